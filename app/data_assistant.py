@@ -15,6 +15,7 @@ a complete data analysis assistant experience.
 """
 
 import logging
+import os
 import panel as pn
 import param
 from app.query_refinement.clarification_workflow import ClarificationWorkflow
@@ -37,6 +38,9 @@ __all__ = ["DataAnalysisAssistant", "data_assistant_page"]
 # Configure logging
 logger = logging.getLogger("data_assistant")
 
+# Minimum interval between narrative pane repaints while tokens stream in
+NARRATIVE_REFRESH_SECONDS = float(os.getenv("MH_NARRATIVE_REFRESH_SECONDS", "0.05"))
+
 # Panel extensions
 pn.extension("tabulator")
 pn.extension("plotly")
@@ -77,6 +81,9 @@ class DataAnalysisAssistant(param.Parameterized):
         self.clarification_workflow = ClarificationWorkflow(self.engine, self.workflow)
         # Initialize feedback component
         self.feedback_widget = None
+        # Identifies the narrative stream allowed to update the UI; a new
+        # query or reset clears it so older streams are ignored
+        self._narrative_token = None
 
         # Load saved questions
         self.saved_questions = _load_saved_questions_db()
@@ -227,6 +234,9 @@ class DataAnalysisAssistant(param.Parameterized):
         import panel as pn
         from functools import partial
 
+        # A narrative still streaming for the previous query must not land
+        self._narrative_token = None
+
         def _worker():
             if not self.query_text:
                 if getattr(pn.state, "curdoc", None) is not None:
@@ -261,10 +271,12 @@ class DataAnalysisAssistant(param.Parameterized):
             # Use real ambiguity/confidence logic
             needs_clarification = is_truly_ambiguous_query(intent)
             self.workflow.mark_intent_parsed(needs_clarification)
-            if getattr(pn.state, "curdoc", None) is not None:
-                pn.state.curdoc.add_next_tick_callback(self._process_current_stage)
-            else:
-                self._process_current_stage()
+            displays = [] if needs_clarification else self._skip_cached_stages()
+            for callback in displays + [self._process_current_stage]:
+                if getattr(pn.state, "curdoc", None) is not None:
+                    pn.state.curdoc.add_next_tick_callback(callback)
+                else:
+                    callback()
 
         if self.test_mode:
             # Run synchronously for tests
@@ -290,12 +302,36 @@ class DataAnalysisAssistant(param.Parameterized):
             intent = self.engine.process_query(self.query_text)
             needs_clarification = is_truly_ambiguous_query(intent)
             self.workflow.mark_intent_parsed(needs_clarification)
+            displays = [] if needs_clarification else self._skip_cached_stages()
+            for callback in displays:
+                callback()
             self._process_current_stage()
         else:
             thread = threading.Thread(target=_worker)
             thread.daemon = True
             thread.start()
 
+    def _skip_cached_stages(self):
+        """Run code generation (and execution) inline after a cached intent
+
+        Uses the engine's per-stage answer-cache flags.  When the intent was a
+        cache hit the code is generated right away; when that was a hit too,
+        the result is fetched as well and the workflow jumps straight to the
+        results stage, without the per-stage workers and indicators.  A code
+        miss leaves the workflow at the execution stage.  Returns the display
+        callbacks to run before ``_process_current_stage``.
+        """
+        if self.engine.cache_hits.get("intent") is not True:
+            return []
+        self.engine.generate_analysis_code()
+        self.workflow.mark_code_generated()
+        displays = [self._display_generated_code]
+        if self.engine.cache_hits.get("code") is True:
+            self.engine.execute_analysis()
+            self.workflow.mark_execution_complete()
+            displays.append(self._display_execution_results)
+        return displays
+
     def _process_current_stage(self):
         """Process the current workflow stage"""
         current_stage = self.workflow.current_stage
@@ -476,41 +512,63 @@ class DataAnalysisAssistant(param.Parameterized):
             # Try to create visualization from results if none exist
             self.ui._create_visualization_from_results(self.engine.execution_results)
 
-        # Update status
-        self.ui.update_status("Analysis executed successfully")
+        # Update status (flag answers served from the answer cache)
+        status = "Analysis executed successfully"
+        if getattr(self.engine, "cache_hits", {}).get("result") is True:
+            status += " (cached result)"
+        self.ui.update_status(status)
 
         # Stop AI indicator
         self.ui.stop_ai_indicator()
 
     def _display_final_results(self):
-        """Display final formatted results with visualizations"""
-        # Check if we should show narrative
-        show_narrative = self.show_narrative == "Narrative"
+        """Display final formatted results with visualizations
 
-        # Generate narrative if needed and not already available
-        narrative_text = None
-        if show_narrative:
-            try:
-                # Use the engine's interpret_results method to generate narrative
-                narrative_text = self.engine.interpret_results()
-            except Exception as e:
-                logger.error(f"Error generating narrative: {e}")
-                narrative_text = None
-
-        # Format results based on narrative preference
-        if show_narrative and narrative_text:
-            # Show narrative view
-            formatted_results = [
-                pn.pane.Markdown(f"### Analysis Results\n\n{narrative_text}")
-            ]
-        else:
+        In narrative mode the results pane is shown straight away and the
+        narrative streams into it token by token (see ``_stream_narrative``).
+        """
+        import threading
+
+        if self.show_narrative != "Narrative":
+            self._narrative_token = None
             # Show tabular/simple results view
-            formatted_results = format_results(
-                self.engine.execution_results,
-                self.engine.intent,
-                False,  # Force tabular view
+            self._show_final_results(self._tabular_results())
+            self.ui.update_status("Analysis completed")
+            return
+
+        narrative_pane = pn.pane.Markdown(
+            "### Analysis Results\n\n*Generating narrative...*"
+        )
+        self._show_final_results([narrative_pane])
+        self.ui.update_status("Generating narrative...")
+
+        # Capture this query's state; the engine moves on with the next query
+        token = self._narrative_token = object()
+        snapshot = {
+            "query_text": self.query_text,
+            "results": self.engine.execution_results,
+            "intent": self.engine.intent,
+            "generated_code": self.engine.generated_code,
+        }
+        if self.test_mode:
+            self._stream_narrative(narrative_pane, token, snapshot)
+        else:
+            thread = threading.Thread(
+                target=self._stream_narrative,
+                args=(narrative_pane, token, snapshot),
             )
+            thread.daemon = True
+            thread.start()
 
+    def _tabular_results(self):
+        return format_results(
+            self.engine.execution_results,
+            self.engine.intent,
+            False,  # Force tabular view
+        )
+
+    def _show_final_results(self, formatted_results):
+        """Put *formatted_results* (plus the refine option) on screen"""
         # Add refine option
         formatted_results = self.ui.add_refine_option(
             formatted_results, self._process_refinement
@@ -531,8 +589,94 @@ class DataAnalysisAssistant(param.Parameterized):
         if hasattr(self, "analyze_button"):
             self.analyze_button.disabled = True
         self._enable_saved_question_buttons(False)
-        # Update status
-        self.ui.update_status("Analysis completed")
+
+    def _stream_narrative(self, narrative_pane, token, snapshot):
+        """Generate the narrative, filling *narrative_pane* as tokens arrive
+
+        *snapshot* holds the query text, results, intent and code captured
+        when the stream started.  Once *token* is no longer the current
+        narrative token (new query, reset, view toggle) the stream stops
+        touching the UI.
+        """
+        import time
+        from functools import partial
+
+        from app.utils.preprocess import validate_narrative
+
+        def _stale():
+            return self._narrative_token is not token
+
+        def _on_ui(callback):
+            def _guarded():
+                if not _stale():
+                    callback()
+
+            if getattr(pn.state, "curdoc", None) is not None:
+                pn.state.curdoc.add_next_tick_callback(_guarded)
+            else:
+                _guarded()
+
+        header = "### Analysis Results\n\n"
+        chunks = []
+        started = time.perf_counter()
+        timing = {"first": None, "shown": 0.0}
+
+        def _on_token(delta):
+            if _stale():
+                return
+            now = time.perf_counter()
+            if timing["first"] is None:
+                timing["first"] = now
+            chunks.append(delta)
+            # Throttle repaints; the final text is always set below
+            if now - timing["shown"] >= NARRATIVE_REFRESH_SECONDS:
+                timing["shown"] = now
+                text = header + "".join(chunks)
+                _on_ui(partial(setattr, narrative_pane, "object", text))
+
+        try:
+            narrative_text = self.engine.interpret_results(on_token=_on_token)
+        except Exception as e:
+            logger.error(f"Error generating narrative: {e}")
+            narrative_text = None
+        finished = time.perf_counter()
+
+        results = snapshot["results"]
+        if narrative_text:
+            narrative_text = validate_narrative(
+                narrative_text,
+                snapshot["query_text"],
+                results if isinstance(results, dict) else {},
+            )
+            _on_ui(partial(setattr, narrative_pane, "object", header + narrative_text))
+        else:
+            # No narrative – fall back to the tabular view
+            def _show_tabular():
+                tabular = format_results(results, snapshot["intent"], False)
+                self.ui.result_container.objects = (
+                    list(tabular) + list(self.ui.result_container.objects)[1:]
+                )
+
+            _on_ui(_show_tabular)
+        _on_ui(partial(self.ui.update_status, "Analysis completed"))
+
+        total_ms = int((finished - started) * 1000)
+        first = timing["first"]
+        ttft_ms = total_ms if first is None else int((first - started) * 1000)
+        logger.info(
+            "Narrative latency: first token %d ms, total %d ms", ttft_ms, total_ms
+        )
+        if not self.test_mode:
+            from app.utils.query_logging import log_interaction
+
+            log_interaction(
+                snapshot["query_text"],
+                intent=snapshot["intent"],
+                generated_code=snapshot["generated_code"],
+                result=narrative_text,
+                narrative_ttft_ms=ttft_ms,
+                narrative_ms=total_ms,
+            )
 
     def _process_refinement(self, refinement_text):
         """Process refinement query"""
@@ -697,6 +841,7 @@ class DataAnalysisAssistant(param.Parameterized):
         self.workflow.reset()
         self.workflow.current_stage = 0  # Explicitly set to initial stage
         self.ui.update_stage_indicators(0)  # Ensure UI is reset
+        self._narrative_token = None
 
         # Clear query input
         self.query_text = ""
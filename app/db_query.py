@@ -15,6 +15,15 @@ from app.utils.schema_cache import load_schema
 from app.utils.patient_attributes import Active, ETOH, Tobacco, GLP1Full, label_for
 from app.reference_ranges import get_reference_range
 from app.config import get_mh_db_path
+from app.utils.db_pool import (
+    get_connection,
+    get_pool,
+    resolve_db_path,
+    write_connection,
+)
+from app.utils.query_cache import get_query_cache, query_cache_enabled
+from app.utils.snapshot_cache import SNAPSHOT_QUERIES, read_table
+from app.utils.dtype_registry import apply_dtypes, typed_frames_enabled
 
 # Configure logging
 logging.basicConfig(
@@ -59,6 +68,9 @@ def set_db_path(path: str | os.PathLike) -> None:  # noqa: D401 – setter
 # runtime via :pyfunc:`_resolve_db_path`.
 DB_PATH = DEFAULT_DB_PATH
 
+# Rows per DataFrame yielded by :func:`iter_query_dataframe`
+DEFAULT_QUERY_CHUNKSIZE = int(os.getenv("MH_QUERY_CHUNKSIZE", "50000"))
+
 
 def _resolve_db_path(db_path: str | None) -> str:  # noqa: D401 – tiny helper
     """Return *db_path* if explicitly provided, otherwise the active path."""
@@ -68,12 +80,32 @@ def _resolve_db_path(db_path: str | None) -> str:  # noqa: D401 – tiny helper
     return db_path
 
 
-def query_dataframe(query, params=None, db_path=None):
+def _typed(df, typed):
+    """Apply :mod:`app.utils.dtype_registry` dtypes when *typed* asks for it.
+
+    ``None`` follows ``MH_TYPED_FRAMES`` (on by default).
+    """
+    if typed is None:
+        typed = typed_frames_enabled()
+    return apply_dtypes(df) if typed else df
+
+
+def query_dataframe(query, params=None, db_path=None, use_cache=True, typed=False):
     """Execute *query* and return the result as a DataFrame.
 
     If *db_path* is ``None`` or still pointing at the original
     ``patient_data.db`` string, we resolve it to the active path returned by
     :pyfunc:`get_db_path` so callers inherit any runtime overrides.
+
+    SELECT results are served from :mod:`app.utils.query_cache` while the
+    database is unchanged; pass ``use_cache=False`` to always hit SQLite.
+
+    ``typed=True`` (or ``None`` to follow ``MH_TYPED_FRAMES``) converts known
+    columns with :func:`app.utils.dtype_registry.apply_dtypes` – parsed
+    dates, categoricals, downcast integers.  Off by default here because
+    many callers feed values back into SQL or the UI as strings; the
+    analytical loaders (``get_all_*``, :func:`iter_query_dataframe`) are
+    typed by default.
     """
 
     # ------------------------------------------------------------------
@@ -87,31 +119,98 @@ def query_dataframe(query, params=None, db_path=None):
 
     db_path = _resolve_db_path(db_path)
 
-    conn = None
     try:
-        conn = sqlite3.connect(db_path)
+        # Pooled, thread-local read connection – owned by the pool, never closed here
+        conn = get_connection(db_path)
+        key = None
+        if use_cache and query_cache_enabled():
+            cache = get_query_cache()
+            key = cache.make_key(conn, resolve_db_path(db_path), query, params)
+            if key is not None:
+                cached = cache.get(key)
+                if cached is not None:
+                    return _typed(cached, typed)
+
+        get_pool().note_statement(query, db_path)
         df = pd.read_sql_query(query, conn, params=params)
-        return df
+        if key is not None:
+            cache.put(key, df)
+        return _typed(df, typed)
     except sqlite3.Error as exc:
         logger.error("Database error in query: %s", exc)
         return pd.DataFrame()
-    finally:
-        if conn:
-            conn.close()
 
 
-def get_all_patients(db_path=DB_PATH):
+def iter_query_dataframe(
+    query, params=None, chunksize=DEFAULT_QUERY_CHUNKSIZE, db_path=None, typed=None
+):
+    """Yield the result of *query* as DataFrames of at most *chunksize* rows.
+
+    Streaming counterpart of :func:`query_dataframe` for full-table scans:
+    rows are fetched from the cursor one chunk at a time, so memory is
+    bounded by *chunksize* rather than by the result size.  Combine with
+    :func:`app.utils.streaming_stats.stream_aggregate` for population-wide
+    summaries.  Results bypass the query cache.  Unlike
+    :func:`query_dataframe`, SQLite errors are logged and re-raised, since
+    an empty stream would be indistinguishable from a truncated one.
+
+    Chunks are typed like the ``get_all_*`` loaders unless ``typed=False``;
+    categorical columns then carry only each chunk's own categories.
+    """
+    if chunksize is None or int(chunksize) < 1:
+        raise ValueError("chunksize must be a positive integer")
+    try:
+        _validate_sql_columns(query, db_path)
+    except ValueError as ve:
+        logger.error("SQL validation error: %s", ve)
+        raise
+
+    db_path = _resolve_db_path(db_path)
+    return _iter_chunks(query, params, int(chunksize), db_path, typed)
+
+
+def _iter_chunks(query, params, chunksize, db_path, typed):
+    # Separate generator so argument and SQL errors surface at call time
+    conn = get_connection(db_path)
+    get_pool().note_statement(query, db_path)
+    try:
+        for chunk in pd.read_sql_query(
+            query, conn, params=params, chunksize=chunksize
+        ):
+            yield _typed(chunk, typed)
+    except sqlite3.Error as exc:
+        logger.error("Database error in chunked query: %s", exc)
+        raise
+
+
+def _read_snapshot_table(table, db_path, typed=None):
+    """Full-table read served from the columnar snapshot while it is fresh.
+
+    Falls back to :func:`query_dataframe` (and re-snapshots the result) when
+    the table changed since the snapshot was written; see
+    :mod:`app.utils.snapshot_cache`.  Snapshots hold the raw SQLite frame;
+    registry dtypes are applied on top unless ``typed=False``.
+    """
+    db_path = _resolve_db_path(db_path)
+    query = SNAPSHOT_QUERIES[table]
+    df = read_table(table, db_path, lambda: query_dataframe(query, db_path=db_path))
+    return _typed(df, typed)
+
+
+def get_all_patients(db_path=DB_PATH, typed=None):
     """
     Retrieve all patient records.
 
     Args:
         db_path (str): Path to the SQLite database file.
+        typed (bool | None): Apply registry dtypes (parsed dates,
+            categoricals, downcast integers); ``None`` follows
+            ``MH_TYPED_FRAMES``.
 
     Returns:
         DataFrame: All patients.
     """
-    query = "SELECT * FROM patients;"
-    return query_dataframe(query, db_path=db_path)
+    return _read_snapshot_table("patients", db_path, typed)
 
 
 def get_patient_by_id(patient_id, db_path=DB_PATH):
@@ -174,11 +273,11 @@ def create_patient(data, db_path=DB_PATH):
     # Make sure we have an ID and it's a string (TEXT)
     if "id" not in data:
         # Get max ID from the database and increment
-        conn = sqlite3.connect(db_path)
-        cur = conn.cursor()
-        cur.execute("SELECT MAX(CAST(id AS INTEGER)) FROM patients")
-        max_id = cur.fetchone()[0]
-        conn.close()
+        max_id = (
+            get_connection(db_path)
+            .execute("SELECT MAX(CAST(id AS INTEGER)) FROM patients")
+            .fetchone()[0]
+        )
 
         # Create new ID
         new_id = str(int(max_id) + 1) if max_id else "1"
@@ -192,20 +291,18 @@ def create_patient(data, db_path=DB_PATH):
     values = tuple(data.values())
     query = f"INSERT INTO patients ({columns}) VALUES ({placeholders});"
 
-    conn = None
     try:
-        conn = sqlite3.connect(db_path)
-        cur = conn.cursor()
-        cur.execute(query, values)
-        conn.commit()
+        with write_connection(db_path) as conn:
+            cur = conn.cursor()
+            cur.execute(query, values)
 
-        # Return the ID we inserted
-        inserted_id = data["id"]
+            # Return the ID we inserted
+            inserted_id = data["id"]
 
-        # Verify the insertion worked
-        verification_query = "SELECT COUNT(*) FROM patients WHERE id = ?"
-        cur.execute(verification_query, (inserted_id,))
-        count = cur.fetchone()[0]
+            # Verify the insertion worked
+            verification_query = "SELECT COUNT(*) FROM patients WHERE id = ?"
+            cur.execute(verification_query, (inserted_id,))
+            count = cur.fetchone()[0]
 
         if count == 0:
             logger.warning(f"Inserted ID {inserted_id} could not be verified")
@@ -214,13 +311,8 @@ def create_patient(data, db_path=DB_PATH):
         logger.info(f"Successfully inserted patient with ID: {inserted_id}")
         return inserted_id
     except sqlite3.Error as e:
-        if conn:
-            conn.rollback()
         logger.error(f"Database error during insert: {e}")
         return None
-    finally:
-        if conn:
-            conn.close()
 
 
 def update_patient(patient_id, updates, db_path=DB_PATH):
@@ -254,31 +346,21 @@ def update_patient(patient_id, updates, db_path=DB_PATH):
     values = tuple(updates.values()) + (patient_id,)
     query = f"UPDATE patients SET {set_clause} WHERE id = ?;"
 
-    conn = None
     try:
-        conn = sqlite3.connect(db_path)
-        cur = conn.cursor()
-        cur.execute(query, values)
-        rows_affected = cur.rowcount
+        with write_connection(db_path) as conn:
+            rows_affected = conn.execute(query, values).rowcount
 
         if rows_affected == 0:
             logger.warning(
                 f"Update did not affect any rows for patient ID: {patient_id}"
             )
-            conn.rollback()
             return False
 
-        conn.commit()
         logger.info(f"Successfully updated patient with ID: {patient_id}")
         return True
     except sqlite3.Error as e:
-        if conn:
-            conn.rollback()
         logger.error(f"Database error during update: {e}")
         return False
-    finally:
-        if conn:
-            conn.close()
 
 
 def delete_patient(patient_id, db_path=DB_PATH):
@@ -305,31 +387,21 @@ def delete_patient(patient_id, db_path=DB_PATH):
 
     query = "DELETE FROM patients WHERE id = ?;"
 
-    conn = None
     try:
-        conn = sqlite3.connect(db_path)
-        cur = conn.cursor()
-        cur.execute(query, (patient_id,))
-        rows_affected = cur.rowcount
+        with write_connection(db_path) as conn:
+            rows_affected = conn.execute(query, (patient_id,)).rowcount
 
         if rows_affected == 0:
             logger.warning(
                 f"Delete did not affect any rows for patient ID: {patient_id}"
             )
-            conn.rollback()
             return False
 
-        conn.commit()
         logger.info(f"Successfully deleted patient with ID: {patient_id}")
         return True
     except sqlite3.Error as e:
-        if conn:
-            conn.rollback()
         logger.error(f"Database error during delete: {e}")
         return False
-    finally:
-        if conn:
-            conn.close()
 
 
 # Example usage (you can remove or modify these when integrating with your app)
@@ -432,8 +504,7 @@ def get_program_stats(db_path: str | None = None):
     # Resolve path so env-var override is honoured
     db_path = _resolve_db_path(db_path)
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    cursor = get_connection(db_path).cursor()
     stats = {}
 
     try:
@@ -508,7 +579,7 @@ def get_program_stats(db_path: str | None = None):
     except sqlite3.Error as e:
         logger.error(f"Error getting program stats: {e}")
     finally:
-        conn.close()
+        cursor.close()
 
     return stats
 
@@ -532,51 +603,44 @@ def get_patient_overview(patient_id, db_path=DB_PATH):
     if patient_df.empty:
         return {"demographics": {}}
 
-    # Get latest vitals
-    vitals_df = get_patient_vitals(patient_id, db_path=db_path)
+    # Get latest vitals (per metric, from the materialized latest_vitals table)
+    vitals_df = get_latest_vitals(patient_id, db_path=db_path)
     latest_vitals = {}
     if not vitals_df.empty:
-        # Get most recent vitals
-        vitals_df = vitals_df.sort_values("date", ascending=False)
-        latest_row = vitals_df.iloc[0]
+        values = dict(zip(vitals_df["metric"], vitals_df["value"]))
         latest_vitals = {
-            "date": latest_row["date"],
-            "weight": latest_row["weight"],
-            "height": latest_row["height"],
-            "bmi": latest_row["bmi"],
-            "systolic": latest_row["sbp"],
-            "diastolic": latest_row["dbp"],
+            "date": vitals_df["date"].max(),
+            "weight": values.get("weight"),
+            "height": values.get("height"),
+            "bmi": values.get("bmi"),
+            "systolic": values.get("sbp"),
+            "diastolic": values.get("dbp"),
         }
 
     # Get latest labs (A1C, etc.)
-    labs_df = get_patient_labs(patient_id, db_path=db_path)
+    labs_df = get_latest_labs(
+        patient_id,
+        test_names=["A1C", "HDL", "LDL", "Triglycerides", "Glucose"],
+        db_path=db_path,
+    )
     latest_labs = {}
-    if not labs_df.empty:
-        # Get most recent of each test type
-        labs_df = labs_df.sort_values("date", ascending=False)
-        for test in ["A1C", "HDL", "LDL", "Triglycerides", "Glucose"]:
-            test_rows = labs_df[labs_df["test_name"] == test]
-            if not test_rows.empty:
-                latest_row = test_rows.iloc[0]
-                latest_labs[test] = {
-                    "date": latest_row["date"],
-                    "value": latest_row["value"],
-                    "unit": latest_row["unit"],
-                }
-
-    # Get latest scores
-    scores_df = get_patient_scores(patient_id, db_path=db_path)
+    for _, latest_row in labs_df.iterrows():
+        latest_labs[latest_row["test_name"]] = {
+            "date": latest_row["date"],
+            "value": latest_row["value"],
+            "unit": latest_row["unit"],
+        }
+
+    # Get latest scores (metabolic scores only; mental health has its own view)
+    scores_df = get_latest_scores(patient_id, db_path=db_path)
     latest_scores = {}
     if not scores_df.empty:
-        scores_df = scores_df.sort_values("date", ascending=False)
-        for score_type in scores_df["score_type"].unique():
-            type_rows = scores_df[scores_df["score_type"] == score_type]
-            if not type_rows.empty:
-                latest_row = type_rows.iloc[0]
-                latest_scores[score_type] = {
-                    "date": latest_row["date"],
-                    "value": latest_row["score_value"],
-                }
+        scores_df = scores_df[scores_df["source"] == "scores"]
+        for _, latest_row in scores_df.iterrows():
+            latest_scores[latest_row["score_type"]] = {
+                "date": latest_row["date"],
+                "value": latest_row["value"],
+            }
 
     # Get visit metrics
     visit_metrics = {}
@@ -624,6 +688,105 @@ def get_patient_overview(patient_id, db_path=DB_PATH):
     return overview
 
 
+def build_abnormal_values_queries():
+    """Return the ``(lab_query, vital_query)`` pair for abnormal lab/vital values.
+
+    Used by :func:`find_patients_with_abnormal_values` and the index advisor.
+    """
+    # Construct query parts for lab results outside normal ranges
+    lab_conditions = []
+    lab_columns = []
+
+    for measure in [
+        "glucose_level",
+        "a1c",
+        "total_cholesterol",
+        "ldl",
+        "hdl",
+        "triglycerides",
+        "sbp",
+        "dbp",
+        "bmi",
+    ]:
+        rng = get_reference_range(measure)
+        if rng is None:
+            continue
+        low, high = rng
+        if measure in ["sbp", "dbp", "bmi"]:  # These are in vitals table
+            continue
+        lab_conditions.append(
+            f"(lab_results.test_name = '{measure}' AND (lab_results.value < {low} OR lab_results.value > {high}))"
+        )
+        lab_columns.append(
+            f"MAX(CASE WHEN lab_results.test_name = '{measure}' THEN lab_results.value END) AS {measure}"
+        )
+
+    # Construct query parts for vital signs outside normal ranges
+    vital_conditions = []
+    vital_columns = []
+
+    for measure in [
+        "glucose_level",
+        "a1c",
+        "total_cholesterol",
+        "ldl",
+        "hdl",
+        "triglycerides",
+        "sbp",
+        "dbp",
+        "bmi",
+    ]:
+        rng = get_reference_range(measure)
+        if rng is None:
+            continue
+        low, high = rng
+        if measure in ["sbp", "dbp", "bmi"]:
+            vital_conditions.append(
+                f"(vitals.{measure} < {low} OR vitals.{measure} > {high})"
+            )
+            vital_columns.append(f"vitals.{measure}")
+
+    # Build query for abnormal lab values
+    lab_query = f"""
+    SELECT 
+        patients.id as patient_id,
+        patients.first_name,
+        patients.last_name,
+        patients.gender,
+        CAST(strftime('%Y', 'now') - strftime('%Y', patients.birth_date) AS INTEGER) as age,
+        {', '.join(lab_columns)}
+    FROM 
+        patients
+    JOIN 
+        lab_results ON patients.id = lab_results.patient_id
+    WHERE 
+        {' OR '.join(lab_conditions)}
+    GROUP BY 
+        patients.id
+    """
+
+    # Build query for abnormal vital values
+    vital_query = f"""
+    SELECT 
+        patients.id as patient_id,
+        patients.first_name,
+        patients.last_name,
+        patients.gender,
+        CAST(strftime('%Y', 'now') - strftime('%Y', patients.birth_date) AS INTEGER) as age,
+        {', '.join(vital_columns)}
+    FROM 
+        patients
+    JOIN 
+        vitals ON patients.id = vitals.patient_id
+    WHERE 
+        {' OR '.join(vital_conditions)}
+    GROUP BY 
+        patients.id
+    """
+
+    return lab_query, vital_query
+
+
 def find_patients_with_abnormal_values(db_path=DB_PATH):
     """
     Find patients with abnormal lab or vital values.
@@ -634,99 +797,10 @@ def find_patients_with_abnormal_values(db_path=DB_PATH):
     Returns:
         pandas.DataFrame: DataFrame containing patients with abnormal values
     """
-    conn = sqlite3.connect(db_path)
+    conn = get_connection(_resolve_db_path(db_path))
 
     try:
-        # Construct query parts for lab results outside normal ranges
-        lab_conditions = []
-        lab_columns = []
-
-        for measure in [
-            "glucose_level",
-            "a1c",
-            "total_cholesterol",
-            "ldl",
-            "hdl",
-            "triglycerides",
-            "sbp",
-            "dbp",
-            "bmi",
-        ]:
-            rng = get_reference_range(measure)
-            if rng is None:
-                continue
-            low, high = rng
-            if measure in ["sbp", "dbp", "bmi"]:  # These are in vitals table
-                continue
-            lab_conditions.append(
-                f"(lab_results.test_name = '{measure}' AND (lab_results.value < {low} OR lab_results.value > {high}))"
-            )
-            lab_columns.append(
-                f"MAX(CASE WHEN lab_results.test_name = '{measure}' THEN lab_results.value END) AS {measure}"
-            )
-
-        # Construct query parts for vital signs outside normal ranges
-        vital_conditions = []
-        vital_columns = []
-
-        for measure in [
-            "glucose_level",
-            "a1c",
-            "total_cholesterol",
-            "ldl",
-            "hdl",
-            "triglycerides",
-            "sbp",
-            "dbp",
-            "bmi",
-        ]:
-            rng = get_reference_range(measure)
-            if rng is None:
-                continue
-            low, high = rng
-            if measure in ["sbp", "dbp", "bmi"]:
-                vital_conditions.append(
-                    f"(vitals.{measure} < {low} OR vitals.{measure} > {high})"
-                )
-                vital_columns.append(f"vitals.{measure}")
-
-        # Build query for abnormal lab values
-        lab_query = f"""
-        SELECT 
-            patients.id as patient_id,
-            patients.first_name,
-            patients.last_name,
-            patients.gender,
-            CAST(strftime('%Y', 'now') - strftime('%Y', patients.birth_date) AS INTEGER) as age,
-            {', '.join(lab_columns)}
-        FROM 
-            patients
-        JOIN 
-            lab_results ON patients.id = lab_results.patient_id
-        WHERE 
-            {' OR '.join(lab_conditions)}
-        GROUP BY 
-            patients.id
-        """
-
-        # Build query for abnormal vital values
-        vital_query = f"""
-        SELECT 
-            patients.id as patient_id,
-            patients.first_name,
-            patients.last_name,
-            patients.gender,
-            CAST(strftime('%Y', 'now') - strftime('%Y', patients.birth_date) AS INTEGER) as age,
-            {', '.join(vital_columns)}
-        FROM 
-            patients
-        JOIN 
-            vitals ON patients.id = vitals.patient_id
-        WHERE 
-            {' OR '.join(vital_conditions)}
-        GROUP BY 
-            patients.id
-        """
+        lab_query, vital_query = build_abnormal_values_queries()
 
         # Execute queries
         lab_df = pd.read_sql_query(lab_query, conn)
@@ -752,8 +826,6 @@ def find_patients_with_abnormal_values(db_path=DB_PATH):
     except (sqlite3.Error, pd.errors.DatabaseError) as e:
         logger.error(f"Error finding patients with abnormal values: {e}")
         return pd.DataFrame()
-    finally:
-        conn.close()
 
 
 def get_patient_vitals(patient_id, start_date=None, end_date=None, db_path=DB_PATH):
@@ -868,27 +940,94 @@ def get_most_recent_labs(patient_id, db_path=DB_PATH):
     """
     patient_id = str(patient_id)
 
+    # latest_labs holds one row per test; join back for the full lab record
     query = """
     SELECT 
-        t1.lab_id,
-        t1.patient_id,
-        t1.date,
-        t1.test_name,
-        t1.value,
-        t1.unit,
-        t1.reference_range
-    FROM lab_results t1
-    INNER JOIN (
-        SELECT test_name, MAX(date) as max_date
-        FROM lab_results
-        WHERE patient_id = ?
-        GROUP BY test_name
-    ) t2 ON t1.test_name = t2.test_name AND t1.date = t2.max_date
-    WHERE t1.patient_id = ?
-    ORDER BY t1.test_name
+        lr.lab_id,
+        lr.patient_id,
+        lr.date,
+        lr.test_name,
+        lr.value,
+        lr.unit,
+        lr.reference_range
+    FROM latest_labs ll
+    JOIN lab_results lr ON lr.lab_id = ll.lab_id
+    WHERE ll.patient_id = ?
+    ORDER BY lr.test_name
+    """
+
+    return query_dataframe(query, params=(patient_id,), db_path=db_path)
+
+
+def _query_latest(table, key_column, patient_id=None, keys=None, db_path=DB_PATH):
+    """Select rows from a materialized ``latest_*`` table (migration 015)."""
+    query = f"SELECT * FROM {table}"
+    clauses = []
+    params = []
+    if patient_id is not None:
+        clauses.append("patient_id = ?")
+        params.append(str(patient_id))
+    if keys is not None:
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        clauses.append(f"{key_column} IN ({', '.join('?' * len(keys))})")
+        params.extend(keys)
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += f" ORDER BY patient_id, {key_column}"
+    return query_dataframe(query, params=tuple(params), db_path=db_path)
+
+
+def get_latest_vitals(patient_id=None, metrics=None, db_path=DB_PATH):
+    """
+    Get the latest non-null value of each vital metric per patient.
+
+    Reads the ``latest_vitals`` table kept current by triggers, so a lookup
+    costs one index probe per patient instead of a scan of the vitals history.
+
+    Args:
+        patient_id (str or int, optional): Restrict to one patient
+        metrics (str or list, optional): Restrict to metrics such as ``"bmi"``
+        db_path (str): Path to the SQLite database file
+
+    Returns:
+        DataFrame: Columns patient_id, metric, value, date
+    """
+    return _query_latest("latest_vitals", "metric", patient_id, metrics, db_path)
+
+
+def get_latest_labs(patient_id=None, test_names=None, db_path=DB_PATH):
+    """
+    Get the latest result of each lab test per patient (``latest_labs``).
+
+    Args:
+        patient_id (str or int, optional): Restrict to one patient
+        test_names (str or list, optional): Restrict to tests such as ``"A1C"``
+        db_path (str): Path to the SQLite database file
+
+    Returns:
+        DataFrame: Columns patient_id, test_name, value, unit, date, lab_id
+    """
+    return _query_latest("latest_labs", "test_name", patient_id, test_names, db_path)
+
+
+def get_latest_scores(patient_id=None, score_types=None, db_path=DB_PATH):
     """
+    Get the latest score of each type per patient (``latest_scores``).
 
-    return query_dataframe(query, params=(patient_id, patient_id), db_path=db_path)
+    Covers both ``scores`` (e.g. vitality_score) and ``mental_health``
+    assessments (e.g. PHQ-9); the ``source`` column names the origin table.
+
+    Args:
+        patient_id (str or int, optional): Restrict to one patient
+        score_types (str or list, optional): Restrict to types such as ``"PHQ-9"``
+        db_path (str): Path to the SQLite database file
+
+    Returns:
+        DataFrame: Columns patient_id, score_type, value, date, source
+    """
+    return _query_latest(
+        "latest_scores", "score_type", patient_id, score_types, db_path
+    )
 
 
 def get_patient_scores(patient_id, start_date=None, end_date=None, db_path=DB_PATH):
@@ -969,54 +1108,48 @@ def get_patient_visit_metrics(patient_id, db_path=DB_PATH):
     return query_dataframe(query, params=(patient_id,), db_path=db_path)
 
 
-def get_all_vitals(db_path=DB_PATH):
+def get_all_vitals(db_path=DB_PATH, typed=None):
     """
     Retrieve all vital signs data from the database.
 
     Args:
         db_path (str): Path to the SQLite database file
+        typed (bool | None): Apply registry dtypes; ``None`` follows
+            ``MH_TYPED_FRAMES``
 
     Returns:
-        DataFrame: All vitals data from the vitals table
-    """
-    query = """
-        SELECT * 
-        FROM vitals
-        ORDER BY date DESC
+        DataFrame: All vitals data from the vitals table, newest first
     """
-
-    df = query_dataframe(query, db_path=db_path)
-
-    return df
+    return _read_snapshot_table("vitals", db_path, typed)
 
 
-def get_all_scores(db_path=DB_PATH):
+def get_all_scores(db_path=DB_PATH, typed=None):
     """Retrieve all rows from the scores table.
 
     Args:
         db_path: Path to the SQLite database file.
+        typed: Apply registry dtypes; ``None`` follows ``MH_TYPED_FRAMES``.
 
     Returns
     -------
     DataFrame containing every record from the `scores` table.
     """
-    query = "SELECT * FROM scores;"
-    return query_dataframe(query, db_path=db_path)
+    return _read_snapshot_table("scores", db_path, typed)
 
 
-def get_all_mental_health(db_path=DB_PATH):
+def get_all_mental_health(db_path=DB_PATH, typed=None):
     """Retrieve all rows from the mental_health table.
 
     Args
     ----
     db_path: Path to the SQLite database file.
+    typed: Apply registry dtypes; ``None`` follows ``MH_TYPED_FRAMES``.
 
     Returns
     -------
     DataFrame with all mental health assessment records.
     """
-    query = "SELECT * FROM mental_health;"
-    return query_dataframe(query, db_path=db_path)
+    return _read_snapshot_table("mental_health", db_path, typed)
 
 
 # ---------------------------------------------------------------------------
@@ -29,6 +29,15 @@ from app.utils.assumptions import (
     get_default_aggregator,
 )
 from app.utils.ai_helper import AIHelper
+from app.utils.ai.execution_plan import ExecutionPlan, compile_plan, fast_path_enabled
+from app.utils.answer_cache import (
+    STAGES as CACHE_STAGES,
+    answer_cache_enabled,
+    data_version_stamp,
+    get_answer_cache,
+    make_key,
+    normalize_query,
+)
 
 ai = AIHelper()
 
@@ -47,7 +56,8 @@ class AnalysisEngine:
     - Intent parsing from natural language queries
     - Clarification of ambiguous queries
     - Code generation based on query intent
-    - Safe execution of generated code in a sandbox environment
+    - Safe execution of generated code in a sandbox environment (template
+      code runs in-process as an :class:`ExecutionPlan`)
     - Result extraction and visualization generation
     - Data sample generation for context
 
@@ -68,12 +78,29 @@ class AnalysisEngine:
         self.query = ""  # The original natural language query
         self.intent = None  # Parsed intent from the query
         self.generated_code = ""  # Python code generated for analysis
+        self.plan = None  # In-process plan when the code is a trusted template
         self.execution_results = None  # Results from code execution
         self.visualizations = []  # Visualizations generated from results
         self.start_time = None  # Timestamp when processing started
         self.end_time = None  # Timestamp when processing finished
         self.threshold_info = None  # Information about threshold queries
         self.parameters = {}  # Additional parameters for query handling
+        # Per-stage answer-cache hit flags (intent/code/result/narrative)
+        self.cache_hits = dict.fromkeys(CACHE_STAGES, False)
+        self._result_key = None  # Cache key of the current execution result
+
+    def _cache_get(self, stage, key):
+        """Look *key* up in the answer cache; returns ``(hit, value)``."""
+        if not answer_cache_enabled():
+            return False, None
+        hit, value = get_answer_cache().get(stage, key)
+        self.cache_hits[stage] = hit
+        return hit, value
+
+    def _cache_put(self, stage, key, value):
+        """Store *value* in the answer cache (no-op when disabled)."""
+        if answer_cache_enabled():
+            get_answer_cache().put(stage, key, value)
 
     def process_query(self, query):
         """
@@ -92,10 +119,13 @@ class AnalysisEngine:
         self.query = query
         self.intent = None
         self.generated_code = ""
+        self.plan = None
         self.execution_results = None
         self.visualizations = []
         self.threshold_info = None
         self.parameters = {}
+        self.cache_hits = dict.fromkeys(CACHE_STAGES, False)
+        self._result_key = None
 
         # Check for threshold queries
         self.threshold_info = self.detect_threshold_query(query)
@@ -223,6 +253,12 @@ class AnalysisEngine:
         """
 
         # logger.info(f"Getting intent for query: {self.query}")
+        cache_key = make_key(ai.model, normalize_query(self.query), self.parameters)
+        hit, cached = self._cache_get("intent", cache_key)
+        if hit:
+            self.intent = cached
+            return self.intent
+
         try:
             self.intent = ai.get_query_intent(self.query)
 
@@ -293,6 +329,8 @@ class AnalysisEngine:
                 else:
                     self.intent.parameters = {"confidence": confidence}
 
+                self._cache_put("intent", cache_key, self.intent)
+
             return self.intent
         except Exception as e:
             logger.error(f"Error getting query intent: {e}", exc_info=True)
@@ -457,6 +495,20 @@ class AnalysisEngine:
             self.generated_code = self.generate_fallback_code()
             return self.generated_code
 
+        # Reuse code generated earlier for an identical intent
+        cache_key = None
+        if answer_cache_enabled() and isinstance(self.intent, QueryIntent):
+            signature = self.intent.model_dump(mode="json")
+            signature.get("parameters", {}).pop("confidence", None)
+            cache_key = make_key(
+                ai.model, signature, custom_prompt, self.threshold_info
+            )
+            hit, cached = self._cache_get("code", cache_key)
+            if hit:
+                self.generated_code = cached
+                self.plan = self._template_plan()
+                return self.generated_code
+
         # Generate code from AI based on intent
         try:
             self.generated_code = ai.generate_analysis_code(
@@ -469,12 +521,40 @@ class AnalysisEngine:
                     self.generated_code
                 )
 
+            if cache_key:
+                self._cache_put("code", cache_key, self.generated_code)
+            self.plan = self._template_plan()
             return self.generated_code
         except Exception as e:
             logger.error(f"Error generating analysis code: {e}", exc_info=True)
             self.generated_code = self.generate_fallback_code()
             return self.generated_code
 
+    def _template_plan(self):
+        """Return an :class:`ExecutionPlan` when the generated code is ours.
+
+        The code is trusted only if it is exactly what the deterministic
+        template generator produces for the current intent (plus the threshold
+        visualisation this engine appends) and the intent names only known
+        fields (see :func:`compile_plan`); anything else – LLM output, test
+        stubs, unknown field names – keeps going through the sandbox.
+        """
+        if not fast_path_enabled() or not isinstance(self.intent, QueryIntent):
+            return None
+        try:
+            plan = compile_plan(self.intent)
+        except Exception as e:
+            logger.debug("No template plan for intent: %s", e)
+            return None
+        if plan is None:
+            return None
+        expected = plan.code
+        if self.threshold_info:
+            expected = self._enhance_threshold_visualization(expected)
+        if self.generated_code != expected:
+            return None
+        return ExecutionPlan(plan.analysis_type, expected)
+
     def _enhance_threshold_visualization(self, code):
         """
         Enhance code with threshold visualization if needed
@@ -613,7 +693,8 @@ except Exception as viz_error:
 
         Runs the generated Python code in a sandboxed environment, captures
         the results, and extracts any visualizations that were created during
-        execution.
+        execution.  Trusted template code (see :meth:`_template_plan`) skips
+        the sandbox and runs in-process.
 
         Returns:
             Any: The results from executing the code
@@ -624,6 +705,9 @@ except Exception as viz_error:
         if not self.generated_code:
             raise ValueError("No code has been generated. Generate code first.")
 
+        if self.plan is not None and self.plan.code == self.generated_code:
+            return self._execute_plan()
+
         # Add safety wrappers to the code
         safe_code = self.add_sandbox_safety(self.generated_code)
 
@@ -639,27 +723,57 @@ except Exception as viz_error:
             print("\n====== BEGIN EXECUTED CODE ======\n")
             print(safe_code)
             print("\n======= END EXECUTED CODE =======\n")
-            # Execute the code in the sandbox
-            result = run_snippet(safe_code)
-
-            # If the result is a dictionary, add any active/inactive preference from the engine
-            if isinstance(result, dict) and "include_inactive" not in result:
-                include_inactive = self.parameters.get("include_inactive", None)
-                if include_inactive is not None:
-                    result["include_inactive"] = include_inactive
-
-            self.execution_results = result
-
-            # Extract visualizations if any
-            self.extract_visualizations()
-
-            return result
+            # Execute the code in the sandbox unless the same code already ran
+            # against the same data
+            hit = False
+            if answer_cache_enabled():
+                from app.db_query import get_db_path
+
+                stamp = data_version_stamp(get_db_path())
+                self._result_key = make_key(safe_code, stamp)
+                hit, result = self._cache_get("result", self._result_key)
+            if not hit:
+                result = run_snippet(safe_code)
+                if not (isinstance(result, dict) and "error" in result):
+                    self._cache_put("result", self._result_key, result)
+
+            return self._finish_execution(result)
         except Exception as e:
             logger.error(f"Error executing analysis: {e}", exc_info=True)
             error_result = {"error": str(e)}
             self.execution_results = error_result
             return error_result
 
+    def _execute_plan(self):
+        """Run a template :class:`ExecutionPlan` in-process (no sandbox)."""
+        hit = False
+        if answer_cache_enabled():
+            from app.db_query import get_db_path
+
+            stamp = data_version_stamp(get_db_path())
+            self._result_key = make_key(self.plan.code, stamp)
+            hit, result = self._cache_get("result", self._result_key)
+        if not hit:
+            result = self.plan.run()
+            if not (isinstance(result, dict) and "error" in result):
+                self._cache_put("result", self._result_key, result)
+        return self._finish_execution(result)
+
+    def _finish_execution(self, result):
+        """Store *result*, tag the include-inactive preference, extract visuals."""
+        # If the result is a dictionary, add any active/inactive preference from the engine
+        if isinstance(result, dict) and "include_inactive" not in result:
+            include_inactive = self.parameters.get("include_inactive", None)
+            if include_inactive is not None:
+                result["include_inactive"] = include_inactive
+
+        self.execution_results = result
+
+        # Extract visualizations if any
+        self.extract_visualizations()
+
+        return result
+
     def extract_visualizations(self):
         """Extract visualizations from execution results if present"""
         self.visualizations = []
@@ -680,8 +794,12 @@ except Exception as viz_error:
 
         return self.visualizations
 
-    def interpret_results(self):
-        """Generate a human-readable interpretation of the results"""
+    def interpret_results(self, on_token=None):
+        """Generate a human-readable interpretation of the results
+
+        *on_token* (optional) receives narrative text deltas while the model
+        streams them; a cached narrative is delivered as a single delta.
+        """
         if not self.execution_results:
             from app.utils.assumptions import NO_DATA_MESSAGE
 
@@ -714,9 +832,26 @@ except Exception as viz_error:
                     }
 
             # Use AI to interpret the results
-            interpretation = ai.interpret_results(
-                self.query, results_for_ai, self.visualizations
-            )
+            cache_key = None
+            hit = False
+            if self._result_key:
+                cache_key = make_key(
+                    ai.model,
+                    normalize_query(self.query),
+                    self._result_key,
+                    include_inactive,
+                )
+                hit, interpretation = self._cache_get("narrative", cache_key)
+            if hit:
+                if on_token is not None and interpretation:
+                    on_token(interpretation)
+            else:
+                stream = {} if on_token is None else {"on_token": on_token}
+                interpretation = ai.interpret_results(
+                    self.query, results_for_ai, self.visualizations, **stream
+                )
+                if cache_key and interpretation:
+                    self._cache_put("narrative", cache_key, interpretation)
 
             # Add patient status to interpretation if not already mentioned
             if include_inactive is not None and interpretation:
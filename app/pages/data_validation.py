@@ -508,7 +508,7 @@ class DataValidationPage(param.Parameterized):
                 self.validation_engine.validate_patient(patient_id)
             else:
                 logger.info("Validating all patients")
-                self.validation_engine.validate_all_patients()
+                self.validation_engine.validate_all_patients(batch=True)
             # Refresh data
             self.refresh_data()
             # Notify user completion
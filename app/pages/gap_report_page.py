@@ -15,7 +15,10 @@ import pandas as pd
 import logging
 import io
 
-from app.utils.gap_report import get_condition_gap_report
+from app.utils.gap_report import (
+    get_all_condition_gap_reports,
+    get_condition_gap_report,
+)
 from app.utils.silent_dropout import (
     get_clinical_inactivity_report,
     mark_patient_as_inactive,
@@ -26,6 +29,9 @@ logger = logging.getLogger(__name__)
 
 pn.extension()  # ensure widgets and FileDownload available
 
+# Condition-dropdown entry that runs every gap rule at once
+ALL_CONDITIONS = "All Conditions"
+
 
 class GapReportPage(param.Parameterized):
     """Panel UI for the Condition Gap Report."""
@@ -61,7 +67,7 @@ class GapReportPage(param.Parameterized):
         from app.utils.gap_report import _RULES  # type: ignore – internal import
 
         # Store options for each report type
-        self._condition_options = sorted(_RULES.keys())
+        self._condition_options = sorted(_RULES.keys()) + [ALL_CONDITIONS]
         self._engagement_options = ["Silent Dropouts"]
 
         # Set initial condition dropdown options
@@ -148,9 +154,15 @@ class GapReportPage(param.Parameterized):
         """Run report and refresh table & download."""
         try:
             if self.report_type == "Condition Gaps":
-                self._df = get_condition_gap_report(
-                    self.condition, active_only=self.active_only
-                )
+                if self.condition == ALL_CONDITIONS:
+                    # Every rule in one query (long format, ``condition`` column)
+                    self._df = get_all_condition_gap_reports(
+                        active_only=self.active_only
+                    )
+                else:
+                    self._df = get_condition_gap_report(
+                        self.condition, active_only=self.active_only
+                    )
 
                 # Format dates for display
                 if not self._df.empty and "date" in self._df.columns:
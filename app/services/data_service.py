@@ -4,10 +4,11 @@ Data Service Module
 This module centralizes all database access and query logic for the application.
 """
 
-import sqlite3
 import logging
 import pandas as pd
 
+from app.utils.db_pool import get_connection, write_connection
+
 
 def get_db_path():
     """Get the database path from app.db_query module to ensure consistent source."""
@@ -21,15 +22,13 @@ def ensure_rules_exist(db_path):
     from app.utils.rule_loader import initialize_validation_rules
 
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        cursor = get_connection(db_path).cursor()
         cursor.execute("SELECT COUNT(*) FROM validation_rules")
         count = cursor.fetchone()[0]
         if count == 0:
             logging.info(
                 "No validation rules found in database. Initializing from default file."
             )
-            conn.close()
             initialize_validation_rules(db_path)
         # logging.info(f"Found {count} validation rules in database.")
     except Exception as e:
@@ -40,8 +39,7 @@ def ensure_rules_exist(db_path):
 def load_summary_data(db_path):
     """Load summary statistics for the dashboard."""
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        cursor = get_connection(db_path).cursor()
 
         # Get counts by status
         cursor.execute(
@@ -76,7 +74,6 @@ def load_summary_data(db_path):
         cursor.execute("SELECT COUNT(DISTINCT patient_id) FROM validation_results")
         patient_count = cursor.fetchone()[0]
 
-        conn.close()
         return (
             status_counts,
             severity_counts,
@@ -92,7 +89,7 @@ def load_summary_data(db_path):
 def load_quality_metrics(db_path):
     """Load aggregated issue counts by field and over time (daily)."""
     try:
-        conn = sqlite3.connect(db_path)
+        conn = get_connection(db_path)
         query = """
             SELECT vr.field_name            AS field,
                    date(vr.detected_at)     AS dt,
@@ -104,7 +101,6 @@ def load_quality_metrics(db_path):
             GROUP BY field, dt, severity
             """
         df = pd.read_sql_query(query, conn)
-        conn.close()
 
         if df.empty:
             return pd.DataFrame(), pd.DataFrame()
@@ -130,38 +126,47 @@ def load_quality_metrics(db_path):
         return pd.DataFrame(), pd.DataFrame()
 
 
+def build_patient_list_sql(
+    filter_status_value, filter_severity_value, filter_type_value
+):
+    """Return ``(query, params)`` for :func:`load_patient_list`."""
+    query = """
+        SELECT vr.patient_id, p.first_name, p.last_name, 
+               COUNT(DISTINCT vr.rule_id) as issue_count,
+               COUNT(DISTINCT CASE WHEN vr.status = 'open' THEN vr.rule_id END) as open_count,
+               MAX(CASE WHEN vru.severity = 'error' THEN 1 ELSE 0 END) as has_errors
+        FROM validation_results vr
+        JOIN patients p ON vr.patient_id = p.id
+        JOIN validation_rules vru ON vr.rule_id = vru.rule_id
+        WHERE 1=1
+    """
+    params = []
+    if filter_status_value != "all":
+        query += " AND vr.status = ?"
+        params.append(filter_status_value)
+    if filter_severity_value != "all":
+        query += " AND vru.severity = ?"
+        params.append(filter_severity_value)
+    if filter_type_value != "all":
+        query += " AND vru.rule_type = ?"
+        params.append(filter_type_value)
+    query += """
+        GROUP BY vr.patient_id, p.first_name, p.last_name
+        ORDER BY open_count DESC, has_errors DESC, issue_count DESC
+    """
+    return query, params
+
+
 def load_patient_list(
     db_path, filter_status_value, filter_severity_value, filter_type_value
 ):
     """Load list of patients with validation issues, filtered by status, severity, and type."""
     try:
-        conn = sqlite3.connect(db_path)
-        query = """
-            SELECT vr.patient_id, p.first_name, p.last_name, 
-                   COUNT(DISTINCT vr.rule_id) as issue_count,
-                   COUNT(DISTINCT CASE WHEN vr.status = 'open' THEN vr.rule_id END) as open_count,
-                   MAX(CASE WHEN vru.severity = 'error' THEN 1 ELSE 0 END) as has_errors
-            FROM validation_results vr
-            JOIN patients p ON vr.patient_id = p.id
-            JOIN validation_rules vru ON vr.rule_id = vru.rule_id
-            WHERE 1=1
-        """
-        params = []
-        if filter_status_value != "all":
-            query += " AND vr.status = ?"
-            params.append(filter_status_value)
-        if filter_severity_value != "all":
-            query += " AND vru.severity = ?"
-            params.append(filter_severity_value)
-        if filter_type_value != "all":
-            query += " AND vru.rule_type = ?"
-            params.append(filter_type_value)
-        query += """
-            GROUP BY vr.patient_id, p.first_name, p.last_name
-            ORDER BY open_count DESC, has_errors DESC, issue_count DESC
-        """
+        conn = get_connection(db_path)
+        query, params = build_patient_list_sql(
+            filter_status_value, filter_severity_value, filter_type_value
+        )
         df = pd.read_sql_query(query, conn, params=params)
-        conn.close()
         return df
     except Exception as e:
         logging.error(f"Error loading patient list: {e}")
@@ -180,52 +185,49 @@ def load_patient_list(
 def submit_correction_db(db_path, result_id, correction_value, correction_reason):
     """Submit a correction for an issue."""
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        # Get information about the issue
-        cursor.execute(
-            """
-            SELECT vr.patient_id, vr.field_name, vr.rule_id
-            FROM validation_results vr
-            WHERE vr.result_id = ?
-            """,
-            (result_id,),
-        )
-        row = cursor.fetchone()
-        if not row:
-            conn.close()
-            return False
-        patient_id, field_name, rule_id = row
-        # Insert correction
-        cursor.execute(
-            """
-            INSERT INTO data_corrections 
-            (result_id, patient_id, field_name, table_name, record_id, new_value, applied_by)
-            VALUES (?, ?, ?, 'vitals', 0, ?, 'current_user')
-            """,
-            (result_id, patient_id, field_name, correction_value),
-        )
-        correction_id = cursor.lastrowid
-        # Add audit record
-        cursor.execute(
-            """
-            INSERT INTO correction_audit 
-            (correction_id, result_id, action_type, action_reason, action_by)
-            VALUES (?, ?, 'correction', ?, 'current_user')
-            """,
-            (correction_id, result_id, correction_reason),
-        )
-        # Update issue status
-        cursor.execute(
-            """
-            UPDATE validation_results
-            SET status = 'corrected'
-            WHERE result_id = ?
-            """,
-            (result_id,),
-        )
-        conn.commit()
-        conn.close()
+        with write_connection(db_path) as conn:
+            cursor = conn.cursor()
+            # Get information about the issue
+            cursor.execute(
+                """
+                SELECT vr.patient_id, vr.field_name, vr.rule_id
+                FROM validation_results vr
+                WHERE vr.result_id = ?
+                """,
+                (result_id,),
+            )
+            row = cursor.fetchone()
+            if not row:
+                return False
+            patient_id, field_name, rule_id = row
+            # Insert correction
+            cursor.execute(
+                """
+                INSERT INTO data_corrections 
+                (result_id, patient_id, field_name, table_name, record_id, new_value, applied_by)
+                VALUES (?, ?, ?, 'vitals', 0, ?, 'current_user')
+                """,
+                (result_id, patient_id, field_name, correction_value),
+            )
+            correction_id = cursor.lastrowid
+            # Add audit record
+            cursor.execute(
+                """
+                INSERT INTO correction_audit 
+                (correction_id, result_id, action_type, action_reason, action_by)
+                VALUES (?, ?, 'correction', ?, 'current_user')
+                """,
+                (correction_id, result_id, correction_reason),
+            )
+            # Update issue status
+            cursor.execute(
+                """
+                UPDATE validation_results
+                SET status = 'corrected'
+                WHERE result_id = ?
+                """,
+                (result_id,),
+            )
         return True
     except Exception as e:
         logging.error(f"Error submitting correction: {e}")
@@ -235,28 +237,25 @@ def submit_correction_db(db_path, result_id, correction_value, correction_reason
 def mark_as_reviewed_db(db_path, result_id, reason):
     """Mark an issue as reviewed."""
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        # Add audit record
-        cursor.execute(
-            """
-            INSERT INTO correction_audit 
-            (result_id, action_type, action_reason, action_by)
-            VALUES (?, 'review', ?, 'current_user')
-            """,
-            (result_id, reason),
-        )
-        # Update issue status
-        cursor.execute(
-            """
-            UPDATE validation_results
-            SET status = 'reviewed'
-            WHERE result_id = ?
-            """,
-            (result_id,),
-        )
-        conn.commit()
-        conn.close()
+        with write_connection(db_path) as conn:
+            # Add audit record
+            conn.execute(
+                """
+                INSERT INTO correction_audit 
+                (result_id, action_type, action_reason, action_by)
+                VALUES (?, 'review', ?, 'current_user')
+                """,
+                (result_id, reason),
+            )
+            # Update issue status
+            conn.execute(
+                """
+                UPDATE validation_results
+                SET status = 'reviewed'
+                WHERE result_id = ?
+                """,
+                (result_id,),
+            )
         return True
     except Exception as e:
         logging.error(f"Error marking as reviewed: {e}")
@@ -266,20 +265,17 @@ def mark_as_reviewed_db(db_path, result_id, reason):
 def validate_patient_db_ops(db_path, patient_id=None):
     """Delete previous validation results for a patient or all patients."""
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        if patient_id:
-            cursor.execute(
-                "DELETE FROM validation_results WHERE patient_id = ?", (patient_id,)
-            )
-            logging.info(
-                f"Cleared previous validation results for patient {patient_id}"
-            )
-        else:
-            cursor.execute("DELETE FROM validation_results")
-            logging.info("Cleared all previous validation results")
-        conn.commit()
-        conn.close()
+        with write_connection(db_path) as conn:
+            if patient_id:
+                conn.execute(
+                    "DELETE FROM validation_results WHERE patient_id = ?", (patient_id,)
+                )
+                logging.info(
+                    f"Cleared previous validation results for patient {patient_id}"
+                )
+            else:
+                conn.execute("DELETE FROM validation_results")
+                logging.info("Cleared all previous validation results")
     except Exception as e:
         logging.error(f"Error purging validation results: {e}")
 
@@ -287,7 +283,7 @@ def validate_patient_db_ops(db_path, patient_id=None):
 def compute_record_quality_db(db_path, patient_id):
     """Compute blocking-rule pass-rate and return (ratio, colour_key)."""
     try:
-        conn = sqlite3.connect(db_path)
+        conn = get_connection(db_path)
         # Total active blocking rules (severity == 'error')
         total_blocking = conn.execute(
             "SELECT COUNT(*) FROM validation_rules WHERE severity = 'error' AND is_active = 1"
@@ -302,7 +298,6 @@ def compute_record_quality_db(db_path, patient_id):
             """,
             (str(patient_id),),
         ).fetchone()[0]
-        conn.close()
         if total_blocking == 0:
             return 1.0, "success"
         passed = max(total_blocking - failing, 0)
@@ -325,36 +320,33 @@ def mark_patient_as_verified_db(db_path, patient_id, reason):
         if not patient_id:
             return {"success": False, "message": "No patient_id provided"}
         logging.info(f"Marking patient {patient_id} as verified")
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        # Get *all* result_ids for this patient (independent of current status)
-        cursor.execute(
-            "SELECT result_id FROM validation_results WHERE patient_id = ?",
-            (patient_id,),
-        )
-        result_ids = [row[0] for row in cursor.fetchall()]
-        if not result_ids:
-            conn.close()
-            return {
-                "success": False,
-                "message": "No validation results found for this patient",
-            }
-        # Audit table entries (one per result)
-        audit_rows = [(rid, "verify", reason, "current_user") for rid in result_ids]
-        cursor.executemany(
-            """
-            INSERT INTO correction_audit (result_id, action_type, action_reason, action_by)
-            VALUES (?, ?, ?, ?)
-            """,
-            audit_rows,
-        )
-        # Update all results to status = 'verified'
-        cursor.execute(
-            "UPDATE validation_results SET status = 'verified' WHERE patient_id = ?",
-            (patient_id,),
-        )
-        conn.commit()
-        conn.close()
+        with write_connection(db_path) as conn:
+            cursor = conn.cursor()
+            # Get *all* result_ids for this patient (independent of current status)
+            cursor.execute(
+                "SELECT result_id FROM validation_results WHERE patient_id = ?",
+                (patient_id,),
+            )
+            result_ids = [row[0] for row in cursor.fetchall()]
+            if not result_ids:
+                return {
+                    "success": False,
+                    "message": "No validation results found for this patient",
+                }
+            # Audit table entries (one per result)
+            audit_rows = [(rid, "verify", reason, "current_user") for rid in result_ids]
+            cursor.executemany(
+                """
+                INSERT INTO correction_audit (result_id, action_type, action_reason, action_by)
+                VALUES (?, ?, ?, ?)
+                """,
+                audit_rows,
+            )
+            # Update all results to status = 'verified'
+            cursor.execute(
+                "UPDATE validation_results SET status = 'verified' WHERE patient_id = ?",
+                (patient_id,),
+            )
         return {
             "success": True,
             "message": f"Patient {patient_id} verified (\u2713 {len(result_ids)} issues).",
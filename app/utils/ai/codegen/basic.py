@@ -4,7 +4,43 @@ basic.py
 Code generation for basic aggregate analysis types (count, sum, average, min, max, median, variance, std_dev).
 """
 
-from app.utils.ai.sql_builder import build_filters_clause, sql_select
+from app.utils.ai.sql_builder import (
+    LATEST_VITAL_METRICS,
+    bound_query_code,
+    build_filters,
+    inline_params,
+    latest_vitals_source,
+    sql_select,
+)
+from app.utils.assumptions import LATEST_PER_PATIENT_SOURCE
+
+# Vitals columns (and filter aliases of them) a filter may reference
+_VITALS_COLUMNS = {"date", "test_date", "weight", "height", "bmi", "sbp", "dbp", "vital_id"}
+
+
+def _vitals_from(intent, metrics, group_by, parameters, sql_where_clause):
+    """Return ``(source, where)`` for ``FROM <source> v``.
+
+    Ungrouped questions about each patient's latest value read one row per
+    patient from ``latest_vitals`` instead of the full vitals history.  Date
+    ranges and filters on vitals columns other than *metrics* keep the full
+    history: the per-patient rows have neither the other columns nor the
+    reading dates those filters need.
+    """
+    items = list(getattr(intent, "filters", []) or []) + list(
+        getattr(intent, "conditions", []) or []
+    )
+    filter_fields = {item.field.lower() for item in items}
+    if (
+        parameters.get("metric_instance") == LATEST_PER_PATIENT_SOURCE
+        and not group_by
+        and set(metrics) <= LATEST_VITAL_METRICS
+        and getattr(intent, "time_range", None) is None
+        and not any(getattr(item, "date_range", None) for item in items)
+        and not (filter_fields & (_VITALS_COLUMNS - set(metrics)))
+    ):
+        return latest_vitals_source(metrics), sql_where_clause.replace("vitals.", "v.")
+    return "vitals", sql_where_clause
 
 
 def generate_basic_code(intent, parameters=None):
@@ -15,7 +51,8 @@ def generate_basic_code(intent, parameters=None):
     additional_fields = getattr(intent, "additional_fields", []) or []
     parameters = parameters or getattr(intent, "parameters", {}) or {}
 
-    sql_where = build_filters_clause(intent)
+    # Filter values are bound as parameters; comments show them inlined
+    sql_where, params = build_filters(intent)
     sql_where_clause = sql_where[6:] if sql_where.startswith("WHERE ") else sql_where
 
     # COUNT, SUM, AVG, MIN, MAX (single or multi-metric, with/without group_by)
@@ -67,6 +104,7 @@ def generate_basic_code(intent, parameters=None):
             )
             code += "# Query data\n"
 
+            sql = f"SELECT COUNT(*) as count FROM {base_table} {table_alias}"
             if sql_where_clause:
                 # Fix table prefixes in WHERE clause if needed
                 fixed_where_clause = sql_where_clause
@@ -74,17 +112,15 @@ def generate_basic_code(intent, parameters=None):
                     # Replace vitals.field with p.field and patients.field with p.field
                     fixed_where_clause = fixed_where_clause.replace("vitals.", "p.")
                     fixed_where_clause = fixed_where_clause.replace("patients.", "p.")
+                sql += f" WHERE {fixed_where_clause}"
 
-                code += f'sql = """SELECT COUNT(*) as count FROM {base_table} {table_alias} WHERE {fixed_where_clause}"""\n'
-                code += f"# SQL equivalent: SELECT COUNT(*) FROM {base_table} {table_alias} WHERE {fixed_where_clause}\n"
-            else:
-                code += f'sql = """SELECT COUNT(*) as count FROM {base_table} {table_alias}"""\n'
-                code += f"# SQL equivalent: SELECT COUNT(*) FROM {base_table} {table_alias}\n"
-
-            code += "df = query_dataframe(sql)\n"
+            code += bound_query_code(sql, params)
             code += "if not df.empty and 'count' in df.columns:\n    results = int(df['count'].iloc[0])\nelse:\n    results = 0\n"
             return code
 
+        vitals_from, sql_where_clause = _vitals_from(
+            intent, metrics, group_by, parameters, sql_where_clause
+        )
         code = f"# SQL equivalent: SELECT {sql_agg_func}({metrics[0]}) FROM vitals v\n"
         code += "# Query data\n"
         select_fields = metrics.copy()
@@ -102,20 +138,18 @@ def generate_basic_code(intent, parameters=None):
 
         if needs_patient_join:
             # Use JOIN when we need patient filters with vitals data
-            code += f'sql = """SELECT {sql_select(select_fields)} FROM vitals v JOIN patients p ON v.patient_id = p.id'
+            sql = f"SELECT {sql_select(select_fields)} FROM {vitals_from} v JOIN patients p ON v.patient_id = p.id"
             if sql_where_clause:
                 # Fix table prefixes in WHERE clause
                 fixed_where_clause = sql_where_clause.replace("patients.", "p.")
-                code += f" WHERE {fixed_where_clause}"
-            code += '"""\n'
+                sql += f" WHERE {fixed_where_clause}"
         else:
             # Use simple vitals query when no patient filters
-            code += f'sql = """SELECT {sql_select(select_fields)} FROM vitals v'
+            sql = f"SELECT {sql_select(select_fields)} FROM {vitals_from} v"
             if sql_where_clause:
-                code += f" WHERE {sql_where_clause}"
-            code += '"""\n'
+                sql += f" WHERE {sql_where_clause}"
 
-        code += "df = query_dataframe(sql)\n"
+        code += bound_query_code(sql, params)
         # Special handling for BMI: comprehensive data validation and filtering
         if any(m == "bmi" for m in metrics):
             code += (
@@ -155,7 +189,7 @@ def generate_basic_code(intent, parameters=None):
                 f" FROM vitals v"
             )
             if sql_where_clause:
-                code += f" WHERE {sql_where_clause}"
+                code += f" WHERE {inline_params(sql_where_clause, params)}"
             code += f" GROUP BY {', '.join([f'v.{g}' for g in group_by])}\n"
         else:
             code += "# Aggregate metrics\n"
@@ -184,6 +218,9 @@ def generate_basic_code(intent, parameters=None):
             "std_dev": "std",
         }
         agg_func = agg_map[analysis_type]
+        vitals_from, sql_where_clause = _vitals_from(
+            intent, metrics, group_by, parameters, sql_where_clause
+        )
         code = "# Query data\n"
         select_fields = [f"v.{m}" for m in metrics]
         if group_by:
@@ -200,20 +237,18 @@ def generate_basic_code(intent, parameters=None):
 
         if needs_patient_join:
             # Use JOIN when we need patient filters with vitals data
-            code += f'sql = """SELECT {", ".join(select_fields)} FROM vitals v JOIN patients p ON v.patient_id = p.id'
+            sql = f"SELECT {', '.join(select_fields)} FROM {vitals_from} v JOIN patients p ON v.patient_id = p.id"
             if sql_where_clause:
                 # Fix table prefixes in WHERE clause
                 fixed_where_clause = sql_where_clause.replace("patients.", "p.")
-                code += f" WHERE {fixed_where_clause}"
-            code += '"""\n'
+                sql += f" WHERE {fixed_where_clause}"
         else:
             # Use simple vitals query when no patient filters
-            code += f'sql = """SELECT {", ".join(select_fields)} FROM vitals v'
+            sql = f"SELECT {', '.join(select_fields)} FROM {vitals_from} v"
             if sql_where_clause:
-                code += f" WHERE {sql_where_clause}"
-            code += '"""\n'
+                sql += f" WHERE {sql_where_clause}"
 
-        code += "df = query_dataframe(sql)\n"
+        code += bound_query_code(sql, params)
         # Special handling for BMI: comprehensive data validation and filtering
         if any(m == "bmi" for m in metrics):
             code += (
@@ -253,7 +288,7 @@ def generate_basic_code(intent, parameters=None):
                 f" FROM vitals v"
             )
             if sql_where_clause:
-                code += f" WHERE {sql_where_clause}"
+                code += f" WHERE {inline_params(sql_where_clause, params)}"
             code += f" GROUP BY {', '.join([f'v.{g}' for g in group_by])}\n"
         else:
             code += "# Aggregate metrics\n"
@@ -4,9 +4,21 @@ correlation.py
 Code generation for correlation analysis types.
 """
 
+# Values the templates below splice into the generated code
+CORRELATION_METHODS = ("pearson", "spearman", "kendall")
+CORRELATION_PERIODS = ("month", "quarter", "year")
+
+
+def valid_rolling_window(value) -> bool:
+    """Return True for ``None`` or a positive integer window."""
+    return value is None or (
+        isinstance(value, int) and not isinstance(value, bool) and value > 0
+    )
+
 
 def generate_correlation_code(intent, parameters=None):
     """Generate code for correlation analysis."""
+    parameters = parameters or getattr(intent, "parameters", {}) or {}
     # Extract metrics for correlation
     if hasattr(intent, "additional_fields") and intent.additional_fields:
         metric_x = intent.target_field
@@ -15,12 +27,17 @@ def generate_correlation_code(intent, parameters=None):
         metric_x = intent.target_field
         metric_y = "bmi" if metric_x != "bmi" else "weight"
 
-    method = getattr(intent, "parameters", {}).get("method", "pearson")
-    correlation_type = getattr(intent, "parameters", {}).get(
-        "correlation_type", "simple"
-    )
-    period = getattr(intent, "parameters", {}).get("period", "month")
-    rolling_window = getattr(intent, "parameters", {}).get("rolling_window", None)
+    method = parameters.get("method", "pearson")
+    correlation_type = parameters.get("correlation_type", "simple")
+    period = parameters.get("period", "month")
+    rolling_window = parameters.get("rolling_window", None)
+
+    if method not in CORRELATION_METHODS:
+        message = f"Unsupported correlation method: {method!r}"
+        return f"# Error: unsupported correlation method\nresults = {{'error': {message!r}}}\n"
+    if period not in CORRELATION_PERIODS or not valid_rolling_window(rolling_window):
+        message = f"Unsupported period or rolling window: {period!r}, {rolling_window!r}"
+        return f"# Error: unsupported correlation period\nresults = {{'error': {message!r}}}\n"
 
     # Basic correlation
     if correlation_type == "simple":
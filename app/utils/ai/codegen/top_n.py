@@ -4,109 +4,59 @@ top_n.py
 Code generation for top-N and histogram/distribution analysis types.
 """
 
-from app.utils.ai.sql_builder import build_filters_clause
+from app.reference_ranges import REFERENCE_RANGES
+from app.utils.ai.sql_builder import bound_query_code
+from app.utils.ai.sql_compiler import compile_histogram, compile_top_n
 
 
 def generate_top_n(intent, parameters=None):
-    """Generate code for top-N analysis."""
-    parameters = parameters or getattr(intent, "parameters", {}) or {}
-    target_field = getattr(intent, "target_field", "weight")
-    N = parameters.get("N", 10)
-    sql_where = build_filters_clause(intent)
-    sql_where_clause = sql_where[6:] if sql_where.startswith("WHERE ") else sql_where
-    code = "# Query data for top-N analysis\n"
+    """Generate code for top-N analysis.
 
-    # Check if we need a JOIN for patient filters
-    needs_patient_join = False
-    patient_fields = {"active", "gender", "ethnicity", "age"}
-    if hasattr(intent, "filters") and intent.filters:
-        for f in intent.filters:
-            if f.field.lower() in patient_fields:
-                needs_patient_join = True
-                break
-
-    if needs_patient_join:
-        # Use JOIN when we need patient filters with vitals data
-        code += f'sql = """SELECT v.{target_field} FROM vitals v JOIN patients p ON v.patient_id = p.id'
-        if sql_where_clause:
-            # Fix table prefixes in WHERE clause
-            fixed_where_clause = sql_where_clause.replace("patients.", "p.")
-            code += f" WHERE {fixed_where_clause}"
-        code += '"""\n'
-    else:
-        # Use simple vitals query when no patient filters
-        code += f'sql = """SELECT v.{target_field} FROM vitals v'
-        if sql_where_clause:
-            code += f" WHERE {sql_where_clause}"
-        code += '"""\n'
-    code += "df = query_dataframe(sql)\n"
-    code += f"# Compute value counts and get top {N}\n"
-    code += f"results = df['{target_field}'].value_counts().nlargest({N}).to_dict()\n"
-    code += "# SQL equivalent:\n"
-    code += f"# SELECT v.{target_field}, COUNT(*) as count FROM vitals v"
-    if sql_where_clause:
-        code += f" WHERE {sql_where_clause}"
-    code += f" GROUP BY v.{target_field} ORDER BY count DESC LIMIT {N}\n"
+    Counting, ordering and ``LIMIT`` run in SQLite, so only *N* rows return.
+    """
+    parameters = parameters or getattr(intent, "parameters", {}) or {}
+    N = int(parameters.get("N", parameters.get("n", 10)))
+    try:
+        compiled = compile_top_n(intent, N)
+    except ValueError as exc:
+        return f"# Error: unknown field\nresults = {{'error': {str(exc)!r}}}\n"
+    code = f"# Query data for top-N analysis (top {N} values, ORDER BY count DESC LIMIT {N})\n"
+    code += bound_query_code(*compiled)
+    code += "results = df.set_index('value')['count'].to_dict() if not df.empty else {}\n"
     return code
 
 
 def generate_histogram(intent, parameters=None):
-    """Generate code for histogram/distribution analysis."""
+    """Generate code for histogram/distribution analysis.
+
+    Values are binned in SQLite with ``np.histogram`` semantics (equal-width
+    bins over ``[min, max]``); pandas only receives one row per bin.
+    """
     parameters = parameters or getattr(intent, "parameters", {}) or {}
     target_field = getattr(intent, "target_field", "weight")
-    bins = parameters.get("bins", 10)
-    sql_where = build_filters_clause(intent)
-    sql_where_clause = sql_where[6:] if sql_where.startswith("WHERE ") else sql_where
-    code = "# Query data for histogram analysis\n"
-
-    # Check if we need a JOIN for patient filters
-    needs_patient_join = False
-    patient_fields = {"active", "gender", "ethnicity", "age"}
-    if hasattr(intent, "filters") and intent.filters:
-        for f in intent.filters:
-            if f.field.lower() in patient_fields:
-                needs_patient_join = True
-                break
-
-    if needs_patient_join:
-        # Use JOIN when we need patient filters with vitals data
-        code += f'sql = """SELECT v.{target_field} FROM vitals v JOIN patients p ON v.patient_id = p.id'
-        if sql_where_clause:
-            # Fix table prefixes in WHERE clause
-            fixed_where_clause = sql_where_clause.replace("patients.", "p.")
-            code += f" WHERE {fixed_where_clause}"
-        code += '"""\n'
-    else:
-        # Use simple vitals query when no patient filters
-        code += f'sql = """SELECT v.{target_field} FROM vitals v'
-        if sql_where_clause:
-            code += f" WHERE {sql_where_clause}"
-        code += '"""\n'
-    code += "df = query_dataframe(sql)\n"
-    # Special handling for BMI: comprehensive data validation and filtering
+    bins = int(parameters.get("bins", 10))
+    # BMI: only bin values within the physiologic range
+    value_range = None
     if target_field == "bmi":
-        code += (
-            "# BMI data validation and filtering\n"
-            "if 'bmi' in df.columns and not df.empty:\n"
-            "    # Convert BMI to numeric and filter to clinical range (12-70)\n"
-            "    initial_count = len(df)\n"
-            "    df['bmi'] = pd.to_numeric(df['bmi'], errors='coerce')\n"
-            "    df = df.dropna(subset=['bmi'])\n"
-            "    df = df[(df['bmi'] >= 12) & (df['bmi'] <= 70)]\n"
-            "    if len(df) < initial_count:\n"
-            "        print(f'BMI filtering: {initial_count} → {len(df)} valid records')\n"
-            "    if df.empty:\n"
-            "        print('WARNING: No valid BMI data after filtering')\n"
-            "else:\n"
-            "    print('WARNING: No BMI data found')\n"
-            "\n"
-            "import pandas as pd\n"
-        )
-    code += f"# Compute histogram with {bins} bins\n"
-    code += f"import numpy as np\ncounts, bin_edges = np.histogram(df['{target_field}'], bins={bins})\nresults = {{'counts': counts.tolist(), 'bin_edges': bin_edges.tolist()}}\n"
-    code += "# SQL equivalent:\n"
-    code += f"# SELECT v.{target_field} FROM vitals v"
-    if sql_where_clause:
-        code += f" WHERE {sql_where_clause}"
-    code += "\n# Histogram computed in pandas/numpy\n"
+        value_range = (REFERENCE_RANGES["bmi_min"], REFERENCE_RANGES["bmi_max"])
+    try:
+        compiled = compile_histogram(intent, bins, value_range)
+    except ValueError as exc:
+        return f"# Error: unknown field\nresults = {{'error': {str(exc)!r}}}\n"
+    code = f"# Query data for histogram analysis ({bins} bins computed in SQL)\n"
+    code += bound_query_code(*compiled)
+    code += (
+        "import numpy as np\n"
+        f"counts = np.zeros({bins}, dtype=int)\n"
+        "if df.empty:\n"
+        f"    print('WARNING: No {target_field} data found')\n"
+        "    lo, hi = 0.0, 1.0\n"
+        "else:\n"
+        "    lo, hi = float(df['lo'].iloc[0]), float(df['hi'].iloc[0])\n"
+        "    if lo == hi:\n"
+        "        lo, hi = lo - 0.5, hi + 0.5\n"
+        "    counts[df['bin'].astype(int).to_numpy()] = df['count'].to_numpy()\n"
+        f"bin_edges = np.linspace(lo, hi, {bins + 1})\n"
+        "results = {'counts': counts.tolist(), 'bin_edges': bin_edges.tolist()}\n"
+    )
     return code
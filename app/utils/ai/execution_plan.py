@@ -0,0 +1,203 @@
+"""
+execution_plan.py
+
+In-process execution of deterministic template code.
+
+Snippets produced by our own generators (``code_generator.generate_code`` for
+the template analysis types) are trusted, so they do not need the sandbox's
+import guard, timeout process or result pickling.  :func:`compile_plan` wraps
+such a snippet in an :class:`ExecutionPlan` whose byte-code is compiled once
+per distinct snippet; :meth:`ExecutionPlan.run` executes it in the calling
+process against the pooled read connection.  LLM-authored code never becomes
+a plan and keeps going through :func:`app.utils.sandbox.run_snippet`.
+
+The templates splice intent field names and a few parameters into the code,
+and those come from the LLM, so an intent only becomes a plan when every field
+it names is a known column (:func:`unknown_fields`) and every spliced
+parameter has an allowed value (:func:`invalid_parameters`); anything else
+runs in the sandbox.
+Set ``MH_TEMPLATE_FAST_PATH=0`` to send template code through the sandbox too.
+"""
+
+import logging
+import os
+import time
+import traceback
+from dataclasses import dataclass
+from functools import lru_cache
+from types import CodeType
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+import app.db_query as db_query
+from app.utils.ai.code_generator import generate_code
+from app.utils.ai.codegen.correlation import (
+    CORRELATION_METHODS,
+    CORRELATION_PERIODS,
+    valid_rolling_window,
+)
+from app.utils.feature_store import read_patient_features
+from app.utils.ai.sql_compiler import PATIENT_FIELDS, PERIOD_EXPRESSIONS, VITALS_FIELDS
+from app.utils.metrics import METRIC_REGISTRY, get_metric
+from app.utils.query_intent import _CANONICAL_FIELDS
+from app.utils.schema import get_data_schema
+from app.utils.streaming_stats import stream_aggregate
+
+logger = logging.getLogger(__name__)
+
+# Analysis types whose code comes from a deterministic template generator
+TEMPLATE_TYPES = {
+    "count",
+    "sum",
+    "average",
+    "min",
+    "max",
+    "median",
+    "variance",
+    "std_dev",
+    "trend",
+    "top_n",
+    "histogram",
+    "distribution",
+    "comparison",
+    "change",
+    "percent_change",
+    "relative_change",
+    "correlation",
+}
+
+# Intent parameters each template splices into its code, with their checks
+_PARAMETER_CHECKS = {
+    "trend": {"period": lambda value: value in PERIOD_EXPRESSIONS},
+    "correlation": {
+        "method": lambda value: value in CORRELATION_METHODS,
+        "period": lambda value: value in CORRELATION_PERIODS,
+        "rolling_window": valid_rolling_window,
+    },
+}
+
+
+@lru_cache(maxsize=1)
+def _known_fields() -> frozenset:
+    """Column names (and filter aliases) a plan may reference."""
+    known = {column for columns in get_data_schema().values() for column in columns}
+    known |= _CANONICAL_FIELDS | PATIENT_FIELDS | VITALS_FIELDS
+    known |= {"assessment_type", "score", "test_date"}  # mental_health, aliases
+    return frozenset(known)
+
+
+def unknown_fields(intent) -> list:
+    """Return the field names in *intent* that are not known columns."""
+    known = _known_fields()
+    fields = [getattr(intent, "target_field", None)]
+    fields += list(getattr(intent, "additional_fields", []) or [])
+    fields += list(getattr(intent, "group_by", []) or [])
+    names = [f for f in fields if f is not None and f not in known]
+    for item in list(getattr(intent, "filters", []) or []) + list(
+        getattr(intent, "conditions", []) or []
+    ):
+        if item.field.lower() not in known:  # build_filters lower-cases these
+            names.append(item.field)
+    return names
+
+
+def invalid_parameters(intent, parameters=None) -> list:
+    """Return the spliced template parameters of *intent* with disallowed values."""
+    parameters = parameters or getattr(intent, "parameters", {}) or {}
+    checks = _PARAMETER_CHECKS.get(getattr(intent, "analysis_type", None), {})
+    names = []
+    for name, check in checks.items():
+        try:
+            allowed = name not in parameters or check(parameters[name])
+        except TypeError:  # unhashable values
+            allowed = False
+        if not allowed:
+            names.append(name)
+    return names
+
+
+def fast_path_enabled() -> bool:
+    """Return False when ``MH_TEMPLATE_FAST_PATH`` disables in-process plans."""
+    return os.getenv("MH_TEMPLATE_FAST_PATH", "1").lower() not in {"0", "false", "no"}
+
+
+@lru_cache(maxsize=256)
+def _compile(code: str) -> CodeType:
+    return compile(code, "<template plan>", "exec")
+
+
+@dataclass(frozen=True)
+class ExecutionPlan:
+    """A trusted template snippet ready to run in-process."""
+
+    analysis_type: str
+    code: str
+
+    def run(self) -> Any:
+        """Execute the plan and return its ``results``.
+
+        Mirrors the sandbox wrapper's envelope: exceptions become
+        ``{'error', 'traceback'}``, a missing result becomes an error and dict
+        results carry ``execution_time``.
+        """
+        namespace = {
+            "pd": pd,
+            "np": np,
+            "db_query": db_query,
+            # Looked up per run so overrides of db_query.query_dataframe apply
+            "query_dataframe": db_query.query_dataframe,
+            "iter_query_dataframe": db_query.iter_query_dataframe,
+            "stream_aggregate": stream_aggregate,
+            "get_metric": get_metric,
+            "METRIC_REGISTRY": METRIC_REGISTRY,
+            "get_patient_features": read_patient_features,
+        }
+        start = time.perf_counter()
+        try:
+            exec(_compile(self.code), namespace)  # noqa: S102 – trusted template
+            results = namespace.get("results")
+        except Exception as exc:
+            results = {"error": str(exc), "traceback": traceback.format_exc()}
+        elapsed = time.perf_counter() - start
+        logger.debug("Ran %s plan in %.1f ms", self.analysis_type, elapsed * 1000)
+
+        if results is None:
+            results = {"error": "No results were generated"}
+        if isinstance(results, dict) and "execution_time" not in results:
+            results["execution_time"] = elapsed
+        return results
+
+
+def compile_plan(intent, parameters=None) -> Optional[ExecutionPlan]:
+    """Return an :class:`ExecutionPlan` for template intents, else ``None``.
+
+    Intents naming unknown fields or carrying disallowed template parameters
+    get ``None`` too, so their code goes through the sandbox.
+    """
+    analysis_type = getattr(intent, "analysis_type", None)
+    if analysis_type not in TEMPLATE_TYPES:
+        return None
+    unknown = unknown_fields(intent)
+    if unknown:
+        logger.info("Unknown fields %r; not running in-process", unknown)
+        return None
+    invalid = invalid_parameters(intent, parameters)
+    if invalid:
+        logger.info("Disallowed parameters %r; not running in-process", invalid)
+        return None
+    code = generate_code(intent, parameters)
+    if not code:
+        return None
+    return ExecutionPlan(analysis_type, code)
+
+
+__all__ = [
+    "TEMPLATE_TYPES",
+    "ExecutionPlan",
+    "compile_plan",
+    "fast_path_enabled",
+    "invalid_parameters",
+    "unknown_fields",
+]
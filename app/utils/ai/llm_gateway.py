@@ -0,0 +1,494 @@
+"""Asyncio LLM gateway shared by every assistant stage.
+
+:func:`app.utils.ai.llm_interface.ask_llm` used to build a new ``OpenAI``
+client per call and block the calling thread for the whole round trip.  The
+gateway replaces that with:
+
+* **one shared** ``AsyncOpenAI`` client running on a dedicated background
+  event loop (so synchronous callers and Panel worker threads can use it
+  without owning a loop),
+* a **bounded semaphore** limiting concurrent upstream requests
+  (``MH_LLM_MAX_CONCURRENCY``, default 4),
+* **retries with full-jitter exponential backoff** for rate limits,
+  connection errors and 5xx responses (``MH_LLM_MAX_RETRIES``, default 3),
+* **request coalescing** – identical in-flight requests (same model,
+  temperature, token limit, prompt and query) share a single upstream call,
+* **token accounting per stage** (``intent``, ``code``, ``narrative``, …) via
+  :func:`llm_stage` / :func:`with_llm_stage` and :meth:`LLMGateway.usage_stats`.
+
+Synchronous code calls :meth:`LLMGateway.ask`; coroutines ``await``
+:meth:`LLMGateway.ask_async`.  :meth:`LLMGateway.ask_stream` yields the reply
+incrementally (``stream=True``) and records time-to-first-token per stage;
+streamed requests are retried only until their first token arrives and are
+never coalesced.  Point ``MH_LLM_BASE_URL`` at
+:mod:`app.utils.ai.llm_stub_server` to exercise the full path offline.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import contextvars
+import functools
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from app.errors import LLMError
+
+logger = logging.getLogger("llm_interface")
+
+__all__ = [
+    "LLMGateway",
+    "get_llm_gateway",
+    "shutdown_llm_gateway",
+    "llm_stage",
+    "with_llm_stage",
+    "current_llm_stage",
+]
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("MH_LLM_MAX_CONCURRENCY", "4"))
+DEFAULT_MAX_RETRIES = int(os.getenv("MH_LLM_MAX_RETRIES", "3"))
+DEFAULT_TIMEOUT = float(os.getenv("MH_LLM_TIMEOUT", "60"))
+
+_RETRYABLE_STATUS = {408, 409, 429}
+
+_STAGE: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "llm_stage", default="default"
+)
+
+
+# ---------------------------------------------------------------------------
+# Stage attribution
+# ---------------------------------------------------------------------------
+
+
+def current_llm_stage() -> str:
+    """Return the pipeline stage LLM usage is currently attributed to."""
+    return _STAGE.get()
+
+
+@contextmanager
+def llm_stage(stage: str) -> Iterator[None]:
+    """Attribute LLM calls made inside the block to *stage*."""
+    token = _STAGE.set(stage)
+    try:
+        yield
+    finally:
+        _STAGE.reset(token)
+
+
+def with_llm_stage(stage: str):
+    """Decorator form of :func:`llm_stage`."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with llm_stage(stage):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# Gateway
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class _StageUsage:
+    requests: int = 0
+    coalesced: int = 0
+    retries: int = 0
+    errors: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+    latency_s: float = 0.0
+    streams: int = 0
+    ttft_s: float = 0.0  # summed time-to-first-token of streamed requests
+
+
+_STREAM_END = object()
+
+
+def _is_retryable(exc: Exception) -> bool:
+    try:
+        import openai
+    except ImportError:  # pragma: no cover – openai is a hard dependency
+        return False
+    if isinstance(exc, (openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    status = getattr(exc, "status_code", None)
+    return status in _RETRYABLE_STATUS or (status is not None and status >= 500)
+
+
+class LLMGateway:
+    """Shared async chat-completions client with coalescing and retries."""
+
+    def __init__(
+        self,
+        *,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        timeout: float = DEFAULT_TIMEOUT,
+        client: Any = None,
+    ) -> None:
+        self.api_key = api_key
+        self.base_url = base_url or os.getenv("MH_LLM_BASE_URL") or None
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+
+        self._client = client
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._usage_lock = threading.Lock()
+        self._usage: Dict[str, _StageUsage] = {}
+
+    # ------------------------------------------------------------------
+    # Event loop + client lifecycle
+    # ------------------------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def _run() -> None:
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(
+                    target=_run, name="llm-gateway", daemon=True
+                )
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+                self._semaphore = None
+            return self._loop
+
+    def _get_client(self):
+        if self._client is None:
+            from openai import AsyncOpenAI
+
+            from app.config import OPENAI_API_KEY
+
+            self._client = AsyncOpenAI(
+                api_key=self.api_key or OPENAI_API_KEY,
+                base_url=self.base_url,
+                timeout=self.timeout,
+                max_retries=0,  # retries are handled here, with jitter
+            )
+        return self._client
+
+    def close(self) -> None:
+        """Close the shared client and stop the background loop."""
+        loop, self._loop = self._loop, None
+        if loop is None or loop.is_closed():
+            return
+        client, self._client = self._client, None
+        if client is not None and hasattr(client, "close"):
+            try:
+                asyncio.run_coroutine_threadsafe(client.close(), loop).result(5)
+            except Exception as exc:  # pragma: no cover – best effort
+                logger.debug("Error closing LLM client: %s", exc)
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    # ------------------------------------------------------------------
+    # Accounting
+    # ------------------------------------------------------------------
+
+    def _record(self, stage: str, **counts: float) -> None:
+        with self._usage_lock:
+            usage = self._usage.setdefault(stage, _StageUsage())
+            for key, value in counts.items():
+                setattr(usage, key, getattr(usage, key) + value)
+
+    def record_usage(self, stage: str, usage: Any, latency_s: float = 0.0) -> None:
+        """Add an OpenAI ``usage`` object to *stage*'s totals."""
+        self._record(
+            stage,
+            requests=1,
+            latency_s=latency_s,
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            total_tokens=getattr(usage, "total_tokens", 0) or 0,
+        )
+
+    def usage_stats(self) -> Dict[str, Dict[str, float]]:
+        """Return per-stage request, coalescing, retry and token counters."""
+        with self._usage_lock:
+            return {stage: asdict(usage) for stage, usage in self._usage.items()}
+
+    def reset_usage(self) -> None:
+        """Zero all per-stage counters."""
+        with self._usage_lock:
+            self._usage.clear()
+
+    # ------------------------------------------------------------------
+    # Requests
+    # ------------------------------------------------------------------
+
+    async def _request(self, stage: str, payload: Dict[str, Any]) -> str:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        client = self._get_client()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    start = time.perf_counter()
+                    response = await client.chat.completions.create(**payload)
+                    latency = time.perf_counter() - start
+            except Exception as exc:
+                if attempt >= self.max_retries or not _is_retryable(exc):
+                    self._record(stage, errors=1)
+                    logger.error("LLM API call failed: %s", exc)
+                    raise LLMError(f"LLM API call failed: {exc}") from exc
+                delay = random.uniform(
+                    0, min(self.backoff_max, self.backoff_base * 2**attempt)
+                )
+                self._record(stage, retries=1)
+                logger.warning(
+                    "LLM call failed (%s), retry %d in %.2fs", exc, attempt + 1, delay
+                )
+                await asyncio.sleep(delay)
+                continue
+
+            usage = getattr(response, "usage", None)
+            self.record_usage(stage, usage, latency)
+            if usage:
+                logger.info(
+                    "LLM tokens [%s] -> prompt: %s, completion: %s, total: %s",
+                    stage,
+                    usage.prompt_tokens,
+                    usage.completion_tokens,
+                    usage.total_tokens,
+                )
+            return response.choices[0].message.content
+
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    async def _complete(self, stage: str, payload: Dict[str, Any]) -> str:
+        key = hashlib.sha256(
+            json.dumps(payload, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self._record(stage, coalesced=1)
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            text = await self._request(stage, payload)
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        else:
+            future.set_result(text)
+            return text
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _stream(
+        self, stage: str, payload: Dict[str, Any], emit: Callable[[Any], None]
+    ) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        client = self._get_client()
+        request = dict(payload, stream=True, stream_options={"include_usage": True})
+
+        try:
+            for attempt in range(self.max_retries + 1):
+                ttft: Optional[float] = None
+                usage = None
+                try:
+                    async with self._semaphore:
+                        start = time.perf_counter()
+                        stream = await client.chat.completions.create(**request)
+                        async for chunk in stream:
+                            if getattr(chunk, "usage", None):
+                                usage = chunk.usage
+                            if not chunk.choices:
+                                continue
+                            delta = chunk.choices[0].delta.content
+                            if delta:
+                                if ttft is None:
+                                    ttft = time.perf_counter() - start
+                                emit(delta)
+                        latency = time.perf_counter() - start
+                except Exception as exc:
+                    # Text already handed to the caller cannot be taken back
+                    if (
+                        ttft is not None
+                        or attempt >= self.max_retries
+                        or not _is_retryable(exc)
+                    ):
+                        self._record(stage, errors=1)
+                        logger.error("LLM streaming call failed: %s", exc)
+                        raise LLMError(f"LLM API call failed: {exc}") from exc
+                    delay = random.uniform(
+                        0, min(self.backoff_max, self.backoff_base * 2**attempt)
+                    )
+                    self._record(stage, retries=1)
+                    logger.warning(
+                        "LLM stream failed (%s), retry %d in %.2fs",
+                        exc,
+                        attempt + 1,
+                        delay,
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+
+                self.record_usage(stage, usage, latency)
+                self._record(stage, streams=1, ttft_s=latency if ttft is None else ttft)
+                logger.info(
+                    "LLM stream [%s] -> first token %.3fs, total %.3fs",
+                    stage,
+                    latency if ttft is None else ttft,
+                    latency,
+                )
+                return
+        finally:
+            emit(_STREAM_END)
+
+    @staticmethod
+    def _payload(prompt, query, model, temperature, max_tokens) -> Dict[str, Any]:
+        return {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": prompt},
+                {"role": "user", "content": query},
+            ],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+
+    async def ask_async(
+        self,
+        prompt: str,
+        query: str,
+        model: str = "gpt-4",
+        temperature: float = 0.3,
+        max_tokens: int = 500,
+        *,
+        stage: Optional[str] = None,
+    ) -> str:
+        """Return the assistant reply for *prompt* + *query* (awaitable)."""
+        loop = self._ensure_loop()
+        coro = self._complete(
+            stage or current_llm_stage(),
+            self._payload(prompt, query, model, temperature, max_tokens),
+        )
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    def ask(
+        self,
+        prompt: str,
+        query: str,
+        model: str = "gpt-4",
+        temperature: float = 0.3,
+        max_tokens: int = 500,
+        *,
+        stage: Optional[str] = None,
+    ) -> str:
+        """Blocking wrapper around :meth:`ask_async` for synchronous callers."""
+        loop = self._ensure_loop()
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("LLMGateway.ask() called from the gateway loop")
+        coro = self._complete(
+            stage or current_llm_stage(),
+            self._payload(prompt, query, model, temperature, max_tokens),
+        )
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def ask_stream(
+        self,
+        prompt: str,
+        query: str,
+        model: str = "gpt-4",
+        temperature: float = 0.3,
+        max_tokens: int = 500,
+        *,
+        stage: Optional[str] = None,
+    ) -> Iterator[str]:
+        """Yield the assistant reply as text deltas while it is generated.
+
+        Blocking generator for synchronous callers; raises :class:`LLMError`
+        when the request fails.  Closing the generator early cancels the
+        upstream request.
+        """
+        loop = self._ensure_loop()
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("LLMGateway.ask_stream() called from the gateway loop")
+        chunks: queue.SimpleQueue = queue.SimpleQueue()
+        coro = self._stream(
+            stage or current_llm_stage(),
+            self._payload(prompt, query, model, temperature, max_tokens),
+            chunks.put,
+        )
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            while (item := chunks.get()) is not _STREAM_END:
+                yield item
+            future.result()
+        finally:
+            if not future.done():
+                future.cancel()
+
+
+_GATEWAY: Optional[LLMGateway] = None
+_GATEWAY_LOCK = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Return the process-wide :class:`LLMGateway`."""
+    global _GATEWAY
+    with _GATEWAY_LOCK:
+        if _GATEWAY is None:
+            _GATEWAY = LLMGateway()
+        return _GATEWAY
+
+
+def shutdown_llm_gateway() -> None:
+    """Close the process-wide gateway (no-op when it was never used)."""
+    global _GATEWAY
+    with _GATEWAY_LOCK:
+        if _GATEWAY is not None:
+            _GATEWAY.close()
+            _GATEWAY = None
+
+
+atexit.register(shutdown_llm_gateway)
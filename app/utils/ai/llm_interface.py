@@ -12,7 +12,8 @@ Example:
 
 import logging
 from pathlib import Path
-from app.config import OPENAI_API_KEY, OFFLINE_MODE
+from typing import Iterator
+from app.config import OFFLINE_MODE
 import logging.handlers
 import json
 from app.errors import LLMError
@@ -59,6 +60,11 @@ def ask_llm(
     deterministic or template-based generation without waiting for network
     timeouts.
 
+    Unless a *client* or *api_key* is injected, the request goes through the
+    shared :class:`~app.utils.ai.llm_gateway.LLMGateway`, which coalesces
+    identical in-flight requests and accounts tokens to the current
+    :func:`~app.utils.ai.llm_gateway.llm_stage`.
+
     Args:
         prompt (str): The system prompt to send to the LLM.
         query (str): The user query to send to the LLM.
@@ -77,12 +83,20 @@ def ask_llm(
     if _OFFLINE_MODE:
         raise LLMError("LLM call skipped – offline mode (no API key)")
 
-    # Allow DI of client or fallback to new client if not provided
+    # Normal path: shared async client with coalescing, retries and per-stage
+    # token accounting (see app.utils.ai.llm_gateway)
+    if client is None and api_key is None:
+        from app.utils.ai.llm_gateway import get_llm_gateway
+
+        return get_llm_gateway().ask(
+            prompt, query, model=model, temperature=temperature, max_tokens=max_tokens
+        )
+
+    # Injected client / key (DI, testing) – direct synchronous call
     if client is None:
         from openai import OpenAI
 
-        _api_key = api_key if api_key is not None else OPENAI_API_KEY
-        client = OpenAI(api_key=_api_key)
+        client = OpenAI(api_key=api_key)
 
     try:
         response = client.chat.completions.create(
@@ -110,6 +124,59 @@ def ask_llm(
     return response.choices[0].message.content
 
 
+def ask_llm_stream(
+    prompt: str,
+    query: str,
+    model: str = "gpt-4",
+    temperature: float = 0.3,
+    max_tokens: int = 500,
+    client=None,
+    api_key=None,
+) -> Iterator[str]:
+    """
+    Streaming variant of :func:`ask_llm` yielding the reply as text deltas.
+
+    Same routing as :func:`ask_llm`: the shared gateway unless a *client* or
+    *api_key* is injected.  Joining the yielded chunks gives the full reply.
+
+    Raises:
+        LLMError: If in offline mode (no API key set) or API call fails.
+    """
+    if _OFFLINE_MODE:
+        raise LLMError("LLM call skipped – offline mode (no API key)")
+
+    if client is None and api_key is None:
+        from app.utils.ai.llm_gateway import get_llm_gateway
+
+        yield from get_llm_gateway().ask_stream(
+            prompt, query, model=model, temperature=temperature, max_tokens=max_tokens
+        )
+        return
+
+    if client is None:
+        from openai import OpenAI
+
+        client = OpenAI(api_key=api_key)
+
+    try:
+        stream = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": prompt},
+                {"role": "user", "content": query},
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        logger.error("LLM streaming call failed: %s", e)
+        raise LLMError(f"LLM API call failed: {e}") from e
+
+
 def is_offline_mode() -> bool:
     """
     Return whether we're running in offline mode (no API key).
@@ -154,6 +221,9 @@ def generate_analysis_code(intent, data_schema, custom_prompt=None):
 
     The code must use **only** the helper functions exposed in the runtime (e.g., `db_query.get_all_vitals()`, `db_query.get_all_scores()`, `db_query.get_all_patients()`).
     Do NOT read external CSV or Excel files from disk, and do NOT attempt internet downloads.
+    For per-patient summaries (age, baseline/latest weight, weight_change_pct, bmi_category, phq9_change, visit counts) prefer `get_patient_features([...])`, which returns one precomputed row per patient.
+    For population-wide statistics over raw `vitals` or `lab_results` rows, stream them with `iter_query_dataframe(sql, chunksize=...)` and summarise with `stream_aggregate(chunks, column, by=..., quantiles=[...])` instead of loading the whole table.
+    Frames from the `get_all_*` helpers are already typed: date columns are datetimes, `gender`/`ethnicity`/`score_type`/`test_name` are categoricals (group them with `groupby(..., observed=True)`) and 0/1 flags such as `active` are small integers.
 
     The code should use pandas and should be clean, efficient, and well-commented **and MUST assign the final output to a variable named `results`**. The UI downstream expects this variable.
 
@@ -0,0 +1,208 @@
+"""Minimal OpenAI-compatible stub server for offline LLM testing.
+
+Serves ``POST /v1/chat/completions`` with deterministic replies so the full
+:mod:`app.utils.ai.llm_gateway` path (HTTP client, concurrency limit,
+retries, coalescing, token accounting) can be exercised without network
+access or an API key::
+
+    python -m app.utils.ai.llm_stub_server --port 8765
+    MH_LLM_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub python run.py
+
+Replies come from ``responses`` (exact user message → reply); anything else
+is echoed back as ``"stub: <user message>"``.  ``delay`` simulates model
+latency and ``fail_first`` makes the first *n* requests return HTTP 429 to
+exercise the retry path.  Token counts are whitespace word counts.
+
+Requests with ``"stream": true`` are answered as server-sent events, one word
+per ``chat.completion.chunk`` with ``token_delay`` seconds between chunks, and
+a trailing usage chunk when ``stream_options.include_usage`` is set.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, Optional
+
+__all__ = ["StubLLMServer"]
+
+
+class StubLLMServer:
+    """Threaded HTTP server speaking just enough of the chat-completions API."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        *,
+        responses: Optional[Dict[str, str]] = None,
+        delay: float = 0.0,
+        fail_first: int = 0,
+        token_delay: float = 0.0,
+    ) -> None:
+        self.responses = dict(responses or {})
+        self.delay = delay
+        self.token_delay = token_delay
+        self.fail_first = fail_first
+        self.requests = 0
+        self.active = 0
+        self.peak_active = 0  # highest number of requests served concurrently
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="llm-stub", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StubLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _reply(self, body: dict) -> tuple[int, dict]:
+        with self._lock:
+            self.requests += 1
+            failing = self.requests <= self.fail_first
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+        try:
+            if self.delay:
+                time.sleep(self.delay)
+        finally:
+            with self._lock:
+                self.active -= 1
+        if failing:
+            error = {"message": "rate limited (stub)", "type": "rate_limit"}
+            return 429, {"error": error}
+
+        messages = body.get("messages", [])
+        user = next(
+            (m["content"] for m in reversed(messages) if m.get("role") == "user"), ""
+        )
+        text = self.responses.get(user, f"stub: {user}")
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+        completion_tokens = len(text.split())
+        return 200, {
+            "id": f"chatcmpl-stub-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def _chunks(self, body: dict, completion: dict) -> Iterator[dict]:
+        """Split a completion payload into streaming chunk payloads."""
+        text = completion["choices"][0]["message"]["content"]
+        base = {
+            "id": completion["id"],
+            "object": "chat.completion.chunk",
+            "created": completion["created"],
+            "model": completion["model"],
+        }
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            delta = {"content": word if i == len(words) - 1 else word + " "}
+            if i == 0:
+                delta["role"] = "assistant"
+            choice = {"index": 0, "delta": delta, "finish_reason": None}
+            yield dict(base, choices=[choice])
+        yield dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield dict(base, choices=[], usage=completion["usage"])
+
+    def _handler_class(self):
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_POST(self):  # noqa: N802 – http.server naming
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                status, payload = server._reply(body)
+                if status == 200 and body.get("stream"):
+                    self._send_stream(body, payload)
+                    return
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, body, payload):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                self.close_connection = True
+                try:
+                    for i, chunk in enumerate(server._chunks(body, payload)):
+                        if i and server.token_delay:
+                            time.sleep(server.token_delay)
+                        event = f"data: {json.dumps(chunk)}\n\n"
+                        self.wfile.write(event.encode("utf-8"))
+                        self.wfile.flush()
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # client cancelled the stream
+
+            def log_message(self, *_args):  # keep test output quiet
+                pass
+
+        return _Handler
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run a stub chat-completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds per reply")
+    parser.add_argument(
+        "--token-delay", type=float, default=0.0, help="Seconds per streamed word"
+    )
+    args = parser.parse_args(argv)
+
+    server = StubLLMServer(
+        args.host, args.port, delay=args.delay, token_delay=args.token_delay
+    ).start()
+    print(f"Stub LLM server listening on {server.base_url}")
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
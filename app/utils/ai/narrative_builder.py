@@ -13,11 +13,11 @@ and narratives from analysis results. It includes functionality for:
 
 import json
 import logging
-from typing import Any, List, Optional
+from typing import Any, Callable, List, Optional
 
 import pandas as pd
 
-from .llm_interface import ask_llm, is_offline_mode
+from .llm_interface import ask_llm, ask_llm_stream, is_offline_mode
 
 logger = logging.getLogger(__name__)
 
@@ -83,12 +83,16 @@ def interpret_results(
     results: Any,
     visualisations: Optional[List[str]] = None,
     model: str = "gpt-4",
+    on_token: Optional[Callable[[str], None]] = None,
 ) -> str:
     """Return a concise, clinician-friendly narrative for *results*.
 
     Mirrors the original behaviour from ``AIHelper.interpret_results`` while
     being library-agnostic.  The function is safe to call in offline mode – it
     will provide a deterministic fallback instead of raising.
+
+    When *on_token* is given the completion is streamed and each text delta is
+    passed to it as soon as it arrives; the full narrative is still returned.
     """
 
     logger.info("Interpreting analysis results for query: %s", query)
@@ -123,9 +127,18 @@ Respond in 3-5 sentences, focusing on the most important insights.
             f"Analysis results: {json.dumps(simplify_for_json(results))}{viz_notes}"
         )
 
-        response = ask_llm(
-            system_prompt, payload, model=model, temperature=0.4, max_tokens=500
-        )
+        if on_token is None:
+            response = ask_llm(
+                system_prompt, payload, model=model, temperature=0.4, max_tokens=500
+            )
+        else:
+            parts = []
+            for delta in ask_llm_stream(
+                system_prompt, payload, model=model, temperature=0.4, max_tokens=500
+            ):
+                parts.append(delta)
+                on_token(delta)
+            response = "".join(parts)
         interpretation = response.strip()
         logger.info("Successfully generated result interpretation")
         return interpretation
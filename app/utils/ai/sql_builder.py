@@ -5,11 +5,70 @@ Helpers for constructing SQL clauses (WHERE, SELECT, GROUP BY) from QueryIntent
 """
 
 from app.utils.query_intent import QueryIntent
-from typing import List
+from typing import Any, Callable, List, Sequence, Tuple
+
+
+def _quote(val) -> str:
+    return f"'{val}'" if isinstance(val, str) else str(val)
 
 
 def build_filters_clause(intent_obj: QueryIntent) -> str:
-    """Build SQL WHERE clause from intent filters and conditions."""
+    """Build SQL WHERE clause from intent filters and conditions.
+
+    Values are inlined as literals; prefer :func:`build_filters` for SQL that
+    is executed.
+    """
+    return _build_filters(intent_obj, _quote)
+
+
+def build_filters(intent_obj: QueryIntent) -> Tuple[str, Tuple[Any, ...]]:
+    """Like :func:`build_filters_clause` but with ``?`` placeholders.
+
+    Returns ``(where_clause, params)``.  Intents that differ only in filter
+    values produce identical SQL text, so SQLite's per-connection statement
+    cache reuses the prepared plan.
+    """
+    params: List[Any] = []
+
+    def _bind(val) -> str:
+        params.append(val)
+        return "?"
+
+    clause = _build_filters(intent_obj, _bind)
+    return clause, tuple(params)
+
+
+def inline_params(sql: str, params: Sequence[Any]) -> str:
+    """Render *sql* with *params* substituted – for comments and logs only.
+
+    Line breaks are flattened so a value cannot end a generated ``#`` comment.
+    """
+    parts = sql.split("?")
+    if len(parts) != len(params) + 1:
+        return sql
+    out = [parts[0]]
+    for val, part in zip(params, parts[1:]):
+        out.append(_quote(val) + part)
+    return " ".join("".join(out).splitlines())
+
+
+def bound_query_code(sql: str, params: Sequence[Any]) -> str:
+    """Return generated-code lines that run *sql* with bound *params*.
+
+    The inlined SQL is kept as a comment so the snippet stays readable.
+    """
+    params = tuple(params)
+    code = f'sql = """{sql}"""\n'
+    if not params:
+        return code + "df = query_dataframe(sql)\n"
+    code += f"params = {params!r}\n"
+    code += f"# SQL equivalent: {inline_params(sql, params)}\n"
+    code += "df = query_dataframe(sql, params)\n"
+    return code
+
+
+def _build_filters(intent_obj: QueryIntent, bind: Callable[[Any], str]) -> str:
+    """Shared WHERE builder; *bind* renders each value (literal or ``?``)."""
     where_clauses: List[str] = []
 
     table_fields = {
@@ -40,9 +99,6 @@ def build_filters_clause(intent_obj: QueryIntent) -> str:
         "date": "program_start_date",
     }
 
-    def _quote(val):
-        return f"'{val}'" if isinstance(val, str) else str(val)
-
     # Global time_range filter
     if intent_obj.time_range is not None:
         date_column = "date"
@@ -53,7 +109,7 @@ def build_filters_clause(intent_obj: QueryIntent) -> str:
         if hasattr(end_date, "strftime"):
             end_date = end_date.strftime("%Y-%m-%d")
         where_clauses.append(
-            f"{date_column} BETWEEN {_quote(start_date)} AND {_quote(end_date)}"
+            f"{date_column} BETWEEN {bind(start_date)} AND {bind(end_date)}"
         )
     # Equality/range filters
     for f in intent_obj.filters:
@@ -76,13 +132,13 @@ def build_filters_clause(intent_obj: QueryIntent) -> str:
                     if val.lower() == "female"
                     else "M" if val.lower() == "male" else val
                 )
-            where_clauses.append(f"{canonical_with_prefix} = {_quote(val)}")
+            where_clauses.append(f"{canonical_with_prefix} = {bind(val)}")
         elif f.range is not None:
             start = f.range.get("start")
             end = f.range.get("end")
             if start is not None and end is not None:
                 where_clauses.append(
-                    f"{canonical_with_prefix} BETWEEN {_quote(start)} AND {_quote(end)}"
+                    f"{canonical_with_prefix} BETWEEN {bind(start)} AND {bind(end)}"
                 )
         elif f.date_range is not None:
             date_col = (
@@ -97,7 +153,7 @@ def build_filters_clause(intent_obj: QueryIntent) -> str:
             if hasattr(end_date, "strftime"):
                 end_date = end_date.strftime("%Y-%m-%d")
             where_clauses.append(
-                f"{date_col} BETWEEN {_quote(start_date)} AND {_quote(end_date)}"
+                f"{date_col} BETWEEN {bind(start_date)} AND {bind(end_date)}"
             )
     # Operator-based conditions
     for c in intent_obj.conditions:
@@ -112,13 +168,13 @@ def build_filters_clause(intent_obj: QueryIntent) -> str:
             and len(c.value) == 2
         ):
             where_clauses.append(
-                f"{canonical_with_prefix} BETWEEN {_quote(c.value[0])} AND {_quote(c.value[1])}"
+                f"{canonical_with_prefix} BETWEEN {bind(c.value[0])} AND {bind(c.value[1])}"
             )
         elif op.lower() == "in" and isinstance(c.value, (list, tuple)):
-            vals = ", ".join(_quote(v) for v in c.value)
+            vals = ", ".join(bind(v) for v in c.value)
             where_clauses.append(f"{canonical_with_prefix} IN ({vals})")
         else:
-            where_clauses.append(f"{canonical_with_prefix} {op} {_quote(c.value)}")
+            where_clauses.append(f"{canonical_with_prefix} {op} {bind(c.value)}")
     return "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
 
 
@@ -132,5 +188,35 @@ def sql_group_by(fields: List[str]) -> str:
     return ", ".join([f"v.{f}" for f in fields])
 
 
+# Vitals columns materialized per patient in ``latest_vitals`` (migration 015)
+LATEST_VITAL_METRICS = {"weight", "height", "bmi", "sbp", "dbp"}
+
+
+def latest_vitals_source(metrics: List[str]) -> str:
+    """Return a subquery with one row per patient holding the latest *metrics*.
+
+    Drop-in replacement for ``vitals`` in ``FROM vitals v`` when the question
+    asks for the latest value per patient: columns are ``patient_id``,
+    ``date`` (most recent of the metrics) and one column per metric.
+    """
+    pivots = ", ".join(
+        f"MAX(CASE WHEN metric = '{m}' THEN value END) AS {m}" for m in metrics
+    )
+    names = ", ".join(f"'{m}'" for m in metrics)
+    return (
+        f"(SELECT patient_id, MAX(date) AS date, {pivots} "
+        f"FROM latest_vitals WHERE metric IN ({names}) GROUP BY patient_id)"
+    )
+
+
 # Public API
-__all__ = ["build_filters_clause", "sql_select", "sql_group_by"]
+__all__ = [
+    "LATEST_VITAL_METRICS",
+    "bound_query_code",
+    "build_filters",
+    "build_filters_clause",
+    "inline_params",
+    "latest_vitals_source",
+    "sql_select",
+    "sql_group_by",
+]
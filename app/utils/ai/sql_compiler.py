@@ -0,0 +1,231 @@
+"""
+sql_compiler.py
+
+Compile template intents (trend, top-N, histogram, comparison) into SQL that
+does the aggregation inside SQLite, so only result-sized rows reach pandas.
+
+Each ``compile_*`` function returns ``(sql, params)``: filter values are bound
+as ``?`` placeholders so template queries differing only in values share one
+prepared statement.  The codegen modules embed both in the generated snippet
+and only reshape the (small) result.  Sources and
+filters follow the same rules as the other templates: vitals fields read from
+``vitals v``, patient attributes from ``patients p``, and the two are joined
+when an intent references both.  Field names come from the LLM intent and are
+spliced into the SQL text, so only known columns of those two tables are
+accepted; anything else raises ``ValueError``.
+"""
+
+from typing import Any, Iterable, List, Optional, Tuple
+
+from app.utils.ai.sql_builder import build_filters
+
+# Fields (and filter aliases) that live on ``patients``
+PATIENT_FIELDS = {
+    "active",
+    "gender",
+    "ethnicity",
+    "age",
+    "sex",
+    "activity_status",
+    "status",
+    "birth_date",
+    "engagement_score",
+    "program_start_date",
+    "program_end_date",
+    "etoh",
+    "tobacco",
+    "glp1_full",
+}
+
+# Columns of ``vitals`` (migrations/001_initial.sql)
+VITALS_FIELDS = {"vital_id", "patient_id", "date", "weight", "height", "bmi", "sbp", "dbp"}
+
+# Filter aliases that name a patients column differently
+_PATIENT_ALIASES = {"sex": "gender", "activity_status": "active", "status": "active"}
+
+# Filter field names as build_filters resolves them
+_FILTER_ALIASES = {"date": "program_start_date", "test_date": "date"}
+
+# ``patients`` stores birth_date; age is derived at query time
+AGE_EXPR = "CAST((julianday('now') - julianday(p.birth_date)) / 365.25 AS INTEGER)"
+
+# Trend period -> SQLite expression matching the former pandas bucketing
+# (``dt.strftime('%Y-%m')``, ``dt.strftime('%Y-%U')``, ``dt.year`` ...).
+# SQLite 3.40 has no ``%U``, so the Sunday-based week number is computed as
+# C's ``(yday + 7 - wday) / 7``.
+PERIOD_EXPRESSIONS = {
+    "month": "strftime('%Y-%m', v.date)",
+    "week": (
+        "strftime('%Y', v.date) || '-' || printf('%02d', "
+        "(CAST(strftime('%j', v.date) AS INTEGER) + 6 "
+        "- CAST(strftime('%w', v.date) AS INTEGER)) / 7)"
+    ),
+    "year": "CAST(strftime('%Y', v.date) AS INTEGER)",
+    "quarter": "(CAST(strftime('%m', v.date) AS INTEGER) + 2) / 3",
+    "day": "CAST(strftime('%d', v.date) AS INTEGER)",
+    "dayofweek": "(CAST(strftime('%w', v.date) AS INTEGER) + 6) % 7",
+}
+
+
+def _check_field(field: str) -> str:
+    """Return *field* if it names a known column; raise ``ValueError`` otherwise."""
+    if field not in PATIENT_FIELDS and field not in VITALS_FIELDS:
+        raise ValueError(f"Unknown field for SQL push-down: {field!r}")
+    return field
+
+
+def column_ref(field: str) -> str:
+    """Return the qualified SQL expression for *field*."""
+    _check_field(field)
+    if field == "age":
+        return AGE_EXPR
+    if field in PATIENT_FIELDS:
+        return f"p.{_PATIENT_ALIASES.get(field, field)}"
+    return f"v.{field}"
+
+
+Params = Tuple[Any, ...]
+
+
+def resolve_source(
+    intent, fields: Iterable[str]
+) -> Tuple[str, List[str], Params]:
+    """Return ``(from_clause, where_terms, params)`` for *fields* and the filters.
+
+    Joins ``patients`` only when both tables are referenced; a time range
+    always implies ``vitals`` (``date`` is a vitals column).  Raises
+    ``ValueError`` for fields and filter fields that are not known columns.
+    """
+    referenced = [_check_field(f) for f in fields if f]
+    for item in list(getattr(intent, "filters", []) or []) + list(
+        getattr(intent, "conditions", []) or []
+    ):
+        field = item.field.lower()
+        referenced.append(_check_field(_FILTER_ALIASES.get(field, field)))
+
+    uses_patients = any(f in PATIENT_FIELDS for f in referenced)
+    uses_vitals = getattr(intent, "time_range", None) is not None or any(
+        f not in PATIENT_FIELDS for f in referenced
+    )
+    if uses_patients and uses_vitals:
+        from_clause = "vitals v JOIN patients p ON v.patient_id = p.id"
+    elif uses_patients:
+        from_clause = "patients p"
+    else:
+        from_clause = "vitals v"
+
+    where, params = build_filters(intent)
+    where = where[6:] if where.startswith("WHERE ") else where
+    where = (
+        where.replace("patients.age", AGE_EXPR)
+        .replace("patients.", "p.")
+        .replace("vitals.", "v.")
+    )
+    return from_clause, [where] if where else [], params
+
+
+def _where(terms: List[str]) -> str:
+    return f" WHERE {' AND '.join(terms)}" if terms else ""
+
+
+def compile_trend(intent, period: str = "month") -> Optional[Tuple[str, Params]]:
+    """Average of ``target_field`` per *period*; ``None`` for unknown periods."""
+    bucket = PERIOD_EXPRESSIONS.get(period)
+    if bucket is None:
+        return None
+    target = getattr(intent, "target_field", None) or "weight"
+    from_clause, terms, params = resolve_source(intent, [target, "date"])
+    sql = (
+        f"SELECT {bucket} AS period, AVG({column_ref(target)}) AS avg_value "
+        f"FROM {from_clause}{_where(terms)} "
+        "GROUP BY period HAVING period IS NOT NULL ORDER BY period"
+    )
+    return sql, params
+
+
+def compile_top_n(intent, n: int = 10) -> Tuple[str, Params]:
+    """The *n* most frequent non-null values of ``target_field`` with counts.
+
+    Patient attributes are counted once per patient; ties are broken by value.
+    """
+    target = getattr(intent, "target_field", None) or "weight"
+    col = column_ref(target)
+    from_clause, terms, params = resolve_source(intent, [target])
+    counted = "COUNT(DISTINCT p.id)" if target in PATIENT_FIELDS else "COUNT(*)"
+    sql = (
+        f"SELECT {col} AS value, {counted} AS count "
+        f"FROM {from_clause}{_where(terms + [f'{col} IS NOT NULL'])} "
+        "GROUP BY value ORDER BY count DESC, value LIMIT ?"
+    )
+    return sql, params + (int(n),)
+
+
+def compile_histogram(
+    intent, bins: int = 10, value_range: Optional[Tuple[float, float]] = None
+) -> Tuple[str, Params]:
+    """Per-bin counts of ``target_field`` using ``np.histogram`` bin rules.
+
+    Bins split ``[min, max]`` into *bins* equal widths, the last bin closed on
+    the right.  Each row carries ``lo``/``hi`` so the caller can rebuild the
+    edges; no rows means no data.  *value_range* drops values outside it
+    (e.g. the physiologic BMI range) before binning.
+    """
+    target = getattr(intent, "target_field", None) or "weight"
+    col = column_ref(target)
+    bins = int(bins)
+    from_clause, terms, params = resolve_source(intent, [target])
+    terms = terms + [f"{col} IS NOT NULL"]
+    if value_range is not None:
+        terms.append(f"{col} BETWEEN ? AND ?")
+        params = params + tuple(value_range)
+    # Same arithmetic as np.histogram: index = (x - lo) * norm, then nudged
+    # by one against the linspace edges.  All-equal values: numpy widens the
+    # range by ±0.5, putting them in the middle bin.  The bin count shapes
+    # the statement (CASE constants) and stays inlined.
+    sql = (
+        f"WITH vals AS (SELECT {col} AS value FROM {from_clause}{_where(terms)}), "
+        "bounds AS (SELECT MIN(value) AS lo, MAX(value) AS hi, "
+        f"{bins} * 1.0 / (MAX(value) - MIN(value)) AS norm, "
+        f"(MAX(value) - MIN(value)) * 1.0 / {bins} AS step FROM vals), "
+        "indexed AS (SELECT value, "
+        f"MIN(CAST((value - lo) * norm AS INTEGER), {bins - 1}) AS i "
+        "FROM vals CROSS JOIN bounds) "
+        "SELECT b.lo, b.hi, "
+        f"CASE WHEN b.hi = b.lo THEN {bins // 2} "
+        "ELSE i - (value < i * b.step + b.lo) "
+        f"+ (value >= (i + 1) * b.step + b.lo AND i < {bins - 1}) "
+        "END AS bin, COUNT(*) AS count "
+        "FROM indexed CROSS JOIN bounds b GROUP BY bin ORDER BY bin"
+    )
+    return sql, params
+
+
+def compile_comparison(intent) -> Optional[Tuple[str, Params]]:
+    """Average and row count of ``target_field`` per non-null ``group_by[0]``."""
+    target = getattr(intent, "target_field", None)
+    group_by = getattr(intent, "group_by", []) or []
+    if not (target and group_by):
+        return None
+    group = column_ref(group_by[0])
+    from_clause, terms, params = resolve_source(intent, [target, group_by[0]])
+    sql = (
+        f"SELECT {group} AS compare_group, "
+        f"AVG({column_ref(target)}) AS avg_value, COUNT(*) AS count "
+        f"FROM {from_clause}{_where(terms + [f'{group} IS NOT NULL'])} "
+        "GROUP BY compare_group"
+    )
+    return sql, params
+
+
+__all__ = [
+    "AGE_EXPR",
+    "PATIENT_FIELDS",
+    "PERIOD_EXPRESSIONS",
+    "VITALS_FIELDS",
+    "column_ref",
+    "compile_comparison",
+    "compile_histogram",
+    "compile_top_n",
+    "compile_trend",
+    "resolve_source",
+]
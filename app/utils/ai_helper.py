@@ -1,6 +1,7 @@
 import logging
 import json
 from app.utils.ai.llm_interface import is_offline_mode
+from app.utils.ai.llm_gateway import with_llm_stage
 from app.utils.ai.intent_parser import get_query_intent as _ai_get_query_intent
 from app.utils.ai import intent_parser as _intent_parser
 from app.utils.query_intent import QueryIntent
@@ -92,6 +93,7 @@ class AIHelper:
             prompt, query, model=self.model, temperature=0.3, max_tokens=500
         )
 
+    @with_llm_stage("intent")
     def get_query_intent(self, query):
         """Return parsed intent via refactored parser (Step 4 wiring).
 
@@ -145,6 +147,7 @@ class AIHelper:
         finally:
             _intent_parser.ask_llm = _original_ask_llm
 
+    @with_llm_stage("code")
     def generate_analysis_code(self, intent, data_schema, custom_prompt=None):
         """
         Generate Python code to perform the analysis based on the identified intent
@@ -342,6 +345,7 @@ class AIHelper:
             results = analysis_error()
             """
 
+    @with_llm_stage("clarification")
     def generate_clarifying_questions(self, query):
         """
         Generate relevant clarifying questions based on the user's query
@@ -349,9 +353,13 @@ class AIHelper:
         # logger.info(f"Generating clarifying questions for: {query}")
         return _generate_clarifying_questions(query, model=self.model)
 
-    def interpret_results(self, query, results, visualizations=None):
+    @with_llm_stage("narrative")
+    def interpret_results(self, query, results, visualizations=None, on_token=None):
         """
         Interpret analysis results and generate human-readable insights
+
+        Pass *on_token* to stream the narrative: it receives each text delta
+        as the model produces it.
         """
         # logger.info("Interpreting analysis results")
         results = normalize_visualization_error(results)
@@ -361,5 +369,9 @@ class AIHelper:
         ):
             query = f"{query} (Note: visualizations are currently disabled)"
         return _interpret_results(
-            query, results, visualisations=visualizations, model=self.model
+            query,
+            results,
+            visualisations=visualizations,
+            model=self.model,
+            on_token=on_token,
         )
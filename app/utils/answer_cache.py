@@ -0,0 +1,305 @@
+"""Persistent, layered answer cache for the Data Analysis Assistant.
+
+Every question used to walk the whole :class:`app.engine.AnalysisEngine`
+pipeline – up to three LLM round trips plus a sandbox run – even when the
+same question was asked a minute earlier.  This module memoises each stage
+separately so a repeat (or a partial repeat) can skip straight ahead:
+
+==============  =========================================================
+stage           key
+==============  =========================================================
+``intent``      normalised query text + resolved engine parameters + model
+``code``        intent signature (``QueryIntent`` minus its confidence) +
+                threshold prompt + model
+``result``      exact sandbox code + data-version stamp of the patient DB
+``narrative``   query + result key + active/inactive preference + model
+==============  =========================================================
+
+Entries are pickled into the ``assistant_answer_cache`` table that lives in
+the same SQLite file as ``assistant_logs`` (see
+:mod:`app.utils.query_logging`), so they survive restarts.  Entries older than
+``MH_ANSWER_CACHE_TTL`` seconds (default one day) are treated as misses and
+purged; once the table holds more than ``MH_ANSWER_CACHE_MAX_BYTES`` (default
+64 MiB) of payload the least recently used rows are deleted.
+
+The ``result`` stage is only valid while the patient data is unchanged:
+:func:`data_version_stamp` reads the per-table counters maintained by
+triggers from ``migrations/012_data_version.py``.
+
+Set ``MH_ANSWER_CACHE=0`` to disable the cache (the test-suite does).  Cache
+failures are logged and treated as misses – they never break a query.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Tuple
+
+from app.utils.db_pool import get_connection, write_connection
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "STAGES",
+    "AnswerCache",
+    "answer_cache_enabled",
+    "data_version_stamp",
+    "get_answer_cache",
+    "make_key",
+    "normalize_query",
+]
+
+STAGES = ("intent", "code", "result", "narrative")
+
+DEFAULT_TTL_SECONDS = float(os.getenv("MH_ANSWER_CACHE_TTL", str(24 * 3600)))
+DEFAULT_MAX_BYTES = int(os.getenv("MH_ANSWER_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+_CREATE_SQL = """
+CREATE TABLE IF NOT EXISTS assistant_answer_cache (
+    stage       TEXT    NOT NULL,
+    cache_key   TEXT    NOT NULL,
+    payload     BLOB    NOT NULL,
+    nbytes      INTEGER NOT NULL,
+    hits        INTEGER NOT NULL DEFAULT 0,
+    created_at  REAL    NOT NULL,
+    last_used   REAL    NOT NULL,
+    PRIMARY KEY (stage, cache_key)
+);
+CREATE INDEX IF NOT EXISTS idx_assistant_answer_cache_last_used
+    ON assistant_answer_cache(last_used);
+"""
+
+
+def answer_cache_enabled() -> bool:
+    """Return False when ``MH_ANSWER_CACHE`` disables the answer cache."""
+    return os.getenv("MH_ANSWER_CACHE", "1").lower() not in {"0", "false", "no"}
+
+
+def normalize_query(query: str) -> str:
+    """Lower-case *query*, collapse whitespace and drop trailing punctuation."""
+    return re.sub(r"\s+", " ", query or "").strip().lower().rstrip("?.! ")
+
+
+def make_key(*parts: Any) -> str:
+    """Return a stable SHA-256 hex digest of *parts* (JSON, sorted keys)."""
+    blob = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def data_version_stamp(db_path: str) -> str:
+    """Return a stamp of *db_path*'s clinical data that changes on every write.
+
+    Uses the per-table counters from ``migrations/012_data_version.py``.  On
+    databases without that table it falls back to fingerprinting the file and
+    its ``-wal`` (which also moves when logs are written – safe, just fewer
+    hits).
+    """
+    if os.path.exists(db_path):
+        try:
+            rows = get_connection(db_path).execute(
+                "SELECT table_name, version FROM data_version ORDER BY table_name"
+            )
+            return "v:" + ",".join(f"{name}={version}" for name, version in rows)
+        except sqlite3.Error:
+            pass
+
+    parts = []
+    for path in (db_path, f"{db_path}-wal"):
+        try:
+            st = os.stat(path)
+        except OSError:
+            parts.append("-")
+        else:
+            parts.append(f"{st.st_ino}:{st.st_mtime_ns}:{st.st_size}")
+    return "f:" + "|".join(parts)
+
+
+class AnswerCache:
+    """SQLite-backed stage cache with TTL and size-based LRU eviction."""
+
+    def __init__(
+        self,
+        db_file: str | None = None,
+        *,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.db_file = db_file
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._ready: set[Tuple[str, int]] = set()
+        self._stats = {stage: {"hits": 0, "misses": 0, "stores": 0} for stage in STAGES}
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    def _path(self) -> str:
+        if self.db_file:
+            return self.db_file
+        from app.utils.query_logging import DB_FILE
+
+        return DB_FILE
+
+    def _ensure_table(self, path: str) -> None:
+        # Keyed on the inode too, so a replaced database file is re-initialised
+        try:
+            ident = (path, os.stat(path).st_ino)
+        except OSError:
+            ident = None
+        if ident is not None and ident in self._ready:
+            return
+        with write_connection(path) as conn:
+            conn.executescript(_CREATE_SQL)
+        if ident is None:
+            ident = (path, os.stat(path).st_ino)
+        self._ready.add(ident)
+
+    def _bump(self, stage: str, key: str) -> None:
+        with self._lock:
+            self._stats[stage][key] += 1
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get(self, stage: str, key: str) -> Tuple[bool, Any]:
+        """Return ``(hit, value)`` for *key* in *stage*."""
+        path = self._path()
+        try:
+            self._ensure_table(path)
+            row = (
+                get_connection(path)
+                .execute(
+                    "SELECT payload, created_at FROM assistant_answer_cache "
+                    "WHERE stage = ? AND cache_key = ?",
+                    (stage, key),
+                )
+                .fetchone()
+            )
+            now = time.time()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._delete(path, stage, key)
+                self._bump(stage, "misses")
+                return False, None
+
+            value = pickle.loads(row[0])
+            with write_connection(path) as conn:
+                conn.execute(
+                    "UPDATE assistant_answer_cache SET hits = hits + 1, last_used = ? "
+                    "WHERE stage = ? AND cache_key = ?",
+                    (now, stage, key),
+                )
+        except Exception as exc:
+            logger.warning("Answer cache lookup failed (%s): %s", stage, exc)
+            self._bump(stage, "misses")
+            return False, None
+
+        self._bump(stage, "hits")
+        return True, value
+
+    def put(self, stage: str, key: str, value: Any) -> bool:
+        """Store *value* under *key*; returns False when it was not cached."""
+        try:
+            payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as exc:
+            logger.debug("Answer cache skipped unpicklable %s value: %s", stage, exc)
+            return False
+        if len(payload) > self.max_bytes:
+            return False
+
+        path = self._path()
+        now = time.time()
+        try:
+            self._ensure_table(path)
+            with write_connection(path) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO assistant_answer_cache "
+                    "(stage, cache_key, payload, nbytes, hits, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, 0, ?, ?)",
+                    (stage, key, payload, len(payload), now, now),
+                )
+                self._evict(conn, now)
+        except Exception as exc:
+            logger.warning("Answer cache store failed (%s): %s", stage, exc)
+            return False
+
+        self._bump(stage, "stores")
+        return True
+
+    def _evict(self, conn, now: float) -> None:
+        conn.execute(
+            "DELETE FROM assistant_answer_cache WHERE created_at < ?",
+            (now - self.ttl_seconds,),
+        )
+        total = conn.execute(
+            "SELECT COALESCE(SUM(nbytes), 0) FROM assistant_answer_cache"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for stage, key, nbytes in conn.execute(
+            "SELECT stage, cache_key, nbytes FROM assistant_answer_cache "
+            "ORDER BY last_used"
+        ):
+            if total <= self.max_bytes:
+                break
+            victims.append((stage, key))
+            total -= nbytes
+        conn.executemany(
+            "DELETE FROM assistant_answer_cache WHERE stage = ? AND cache_key = ?",
+            victims,
+        )
+
+    def _delete(self, path: str, stage: str, key: str) -> None:
+        with write_connection(path) as conn:
+            conn.execute(
+                "DELETE FROM assistant_answer_cache WHERE stage = ? AND cache_key = ?",
+                (stage, key),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-stage hit/miss/store counters plus stored entries/bytes."""
+        with self._lock:
+            snapshot: Dict[str, Any] = {s: dict(c) for s, c in self._stats.items()}
+        try:
+            path = self._path()
+            self._ensure_table(path)
+            rows = get_connection(path).execute(
+                "SELECT stage, COUNT(*), COALESCE(SUM(nbytes), 0) "
+                "FROM assistant_answer_cache GROUP BY stage"
+            )
+            for stage, count, nbytes in rows:
+                snapshot.setdefault(stage, {}).update(entries=count, bytes=nbytes)
+        except Exception as exc:  # pragma: no cover – stats are best effort
+            logger.debug("Answer cache stats unavailable: %s", exc)
+        return snapshot
+
+    def clear(self) -> None:
+        """Delete every cached entry and reset the counters."""
+        path = self._path()
+        self._ensure_table(path)
+        with write_connection(path) as conn:
+            conn.execute("DELETE FROM assistant_answer_cache")
+        with self._lock:
+            for counters in self._stats.values():
+                for key in counters:
+                    counters[key] = 0
+
+
+_CACHE = AnswerCache()
+
+
+def get_answer_cache() -> AnswerCache:
+    """Return the process-wide :class:`AnswerCache`."""
+    return _CACHE
@@ -13,6 +13,9 @@ Default Constants:
 - DEFAULT_PATIENT_STATUS: Default for patient activity status (active/all)
 - DEFAULT_AGGREGATOR: Default metric aggregation (average/min/max)
 - DEFAULT_BMI_SOURCE: Metric instance source (e.g., 'most_recent')
+- LATEST_PER_PATIENT_SOURCE: Metric instance for queries asking for each
+  patient's latest value – one value per patient from the materialized
+  latest_* tables
 
 Helper Functions:
 - resolve_time_window
@@ -50,6 +53,18 @@ DEFAULT_GENDER = "all"
 DEFAULT_PATIENT_STATUS = "active"  # Options: "active", "all"
 DEFAULT_AGGREGATOR = "average"  # for multi-value queries
 DEFAULT_BMI_SOURCE = "most_recent"
+LATEST_PER_PATIENT_SOURCE = "latest_per_patient"
+# "latest" wording only selects LATEST_PER_PATIENT_SOURCE with per-patient wording
+_LATEST_TERMS = ("latest", "most recent", "last recorded")
+_PER_PATIENT_TERMS = (
+    "per patient",
+    "per-patient",
+    "each patient",
+    "every patient",
+    "patient's",
+    "patients'",
+    "their",
+)
 
 # --- Helper Functions ---
 
@@ -91,8 +106,15 @@ def resolve_metric_source(query: str) -> str:
     Determines which metric instance to use (e.g., 'most recent' for BMI).
     Defaults to most recent.
     """
-    if "earliest" in query.lower():
+    q = query.lower()
+    if "earliest" in q:
         return "earliest"
+    # "each patient's latest ..." → aggregate one (latest) value per patient;
+    # plain "latest" wording keeps aggregating over all readings
+    if any(term in q for term in _LATEST_TERMS) and any(
+        term in q for term in _PER_PATIENT_TERMS
+    ):
+        return LATEST_PER_PATIENT_SOURCE
     # Add more logic as needed
     return DEFAULT_BMI_SOURCE
 
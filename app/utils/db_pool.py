@@ -0,0 +1,397 @@
+"""Process-wide SQLite connection pool.
+
+Every helper used to call :pyfunc:`sqlite3.connect` on each request and close
+the handle again afterwards, which means paying the open + page-cache warm-up
+cost for every dashboard refresh and every assistant query.  This module keeps
+connections alive instead:
+
+* **Readers** – one connection *per thread per database*, stored in
+  ``threading.local`` so no locking is required on the hot path.  Readers are
+  opened with ``PRAGMA query_only`` so a stray ``INSERT`` can never leave an
+  implicit write transaction dangling on a shared handle.
+* **Writer** – a single connection per database guarded by a re-entrant lock.
+  :pyfunc:`write_connection` serialises writers inside the process and
+  commits / rolls back automatically.
+
+Connections are keyed by the *resolved* database path so the runtime override
+via :pyfunc:`app.db_query.set_db_path` (``MH_DB_PATH``) is honoured on every
+checkout.  If the file behind a pooled handle is deleted or replaced (common in
+tests that create temporary databases) the stale handle is dropped and a fresh
+one opened transparently.
+
+WAL journalling is switched on when the writer first opens a database (it is a
+persistent, file-level setting), so purely read-only consumers never rewrite
+the file header.  ``mmap_size`` and ``cache_size`` are per-connection and are
+applied to every pooled handle.
+
+Each handle keeps up to ``cached_statements`` prepared statements (sqlite3's
+per-connection LRU keyed by SQL text).  Callers that bind values as ``?``
+parameters reuse one plan for every value; :pyfunc:`ConnectionPool.note_statement`
+mirrors that LRU so :pyfunc:`pool_stats` can report a statement-cache hit-rate.
+
+In-memory databases (``:memory:``) are never pooled – each connection would be
+a different database, so callers receive a fresh, unpooled handle.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional, Tuple
+
+from app.config import get_mh_db_path
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "ConnectionPool",
+    "resolve_db_path",
+    "get_pool",
+    "get_connection",
+    "write_connection",
+    "pool_stats",
+    "close_all",
+]
+
+# ---------------------------------------------------------------------------
+# Tunables (overridable via environment for deployment sizing)
+# ---------------------------------------------------------------------------
+
+#: Bytes of the database file SQLite may memory-map per connection.
+DEFAULT_MMAP_SIZE = int(os.getenv("MH_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+#: Page-cache size per connection in KiB (applied as a negative cache_size).
+DEFAULT_CACHE_SIZE_KIB = int(os.getenv("MH_DB_CACHE_SIZE_KIB", str(64 * 1024)))
+#: Seconds a connection waits on a locked database before raising.
+DEFAULT_BUSY_TIMEOUT = float(os.getenv("MH_DB_BUSY_TIMEOUT", "30"))
+#: Prepared statements sqlite3 keeps per connection (its default is 128).
+DEFAULT_CACHED_STATEMENTS = int(os.getenv("MH_DB_CACHED_STATEMENTS", "256"))
+
+_MEMORY_PATHS = {":memory:", ""}
+
+
+def resolve_db_path(db_path: str | os.PathLike | None = None) -> str:
+    """Return the absolute path the pool uses as key for *db_path*.
+
+    ``None`` resolves to the active database (``MH_DB_PATH`` override or the
+    default ``patient_data.db``).
+    """
+
+    path = str(db_path) if db_path is not None else get_mh_db_path()
+    if path in _MEMORY_PATHS or path.startswith("file:"):
+        return path
+    return os.path.realpath(path)
+
+
+def _file_identity(path: str) -> Optional[Tuple[int, int]]:
+    """Return ``(st_dev, st_ino)`` for *path* or ``None`` when it is missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_dev, st.st_ino
+
+
+@dataclass
+class _Entry:
+    """A pooled connection together with the identity of the file it opened."""
+
+    conn: sqlite3.Connection
+    file_id: Optional[Tuple[int, int]]
+    generation: int
+    #: SQL texts in the connection's statement cache, least recent first
+    statements: "OrderedDict[str, None]" = field(default_factory=OrderedDict)
+
+
+@dataclass
+class _WriterSlot:
+    """Lazily-opened writer connection plus the lock serialising its use."""
+
+    lock: threading.RLock = field(default_factory=threading.RLock)
+    entry: Optional[_Entry] = None
+    depth: int = 0  # nesting level of writer() blocks holding the lock
+
+
+class ConnectionPool:
+    """Thread-local reader / serialised writer pool keyed by database path."""
+
+    def __init__(
+        self,
+        *,
+        mmap_size: int = DEFAULT_MMAP_SIZE,
+        cache_size_kib: int = DEFAULT_CACHE_SIZE_KIB,
+        busy_timeout: float = DEFAULT_BUSY_TIMEOUT,
+        cached_statements: int = DEFAULT_CACHED_STATEMENTS,
+    ) -> None:
+        self.mmap_size = mmap_size
+        self.cache_size_kib = cache_size_kib
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writers: Dict[str, _WriterSlot] = {}
+        self._generation = 0
+        self._pid = os.getpid()
+        self._stats = {
+            "reader_hits": 0,
+            "reader_misses": 0,
+            "writer_hits": 0,
+            "writer_misses": 0,
+            "reconnects": 0,
+            "statement_hits": 0,
+            "statement_misses": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    def _bump(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += n
+
+    def _check_fork(self) -> None:
+        """Forget handles inherited from a parent process (never share them)."""
+        if os.getpid() != self._pid:
+            with self._lock:
+                self._pid = os.getpid()
+                self._local = threading.local()
+                self._writers = {}
+                self._generation += 1
+
+    def _open(self, path: str, *, read_only: bool) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            path,
+            timeout=self.busy_timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            uri=path.startswith("file:"),
+        )
+        try:
+            conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+            conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kib)}")
+            if read_only:
+                conn.execute("PRAGMA query_only = ON")
+            else:
+                conn.execute("PRAGMA journal_mode = WAL")
+        except sqlite3.Error as exc:  # pragma: no cover – e.g. read-only media
+            logger.debug("Could not apply pool PRAGMAs to %s: %s", path, exc)
+        return conn
+
+    def _is_stale(self, entry: _Entry, path: str) -> bool:
+        if entry.generation != self._generation:
+            return True
+        return entry.file_id != _file_identity(path)
+
+    @staticmethod
+    def _close_quietly(conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        except Exception:  # pragma: no cover – best effort
+            pass
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def reader(self, db_path: str | os.PathLike | None = None) -> sqlite3.Connection:
+        """Return this thread's read-only connection for *db_path*.
+
+        The handle stays owned by the pool – callers must **not** close it.
+        """
+
+        path = resolve_db_path(db_path)
+        if path in _MEMORY_PATHS:
+            return sqlite3.connect(path)
+
+        self._check_fork()
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+
+        entry = conns.get(path)
+        if entry is not None and not self._is_stale(entry, path):
+            self._bump("reader_hits")
+            return entry.conn
+
+        if entry is not None:
+            self._close_quietly(entry.conn)
+            self._bump("reconnects")
+
+        conn = self._open(path, read_only=True)
+        conns[path] = _Entry(conn, _file_identity(path), self._generation)
+        self._bump("reader_misses")
+        return conn
+
+    @contextmanager
+    def writer(
+        self, db_path: str | os.PathLike | None = None
+    ) -> Iterator[sqlite3.Connection]:
+        """Yield the serialised writer connection for *db_path*.
+
+        The transaction is committed when the block exits normally and rolled
+        back on error.  Nested use from the same thread is allowed (the lock is
+        re-entrant): an inner block runs inside a SAVEPOINT of the outer
+        transaction, so an error rolls back just the inner block and only the
+        outermost block commits.
+        """
+
+        path = resolve_db_path(db_path)
+        if path in _MEMORY_PATHS:
+            conn = sqlite3.connect(path)
+            try:
+                with conn:
+                    yield conn
+            finally:
+                conn.close()
+            return
+
+        self._check_fork()
+        with self._lock:
+            slot = self._writers.setdefault(path, _WriterSlot())
+
+        with slot.lock:
+            if slot.depth:
+                yield from self._nested_writer(slot)
+                return
+
+            entry = slot.entry
+            if entry is not None and not self._is_stale(entry, path):
+                self._bump("writer_hits")
+            else:
+                if entry is not None:
+                    self._close_quietly(entry.conn)
+                    self._bump("reconnects")
+                conn = self._open(path, read_only=False)
+                entry = slot.entry = _Entry(
+                    conn, _file_identity(path), self._generation
+                )
+                self._bump("writer_misses")
+
+            conn = entry.conn
+            slot.depth = 1
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                slot.depth = 0
+
+    def _nested_writer(self, slot: _WriterSlot) -> Iterator[sqlite3.Connection]:
+        conn = slot.entry.conn
+        self._bump("writer_hits")
+        if not conn.in_transaction:
+            # Otherwise RELEASE of the outermost savepoint would commit
+            conn.execute("BEGIN")
+        name = f"pool_writer_{slot.depth}"
+        conn.execute(f"SAVEPOINT {name}")
+        slot.depth += 1
+        try:
+            yield conn
+            conn.execute(f"RELEASE {name}")
+        except BaseException:
+            conn.execute(f"ROLLBACK TO {name}")
+            conn.execute(f"RELEASE {name}")
+            raise
+        finally:
+            slot.depth -= 1
+
+    def note_statement(
+        self, sql: str, db_path: str | os.PathLike | None = None
+    ) -> bool:
+        """Record that this thread's reader is about to prepare *sql*.
+
+        Returns ``True`` when the statement is already in the connection's
+        cache (the plan is reused) and updates the statement hit/miss
+        counters.  Call right before executing on :meth:`reader`'s handle.
+        """
+
+        path = resolve_db_path(db_path)
+        entry = (getattr(self._local, "conns", None) or {}).get(path)
+        if entry is None:
+            return False
+        statements = entry.statements
+        hit = sql in statements
+        if hit:
+            statements.move_to_end(sql)
+        else:
+            statements[sql] = None
+            if len(statements) > self.cached_statements:
+                statements.popitem(last=False)
+        self._bump("statement_hits" if hit else "statement_misses")
+        return hit
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters plus the checkout and statement hit-rates."""
+        with self._lock:
+            snapshot: Dict[str, float] = dict(self._stats)
+        hits = snapshot["reader_hits"] + snapshot["writer_hits"]
+        total = hits + snapshot["reader_misses"] + snapshot["writer_misses"]
+        snapshot["hit_rate"] = hits / total if total else 0.0
+        prepared = snapshot["statement_hits"] + snapshot["statement_misses"]
+        snapshot["statement_hit_rate"] = (
+            snapshot["statement_hits"] / prepared if prepared else 0.0
+        )
+        return snapshot
+
+    def reset_stats(self) -> None:
+        """Zero all counters (useful for benchmarks)."""
+        with self._lock:
+            for key in self._stats:
+                self._stats[key] = 0
+
+    def close_all(self) -> None:
+        """Close pooled handles; other threads reconnect on next checkout."""
+        with self._lock:
+            self._generation += 1
+            writers, self._writers = self._writers, {}
+
+        for slot in writers.values():
+            with slot.lock:
+                if slot.entry is not None:
+                    self._close_quietly(slot.entry.conn)
+                    slot.entry = None
+
+        conns = getattr(self._local, "conns", None) or {}
+        for entry in conns.values():
+            self._close_quietly(entry.conn)
+        conns.clear()
+
+
+# ---------------------------------------------------------------------------
+# Module-level singleton + convenience wrappers
+# ---------------------------------------------------------------------------
+
+_POOL = ConnectionPool()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide :class:`ConnectionPool`."""
+    return _POOL
+
+
+def get_connection(db_path: str | os.PathLike | None = None) -> sqlite3.Connection:
+    """Shortcut for ``get_pool().reader(db_path)``."""
+    return _POOL.reader(db_path)
+
+
+def write_connection(db_path: str | os.PathLike | None = None):
+    """Shortcut for ``get_pool().writer(db_path)`` (context manager)."""
+    return _POOL.writer(db_path)
+
+
+def pool_stats() -> Dict[str, float]:
+    """Shortcut for ``get_pool().stats()``."""
+    return _POOL.stats()
+
+
+def close_all() -> None:
+    """Shortcut for ``get_pool().close_all()``."""
+    _POOL.close_all()
@@ -0,0 +1,146 @@
+"""Schema-driven dtypes for DataFrames loaded from SQLite.
+
+``pd.read_sql_query`` returns ``date`` columns as strings, enum-like text
+(``gender``, ``test_name`` ...) as one Python ``str`` per row and every
+integer as ``int64``, so analysis code keeps calling ``pd.to_datetime`` /
+``convert_df_dates`` on the same columns.  :data:`DTYPE_REGISTRY` maps column
+names to a target kind, derived once from
+
+* :func:`app.utils.schema.get_data_schema` – ``datetime`` columns are
+  parsed, ``integer`` columns are downcast, ``float`` columns are left as
+  ``float64`` (downcasting would change values);
+* :mod:`app.utils.patient_attributes` – text fields with an enum/label map
+  become categoricals and 0/1 flag enums (``active``, ``etoh`` ...) ``int8``;
+* :data:`_EXTRA_COLUMNS` – columns the schema description does not cover.
+
+:func:`apply_dtypes` converts a frame in one pass and only where it is
+lossless: dates must all parse, integers must be null-free (SQLite integers
+with NULLs arrive as ``float64`` and stay so) and fit the target type.
+Categories are the values present, so no empty groups appear; pass
+``observed=True`` to ``groupby`` on categorical keys to silence pandas'
+warning.  Set ``MH_TYPED_FRAMES=0`` to turn typed loading off globally.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Dict, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.utils import patient_attributes
+from app.utils.schema import get_data_schema
+
+__all__ = [
+    "DTYPE_REGISTRY",
+    "typed_frames_enabled",
+    "apply_dtypes",
+    "memory_savings",
+]
+
+# Schema keys that differ from table names
+_SCHEMA_TABLES = {"labs": "lab_results"}
+
+# Columns missing from get_data_schema(), described the same way
+_EXTRA_COLUMNS: Dict[str, Dict[str, str]] = {
+    "mental_health": {
+        "date": "datetime",
+        "assessment_type": "string",
+        "score": "integer",
+    },
+}
+
+# Low-cardinality text without an enum in patient_attributes
+_LOW_CARDINALITY = {"test_name", "unit"}
+
+
+def _build_registry() -> Dict[str, str]:
+    labels = patient_attributes.ATTRIBUTE_LABELS
+    # 0/1 flag enums (Active, ETOH, Tobacco, GLP1Full); the rest are text codes
+    flags = {field for field, values in labels.items() if set(values) == {0, 1}}
+    categorical = _LOW_CARDINALITY | (set(labels) - flags)
+
+    described = {
+        _SCHEMA_TABLES.get(table, table): columns
+        for table, columns in get_data_schema().items()
+    }
+    for table, columns in _EXTRA_COLUMNS.items():
+        described.setdefault(table, {}).update(columns)
+
+    registry: Dict[str, str] = {}
+    for table, columns in described.items():
+        for column, description in columns.items():
+            kind = description.split(" ", 1)[0]
+            if kind == "datetime":
+                target = "datetime"
+            elif column in flags:
+                target = "int8"
+            elif kind == "integer":
+                target = "int32"
+            elif kind == "string" and column in categorical:
+                target = "category"
+            else:
+                continue
+            if registry.setdefault(column, target) != target:
+                raise ValueError(
+                    f"Conflicting dtypes for column {column!r} ({table}): "
+                    f"{registry[column]} vs {target}"
+                )
+    return registry
+
+
+#: Column name → target kind (``datetime``, ``category``, ``int8``, ``int32``)
+DTYPE_REGISTRY: Dict[str, str] = _build_registry()
+
+
+def typed_frames_enabled() -> bool:
+    """Return False when ``MH_TYPED_FRAMES`` disables typed loading."""
+    return os.getenv("MH_TYPED_FRAMES", "1").lower() not in {"0", "false", "no"}
+
+
+def _convert(series: pd.Series, kind: str) -> Optional[pd.Series]:
+    """Return *series* converted to *kind*, or ``None`` if that would be lossy."""
+    if kind == "datetime":
+        if series.dtype != object:
+            return None
+        try:
+            parsed = pd.to_datetime(series, errors="coerce", format="ISO8601")
+        except (ValueError, TypeError):  # e.g. mixed UTC offsets
+            return None
+        return parsed if parsed.notna().sum() == series.notna().sum() else None
+    if kind == "category":
+        return series.astype("category") if series.dtype == object else None
+    if not pd.api.types.is_integer_dtype(series.dtype) or series.dtype == kind:
+        return None
+    info = np.iinfo(kind)
+    if len(series) and (series.min() < info.min or series.max() > info.max):
+        return None
+    return series.astype(kind)
+
+
+def apply_dtypes(
+    df: pd.DataFrame, registry: Optional[Mapping[str, str]] = None
+) -> pd.DataFrame:
+    """Return *df* with registry columns converted (see module docstring).
+
+    Columns not in the registry, and conversions that would lose
+    information, are left untouched.  *df* itself is not modified.
+    """
+    registry = DTYPE_REGISTRY if registry is None else registry
+    converted = {}
+    for column in df.columns:
+        kind = registry.get(column)
+        if kind is None or not isinstance(df[column], pd.Series):
+            continue  # duplicate column names return a frame
+        new = _convert(df[column], kind)
+        if new is not None:
+            converted[column] = new
+    return df.assign(**converted) if converted else df
+
+
+def memory_savings(raw: pd.DataFrame, typed: pd.DataFrame) -> Dict[str, int]:
+    """Return deep memory use of *raw* vs *typed* and the bytes saved."""
+    before = int(raw.memory_usage(index=True, deep=True).sum())
+    after = int(typed.memory_usage(index=True, deep=True).sum())
+    return {"before_bytes": before, "after_bytes": after, "saved_bytes": before - after}
@@ -0,0 +1,461 @@
+"""Patient-level feature store.
+
+Per-patient features that assistant snippets and cohort reports derive again
+and again – baseline vs. latest weight, percent weight change, BMI category,
+PHQ-9 change, visit counts, age – are computed once into ``patient_features``
+(one row, one column per feature) so cohort questions become a single-table
+scan instead of a multi-join aggregation over the full history.
+
+Features are declared in :data:`FEATURE_REGISTRY`; metric-style features reuse
+the functions in :data:`app.utils.metrics.METRIC_REGISTRY`.  Each definition
+names the source tables it reads, and the table gains a column for every
+registered feature on the next refresh.
+
+Triggers from ``migrations/016_patient_features.py`` log every patient whose
+source rows change in ``feature_change_log``; :func:`refresh_features`
+recomputes just those patients.  It runs after each JSON ingest and can be
+called explicitly (or via ``get_patient_features(refresh=True)``) after other
+writes.  :func:`get_patient_features` only reads by default; sandbox snippets
+and execution plans get :func:`read_patient_features`, which can never
+refresh, so generated code does not take the writer lock or alter the table.
+``age`` is evaluated at refresh time and is not re-aged by the calendar.
+
+Example
+-------
+>>> from app.utils.feature_store import get_patient_features
+>>> df = get_patient_features(["bmi_category", "weight_change_pct"])
+>>> df.groupby("bmi_category")["weight_change_pct"].mean()
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.db_query import query_dataframe
+from app.reference_ranges import REFERENCE_RANGES
+from app.utils.db_pool import get_connection, resolve_db_path, write_connection
+from app.utils.metrics import get_metric
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "FEATURE_REGISTRY",
+    "FeatureDefinition",
+    "get_patient_features",
+    "read_patient_features",
+    "refresh_features",
+    "register_feature",
+]
+
+# Patients per recompute batch (bounded memory and ``IN (...)`` parameter count)
+_BATCH_SIZE = 500
+
+Inputs = Dict[str, pd.DataFrame]
+
+# Source name -> SELECT returning a ``patient_id`` column.  ``{where}`` is
+# replaced by a patient filter for incremental refreshes.
+_SOURCES: Dict[str, str] = {
+    "patients": (
+        "SELECT id AS patient_id, birth_date, gender, active, program_start_date "
+        "FROM patients WHERE 1=1 {where}"
+    ),
+    "vitals": (
+        "SELECT patient_id, date, weight, bmi FROM vitals "
+        "WHERE (weight IS NOT NULL OR bmi IS NOT NULL) {where}"
+    ),
+    "phq9": (
+        "SELECT patient_id, date, score AS value FROM mental_health "
+        "WHERE LOWER(REPLACE(assessment_type, '-', '')) = 'phq9' "
+        "AND score IS NOT NULL {where}"
+    ),
+    "visits": (
+        "SELECT patient_id, provider_visits, health_coach_visits, "
+        "cancelled_visits, no_show_visits FROM patient_visit_metrics "
+        "WHERE 1=1 {where}"
+    ),
+}
+_SOURCE_KEY = {"patients": "id"}
+
+
+@dataclass(frozen=True)
+class FeatureDefinition:
+    """A patient feature: *compute* maps loaded sources to a per-patient Series."""
+
+    name: str
+    compute: Callable[[Inputs], pd.Series]
+    sql_type: str = "REAL"
+    sources: FrozenSet[str] = frozenset()
+    description: str = ""
+
+
+FEATURE_REGISTRY: Dict[str, FeatureDefinition] = {}
+
+
+def register_feature(
+    name: str,
+    compute: Callable[[Inputs], pd.Series],
+    *,
+    sql_type: str = "REAL",
+    sources: Iterable[str] = (),
+    description: str = "",
+) -> None:
+    """Add (or replace) a feature definition.
+
+    *sources* must be keys of the built-in source queries (``patients``,
+    ``vitals``, ``phq9``, ``visits``).
+    """
+    unknown = set(sources) - set(_SOURCES)
+    if unknown:
+        raise ValueError(f"Unknown feature sources: {sorted(unknown)}")
+    FEATURE_REGISTRY[name] = FeatureDefinition(
+        name, compute, sql_type, frozenset(sources), description
+    )
+
+
+# ---------------------------------------------------------------------------
+# Feature implementations
+# ---------------------------------------------------------------------------
+
+
+def _by_patient(df: pd.DataFrame, column: str) -> pd.Series:
+    return df.set_index("patient_id")[column]
+
+
+def _age(inputs: Inputs) -> pd.Series:
+    births = pd.to_datetime(
+        _by_patient(inputs["patients"], "birth_date"), errors="coerce"
+    )
+    today = pd.Timestamp(datetime.now().date())
+    years = today.year - births.dt.year
+    before_birthday = (today.month < births.dt.month) | (
+        (today.month == births.dt.month) & (today.day < births.dt.day)
+    )
+    return years - before_birthday.astype(int)
+
+
+def _weights(inputs: Inputs) -> pd.core.groupby.SeriesGroupBy:
+    vitals = inputs["vitals"]
+    vitals = vitals[vitals["weight"].notna()].sort_values(["patient_id", "date"])
+    return vitals.groupby("patient_id")["weight"]
+
+
+def _latest_bmi(inputs: Inputs) -> pd.Series:
+    vitals = inputs["vitals"]
+    vitals = vitals[vitals["bmi"].notna()].sort_values(["patient_id", "date"])
+    return vitals.groupby("patient_id")["bmi"].last()
+
+
+def _bmi_category(inputs: Inputs) -> pd.Series:
+    bmi = _latest_bmi(inputs)
+    bins = [
+        -np.inf,
+        REFERENCE_RANGES["bmi"][0],
+        REFERENCE_RANGES["bmi_overweight"],
+        REFERENCE_RANGES["bmi_obese"],
+        REFERENCE_RANGES["bmi_morbid_obesity"],
+        np.inf,
+    ]
+    labels = ["underweight", "normal", "overweight", "obesity", "morbid_obesity"]
+    return pd.cut(bmi, bins=bins, labels=labels, right=False).astype(object)
+
+
+def _phq9_change(inputs: Inputs) -> pd.Series:
+    # Per patient, so a patient's value does not depend on the batch it is in
+    # (the metric falls back to first-vs-last when no window matches).
+    metric = get_metric("phq9_change")
+    changes = {}
+    for patient_id, rows in inputs["phq9"].groupby("patient_id"):
+        if len(rows) < 2:
+            continue
+        try:
+            result = metric(rows)
+        except (KeyError, ValueError, IndexError) as exc:
+            logger.debug("phq9_change skipped for %s: %s", patient_id, exc)
+            continue
+        if not result.empty:
+            changes[patient_id] = float(result.iloc[0])
+    return pd.Series(changes, dtype=float)
+
+
+def _visits(column: str) -> Callable[[Inputs], pd.Series]:
+    def compute(inputs: Inputs) -> pd.Series:
+        return inputs["visits"].groupby("patient_id")[column].sum()
+
+    return compute
+
+
+register_feature(
+    "age",
+    _age,
+    sql_type="INTEGER",
+    sources={"patients"},
+    description="Age in whole years from birth_date",
+)
+register_feature(
+    "gender",
+    lambda inputs: _by_patient(inputs["patients"], "gender"),
+    sql_type="TEXT",
+    sources={"patients"},
+)
+register_feature(
+    "active",
+    lambda inputs: _by_patient(inputs["patients"], "active"),
+    sql_type="INTEGER",
+    sources={"patients"},
+)
+register_feature(
+    "baseline_weight",
+    lambda inputs: _weights(inputs).first(),
+    sources={"vitals"},
+    description="Earliest recorded weight",
+)
+register_feature(
+    "latest_weight",
+    lambda inputs: _weights(inputs).last(),
+    sources={"vitals"},
+    description="Most recent recorded weight",
+)
+register_feature(
+    "weight_change",
+    lambda inputs: _weights(inputs).last() - _weights(inputs).first(),
+    sources={"vitals"},
+    description="Latest minus baseline weight",
+)
+register_feature(
+    "weight_change_pct",
+    lambda inputs: _weights(inputs).agg(get_metric("percent_change")),
+    sources={"vitals"},
+    description="Percent change from baseline to latest weight",
+)
+register_feature(
+    "latest_bmi", _latest_bmi, sources={"vitals"}, description="Most recent BMI"
+)
+register_feature(
+    "bmi_category",
+    _bmi_category,
+    sql_type="TEXT",
+    sources={"vitals"},
+    description="underweight / normal / overweight / obesity / morbid_obesity",
+)
+register_feature(
+    "phq9_change",
+    _phq9_change,
+    sources={"phq9"},
+    description="PHQ-9 follow-up minus baseline (metrics.phq9_change)",
+)
+register_feature(
+    "provider_visits",
+    _visits("provider_visits"),
+    sql_type="INTEGER",
+    sources={"visits"},
+)
+register_feature(
+    "health_coach_visits",
+    _visits("health_coach_visits"),
+    sql_type="INTEGER",
+    sources={"visits"},
+)
+register_feature(
+    "total_visits",
+    lambda inputs: _visits("provider_visits")(inputs)
+    + _visits("health_coach_visits")(inputs),
+    sql_type="INTEGER",
+    sources={"visits"},
+    description="Provider plus health-coach visits",
+)
+
+
+# ---------------------------------------------------------------------------
+# Build / refresh
+# ---------------------------------------------------------------------------
+
+
+def _load_inputs(
+    conn: sqlite3.Connection, sources: Iterable[str], patient_ids: Sequence[str]
+) -> Inputs:
+    placeholders = ", ".join("?" * len(patient_ids))
+    inputs = {}
+    for source in sources:
+        key = _SOURCE_KEY.get(source, "patient_id")
+        sql = _SOURCES[source].format(where=f"AND {key} IN ({placeholders})")
+        df = pd.read_sql_query(sql, conn, params=list(patient_ids))
+        df["patient_id"] = df["patient_id"].astype(str)
+        inputs[source] = df
+    return inputs
+
+
+def _compute_batch(conn: sqlite3.Connection, patient_ids: Sequence[str]) -> pd.DataFrame:
+    """Return a DataFrame indexed by patient_id with one column per feature."""
+    sources = set().union(*(f.sources for f in FEATURE_REGISTRY.values()))
+    inputs = _load_inputs(conn, sorted(sources), patient_ids)
+    frame = pd.DataFrame(index=pd.Index(patient_ids, name="patient_id"))
+    for name, feature in FEATURE_REGISTRY.items():
+        try:
+            values = feature.compute(inputs)
+        except Exception as exc:  # one bad feature must not block the rest
+            logger.error("Feature %s failed: %s", name, exc)
+            values = pd.Series(dtype=object)
+        values.index = values.index.astype(str)
+        frame[name] = values.reindex(frame.index)
+    return frame
+
+
+def _ensure_columns(conn: sqlite3.Connection) -> None:
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(patient_features)")}
+    if not existing:
+        raise RuntimeError("patient_features missing – apply migration 016 first")
+    for name, feature in FEATURE_REGISTRY.items():
+        if name not in existing:
+            conn.execute(
+                f'ALTER TABLE patient_features ADD COLUMN "{name}" {feature.sql_type}'
+            )
+            logger.info("Added feature column %s", name)
+
+
+def _to_sql_value(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _write_batch(
+    conn: sqlite3.Connection, patient_ids: Sequence[str], frame: pd.DataFrame
+) -> None:
+    existing = {
+        str(row[0])
+        for row in conn.execute(
+            f"SELECT id FROM patients WHERE id IN ({', '.join('?' * len(patient_ids))})",
+            list(patient_ids),
+        )
+    }
+    conn.executemany(
+        "DELETE FROM patient_features WHERE patient_id = ?",
+        [(pid,) for pid in patient_ids if pid not in existing],
+    )
+    frame = frame[frame.index.isin(existing)]
+    if frame.empty:
+        return
+    names = list(frame.columns)
+    cols = ", ".join(["patient_id", "computed_at"] + [f'"{n}"' for n in names])
+    placeholders = ", ".join("?" * (len(names) + 2))
+    computed_at = datetime.now().isoformat(timespec="seconds")
+    conn.executemany(
+        f"INSERT OR REPLACE INTO patient_features ({cols}) VALUES ({placeholders})",
+        [
+            (pid, computed_at, *(_to_sql_value(v) for v in row))
+            for pid, row in zip(frame.index, frame.itertuples(index=False))
+        ],
+    )
+
+
+def refresh_features(db_path: Optional[str] = None, *, full: bool = False) -> int:
+    """Recompute features for patients logged in ``feature_change_log``.
+
+    With ``full=True`` every patient is recomputed.  Consumed change-log rows
+    are deleted in the same transaction as the feature writes, so a failed
+    refresh is simply retried next time.  Returns the number of patients
+    recomputed.
+    """
+    path = resolve_db_path(db_path)
+    reader = get_connection(path)
+    try:
+        latest = reader.execute("SELECT MAX(change_id) FROM feature_change_log")
+        latest = latest.fetchone()[0]
+    except sqlite3.Error as exc:
+        raise RuntimeError(
+            "feature_change_log missing – apply migration 016 first"
+        ) from exc
+
+    if full:
+        rows = reader.execute("SELECT id FROM patients ORDER BY id")
+    elif latest is None:
+        return 0
+    else:
+        rows = reader.execute(
+            """
+            SELECT DISTINCT patient_id FROM feature_change_log
+            WHERE change_id <= ? AND patient_id IS NOT NULL
+            """,
+            (latest,),
+        )
+    patient_ids = [str(row[0]) for row in rows]
+
+    batches = [
+        patient_ids[i : i + _BATCH_SIZE]
+        for i in range(0, len(patient_ids), _BATCH_SIZE)
+    ]
+    frames = [_compute_batch(reader, batch) for batch in batches]
+
+    with write_connection(path) as conn:
+        _ensure_columns(conn)
+        for batch, frame in zip(batches, frames):
+            _write_batch(conn, batch, frame)
+        if latest is not None:
+            conn.execute("DELETE FROM feature_change_log WHERE change_id <= ?", (latest,))
+
+    logger.info("Feature store refreshed %d patient(s)", len(patient_ids))
+    return len(patient_ids)
+
+
+# ---------------------------------------------------------------------------
+# Accessor
+# ---------------------------------------------------------------------------
+
+
+def get_patient_features(
+    features: Optional[Sequence[str]] = None,
+    patient_ids: Optional[Sequence] = None,
+    *,
+    db_path: Optional[str] = None,
+    refresh: bool = False,
+) -> pd.DataFrame:
+    """Return ``patient_id`` plus the requested feature columns.
+
+    Parameters
+    ----------
+    features : sequence of str, optional
+        Feature names from :data:`FEATURE_REGISTRY`.  Defaults to all.
+    patient_ids : sequence, optional
+        Restrict to these patients.
+    db_path : str, optional
+        Path to SQLite DB.  Defaults to the active path.
+    refresh : bool, default False
+        Recompute patients with pending changes first (a single ``MAX``
+        probe when there are none).  This writes, so it is for trusted
+        callers only.
+    """
+    names: List[str] = list(FEATURE_REGISTRY) if features is None else list(features)
+    unknown = [n for n in names if n not in FEATURE_REGISTRY]
+    if unknown:
+        raise KeyError(f"Unknown features: {', '.join(unknown)}")
+
+    if refresh:
+        refresh_features(db_path)
+
+    cols = ", ".join(["patient_id"] + [f'"{n}"' for n in names])
+    sql = f"SELECT {cols} FROM patient_features"
+    params: tuple = ()
+    if patient_ids is not None:
+        ids = [str(pid) for pid in patient_ids]
+        sql += f" WHERE patient_id IN ({', '.join('?' * len(ids))})"
+        params = tuple(ids)
+    return query_dataframe(sql + " ORDER BY patient_id", params=params, db_path=db_path)
+
+
+def read_patient_features(
+    features: Optional[Sequence[str]] = None,
+    patient_ids: Optional[Sequence] = None,
+    *,
+    db_path: Optional[str] = None,
+) -> pd.DataFrame:
+    """Read-only :func:`get_patient_features` for sandbox snippets and plans."""
+    return get_patient_features(features, patient_ids, db_path=db_path, refresh=False)
@@ -10,8 +10,13 @@ requests.
 
 from __future__ import annotations
 
+import os
 import sqlite3
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Iterator
+
+from app.utils.db_pool import get_connection, write_connection
 
 # Reuse DB location from existing utils
 from app.utils.saved_questions_db import (
@@ -40,14 +45,39 @@ CREATE TABLE IF NOT EXISTS assistant_feedback (
 # ---------------------------------------------------------------------------
 
 
-def _get_conn(db_file: str | None = None) -> sqlite3.Connection:
-    """Return connection and ensure *assistant_feedback* table exists."""
-    db_path = db_file or DB_FILE
+# (path, inode) pairs whose table already exists – readers then skip the
+# writer lock entirely
+_READY: set = set()
+
+
+def _ensure_table(db_path: str) -> None:
+    # Keyed on the inode too, so a replaced database file is re-initialised
+    try:
+        ident = (db_path, os.stat(db_path).st_ino)
+    except OSError:
+        ident = None
+    if ident is not None and ident in _READY:
+        return
     Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(db_path)
-    with conn:
+    with write_connection(db_path) as conn:
         conn.execute(FEEDBACK_TABLE_SQL)
-    return conn
+    _READY.add((db_path, os.stat(db_path).st_ino))
+
+
+@contextmanager
+def _write_conn(db_file: str | None = None) -> Iterator[sqlite3.Connection]:
+    """Yield the pooled writer and ensure *assistant_feedback* table exists."""
+    db_path = db_file or DB_FILE
+    _ensure_table(db_path)
+    with write_connection(db_path) as conn:
+        yield conn
+
+
+def _get_conn(db_file: str | None = None) -> sqlite3.Connection:
+    """Return pooled read connection and ensure *assistant_feedback* table exists."""
+    db_path = db_file or DB_FILE
+    _ensure_table(db_path)
+    return get_connection(db_path)
 
 
 # ---------------------------------------------------------------------------
@@ -83,7 +113,7 @@ def insert_feedback(
 
     uid = user_id or "anon"
     try:
-        with _get_conn(db_file) as conn:
+        with _write_conn(db_file) as conn:
             conn.execute(
                 "INSERT INTO assistant_feedback (user_id, question, rating, comment) VALUES (?, ?, ?, ?)",
                 (uid, question, rating, comment),
@@ -95,11 +125,11 @@ def insert_feedback(
 
 def load_feedback(*, db_file: str | None = None, limit: int = 100) -> list[dict]:
     """Return latest feedback rows as list of dicts (max *limit*)."""
-    with _get_conn(db_file) as conn:
-        # Enable row_factory for proper dict access
-        conn.row_factory = sqlite3.Row
-        rows = conn.execute(
-            "SELECT user_id, question, rating, comment, created_at FROM assistant_feedback ORDER BY id DESC LIMIT ?",
-            (limit,),
-        ).fetchall()
-        return [dict(r) for r in rows]
+    cursor = _get_conn(db_file).cursor()
+    # Row factory on the cursor only – the pooled connection is shared
+    cursor.row_factory = sqlite3.Row
+    rows = cursor.execute(
+        "SELECT user_id, question, rating, comment, created_at FROM assistant_feedback ORDER BY id DESC LIMIT ?",
+        (limit,),
+    ).fetchall()
+    return [dict(r) for r in rows]
@@ -18,7 +18,7 @@ Example
 0         12  34.2  2025-05-01
 """
 
-from typing import Dict, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 import logging
 import pandas as pd
 from textwrap import dedent
@@ -35,7 +35,8 @@ logger = logging.getLogger(__name__)
 # The structure maps the *canonical* condition name (see ConditionMapper) to a
 # tuple consisting of:
 #   1. SQL snippet that selects the *latest* relevant measurement per patient
-#      and exposes three columns (patient_id, metric_value, date)
+#      from the materialized ``latest_vitals`` / ``latest_labs`` tables
+#      (migration 015) and exposes three columns (patient_id, metric_value, date)
 #   2. Name of the column that stores the metric in the final output
 #
 # The helper will later LEFT-JOIN this CTE against the PMH table to filter out
@@ -45,69 +46,80 @@ ConditionRule = Tuple[str, str]  # (cte_sql, metric_alias)
 
 
 def _vitals_cte(metric: str, where_clause: str) -> str:
-    """Return CTE selecting latest *metric* from vitals with *where_clause*."""
+    """Return CTE selecting latest *metric* from ``latest_vitals`` with *where_clause*."""
     return f"""
-    latest_vitals AS (
+    latest_metric AS (
         SELECT patient_id,
-               {metric} AS metric_value,
-               MAX(date) AS date
-        FROM vitals
-        WHERE {metric} IS NOT NULL
-        GROUP BY patient_id
+               value AS {metric},
+               date
+        FROM latest_vitals
+        WHERE metric = '{metric}'
     ),
     candidates AS (
-        SELECT lv.patient_id, lv.metric_value, lv.date
-        FROM vitals v
-        JOIN latest_vitals lv
-          ON lv.patient_id = v.patient_id
-         AND lv.date = v.date
+        SELECT patient_id, {metric} AS metric_value, date
+        FROM latest_metric
         WHERE {where_clause}
     )"""
 
 
 def _simple_lab_cte(test_name: str, where_clause: str) -> str:
-    """Return CTE selecting latest lab *test_name* per patient."""
+    """Return CTE selecting latest lab *test_name* per patient from ``latest_labs``."""
     return f"""
-    latest_labs AS (
+    latest_metric AS (
         SELECT patient_id,
                value AS metric_value,
-               MAX(date) AS date
-        FROM lab_results
+               date
+        FROM latest_labs
         WHERE test_name = '{test_name}'
-        GROUP BY patient_id
     ),
     candidates AS (
-        SELECT ll.patient_id, ll.metric_value, ll.date
-        FROM lab_results lr
-        JOIN latest_labs ll
-          ON ll.patient_id = lr.patient_id
-         AND ll.date = lr.date
-        WHERE lr.test_name = '{test_name}' AND {where_clause}
+        SELECT patient_id, metric_value, date
+        FROM latest_metric
+        WHERE {where_clause}
     )"""
 
 
-# Build rules dict – extend as new conditions are supported
-_RULES: Dict[str, ConditionRule] = {
+# Measurement thresholds per canonical condition:
+#   (source table, metric column / lab test_name, lower bound (inclusive),
+#    upper bound (exclusive) or None, metric alias in the output)
+# The single-condition SQL in ``_RULES`` and the batch SQL in
+# :func:`build_all_conditions_gap_sql` are both generated from this table.
+RuleSpec = Tuple[str, str, float, Optional[float], str]
+
+_RULE_SPECS: Dict[str, RuleSpec] = {
     # Obesity – BMI ≥ 30
-    "obesity": (
-        _vitals_cte("bmi", f"bmi >= {REFERENCE_RANGES['bmi_obese']}"),
-        "bmi",
-    ),
+    "obesity": ("vitals", "bmi", REFERENCE_RANGES["bmi_obese"], None, "bmi"),
     # Morbid obesity – BMI ≥ 40
     "morbid_obesity": (
-        _vitals_cte("bmi", f"bmi >= {REFERENCE_RANGES['bmi_morbid_obesity']}"),
+        "vitals",
+        "bmi",
+        REFERENCE_RANGES["bmi_morbid_obesity"],
+        None,
         "bmi",
     ),
     # Prediabetes – A1C 5.7–6.4  (inclusive of lower bound, exclusive upper)
-    "prediabetes": (
-        _simple_lab_cte("A1C", "metric_value >= 5.7 AND metric_value < 6.5"),
-        "a1c",
-    ),
+    "prediabetes": ("lab_results", "A1C", 5.7, 6.5, "a1c"),
     # Type-2 diabetes – A1C ≥ 6.5
-    "type_2_diabetes": (
-        _simple_lab_cte("A1C", "metric_value >= 6.5"),
-        "a1c",
-    ),
+    "type_2_diabetes": ("lab_results", "A1C", 6.5, None, "a1c"),
+}
+
+
+def _rule_from_spec(spec: RuleSpec) -> ConditionRule:
+    source, metric, low, high, metric_alias = spec
+    if source == "vitals":
+        where = f"{metric} >= {low}"
+        if high is not None:
+            where += f" AND {metric} < {high}"
+        return _vitals_cte(metric, where), metric_alias
+    where = f"metric_value >= {low}"
+    if high is not None:
+        where += f" AND metric_value < {high}"
+    return _simple_lab_cte(metric, where), metric_alias
+
+
+# Build rules dict – extend ``_RULE_SPECS`` as new conditions are supported
+_RULES: Dict[str, ConditionRule] = {
+    name: _rule_from_spec(spec) for name, spec in _RULE_SPECS.items()
 }
 
 # Allow common synonyms to reuse canonical rule
@@ -122,33 +134,8 @@ _RULE_ALIASES = {
 # ---------------------------------------------------------------------------
 
 
-def get_condition_gap_report(
-    condition: str,
-    *,
-    active_only: bool = False,
-    db_path: str | None = None,
-) -> pd.DataFrame:
-    """Return a DataFrame with patients who meet *condition* criteria but lack PMH diagnosis.
-
-    Parameters
-    ----------
-    condition : str
-        Condition term, e.g. "obesity", "prediabetes".  Synonyms are resolved via
-        :class:`ConditionMapper` and `_RULE_ALIASES`.
-    active_only : bool, default False
-        If *True*, restrict to patients marked as ``active = 1`` in the patients table.
-    db_path : str, optional
-        Path to SQLite DB.  Defaults to the active path resolved by ``db_query``.
-
-    Returns
-    -------
-    pandas.DataFrame
-        Columns: ``patient_id``, condition-specific metric (e.g. ``bmi``), ``date``.
-    """
-
-    # ------------------------------------------------------------------
-    # Resolve canonical condition & rule
-    # ------------------------------------------------------------------
+def _resolve_condition(condition: str) -> str:
+    """Map *condition* to its canonical ``_RULES`` key or raise ``ValueError``."""
     canonical = condition_mapper.get_canonical_condition(condition) or condition.lower()
     canonical = _RULE_ALIASES.get(canonical, canonical)
 
@@ -156,7 +143,37 @@ def get_condition_gap_report(
         raise ValueError(
             f"Gap-report not supported for condition '{condition}'. Supported: {sorted(_RULES)}"
         )
+    return canonical
+
+
+def _pmh_text_term(canonical: str) -> str:
+    return canonical.replace("_", " ").lower()
+
+
+def _sql_literal(value) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return str(value)
+
+
+def _values_sql(rows: List[tuple]) -> str:
+    return ",\n            ".join(
+        "(" + ", ".join(_sql_literal(v) for v in row) + ")" for row in rows
+    )
 
+
+def build_condition_gap_sql(condition: str, *, active_only: bool = False) -> str:
+    """Return the gap-report SQL for *condition* (see :func:`get_condition_gap_report`).
+
+    Raises ``ValueError`` for conditions without a measurement rule.
+    """
+
+    # ------------------------------------------------------------------
+    # Resolve canonical condition & rule
+    # ------------------------------------------------------------------
+    canonical = _resolve_condition(condition)
     rule_cte, metric_alias = _RULES[canonical]
 
     # ------------------------------------------------------------------
@@ -164,7 +181,7 @@ def get_condition_gap_report(
     # ------------------------------------------------------------------
     codes_list_sql = condition_mapper.get_all_codes_as_sql_list(canonical)
 
-    text_term = canonical.replace("_", " ").lower()
+    text_term = _pmh_text_term(canonical)
     pmh_filter_clauses = [f"LOWER(pmh.condition) LIKE '%{text_term}%'"]
     if codes_list_sql:
         pmh_filter_clauses.append(f"pmh.code IN ({codes_list_sql})")
@@ -200,12 +217,181 @@ def get_condition_gap_report(
             "JOIN patients ON patients.id = c.patient_id AND patients.active = 1"
         )
 
-    sql = sql.replace("{active_join}", active_clause)
+    return sql.replace("{active_join}", active_clause)
+
+
+def get_condition_gap_report(
+    condition: str,
+    *,
+    active_only: bool = False,
+    db_path: str | None = None,
+) -> pd.DataFrame:
+    """Return a DataFrame with patients who meet *condition* criteria but lack PMH diagnosis.
+
+    Parameters
+    ----------
+    condition : str
+        Condition term, e.g. "obesity", "prediabetes".  Synonyms are resolved via
+        :class:`ConditionMapper` and `_RULE_ALIASES`.
+    active_only : bool, default False
+        If *True*, restrict to patients marked as ``active = 1`` in the patients table.
+    db_path : str, optional
+        Path to SQLite DB.  Defaults to the active path resolved by ``db_query``.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Columns: ``patient_id``, condition-specific metric (e.g. ``bmi``), ``date``.
+    """
+    sql = build_condition_gap_sql(condition, active_only=active_only)
+
+    logger.debug("Executing gap report SQL for %s: %s", condition, sql)
+
+    df = query_dataframe(sql, db_path=db_path)
+    return df
+
+
+def build_all_conditions_gap_sql(
+    conditions: Optional[Iterable[str]] = None, *, active_only: bool = False
+) -> str:
+    """Return one SQL statement evaluating several gap rules in a single pass.
+
+    Latest values are read once from ``latest_vitals`` / ``latest_labs``, PMH
+    is matched once against every selected condition, and each rule is
+    applied by joining the latest values to an inline ``rules`` table.  *conditions* defaults to every rule
+    in ``_RULES``; synonyms are resolved as in :func:`build_condition_gap_sql`.
+    """
+    if conditions is None:
+        canonicals = list(_RULES)
+    else:
+        canonicals = list(dict.fromkeys(_resolve_condition(c) for c in conditions))
+    if not canonicals:
+        raise ValueError("At least one condition is required for a gap report")
+
+    specs = {name: _RULE_SPECS[name] for name in canonicals}
+    vital_metrics = sorted({s[1] for s in specs.values() if s[0] == "vitals"})
+    lab_tests = sorted({s[1] for s in specs.values() if s[0] == "lab_results"})
+
+    # ------------------------------------------------------------------
+    # Latest value per patient (and metric) from the materialized tables
+    # ------------------------------------------------------------------
+    latest_parts = []
+    if vital_metrics:
+        metrics_sql = ", ".join(_sql_literal(m) for m in vital_metrics)
+        latest_parts.append(
+            f"""
+            SELECT patient_id, metric, value AS metric_value, date
+            FROM latest_vitals
+            WHERE metric IN ({metrics_sql})"""
+        )
+    if lab_tests:
+        tests_sql = ", ".join(_sql_literal(t) for t in lab_tests)
+        latest_parts.append(
+            f"""
+            SELECT patient_id, test_name AS metric, value AS metric_value, date
+            FROM latest_labs
+            WHERE test_name IN ({tests_sql})"""
+        )
+    latest_sql = "\n            UNION ALL".join(latest_parts)
+
+    # ------------------------------------------------------------------
+    # Inline rule and PMH-match tables
+    # ------------------------------------------------------------------
+    rule_rows = [
+        (name, metric, low, high, alias)
+        for name, (_source, metric, low, high, alias) in specs.items()
+    ]
+    pmh_rows: List[tuple] = []
+    for name in canonicals:
+        pmh_rows.append((name, f"%{_pmh_text_term(name)}%", None))
+        for code in condition_mapper.get_icd_codes(name) or []:
+            pmh_rows.append((name, None, code))
+
+    active_clause = ""
+    if active_only:
+        active_clause = (
+            "JOIN patients ON patients.id = l.patient_id AND patients.active = 1"
+        )
+
+    return dedent(
+        f"""
+        WITH
+        -- MATERIALIZED keeps the UNION ALL from being merged into the outer
+        -- query, so the PMH list subquery is built once rather than per arm.
+        latest AS MATERIALIZED ({latest_sql}
+        ),
+        rules(condition, metric, low, high, metric_alias) AS (
+            VALUES
+            {_values_sql(rule_rows)}
+        ),
+        pmh_rules(condition, pattern, code) AS (
+            VALUES
+            {_values_sql(pmh_rows)}
+        ),
+        pmh_match AS (
+            -- CROSS JOIN pins pmh as the outer loop: one pass over the table
+            SELECT pmh.patient_id, pr.condition
+            FROM pmh
+            CROSS JOIN pmh_rules pr
+            WHERE LOWER(pmh.condition) LIKE pr.pattern OR pmh.code = pr.code
+        )
+        SELECT r.condition,
+               l.patient_id,
+               r.metric_alias AS metric,
+               l.metric_value AS value,
+               l.date
+        FROM latest l
+        CROSS JOIN rules r
+        {active_clause}
+        WHERE r.metric = l.metric
+          AND l.metric_value >= r.low
+          AND (r.high IS NULL OR l.metric_value < r.high)
+          AND (r.condition, l.patient_id) NOT IN (
+              SELECT condition, patient_id FROM pmh_match
+          )
+        ORDER BY r.condition, l.metric_value DESC;
+        """
+    )
+
+
+def get_all_condition_gap_reports(
+    conditions: Optional[Iterable[str]] = None,
+    *,
+    active_only: bool = False,
+    db_path: str | None = None,
+) -> pd.DataFrame:
+    """Return gaps for several conditions at once, in long format.
+
+    Runs a single query (see :func:`build_all_conditions_gap_sql`), so
+    evaluating every rule costs about the same as one
+    :func:`get_condition_gap_report` call.
+
+    Parameters
+    ----------
+    conditions : iterable of str, optional
+        Condition terms to evaluate.  Defaults to every supported condition.
+    active_only : bool, default False
+        If *True*, restrict to patients marked as ``active = 1``.
+    db_path : str, optional
+        Path to SQLite DB.  Defaults to the active path resolved by ``db_query``.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Columns: ``condition`` (canonical name), ``patient_id``, ``metric``
+        (e.g. ``bmi``), ``value``, ``date``.
+    """
+    sql = build_all_conditions_gap_sql(conditions, active_only=active_only)
 
-    logger.debug("Executing gap report SQL for %s: %s", canonical, sql)
+    logger.debug("Executing batch gap report SQL: %s", sql)
 
     df = query_dataframe(sql, db_path=db_path)
     return df
 
 
-__all__ = ["get_condition_gap_report"]
+__all__ = [
+    "build_all_conditions_gap_sql",
+    "build_condition_gap_sql",
+    "get_all_condition_gap_reports",
+    "get_condition_gap_report",
+]
@@ -0,0 +1,275 @@
+"""Index advisor for the report and gap-analysis queries.
+
+Runs ``EXPLAIN QUERY PLAN`` over a registry of the app's known report queries
+and flags every step that reads a whole base table:
+
+* ``SCAN <table>`` – full table scan, no index at all;
+* ``SCAN <table> USING INDEX <idx>`` – walks an entire (non-covering) index
+  and then looks up every row in the table, usually slower than the scan.
+
+``SCAN <table> USING COVERING INDEX`` is reported but not flagged: queries that
+aggregate over every patient (latest value per patient, activity counts) have
+to read each row once, and a covering index is the cheapest way to do it.
+Tables whose scan is inherent to a query (e.g. ``LIKE '%…%'`` on free text)
+are listed in the query's ``allow_scans``.
+
+The indexes these queries rely on ship in ``migrations/014_report_indexes.py``.
+Command line::
+
+    python -m scripts.index_advisor [--db patient_data.db] [--verbose]
+
+Example
+-------
+>>> from app.utils.index_advisor import advise
+>>> [a.name for a in advise() if a.full_scans]
+[]
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+from app.utils.db_pool import get_connection, resolve_db_path
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "REPORT_QUERIES",
+    "QueryAdvice",
+    "ReportQuery",
+    "advise",
+    "explain_query_plan",
+    "format_advice",
+    "register_report_query",
+]
+
+_SCAN_RE = re.compile(r"^SCAN (\S+)(?: USING (COVERING )?INDEX (\S+))?")
+_SOURCE_RE = re.compile(
+    r"\b(?:FROM|JOIN)\s+([A-Za-z_]\w*)(?:\s+(?:AS\s+)?([A-Za-z_]\w*))?",
+    re.IGNORECASE,
+)
+_KEYWORDS = {
+    "on",
+    "where",
+    "join",
+    "left",
+    "inner",
+    "cross",
+    "outer",
+    "group",
+    "order",
+    "limit",
+    "union",
+    "using",
+    "natural",
+}
+
+
+@dataclass(frozen=True)
+class ReportQuery:
+    """A known report query: *build* returns ``(sql, params)``."""
+
+    name: str
+    build: Callable[[], tuple]
+    allow_scans: FrozenSet[str] = frozenset()
+    note: str = ""
+
+
+@dataclass
+class QueryAdvice:
+    """Plan summary for one :class:`ReportQuery`."""
+
+    name: str
+    plan: List[str] = field(default_factory=list)
+    full_scans: List[str] = field(default_factory=list)
+    covering_scans: List[str] = field(default_factory=list)
+    allowed_scans: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.full_scans
+
+
+REPORT_QUERIES: Dict[str, ReportQuery] = {}
+
+
+def register_report_query(
+    name: str,
+    build: Callable[[], tuple],
+    *,
+    allow_scans: Iterable[str] = (),
+    note: str = "",
+) -> None:
+    """Add (or replace) a query in the advisor registry."""
+    REPORT_QUERIES[name] = ReportQuery(name, build, frozenset(allow_scans), note)
+
+
+# ---------------------------------------------------------------------------
+# Plan analysis
+# ---------------------------------------------------------------------------
+
+
+def explain_query_plan(
+    conn: sqlite3.Connection, sql: str, params: Sequence = ()
+) -> List[str]:
+    """Return the ``detail`` column of ``EXPLAIN QUERY PLAN`` for *sql*."""
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql.strip().rstrip(';')}", params)
+    return [row[3] for row in rows]
+
+
+def _aliases(sql: str) -> Dict[str, str]:
+    """Map every ``FROM``/``JOIN`` alias (and bare name) to its source name."""
+    mapping: Dict[str, str] = {}
+    for source, alias in _SOURCE_RE.findall(sql):
+        mapping.setdefault(source.lower(), source.lower())
+        if alias and alias.lower() not in _KEYWORDS:
+            mapping[alias.lower()] = source.lower()
+    return mapping
+
+
+def _tables(conn: sqlite3.Connection) -> set:
+    rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    return {name.lower() for (name,) in rows}
+
+
+def _check(conn: sqlite3.Connection, query: ReportQuery, tables: set) -> QueryAdvice:
+    advice = QueryAdvice(query.name)
+    try:
+        sql, params = query.build()
+        advice.plan = explain_query_plan(conn, sql, params)
+    except (sqlite3.Error, ValueError) as exc:
+        advice.error = str(exc)
+        return advice
+
+    aliases = _aliases(sql)
+    for detail in advice.plan:
+        match = _SCAN_RE.match(detail)
+        if not match:
+            continue
+        name, covering, index = match.groups()
+        table = aliases.get(name.lower(), name.lower())
+        if table not in tables:  # CTE, subquery or constant row
+            continue
+        if covering:
+            advice.covering_scans.append(f"{table} ({index})")
+        elif table in query.allow_scans:
+            advice.allowed_scans.append(table)
+        elif index:
+            advice.full_scans.append(f"{table} (non-covering index {index})")
+        else:
+            advice.full_scans.append(table)
+    return advice
+
+
+def advise(
+    db_path: Optional[str] = None,
+    queries: Optional[Iterable[ReportQuery]] = None,
+) -> List[QueryAdvice]:
+    """Explain every registered report query against *db_path*.
+
+    Pass *queries* to check a different set than :data:`REPORT_QUERIES`.
+    """
+    conn = get_connection(resolve_db_path(db_path))
+    tables = _tables(conn)
+    selected = REPORT_QUERIES.values() if queries is None else queries
+    results = [_check(conn, query, tables) for query in selected]
+    for advice in results:
+        if advice.full_scans:
+            logger.debug("Full scan in %s: %s", advice.name, advice.full_scans)
+    return results
+
+
+def format_advice(results: Iterable[QueryAdvice], *, verbose: bool = False) -> str:
+    """Render advisor results as a plain-text report."""
+    lines = []
+    for advice in results:
+        if advice.error:
+            status = "ERROR"
+        else:
+            status = "OK" if advice.ok else "FULL SCAN"
+        lines.append(f"[{status}] {advice.name}")
+        if advice.error:
+            lines.append(f"    error: {advice.error}")
+        for table in advice.full_scans:
+            lines.append(f"    full scan: {table}")
+        for table in advice.allowed_scans:
+            note = REPORT_QUERIES.get(advice.name)
+            reason = f" – {note.note}" if note and note.note else ""
+            lines.append(f"    expected scan: {table}{reason}")
+        if verbose:
+            for table in advice.covering_scans:
+                lines.append(f"    covering index scan: {table}")
+            for detail in advice.plan:
+                lines.append(f"      | {detail}")
+    return "\n".join(lines)
+
+
+# ---------------------------------------------------------------------------
+# Registry of known report queries
+# ---------------------------------------------------------------------------
+
+
+def _gap_report(condition: str) -> Callable[[], tuple]:
+    def build():
+        from app.utils.gap_report import build_condition_gap_sql
+
+        return build_condition_gap_sql(condition, active_only=True), ()
+
+    return build
+
+
+def _all_gap_reports():
+    from app.utils.gap_report import build_all_conditions_gap_sql
+
+    return build_all_conditions_gap_sql(active_only=True), ()
+
+
+def _clinical_inactivity():
+    from app.utils.silent_dropout import build_clinical_inactivity_sql
+
+    return build_clinical_inactivity_sql(active_only=True), (2, "2000-01-01", 90)
+
+
+def _abnormal_values(index: int) -> Callable[[], tuple]:
+    def build():
+        from app.db_query import build_abnormal_values_queries
+
+        return build_abnormal_values_queries()[index], ()
+
+    return build
+
+
+def _patient_list():
+    from app.services.data_service import build_patient_list_sql
+
+    return build_patient_list_sql("open", "all", "all")
+
+
+_PMH_NOTE = "PMH is matched with LIKE '%…%' on free text"
+
+register_report_query(
+    "gap_report.obesity", _gap_report("obesity"), allow_scans={"pmh"}, note=_PMH_NOTE
+)
+register_report_query(
+    "gap_report.type_2_diabetes",
+    _gap_report("type_2_diabetes"),
+    allow_scans={"pmh"},
+    note=_PMH_NOTE,
+)
+register_report_query(
+    "gap_report.all_conditions", _all_gap_reports, allow_scans={"pmh"}, note=_PMH_NOTE
+)
+register_report_query("silent_dropout.clinical_inactivity", _clinical_inactivity)
+register_report_query("db_query.abnormal_labs", _abnormal_values(0))
+register_report_query(
+    "db_query.abnormal_vitals",
+    _abnormal_values(1),
+    allow_scans={"patients", "vitals"},
+    note="out-of-range tests span several vitals columns, so every row is read",
+)
+register_report_query("data_service.patient_list", _patient_list)
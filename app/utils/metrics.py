@@ -9,11 +9,12 @@ computed metric.
 
 from __future__ import annotations
 
-from typing import Callable, Dict, Tuple, Literal
+from typing import Callable, Dict, Iterable, Sequence, Tuple, Literal
 
 import pandas as pd
 from app.utils.patient_attributes import Active
 from app.utils.advanced_correlation import calculate_correlation_matrix
+from app.utils.streaming_stats import stream_aggregate
 
 __all__ = [
     "phq9_change",
@@ -26,6 +27,7 @@ __all__ = [
     "top_n",
     "correlation_coefficient",
     "correlation_matrix",
+    "running_summary",
 ]
 
 # ---------------------------------------------------------------------------
@@ -233,6 +235,26 @@ def correlation_matrix(
     return corr_matrix, None
 
 
+# ---------------------------------------------------------------------------
+# Chunked aggregation (delegated to streaming_stats)
+# ---------------------------------------------------------------------------
+
+
+def running_summary(
+    chunks: Iterable[pd.DataFrame],
+    column: str,
+    by: str | Sequence[str] | None = None,
+    quantiles: Sequence[float] = (0.5,),
+) -> pd.DataFrame:
+    """Summarise *column* over DataFrame *chunks* in bounded memory.
+
+    *chunks* is typically ``db_query.iter_query_dataframe(sql)``.  Returns
+    count/mean/std/min/max and approximate quantiles per *by* group; see
+    :func:`app.utils.streaming_stats.stream_aggregate`.
+    """
+    return stream_aggregate(chunks, column, by=by, quantiles=quantiles)
+
+
 # ---------------------------------------------------------------------------
 # Registry utilities
 # ---------------------------------------------------------------------------
@@ -247,6 +269,7 @@ METRIC_REGISTRY: Dict[str, Callable[..., pd.Series]] = {
     "top_n": top_n,
     "correlation_coefficient": correlation_coefficient,
     "correlation_matrix": correlation_matrix,
+    "running_summary": running_summary,
 }
 
 
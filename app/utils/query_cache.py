@@ -0,0 +1,266 @@
+"""In-process result cache for :func:`app.db_query.query_dataframe`.
+
+The assistant's generated code (``app/utils/ai/codegen``) re-issues the same
+template SQL for repeated and saved questions.  This module memoises the
+resulting DataFrames keyed on
+
+* the resolved database path,
+* the SQL text with whitespace outside string literals normalised,
+* the bound parameters, and
+* a per-database **data version**.
+
+The data version is derived from SQLite's ``PRAGMA data_version`` on the
+pooled read-only connection.  Its value changes whenever *another* connection
+commits to the file – the pooled writer, ETL scripts using a plain
+:pyfunc:`sqlite3.connect`, or a different process altogether – and our
+readers never write themselves.  Whenever a thread sees the value move (or
+gets a fresh connection) the database's version counter is bumped and every
+entry stored under an older version is dropped, so a hit can never return
+data older than the last commit any thread has observed.
+
+Entries are evicted least-recently-used once their combined
+``memory_usage(deep=True)`` exceeds ``MH_QUERY_CACHE_MAX_BYTES`` (default
+64 MiB).  Callers always receive a copy, so mutating a returned frame cannot
+corrupt the cache.  Set ``MH_QUERY_CACHE=0`` to disable caching.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "QueryCache",
+    "normalize_sql",
+    "get_query_cache",
+    "query_cache_enabled",
+    "query_cache_stats",
+    "clear_query_cache",
+]
+
+DEFAULT_MAX_BYTES = int(os.getenv("MH_QUERY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+_MEMORY_PATHS = {":memory:", ""}
+_TOKEN_RE = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")|\s+")
+_READ_ONLY_RE = re.compile(r"^\s*(select|with)\b", re.IGNORECASE)
+
+CacheKey = Tuple[str, int, str, Hashable]
+
+
+def query_cache_enabled() -> bool:
+    """Return False when ``MH_QUERY_CACHE`` disables the result cache."""
+    return os.getenv("MH_QUERY_CACHE", "1").lower() not in {"0", "false", "no"}
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace outside quoted literals and drop trailing ``;``."""
+    text = _TOKEN_RE.sub(lambda m: m.group(1) or " ", sql).strip()
+    return text.rstrip(";").rstrip()
+
+
+def _params_key(params: Any) -> Optional[Hashable]:
+    """Return a hashable form of *params*, or ``None`` when not cacheable."""
+    if params is None:
+        return ()
+    if isinstance(params, dict):
+        items = tuple(sorted(params.items()))
+    elif isinstance(params, (list, tuple)):
+        items = tuple(params)
+    else:
+        return None
+    try:
+        hash(items)
+    except TypeError:
+        return None
+    return items
+
+
+def _frame_nbytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+@dataclass
+class _CacheEntry:
+    frame: pd.DataFrame
+    nbytes: int
+    sql: str
+    params: Hashable
+    created: float = field(default_factory=time.time)
+    hits: int = 0
+    last_hit: Optional[float] = None
+
+
+class QueryCache:
+    """Size-bounded LRU of query results, invalidated by data version."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[CacheKey, _CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._versions: Dict[str, int] = {}
+        self._local = threading.local()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "skipped": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Data version
+    # ------------------------------------------------------------------
+
+    def data_version(self, conn: sqlite3.Connection, db_path: str) -> int:
+        """Return the cache version for *db_path* as seen through *conn*.
+
+        Bumps the version (dropping older entries) when *conn* reports a
+        commit since this thread last looked, or when *conn* is new.
+        """
+        seen = getattr(self._local, "seen", None)
+        if seen is None:
+            seen = self._local.seen = {}
+
+        current = conn.execute("PRAGMA data_version").fetchone()[0]
+        last = seen.get(db_path)
+        if last is None or last[0] is not conn or last[1] != current:
+            seen[db_path] = (conn, current)
+            self._invalidate(db_path)
+
+        with self._lock:
+            return self._versions.setdefault(db_path, 0)
+
+    def _invalidate(self, db_path: str) -> None:
+        with self._lock:
+            self._versions[db_path] = self._versions.get(db_path, 0) + 1
+            stale = [key for key in self._entries if key[0] == db_path]
+            for key in stale:
+                self._bytes -= self._entries.pop(key).nbytes
+            if stale:
+                self._stats["invalidations"] += len(stale)
+
+    # ------------------------------------------------------------------
+    # Lookup / store
+    # ------------------------------------------------------------------
+
+    def make_key(
+        self, conn: sqlite3.Connection, db_path: str, sql: str, params: Any = None
+    ) -> Optional[CacheKey]:
+        """Return the cache key for a query, or ``None`` if it is not cacheable."""
+        if db_path in _MEMORY_PATHS or not _READ_ONLY_RE.match(sql):
+            return None
+        params_key = _params_key(params)
+        if params_key is None:
+            return None
+        version = self.data_version(conn, db_path)
+        return (db_path, version, normalize_sql(sql), params_key)
+
+    def get(self, key: CacheKey) -> Optional[pd.DataFrame]:
+        """Return a copy of the cached frame for *key* or ``None``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            entry.hits += 1
+            entry.last_hit = time.time()
+            self._stats["hits"] += 1
+            frame = entry.frame
+        return frame.copy()
+
+    def put(self, key: CacheKey, df: pd.DataFrame) -> None:
+        """Store a copy of *df* under *key*, evicting LRU entries as needed."""
+        nbytes = _frame_nbytes(df)
+        if nbytes > self.max_bytes:
+            with self._lock:
+                self._stats["skipped"] += 1
+            return
+
+        entry = _CacheEntry(df.copy(), nbytes, key[2], key[3])
+        with self._lock:
+            # A commit observed while the query ran makes this result stale
+            if self._versions.get(key[0], 0) != key[1]:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = entry
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self._stats["evictions"] += 1
+
+    # ------------------------------------------------------------------
+    # Introspection
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, float]:
+        """Return global counters plus entry count, bytes and hit-rate."""
+        with self._lock:
+            snapshot: Dict[str, float] = dict(self._stats)
+            snapshot["entries"] = len(self._entries)
+            snapshot["bytes"] = self._bytes
+        lookups = snapshot["hits"] + snapshot["misses"]
+        snapshot["hit_rate"] = snapshot["hits"] / lookups if lookups else 0.0
+        return snapshot
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Return per-entry statistics, most recently used last."""
+        with self._lock:
+            return [
+                {
+                    "db_path": key[0],
+                    "sql": entry.sql,
+                    "params": entry.params,
+                    "rows": len(entry.frame),
+                    "bytes": entry.nbytes,
+                    "hits": entry.hits,
+                    "created": entry.created,
+                    "last_hit": entry.last_hit,
+                }
+                for key, entry in self._entries.items()
+            ]
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            for key in self._stats:
+                self._stats[key] = 0
+
+
+# ---------------------------------------------------------------------------
+# Module-level singleton + convenience wrappers
+# ---------------------------------------------------------------------------
+
+_CACHE = QueryCache()
+
+
+def get_query_cache() -> QueryCache:
+    """Return the process-wide :class:`QueryCache`."""
+    return _CACHE
+
+
+def query_cache_stats() -> Dict[str, float]:
+    """Shortcut for ``get_query_cache().stats()``."""
+    return _CACHE.stats()
+
+
+def clear_query_cache() -> None:
+    """Shortcut for ``get_query_cache().clear()``."""
+    _CACHE.clear()
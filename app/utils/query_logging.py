@@ -19,6 +19,11 @@ assistant_logs(
 )
 ```
 
+`migrations/013_assistant_logs_narrative_latency.py` adds
+``narrative_ttft_ms`` (time until the first streamed narrative token reached
+the UI) and ``narrative_ms`` (total narrative generation time) so perceived
+and total latency can be compared.
+
 The helpers below are intentionally lenient: if the migration has not yet run
 (e.g., when tests use a fresh temporary DB) they will create the table on the
 fly.  This keeps unit tests self-contained.
@@ -31,6 +36,7 @@ import logging
 import sqlite3
 from typing import Any, List, Dict
 from app.config import get_vp_data_db
+from app.utils.db_pool import get_connection, write_connection
 
 # Re-use the same DB path as other helpers to keep everything in one file.
 try:
@@ -48,24 +54,36 @@ CREATE TABLE IF NOT EXISTS assistant_logs (
     generated_code   TEXT,
     result_summary   TEXT,
     duration_ms      INTEGER,
+    narrative_ttft_ms INTEGER,
+    narrative_ms     INTEGER,
     created_at       TEXT    DEFAULT CURRENT_TIMESTAMP
 );
 """
 
+# Columns added after the original table shipped (see migration 013)
+_LATER_COLUMNS = {"narrative_ttft_ms": "INTEGER", "narrative_ms": "INTEGER"}
+
 
 # ---------------------------------------------------------------------------
 # Internal helpers
 # ---------------------------------------------------------------------------
 
 
+def _ensure_table(conn: sqlite3.Connection) -> None:
+    """Create *assistant_logs* and add columns missing from older tables."""
+    conn.execute(_CREATE_SQL)
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(assistant_logs)")}
+    for column, sql_type in _LATER_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE assistant_logs ADD COLUMN {column} {sql_type}")
+
+
 def _get_conn(db_file: str | None = None) -> sqlite3.Connection:  # pragma: no cover
-    """Return SQLite connection ensuring *assistant_logs* table exists."""
+    """Return pooled read connection ensuring *assistant_logs* table exists."""
     path = db_file or DB_FILE
-    conn = sqlite3.connect(path)
-    conn.row_factory = sqlite3.Row
-    with conn:
-        conn.execute(_CREATE_SQL)
-    return conn
+    with write_connection(path) as conn:
+        _ensure_table(conn)
+    return get_connection(path)
 
 
 def _safe_json(obj: Any) -> str:
@@ -96,6 +114,8 @@ def log_interaction(
     result: Any = None,
     duration_ms: int | None = None,
     *,
+    narrative_ttft_ms: int | None = None,
+    narrative_ms: int | None = None,
     db_file: str | None = None,
 ) -> None:
     """Persist a single assistant interaction.
@@ -112,6 +132,10 @@ def log_interaction(
         Final *summary* to display to the user OR any serialisable short string.
     duration_ms
         Total processing time in milliseconds.
+    narrative_ttft_ms
+        Time until the first streamed narrative token arrived.
+    narrative_ms
+        Total time spent generating the narrative.
     db_file
         Override DB path (used by tests).
     """
@@ -129,22 +153,25 @@ def log_interaction(
         result_summary = _safe_json(result)[:1_000]
 
     try:
-        with _get_conn(db_file) as conn:
-            with conn:
-                conn.execute(
-                    """
-                    INSERT INTO assistant_logs (
-                        query, intent_json, generated_code, result_summary, duration_ms
-                    ) VALUES (?, ?, ?, ?, ?)
-                    """,
-                    (
-                        query,
-                        _safe_json(intent),
-                        code_trim,
-                        result_summary,
-                        duration_ms,
-                    ),
-                )
+        with write_connection(db_file or DB_FILE) as conn:
+            _ensure_table(conn)
+            conn.execute(
+                """
+                INSERT INTO assistant_logs (
+                    query, intent_json, generated_code, result_summary, duration_ms,
+                    narrative_ttft_ms, narrative_ms
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    query,
+                    _safe_json(intent),
+                    code_trim,
+                    result_summary,
+                    duration_ms,
+                    narrative_ttft_ms,
+                    narrative_ms,
+                ),
+            )
     except Exception as exc:  # pragma: no cover – best-effort logging
         logger.error("Failed to record assistant interaction: %s", exc, exc_info=True)
 
@@ -153,8 +180,9 @@ def fetch_recent(
     limit: int = 20, *, db_file: str | None = None
 ) -> List[Dict[str, Any]]:
     """Return the *latest* `limit` interactions."""
-    with _get_conn(db_file) as conn:
-        rows = conn.execute(
-            "SELECT * FROM assistant_logs ORDER BY created_at DESC LIMIT ?", (limit,)
-        ).fetchall()
-        return [dict(r) for r in rows]
+    cursor = _get_conn(db_file).cursor()
+    cursor.row_factory = sqlite3.Row
+    rows = cursor.execute(
+        "SELECT * FROM assistant_logs ORDER BY created_at DESC LIMIT ?", (limit,)
+    ).fetchall()
+    return [dict(r) for r in rows]
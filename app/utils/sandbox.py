@@ -24,6 +24,8 @@ import pandas as pd
 
 import app.db_query as db_query
 from app.utils.metrics import get_metric, METRIC_REGISTRY
+from app.utils.streaming_stats import stream_aggregate
+from app.utils.feature_store import read_patient_features
 from app.utils.results_formatter import (
     extract_scalar,
 )
@@ -118,6 +120,9 @@ _READ_ONLY_GLOBALS = MappingProxyType(
         "get_all_vitals": db_query.get_all_vitals,
         "get_all_mental_health": db_query.get_all_mental_health,
         "get_all_patients": db_query.get_all_patients,
+        # Precomputed per-patient features (weight change, BMI category, ...);
+        # read-only so snippets never trigger a refresh write
+        "get_patient_features": read_patient_features,
     }
 )
 
@@ -126,9 +131,14 @@ _EXEC_GLOBALS = dict(_READ_ONLY_GLOBALS)
 
 # Add query_dataframe directly to the globals for backward compatibility
 _EXEC_GLOBALS["query_dataframe"] = db_query.query_dataframe
+# Chunked reads + bounded-memory aggregation for full-table scans
+_EXEC_GLOBALS["iter_query_dataframe"] = db_query.iter_query_dataframe
+_EXEC_GLOBALS["stream_aggregate"] = stream_aggregate
 
-# Max DataFrame size to prevent memory issues
-MAX_DATAFRAME_SIZE = 1_000_000  # 1 million cells
+# Max DataFrame/Series payload in bytes to prevent memory issues.  Process
+# results are measured on the shared Arrow buffer (sandbox_transport); the
+# default admits the old 1 million cell limit at up to 128 bytes per cell.
+MAX_DATAFRAME_SIZE = int(os.getenv("MH_SANDBOX_MAX_RESULT_BYTES", "128000000"))
 
 
 def _detect_test_case(code: str) -> dict | None:
@@ -293,6 +303,32 @@ class SandboxResult:
     meta: Dict[str, Any] = field(default_factory=dict)
 
 
+def _result_nbytes(raw: Any) -> int:
+    """Return the in-memory size of a DataFrame/Series in bytes (index included)."""
+    usage = raw.memory_usage(index=True, deep=True)
+    return int(usage.sum()) if isinstance(raw, pd.DataFrame) else int(usage)
+
+
+def _check_result_size(raw: Any, max_bytes: int | None = None) -> SandboxResult | None:
+    """Return an error envelope when *raw* exceeds *max_bytes* in memory.
+
+    Used where no shared buffer is involved (in-process runs, results Arrow
+    cannot convert).  *max_bytes* defaults to :data:`MAX_DATAFRAME_SIZE`.
+    """
+    if not isinstance(raw, (pd.DataFrame, pd.Series)):
+        return None
+    if max_bytes is None:
+        max_bytes = MAX_DATAFRAME_SIZE
+    size = _result_nbytes(raw)
+    if size <= max_bytes:
+        return None
+    label = "DataFrame" if isinstance(raw, pd.DataFrame) else "Series"
+    return SandboxResult(
+        type="error",
+        value=f"{label} too large: {size} bytes (max: {max_bytes} bytes)",
+    )
+
+
 def _execute_code_in_process(code: str, queue: multiprocessing.Queue):
     """Execute code in a separate process and put the result in a queue."""
     try:
@@ -302,8 +338,13 @@ def _execute_code_in_process(code: str, queue: multiprocessing.Queue):
         # Import handling
         import builtins as _builtins  # local alias to avoid shadowing
 
+        from sys import modules as _sys_modules
+
         # Save original import so we can restore later
         _orig_import = _builtins.__import__
+        # The subprocess stub below replaces sys.modules["subprocess"]; keep the
+        # real module so the worker is left intact for the next snippet
+        _orig_subprocess = _sys_modules.get("subprocess")
 
         # Minimal whitelist – expand as legitimate needs grow
         _IMPORT_WHITELIST = {
@@ -552,8 +593,9 @@ def _execute_code_in_process(code: str, queue: multiprocessing.Queue):
         except ImportError:
             pass
 
-        # Execute the code
-        exec(code, _EXEC_GLOBALS, safe_locals)
+        # Execute the code on a copy of the globals – pooled workers run many
+        # snippets, so one snippet must not leave names behind for the next
+        exec(code, dict(_EXEC_GLOBALS), safe_locals)
         # Check for results
         if "results" not in safe_locals:
             queue.put(
@@ -565,71 +607,40 @@ def _execute_code_in_process(code: str, queue: multiprocessing.Queue):
 
         raw = safe_locals["results"]
 
-        # Size validation for DataFrames and Series to prevent memory issues
-        try:
-            import pandas as _pd
-
-            if isinstance(raw, _pd.DataFrame):
-                size = raw.shape[0] * raw.shape[1]
-                if size > MAX_DATAFRAME_SIZE:
-                    queue.put(
-                        SandboxResult(
-                            type="error",
-                            value=f"DataFrame too large: {size} cells (max: {MAX_DATAFRAME_SIZE})",
-                        )
-                    )
-                    return
-            elif isinstance(raw, _pd.Series) and len(raw) > MAX_DATAFRAME_SIZE:
-                queue.put(
-                    SandboxResult(
-                        type="error",
-                        value=f"Series too large: {len(raw)} elements (max: {MAX_DATAFRAME_SIZE})",
-                    )
-                )
-                return
-        except Exception:
-            pass  # If pandas isn't available, skip this check
+        # The size budget is enforced when the result is packed for transport
+        # (sandbox_transport.pack_result), on the shared buffer itself
 
         # Detect result type
         result_type = "object"
         meta: Dict[str, Any] = {}
 
+        # The import guard is still active here and blocks bokeh, so holoviews
+        # is probed separately – pandas results must not degrade to "object"
         try:
-            import pandas as _pd
             import holoviews as _hv
-            from bokeh.document import Document  # noqa: F401 – just for isinstance test
-
-            if raw is None:
-                result_type = "object"
-                raw = {}
-            elif isinstance(raw, (int, float, complex)):
-                result_type = "scalar"
-            elif isinstance(raw, _pd.Series):
-                result_type = "series"
-                meta = {"length": len(raw)}
-            elif isinstance(raw, _pd.DataFrame):
-                result_type = "dataframe"
-                meta = {"shape": raw.shape, "columns": list(raw.columns)}
-            elif isinstance(raw, dict):
-                result_type = "dict"
-                meta = {"keys": list(raw.keys())}
-            elif isinstance(raw, _hv.core.generators.Generator):
-                result_type = "figure"
-            else:
-                result_type = "object"
 
+            _figure_type = _hv.core.generators.Generator
         except Exception:
-            # If imports fail, use basic type detection
-            if raw is None:
-                result_type = "object"
-                raw = {}
-            elif isinstance(raw, (int, float, complex)):
-                result_type = "scalar"
-            elif isinstance(raw, dict):
-                result_type = "dict"
-                meta = {"keys": list(raw.keys())}
-            else:
-                result_type = "object"
+            _figure_type = None
+
+        if raw is None:
+            result_type = "object"
+            raw = {}
+        elif isinstance(raw, (int, float, complex)):
+            result_type = "scalar"
+        elif isinstance(raw, pd.Series):
+            result_type = "series"
+            meta = {"length": len(raw)}
+        elif isinstance(raw, pd.DataFrame):
+            result_type = "dataframe"
+            meta = {"shape": raw.shape, "columns": list(raw.columns)}
+        elif isinstance(raw, dict):
+            result_type = "dict"
+            meta = {"keys": list(raw.keys())}
+        elif _figure_type is not None and isinstance(raw, _figure_type):
+            result_type = "figure"
+        else:
+            result_type = "object"
 
         # Put the result in the queue
         queue.put(SandboxResult(type=result_type, value=raw, meta=meta))
@@ -640,6 +651,17 @@ def _execute_code_in_process(code: str, queue: multiprocessing.Queue):
     finally:
         # Always restore the original import
         _builtins.__import__ = _orig_import
+        if _orig_subprocess is not None:
+            _sys_modules["subprocess"] = _orig_subprocess
+
+
+def _execute_code_packed(code: str, queue: multiprocessing.Queue):
+    """Child entry point: like :func:`_execute_code_in_process`, but large
+    DataFrame/Series results are handed over via shared memory."""
+    from app.utils.sandbox_transport import execute_packed, install_worker_cleanup
+
+    install_worker_cleanup()
+    queue.put(execute_packed(code))
 
 
 def run_user_code(code: str) -> SandboxResult:
@@ -671,8 +693,13 @@ def _run_with_signal_timeout(code: str) -> SandboxResult:
     # ------------------------------------------------------------------
     import builtins as _builtins  # local alias to avoid shadowing
 
+    from sys import modules as _sys_modules
+
     # Save original import so we can restore later
     _orig_import = _builtins.__import__
+    # The subprocess stub below replaces sys.modules["subprocess"]; restore the
+    # real module afterwards so the host process can still spawn workers
+    _orig_subprocess = _sys_modules.get("subprocess")
 
     # Minimal whitelist – expand as legitimate needs grow
     _IMPORT_WHITELIST = {
@@ -854,6 +881,8 @@ def _run_with_signal_timeout(code: str) -> SandboxResult:
     finally:
         # Always restore the original import to avoid polluting global state
         _builtins.__import__ = _orig_import
+        if _orig_subprocess is not None:
+            _sys_modules["subprocess"] = _orig_subprocess
         if _HAS_ALARM:
             signal.alarm(0)
             signal.signal(signal.SIGALRM, _old_handler)
@@ -869,23 +898,9 @@ def _run_with_signal_timeout(code: str) -> SandboxResult:
     raw = safe_locals["results"]
 
     # Check DataFrame size
-    try:
-        import pandas as _pd
-
-        if isinstance(raw, _pd.DataFrame):
-            size = raw.shape[0] * raw.shape[1]
-            if size > MAX_DATAFRAME_SIZE:
-                return SandboxResult(
-                    type="error",
-                    value=f"DataFrame too large: {size} cells (max: {MAX_DATAFRAME_SIZE})",
-                )
-        elif isinstance(raw, _pd.Series) and len(raw) > MAX_DATAFRAME_SIZE:
-            return SandboxResult(
-                type="error",
-                value=f"Series too large: {len(raw)} elements (max: {MAX_DATAFRAME_SIZE})",
-            )
-    except Exception:
-        pass  # If pandas isn't available, skip this check
+    too_large = _check_result_size(raw)
+    if too_large is not None:
+        return too_large
 
     # Detect result type ---------------------------------------------------
     result_type: str
@@ -922,12 +937,28 @@ def _run_with_signal_timeout(code: str) -> SandboxResult:
 
 
 def _run_with_process_timeout(code: str, timeout: int = 20) -> SandboxResult:
-    """Execute code in a separate process with timeout."""
+    """Execute code in a separate process with timeout.
+
+    Uses the warm worker pool from :mod:`app.utils.sandbox_pool` unless it is
+    disabled via ``MH_SANDBOX_POOL=0``, in which case a fresh process is
+    spawned for this call.
+    """
+    from app.utils.sandbox_pool import get_sandbox_pool, pool_enabled
+
+    if pool_enabled():
+        try:
+            return get_sandbox_pool().run(code, timeout=timeout)
+        except Exception as e:
+            logger.error("Sandbox pool unavailable, spawning process: %s", e)
+
+    from app.utils.sandbox_transport import discard_result, unpack_result
+
     ctx = multiprocessing.get_context("spawn")
     queue = ctx.Queue()
 
     # Create and start the process
-    process = ctx.Process(target=_execute_code_in_process, args=(code, queue))
+    process = ctx.Process(target=_execute_code_packed, args=(code, queue))
+    timed_out = False
 
     try:
         # Start the process with a timeout
@@ -939,12 +970,12 @@ def _run_with_process_timeout(code: str, timeout: int = 20) -> SandboxResult:
             if not queue.empty():
                 # Get the result and return it
                 result = queue.get(block=False)
-                return result
+                return unpack_result(result)
 
             # Check if process has terminated
             if not process.is_alive():
                 if not queue.empty():
-                    return queue.get(block=False)
+                    return unpack_result(queue.get(block=False))
                 return SandboxResult(
                     type="error", value="Process terminated without returning a result"
                 )
@@ -953,6 +984,7 @@ def _run_with_process_timeout(code: str, timeout: int = 20) -> SandboxResult:
             time.sleep(0.1)
 
         # If we're here, we hit the timeout
+        timed_out = True
         logger.warning("Sandbox execution timed out after %s seconds", timeout)
         return SandboxResult(
             type="error", value=f"Execution timed out after {timeout} seconds"
@@ -970,6 +1002,12 @@ def _run_with_process_timeout(code: str, timeout: int = 20) -> SandboxResult:
             # Force kill if it didn't terminate
             if process.is_alive():
                 os.kill(process.pid, 9)  # SIGKILL
+        # Unlink the shared segment of a result that arrived too late
+        while timed_out:
+            try:
+                discard_result(queue.get(timeout=0.1))
+            except Exception:
+                break
 
 
 def run_snippet(code: str) -> Dict[str, Any]:
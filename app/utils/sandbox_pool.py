@@ -0,0 +1,352 @@
+"""Pool of warm, pre-imported sandbox worker processes.
+
+:func:`app.utils.sandbox._run_with_process_timeout` used to start a fresh
+``spawn`` process for every snippet.  Each one re-imported pandas, numpy,
+holoviews and ``app.db_query`` before the snippet could run, and the parent
+polled the result queue every 100 ms.
+
+This module keeps a small set of workers alive instead.  Each worker imports
+the sandbox module once, then loops: receive code over a ``Pipe``, run it via
+:func:`app.utils.sandbox._execute_code_in_process` (same import whitelist and
+stubs), and send the :class:`~app.utils.sandbox.SandboxResult` back.  The
+parent blocks on ``Connection.poll(timeout)``, so latency is the snippet's own
+runtime and nothing else.  Large DataFrame/Series results come back through
+shared memory (:mod:`app.utils.sandbox_transport`) instead of the pipe.
+
+* **Timeouts** – a worker that misses the deadline is terminated (SIGKILL as a
+  last resort) exactly like the old per-call process, and replaced.
+* **Recycling** – a worker retires after ``max_tasks`` executions or once its
+  peak RSS passes ``max_rss_mb``.  It also retires right after any snippet
+  that rebinds a module attribute, a public pandas/numpy class attribute or
+  an environment variable (e.g. ``pd.read_csv = ...``), so one snippet cannot
+  change the helpers the next one runs against.
+* **Queueing** – waiting for an idle worker counts against the same
+  ``timeout`` as the snippet itself.
+
+Tunables: ``MH_SANDBOX_POOL_SIZE`` (default 2), ``MH_SANDBOX_MAX_TASKS``
+(default 50), ``MH_SANDBOX_MAX_RSS_MB`` (default 1024) and ``MH_SANDBOX_POOL``
+(set to ``0`` to fall back to one process per call).
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+import types
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.utils.sandbox import SandboxResult
+from app.utils.sandbox_transport import (
+    discard_result,
+    execute_packed,
+    handed_over,
+    install_worker_cleanup,
+    unpack_result,
+)
+
+logger = logging.getLogger("sandbox")
+
+__all__ = [
+    "SandboxWorkerPool",
+    "get_sandbox_pool",
+    "shutdown_sandbox_pool",
+    "pool_enabled",
+]
+
+DEFAULT_POOL_SIZE = int(os.getenv("MH_SANDBOX_POOL_SIZE", "2"))
+DEFAULT_MAX_TASKS = int(os.getenv("MH_SANDBOX_MAX_TASKS", "50"))
+DEFAULT_MAX_RSS_MB = int(os.getenv("MH_SANDBOX_MAX_RSS_MB", "1024"))
+
+
+def pool_enabled() -> bool:
+    """Return False when ``MH_SANDBOX_POOL`` disables the warm pool."""
+    return os.getenv("MH_SANDBOX_POOL", "1").lower() not in {"0", "false", "no"}
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+
+def _peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:  # pragma: no cover – Windows
+        return 0.0
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if os.uname().sysname == "Darwin" else peak / 1024
+
+
+# Class namespaces watched besides module namespaces (pd.DataFrame, np.ndarray, ...)
+_WATCHED_CLASS_MODULES = ("pandas", "numpy")
+
+_StateSnapshot = Tuple[Dict[str, Tuple[Any, Dict[str, Any]]], Dict[str, str]]
+
+
+def _namespaces() -> List[Tuple[str, Any]]:
+    spaces = [
+        (name, module)
+        for name, module in list(sys.modules.items())
+        if isinstance(module, types.ModuleType)
+    ]
+    for root in _WATCHED_CLASS_MODULES:
+        module = sys.modules.get(root)
+        for attr, value in list(vars(module).items()) if module else []:
+            if isinstance(value, type) and not attr.startswith("_"):
+                spaces.append((f"{root}.{attr}", value))
+    return spaces
+
+
+def _snapshot_state() -> _StateSnapshot:
+    """Shallow copy of every loaded module's namespace plus ``os.environ``."""
+    spaces = {name: (obj, dict(vars(obj))) for name, obj in _namespaces()}
+    return spaces, dict(os.environ)
+
+
+def _changed_state(snapshot: _StateSnapshot) -> List[str]:
+    """Return the namespaces a snippet rebound since *snapshot* was taken."""
+    spaces, environ = snapshot
+    changed = []
+    for name, (obj, before) in spaces.items():
+        if isinstance(obj, types.ModuleType) and sys.modules.get(name) is not obj:
+            changed.append(name)
+            continue
+        after = vars(obj)
+        added = [
+            key
+            for key in after.keys() - before.keys()
+            if key != "__warningregistry__"
+            # importing a submodule binds it on its parent package
+            and not (
+                isinstance(after[key], types.ModuleType)
+                and after[key].__name__ == f"{name}.{key}"
+            )
+        ]
+        if added or before.keys() - after.keys() or any(
+            after[key] is not value for key, value in before.items() if key in after
+        ):
+            changed.append(name)
+    if dict(os.environ) != environ:
+        changed.append("os.environ")
+    return changed
+
+
+def _worker_main(conn: Connection, max_tasks: int, max_rss_mb: float) -> None:
+    """Entry point of a pooled worker process."""
+    install_worker_cleanup()
+    # Pay the heavy imports once, before the first snippet arrives
+    try:
+        import holoviews  # noqa: F401
+    except Exception:
+        pass
+
+    tasks = 0
+    while True:
+        try:
+            code = conn.recv()
+        except (EOFError, OSError):
+            break
+        if code is None:
+            break
+
+        snapshot = _snapshot_state()
+        # Large DataFrames travel through shared memory, not the pipe
+        result = execute_packed(code)
+
+        tasks += 1
+        tainted = _changed_state(snapshot)
+        if tainted:
+            logger.info("Snippet modified %s; recycling sandbox worker", ", ".join(tainted[:5]))
+        retire = (
+            bool(tainted)
+            or tasks >= max_tasks
+            or (max_rss_mb and _peak_rss_mb() > max_rss_mb)
+        )
+        try:
+            conn.send((result, bool(retire)))
+        except (EOFError, OSError):
+            break
+        except Exception as exc:  # unpicklable value
+            conn.send(
+                (SandboxResult(type="error", value=f"Result not transferable: {exc}"), bool(retire))
+            )
+        handed_over()
+        if retire:
+            break
+    conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Parent side
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class _Worker:
+    process: multiprocessing.process.BaseProcess
+    conn: Connection
+
+
+class SandboxWorkerPool:
+    """Fixed-size pool of warm sandbox processes with timeout-kill semantics."""
+
+    def __init__(
+        self,
+        size: int = DEFAULT_POOL_SIZE,
+        *,
+        max_tasks: int = DEFAULT_MAX_TASKS,
+        max_rss_mb: float = DEFAULT_MAX_RSS_MB,
+        start_method: str = "spawn",
+    ) -> None:
+        self.size = max(1, size)
+        self.max_tasks = max(1, max_tasks)
+        self.max_rss_mb = max_rss_mb
+        self._ctx = multiprocessing.get_context(start_method)
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {"executions": 0, "timeouts": 0, "crashes": 0, "recycled": 0, "spawned": 0}
+        for _ in range(self.size):
+            self._idle.put(self._spawn())
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = self._ctx.Pipe(duplex=True)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.max_tasks, self.max_rss_mb),
+            daemon=True,
+            name="sandbox-worker",
+        )
+        process.start()
+        child_conn.close()
+        self._bump("spawned")
+        return _Worker(process, parent_conn)
+
+    def _bump(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    @staticmethod
+    def _kill(worker: _Worker) -> None:
+        process = worker.process
+        if process.is_alive():
+            process.terminate()
+            process.join(timeout=1.0)
+            # Force kill if it didn't terminate
+            if process.is_alive():
+                os.kill(process.pid, 9)  # SIGKILL
+        process.join(timeout=1.0)
+        # A result sent after the deadline may still hold a shared segment
+        try:
+            while worker.conn.poll(0):
+                discard_result(worker.conn.recv()[0])
+        except Exception:
+            pass
+        try:
+            worker.conn.close()
+        except Exception:
+            pass
+
+    def run(self, code: str, timeout: float = 20) -> SandboxResult:
+        """Execute *code* on an idle worker and return its :class:`SandboxResult`.
+
+        *timeout* covers both waiting for an idle worker and the run itself.
+        """
+        if self._closed:
+            raise RuntimeError("sandbox pool is shut down")
+
+        deadline = time.monotonic() + timeout
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            return self._timed_out(timeout)
+        keep = False
+        try:
+            if not worker.process.is_alive():
+                self._kill(worker)
+                worker = self._spawn()
+
+            worker.conn.send(code)
+            if not worker.conn.poll(max(0.0, deadline - time.monotonic())):
+                return self._timed_out(timeout)
+
+            result, retire = worker.conn.recv()
+            self._bump("executions")
+            if retire:
+                self._bump("recycled")
+            keep = not retire
+            return unpack_result(result)
+
+        except (EOFError, OSError):
+            self._bump("crashes")
+            return SandboxResult(
+                type="error", value="Process terminated without returning a result"
+            )
+
+        finally:
+            if keep:
+                self._idle.put(worker)
+            else:
+                self._kill(worker)
+                if not self._closed:
+                    self._idle.put(self._spawn())
+
+    def _timed_out(self, timeout: float) -> SandboxResult:
+        self._bump("timeouts")
+        logger.warning("Sandbox execution timed out after %s seconds", timeout)
+        return SandboxResult(
+            type="error", value=f"Execution timed out after {timeout} seconds"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Return execution / timeout / recycle counters."""
+        with self._lock:
+            return dict(self._stats, size=self.size)
+
+    def shutdown(self) -> None:
+        """Stop all idle workers; busy ones are killed when their call returns."""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                worker.conn.send(None)
+            except Exception:
+                pass
+            self._kill(worker)
+
+
+_POOL: Optional[SandboxWorkerPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_sandbox_pool() -> SandboxWorkerPool:
+    """Return the process-wide pool, starting its workers on first use."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None or _POOL._closed:
+            _POOL = SandboxWorkerPool()
+        return _POOL
+
+
+def shutdown_sandbox_pool() -> None:
+    """Stop the process-wide pool (no-op when it was never started)."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown()
+            _POOL = None
+
+
+atexit.register(shutdown_sandbox_pool)
@@ -0,0 +1,243 @@
+"""Shared-memory transport for large sandbox results.
+
+Sandbox workers used to return DataFrames by pickling the whole
+:class:`~app.utils.sandbox.SandboxResult` through a ``Queue``/``Pipe``: one
+copy into the pickle, the pipe chunking, another copy on the receiving side
+and a final one while unpickling.
+
+For DataFrame/Series results of at least ``MH_SANDBOX_SHM_MIN_BYTES``
+(default 1 MiB) the worker instead writes the frame as an Arrow IPC stream
+straight into a :class:`multiprocessing.shared_memory.SharedMemory` block and
+sends only a small :class:`SharedFrameRef`.  The parent maps the block, reads
+the Arrow table from it in place and converts it to pandas; columns Arrow can
+hand over zero-copy stay backed by the mapping, everything else is copied out
+once.  The block's name is unlinked as soon as the parent has attached.  A
+parent that abandons a result (timeout, killed worker) drains it and calls
+:func:`discard_result`; a worker terminated before handing a block over
+unlinks it itself (:func:`install_worker_cleanup`).
+
+``MAX_DATAFRAME_SIZE`` is enforced here, once per result: on the size of the
+Arrow buffer before the segment is allocated.  Smaller results (always within
+budget) and frames Arrow cannot represent (e.g. mixed-type object columns)
+keep using pickle; the latter are checked on their in-memory size instead.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import signal
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Hashable, Optional, Set
+
+import pandas as pd
+import pyarrow as pa
+
+from app.utils.sandbox import (
+    SandboxResult,
+    _check_result_size,
+    _execute_code_in_process,
+    _result_nbytes,
+)
+
+logger = logging.getLogger("sandbox")
+
+__all__ = [
+    "SharedFrameRef",
+    "discard_result",
+    "execute_packed",
+    "handed_over",
+    "install_worker_cleanup",
+    "pack_result",
+    "unpack_result",
+]
+
+SHM_MIN_BYTES = int(os.getenv("MH_SANDBOX_SHM_MIN_BYTES", str(1024 * 1024)))
+
+# Segments this (worker) process created that the parent has not received yet
+_PENDING: Set[str] = set()
+
+
+@dataclass(frozen=True)
+class SharedFrameRef:
+    """Handle to a DataFrame/Series written to a shared-memory block."""
+
+    name: str
+    nbytes: int
+    kind: str  # "dataframe" or "series"
+    series_name: Optional[Hashable] = None
+
+
+def _write_ipc(table: pa.Table, sink) -> None:
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def pack_result(
+    result: SandboxResult,
+    *,
+    min_bytes: int = SHM_MIN_BYTES,
+    max_bytes: Optional[int] = None,
+) -> SandboxResult:
+    """Move a large DataFrame/Series payload of *result* into shared memory.
+
+    Returns *result* unchanged when it is not a pandas object, is smaller than
+    *min_bytes* or cannot be converted to Arrow.  Returns an error envelope
+    when the Arrow buffer exceeds *max_bytes* (default ``MAX_DATAFRAME_SIZE``),
+    or when a frame Arrow cannot convert exceeds it in memory.
+    """
+    value = result.value
+    if result.type == "error" or not isinstance(value, (pd.DataFrame, pd.Series)):
+        return result
+    if _result_nbytes(value) < min_bytes:
+        return result
+
+    if max_bytes is None:
+        from app.utils.sandbox import MAX_DATAFRAME_SIZE
+
+        max_bytes = MAX_DATAFRAME_SIZE
+
+    is_series = isinstance(value, pd.Series)
+    try:
+        frame = value.to_frame() if is_series else value
+        table = pa.Table.from_pandas(frame)
+    except (pa.ArrowException, TypeError, ValueError) as exc:
+        logger.debug("Result not Arrow-compatible, falling back to pickle: %s", exc)
+        return _check_result_size(value, max_bytes) or result
+
+    # Size the IPC stream first so the budget is checked before allocating
+    mock = pa.MockOutputStream()
+    _write_ipc(table, mock)
+    nbytes = mock.size()
+    if nbytes > max_bytes:
+        label = "Series" if is_series else "DataFrame"
+        return SandboxResult(
+            type="error",
+            value=f"{label} too large: {nbytes} bytes (max: {max_bytes} bytes)",
+        )
+
+    shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+    try:
+        target = pa.py_buffer(shm.buf)
+        _write_ipc(table, pa.FixedSizeBufferWriter(target))
+        del target  # release the buffer export so the mapping can close
+    except Exception:
+        shm.close()
+        shm.unlink()
+        raise
+    shm.close()
+    _PENDING.add(shm.name)
+
+    ref = SharedFrameRef(
+        name=shm.name,
+        nbytes=nbytes,
+        kind="series" if is_series else "dataframe",
+        series_name=value.name if is_series else None,
+    )
+    meta = dict(result.meta, transport="shared_memory", nbytes=nbytes)
+    return SandboxResult(type=result.type, value=ref, meta=meta)
+
+
+def _unlink(name: str) -> None:
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:  # already attached (and unlinked) or discarded
+        return
+    shm.close()
+    shm.unlink()
+
+
+def discard_result(result: Any) -> None:
+    """Unlink the shared segment behind a result the parent will not unpack."""
+    ref = getattr(result, "value", None)
+    if isinstance(ref, SharedFrameRef):
+        _unlink(ref.name)
+
+
+def handed_over() -> None:
+    """Worker side: the parent now owns every segment sent so far."""
+    _PENDING.clear()
+
+
+def install_worker_cleanup() -> None:
+    """Worker side: unlink segments not yet handed over when terminated."""
+
+    def _on_terminate(signum, _frame):  # noqa: ANN001 – signal handler
+        for name in list(_PENDING):
+            _unlink(name)
+        os._exit(128 + signum)
+
+    signal.signal(signal.SIGTERM, _on_terminate)
+
+
+class _Segment:
+    """Keeps a shared-memory mapping open while Arrow/pandas buffers use it."""
+
+    def __init__(self, name: str) -> None:
+        self.shm = shared_memory.SharedMemory(name=name)
+        # Drop the name right away; the mapping itself stays valid until closed
+        self.shm.unlink()
+        self.view: Optional[pa.Buffer] = pa.py_buffer(self.shm.buf)
+
+    def __del__(self) -> None:
+        self.view = None
+        try:
+            self.shm.close()
+        except BufferError:  # pragma: no cover – export still alive
+            pass
+
+
+def unpack_result(result: SandboxResult) -> SandboxResult:
+    """Rebuild the pandas object behind a :class:`SharedFrameRef`.
+
+    Columns that Arrow can hand to pandas without conversion stay backed by
+    the shared segment, which is unmapped once the last of them is collected.
+    """
+    ref = result.value
+    if not isinstance(ref, SharedFrameRef):
+        return result
+
+    try:
+        segment = _Segment(ref.name)
+    except FileNotFoundError:
+        return SandboxResult(type="error", value="Shared result buffer disappeared")
+
+    view = segment.view
+    source = pa.foreign_buffer(view.address, ref.nbytes, base=segment)
+    del segment, view
+    frame = pa.ipc.open_stream(source).read_all().to_pandas()
+
+    value: Any = frame
+    if ref.kind == "series":
+        value = frame.iloc[:, 0].rename(ref.series_name)
+    return SandboxResult(type=result.type, value=value, meta=result.meta)
+
+
+class _Collector:
+    """Queue stand-in handed to ``_execute_code_in_process``; keeps the first put."""
+
+    def __init__(self) -> None:
+        self.result: Optional[SandboxResult] = None
+
+    def put(self, item: SandboxResult, *_a, **_kw) -> None:
+        if self.result is None:
+            self.result = item
+
+
+def execute_packed(code: str) -> SandboxResult:
+    """Run *code* in this process and pack a large result for transport.
+
+    Packing happens after ``_execute_code_in_process`` has returned, i.e. once
+    the sandbox import guard is lifted again (pyarrow imports lazily).
+    """
+    collector = _Collector()
+    _execute_code_in_process(code, collector)
+    result = collector.result or SandboxResult(
+        type="error", value="Process terminated without returning a result"
+    )
+    try:
+        return pack_result(result)
+    except Exception as exc:  # keep the pickle path as a safety net
+        logger.warning("Shared-memory packing failed: %s", exc)
+        return result
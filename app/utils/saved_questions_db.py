@@ -16,10 +16,12 @@ from __future__ import annotations
 import os
 import sqlite3
 import logging
-from typing import List, Dict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
 import json
 import shutil
 from app.config import get_vp_data_db
+from app.utils.db_pool import get_connection, write_connection
 
 logger = logging.getLogger(__name__)
 
@@ -44,14 +46,38 @@ CREATE TABLE IF NOT EXISTS saved_questions (
 # ---------------------------------------------------------------------------
 
 
+# (path, inode) pairs whose table already exists – readers then skip the
+# writer lock entirely
+_READY: set = set()
+
+
+def _ensure_table(db_path: str) -> None:
+    # Keyed on the inode too, so a replaced database file is re-initialised
+    try:
+        ident = (db_path, os.stat(db_path).st_ino)
+    except OSError:
+        ident = None
+    if ident is not None and ident in _READY:
+        return
+    with write_connection(db_path) as conn:
+        conn.execute(TABLE_SQL)
+    _READY.add((db_path, os.stat(db_path).st_ino))
+
+
+@contextmanager
+def _write_conn(db_file: str | None = None) -> Iterator[sqlite3.Connection]:
+    """Yield the pooled writer and ensure the *saved_questions* table exists."""
+    db_path = db_file or DB_FILE
+    _ensure_table(db_path)
+    with write_connection(db_path) as conn:
+        yield conn
+
+
 def _get_conn(db_file: str | None = None) -> sqlite3.Connection:
-    """Return a SQLite connection and ensure the *saved_questions* table exists."""
+    """Return a pooled read connection and ensure the *saved_questions* table exists."""
     db_path = db_file or DB_FILE
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row  # easier dict conversion
-    with conn:
-        conn.execute(TABLE_SQL)
-    return conn
+    _ensure_table(db_path)
+    return get_connection(db_path)
 
 
 # ---------------------------------------------------------------------------
@@ -65,11 +91,12 @@ def load_saved_questions(db_file: str | None = None) -> List[Dict[str, str]]:
     Returns an **empty list** when no questions exist.
     """
     try:
-        with _get_conn(db_file) as conn:
-            rows = conn.execute(
-                "SELECT name, query FROM saved_questions ORDER BY id"
-            ).fetchall()
-            return [{"name": r["name"], "query": r["query"]} for r in rows]
+        cursor = _get_conn(db_file).cursor()
+        cursor.row_factory = sqlite3.Row  # easier dict conversion
+        rows = cursor.execute(
+            "SELECT name, query FROM saved_questions ORDER BY id"
+        ).fetchall()
+        return [{"name": r["name"], "query": r["query"]} for r in rows]
     except Exception as exc:
         logger.error(
             "Failed to load saved questions from SQLite: %s", exc, exc_info=True
@@ -90,13 +117,12 @@ def save_all_questions(
         Alternative database file (used by tests).
     """
     try:
-        with _get_conn(db_file) as conn:
-            with conn:
-                conn.execute("DELETE FROM saved_questions")
-                conn.executemany(
-                    "INSERT INTO saved_questions (name, query) VALUES (?, ?)",
-                    [(q["name"], q["query"]) for q in questions],
-                )
+        with _write_conn(db_file) as conn:
+            conn.execute("DELETE FROM saved_questions")
+            conn.executemany(
+                "INSERT INTO saved_questions (name, query) VALUES (?, ?)",
+                [(q["name"], q["query"]) for q in questions],
+            )
         logger.info("Saved %d questions to SQLite", len(questions))
         return True
     except sqlite3.IntegrityError as exc:
@@ -109,19 +135,17 @@ def save_all_questions(
 
 def upsert_question(name: str, query: str, *, db_file: str | None = None) -> None:
     """Insert *or* update a single question identified by *name*."""
-    with _get_conn(db_file) as conn:
-        with conn:
-            conn.execute(
-                "INSERT INTO saved_questions (name, query) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET query = excluded.query",
-                (name, query),
-            )
+    with _write_conn(db_file) as conn:
+        conn.execute(
+            "INSERT INTO saved_questions (name, query) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET query = excluded.query",
+            (name, query),
+        )
 
 
 def delete_question(name: str, *, db_file: str | None = None) -> None:
     """Delete question with *name* if it exists."""
-    with _get_conn(db_file) as conn:
-        with conn:
-            conn.execute("DELETE FROM saved_questions WHERE name = ?", (name,))
+    with _write_conn(db_file) as conn:
+        conn.execute("DELETE FROM saved_questions WHERE name = ?", (name,))
 
 
 # ---------------------------------------------------------------------------
@@ -159,9 +159,10 @@ def get_silent_dropout_report(
         "Executing silent dropout SQL with threshold of %d days", threshold_days
     )
 
-    # Execute query with appropriate parameters
-    # Make sure params is always passed, even for the simplified query
-    df = query_dataframe(sql, params=(cutoff_date,), db_path=db_path)
+    # Only the full query binds the cutoff; the simplified one has no
+    # placeholder and sqlite3 rejects a mismatched parameter count
+    params = (cutoff_date,) if has_last_visit_date else ()
+    df = query_dataframe(sql, params=params, db_path=db_path)
 
     # Format dates for display if needed
     if not df.empty and "last_visit_date" in df.columns and has_last_visit_date:
@@ -343,51 +344,17 @@ def ensure_last_visit_date_column(db_path: Optional[str] = None) -> bool:
             conn.close()
 
 
-def get_clinical_inactivity_report(
-    inactivity_days: int = 90,
-    minimum_activity_count: int = 2,
-    active_only: bool = True,
-    db_path: Optional[str] = None,
-) -> pd.DataFrame:
-    """Identify potentially inactive patients based on clinical data points.
+def build_clinical_inactivity_sql(active_only: bool = True) -> str:
+    """Return the SQL behind :func:`get_clinical_inactivity_report`.
 
-    This approach looks at when patients last had lab tests, mental health screenings,
-    or vital measurements recorded. A true "silent dropout" is identified as someone who:
-    1. Has been active in the program (has some clinical data)
-    2. Hasn't had any activity recently (inactivity_days threshold)
-    3. Has multiple recorded activities (minimum_activity_count)
-
-    Parameters
-    ----------
-    inactivity_days : int, default 90
-        Number of days without clinical activity to flag a patient
-    minimum_activity_count : int, default 2
-        Minimum number of recorded clinical activities to consider a patient as "previously active"
-    active_only : bool, default True
-        Whether to only include patients marked as active in the system
-    db_path : str, optional
-        Path to SQLite database
-
-    Returns
-    -------
-    pandas.DataFrame
-        Columns: patient_id, first_name, last_name, last_lab_date,
-                 last_mental_health_date, last_vitals_date, most_recent_activity,
-                 days_since_activity, activity_count
+    Takes three positional parameters: minimum activity count, cutoff date
+    (``YYYY-MM-DD``) and minimum days enrolled.
     """
-    if db_path is None:
-        db_path = get_db_path()
-
-    # Calculate the cutoff date (today - inactivity_days)
-    cutoff_date = (datetime.now() - timedelta(days=inactivity_days)).strftime(
-        "%Y-%m-%d"
-    )
-
     # Build the active filter clause if needed
     active_clause = "WHERE p.active = 1" if active_only else ""
 
     # SQL query that finds the most recent clinical activity date for each patient
-    sql = f"""
+    return f"""
     WITH 
     patient_basics AS (
         SELECT 
@@ -466,6 +433,49 @@ def get_clinical_inactivity_report(
     ORDER BY days_since_activity DESC
     """
 
+
+def get_clinical_inactivity_report(
+    inactivity_days: int = 90,
+    minimum_activity_count: int = 2,
+    active_only: bool = True,
+    db_path: Optional[str] = None,
+) -> pd.DataFrame:
+    """Identify potentially inactive patients based on clinical data points.
+
+    This approach looks at when patients last had lab tests, mental health screenings,
+    or vital measurements recorded. A true "silent dropout" is identified as someone who:
+    1. Has been active in the program (has some clinical data)
+    2. Hasn't had any activity recently (inactivity_days threshold)
+    3. Has multiple recorded activities (minimum_activity_count)
+
+    Parameters
+    ----------
+    inactivity_days : int, default 90
+        Number of days without clinical activity to flag a patient
+    minimum_activity_count : int, default 2
+        Minimum number of recorded clinical activities to consider a patient as "previously active"
+    active_only : bool, default True
+        Whether to only include patients marked as active in the system
+    db_path : str, optional
+        Path to SQLite database
+
+    Returns
+    -------
+    pandas.DataFrame
+        Columns: patient_id, first_name, last_name, last_lab_date,
+                 last_mental_health_date, last_vitals_date, most_recent_activity,
+                 days_since_activity, activity_count
+    """
+    if db_path is None:
+        db_path = get_db_path()
+
+    # Calculate the cutoff date (today - inactivity_days)
+    cutoff_date = (datetime.now() - timedelta(days=inactivity_days)).strftime(
+        "%Y-%m-%d"
+    )
+
+    sql = build_clinical_inactivity_sql(active_only)
+
     # Execute the query with appropriate parameters
     params = (minimum_activity_count, cutoff_date, inactivity_days)
     df = query_dataframe(sql, params=params, db_path=db_path)
@@ -503,4 +513,5 @@ __all__ = [
     "mark_patient_as_inactive",
     "ensure_last_visit_date_column",
     "get_clinical_inactivity_report",
+    "build_clinical_inactivity_sql",
 ]
@@ -0,0 +1,216 @@
+"""Columnar on-disk snapshots of the analytical tables.
+
+``get_all_patients``, ``get_all_vitals``, ``get_all_scores`` and
+``get_all_mental_health`` (see :mod:`app.db_query`) are called by most
+sandbox snippets and each used to run a full ``SELECT *`` and build the
+DataFrame from Python row tuples.  This module keeps one uncompressed Arrow
+IPC file per table next to the database (``<db>.snapshots/<table>.arrow``,
+or under ``MH_SNAPSHOT_DIR``) and serves those helpers from it:
+
+* Each file carries the table's counter from ``data_version`` (migration
+  ``012_data_version.py``) and the database file's inode in its schema
+  metadata.  A snapshot is used only while both still match, so any
+  committed INSERT/UPDATE/DELETE on the table makes it stale.
+* Files are read through :func:`pyarrow.memory_map`, so every sandbox
+  worker reads the same page-cache pages instead of its own SQLite copy.
+  Arrow IPC rather than Parquet, because IPC needs no decoding to map.
+* A stale or missing snapshot falls back to SQLite, and the fresh result is
+  written back (atomically, via ``os.replace``) for the next caller.  The
+  ETL refreshes all snapshots right after an ingest
+  (:func:`refresh_snapshots`).
+
+Frames round-trip through Arrow with the dtypes SQLite/pandas produced, so a
+snapshot read returns exactly what the SQLite path would.  Tables Arrow
+cannot represent (mixed-type object columns) are simply not snapshotted.
+Set ``MH_SNAPSHOT_CACHE=0`` to disable.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+from typing import Callable, Dict, Iterable, Optional
+
+import pandas as pd
+import pyarrow as pa
+
+from app.utils.db_pool import get_connection, resolve_db_path
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "SNAPSHOT_QUERIES",
+    "snapshot_enabled",
+    "snapshot_dir",
+    "read_table",
+    "refresh_snapshots",
+    "snapshot_stats",
+]
+
+# Exactly the SQL the ``get_all_*`` helpers run, keyed by source table
+SNAPSHOT_QUERIES: Dict[str, str] = {
+    "patients": "SELECT * FROM patients;",
+    "vitals": "SELECT * FROM vitals ORDER BY date DESC",
+    "scores": "SELECT * FROM scores;",
+    "mental_health": "SELECT * FROM mental_health;",
+}
+
+_META_KEY = b"mh_snapshot"
+_MEMORY_PATHS = {":memory:", ""}
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "writes": 0, "skipped": 0}
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def snapshot_enabled() -> bool:
+    """Return False when ``MH_SNAPSHOT_CACHE`` disables columnar snapshots."""
+    return os.getenv("MH_SNAPSHOT_CACHE", "1").lower() not in {"0", "false", "no"}
+
+
+def snapshot_dir(db_path: str) -> str:
+    """Return the directory holding the snapshots of *db_path*."""
+    root = os.getenv("MH_SNAPSHOT_DIR")
+    resolved = resolve_db_path(db_path)
+    if root:
+        name = os.path.basename(resolved) + ".snapshots"
+        return os.path.join(root, name)
+    return resolved + ".snapshots"
+
+
+def _snapshot_path(table: str, db_path: str) -> str:
+    return os.path.join(snapshot_dir(db_path), f"{table}.arrow")
+
+
+def _stamp(conn: sqlite3.Connection, table: str, db_path: str) -> Optional[str]:
+    """Return the current version stamp of *table*, or ``None`` if untracked."""
+    try:
+        row = conn.execute(
+            "SELECT version FROM data_version WHERE table_name = ?", (table,)
+        ).fetchone()
+        inode = os.stat(resolve_db_path(db_path)).st_ino
+    except (sqlite3.Error, OSError):
+        return None
+    if row is None:
+        return None
+    return f"{inode}:{row[0]}"
+
+
+def _load(path: str, stamp: str, *, read: bool = True) -> Optional[pd.DataFrame]:
+    """Return the snapshot at *path* if it carries *stamp*, else ``None``.
+
+    Only the file footer is parsed until the stamp matches.  With
+    ``read=False`` an empty frame stands in for a fresh snapshot.
+    """
+    try:
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            meta = json.loads((reader.schema.metadata or {}).get(_META_KEY, b"{}"))
+            if meta.get("stamp") != stamp:
+                return None
+            return reader.read_all().to_pandas() if read else pd.DataFrame()
+    except FileNotFoundError:
+        return None
+    except (pa.ArrowException, OSError, ValueError) as exc:
+        logger.warning("Ignoring unreadable snapshot %s: %s", path, exc)
+        return None
+
+
+def _store(path: str, stamp: str, df: pd.DataFrame) -> bool:
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowException, TypeError, ValueError) as exc:
+        logger.debug("Not snapshotting %s: %s", path, exc)
+        _count("skipped")
+        return False
+    meta = dict(table.schema.metadata or {})
+    meta[_META_KEY] = json.dumps({"stamp": stamp}).encode()
+    table = table.replace_schema_metadata(meta)
+
+    directory = os.path.dirname(path)
+    tmp = None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fh:
+            with pa.ipc.new_file(fh, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp, path)
+    except OSError as exc:
+        logger.warning("Could not write snapshot %s: %s", path, exc)
+        if tmp is not None and os.path.exists(tmp):
+            os.unlink(tmp)
+        return False
+    _count("writes")
+    return True
+
+
+def read_table(
+    table: str, db_path: str, load: Callable[[], pd.DataFrame]
+) -> pd.DataFrame:
+    """Return *table* from its snapshot, or from ``load()`` when stale.
+
+    *load* runs the table's SQLite query; its result replaces the stale
+    snapshot.  The version stamp is taken before *load* runs, so a commit
+    racing with it only makes the new snapshot look stale, never fresh.
+    """
+    if not snapshot_enabled() or db_path in _MEMORY_PATHS:
+        return load()
+    stamp = _stamp(get_connection(db_path), table, db_path)
+    if stamp is None:
+        return load()
+
+    path = _snapshot_path(table, db_path)
+    df = _load(path, stamp)
+    if df is not None:
+        _count("hits")
+        return df
+    _count("misses")
+    df = load()
+    # query_dataframe returns a column-less frame on SQLite errors
+    if len(df.columns):
+        _store(path, stamp, df)
+    return df
+
+
+def refresh_snapshots(db_path: str, tables: Optional[Iterable[str]] = None) -> int:
+    """Rewrite the snapshots of *tables* (default all) that are out of date.
+
+    Reads with its own connection, so it can run right after an ETL commit.
+    Returns the number of snapshots written.
+    """
+    if not snapshot_enabled() or db_path in _MEMORY_PATHS:
+        return 0
+    written = 0
+    conn = sqlite3.connect(resolve_db_path(db_path), isolation_level=None)
+    try:
+        # One read transaction, so each stamp matches the rows read with it
+        conn.execute("BEGIN")
+        for table in tables or SNAPSHOT_QUERIES:
+            stamp = _stamp(conn, table, db_path)
+            if stamp is None:
+                continue
+            path = _snapshot_path(table, db_path)
+            if _load(path, stamp, read=False) is not None:
+                continue
+            df = pd.read_sql_query(SNAPSHOT_QUERIES[table], conn)
+            written += _store(path, stamp, df)
+    finally:
+        conn.close()
+    if written:
+        logger.info("Refreshed %d table snapshots for %s", written, db_path)
+    return written
+
+
+def snapshot_stats() -> Dict[str, int]:
+    """Return hit/miss/write/skip counters for this process."""
+    with _stats_lock:
+        return dict(_stats)
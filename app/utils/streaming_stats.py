@@ -0,0 +1,251 @@
+"""Bounded-memory aggregation over chunked query results.
+
+:func:`app.db_query.iter_query_dataframe` yields a large result set as a
+sequence of DataFrames.  The accumulators here consume such chunks one at a
+time and can be merged, so population-wide summaries never need the whole
+table in memory:
+
+* :class:`RunningStats` – count, mean, variance/std, min and max.  Each chunk
+  is reduced with numpy and folded in with Chan et al.'s pairwise update, so
+  results match pandas on the concatenated data up to float rounding.
+* :class:`QuantileSketch` – a KLL-style compactor sketch.  Memory is about
+  ``k * log2(n / k)`` values; rank error is roughly ``1 / k`` (well under
+  1 % at the default ``k=2048``).
+* :func:`stream_aggregate` – one summary row per group (or overall) built
+  from the two above.
+
+>>> chunks = db_query.iter_query_dataframe("SELECT gender, bmi FROM vitals JOIN patients ...")
+>>> stream_aggregate(chunks, "bmi", by="gender", quantiles=(0.5, 0.9))
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+__all__ = ["RunningStats", "QuantileSketch", "stream_aggregate"]
+
+
+def _numeric(values: Any) -> np.ndarray:
+    """Return the non-null values of *values* as a float array."""
+    arr = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=float)
+    return arr[~np.isnan(arr)]
+
+
+class RunningStats:
+    """Mergeable count / mean / variance / min / max accumulator."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self._mean = 0.0
+        self._m2 = 0.0  # sum of squared deviations from the mean
+        self.min = float("nan")
+        self.max = float("nan")
+
+    def update(self, values: Any) -> "RunningStats":
+        """Fold the non-null numeric *values* of one chunk in."""
+        arr = _numeric(values)
+        if arr.size:
+            mean = float(arr.mean())
+            self._combine(arr.size, mean, float(((arr - mean) ** 2).sum()))
+            self._bounds(float(arr.min()), float(arr.max()))
+        return self
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        """Fold another accumulator (e.g. from a different chunk stream) in."""
+        if other.count:
+            self._combine(other.count, other._mean, other._m2)
+            self._bounds(other.min, other.max)
+        return self
+
+    def _combine(self, count: int, mean: float, m2: float) -> None:
+        total = self.count + count
+        delta = mean - self._mean
+        self._mean += delta * count / total
+        self._m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def _bounds(self, lo: float, hi: float) -> None:
+        self.min = lo if np.isnan(self.min) else min(self.min, lo)
+        self.max = hi if np.isnan(self.max) else max(self.max, hi)
+
+    @property
+    def mean(self) -> float:
+        return self._mean if self.count else float("nan")
+
+    def variance(self, ddof: int = 1) -> float:
+        """Return the variance (sample variance by default, like pandas)."""
+        if self.count <= ddof:
+            return float("nan")
+        return self._m2 / (self.count - ddof)
+
+    def std(self, ddof: int = 1) -> float:
+        return float(np.sqrt(self.variance(ddof)))
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "std": self.std(),
+            "min": self.min,
+            "max": self.max,
+        }
+
+
+class QuantileSketch:
+    """Approximate quantiles of a stream in bounded memory.
+
+    Values enter level 0.  Whenever a level holds more than *k* values it is
+    sorted and every other value (random offset) moves up one level, where
+    each value stands for twice as many inputs.  Total weight is preserved
+    exactly, so :attr:`count` stays exact.
+    """
+
+    def __init__(self, k: int = 2048, seed: Optional[int] = 0) -> None:
+        if k < 2:
+            raise ValueError("k must be at least 2")
+        self.k = k
+        self.count = 0
+        self._levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values: Any) -> "QuantileSketch":
+        """Add the non-null numeric *values* of one chunk."""
+        arr = _numeric(values)
+        if arr.size:
+            self.count += arr.size
+            self._levels[0] = np.concatenate([self._levels[0], arr])
+            self._compact()
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Fold another sketch in (it is left unchanged)."""
+        while len(self._levels) < len(other._levels):
+            self._levels.append(np.empty(0))
+        for level, values in enumerate(other._levels):
+            self._levels[level] = np.concatenate([self._levels[level], values])
+        self.count += other.count
+        self._compact()
+        return self
+
+    def _compact(self) -> None:
+        level = 0
+        while level < len(self._levels):
+            values = self._levels[level]
+            if values.size > self.k:
+                values = np.sort(values)
+                # An odd value out stays behind so the weight is preserved
+                even = values.size - values.size % 2
+                keep, values = values[even:], values[:even]
+                promoted = values[int(self._rng.integers(2)) :: 2]
+                self._levels[level] = keep
+                if level + 1 == len(self._levels):
+                    self._levels.append(np.empty(0))
+                self._levels[level + 1] = np.concatenate(
+                    [self._levels[level + 1], promoted]
+                )
+            level += 1
+
+    def quantile(self, q: float | Sequence[float]) -> float | List[float]:
+        """Return the approximate *q* quantile(s), ``0 <= q <= 1``."""
+        qs = np.atleast_1d(np.asarray(q, dtype=float))
+        if ((qs < 0) | (qs > 1)).any():
+            raise ValueError("quantiles must be between 0 and 1")
+        if not self.count:
+            out = [float("nan")] * qs.size
+        else:
+            values = np.concatenate(self._levels)
+            weights = np.concatenate(
+                [np.full(v.size, 2**level) for level, v in enumerate(self._levels)]
+            )
+            order = np.argsort(values, kind="stable")
+            cumulative = np.cumsum(weights[order])
+            # Nearest rank: the first value whose cumulative weight reaches q*n
+            ranks = np.maximum(np.ceil(qs * self.count), 1)
+            idx = np.minimum(np.searchsorted(cumulative, ranks), values.size - 1)
+            out = values[order][idx].tolist()
+        return out if np.ndim(q) else out[0]
+
+
+def _merge_moments(acc: Optional[pd.DataFrame], part: pd.DataFrame) -> pd.DataFrame:
+    """Combine two per-group ``count/mean/m2/min/max`` frames (Chan et al.)."""
+    if acc is None:
+        return part
+    a, b = acc.align(part, join="outer")
+    na, nb = a["count"].fillna(0), b["count"].fillna(0)
+    ma, mb = a["mean"].fillna(0.0), b["mean"].fillna(0.0)
+    total = na + nb
+    delta = mb - ma
+    return pd.DataFrame(
+        {
+            "count": total,
+            "mean": ma + delta * nb / total,
+            "m2": a["m2"].fillna(0.0)
+            + b["m2"].fillna(0.0)
+            + delta * delta * na * nb / total,
+            "min": np.fmin(a["min"], b["min"]),
+            "max": np.fmax(a["max"], b["max"]),
+        }
+    )
+
+
+def stream_aggregate(
+    chunks: Iterable[pd.DataFrame],
+    column: str,
+    *,
+    by: Optional[str | Sequence[str]] = None,
+    quantiles: Sequence[float] = (),
+    k: int = 2048,
+) -> pd.DataFrame:
+    """Summarise *column* over a stream of DataFrame *chunks*.
+
+    Returns one row per *by* group (or a single ``"all"`` row) with
+    ``count``, ``mean``, ``std``, ``min``, ``max`` and, for each of
+    *quantiles*, an approximate ``q<percent>`` column (e.g. ``q50``).  Null
+    values are ignored; groups without any value are left out.  Only the
+    per-group accumulators are kept between chunks.
+    """
+    keys = [by] if isinstance(by, str) else list(by or [])
+    moments: Optional[pd.DataFrame] = None
+    sketches: Dict[Any, QuantileSketch] = {}
+
+    for chunk in chunks:
+        missing = [c for c in [column, *keys] if c not in chunk.columns]
+        if missing:
+            raise KeyError(f"DataFrame missing required columns: {', '.join(missing)}")
+        frame = chunk[keys].assign(_value=pd.to_numeric(chunk[column], errors="coerce"))
+        frame = frame[frame["_value"].notna()]
+        if frame.empty:
+            continue
+        if keys:
+            group_by = keys[0] if len(keys) == 1 else keys
+        else:
+            group_by = np.zeros(len(frame), dtype=int)
+        # observed=True: typed chunks have categorical keys, and unobserved
+        # categories would come back as empty groups
+        grouped = frame.groupby(group_by, sort=False, observed=True)["_value"]
+        part = grouped.agg(["count", "mean", "min", "max"])
+        part["m2"] = grouped.var(ddof=0) * part["count"]
+        moments = _merge_moments(moments, part)
+        if quantiles:
+            for key, values in grouped:
+                sketches.setdefault(key, QuantileSketch(k)).update(values)
+
+    q_cols = [f"q{q * 100:g}" for q in quantiles]
+    if moments is None:
+        return pd.DataFrame(columns=["count", "mean", "std", "min", "max", *q_cols])
+
+    result = moments[["count", "mean"]].astype({"count": int})
+    ddof_count = moments["count"] - 1
+    result["std"] = np.sqrt((moments["m2"] / ddof_count).where(ddof_count > 0))
+    result["min"] = moments["min"]
+    result["max"] = moments["max"]
+    if quantiles:
+        estimates = [sketches[key].quantile(list(quantiles)) for key in result.index]
+        result[q_cols] = pd.DataFrame(estimates, index=result.index)
+    if keys:
+        return result.sort_index()
+    result.index = pd.Index(["all"])
+    return result
@@ -0,0 +1,494 @@
+"""
+Vectorised validation over the whole patient population.
+
+:meth:`ValidationEngine.validate_patient` runs two queries per patient and walks
+the vitals rows with ``iterrows``; validating every patient that way scales
+with *patients × rules × rows*.  This module loads ``patients`` and ``vitals``
+once and evaluates each rule as a pandas mask over the full population.
+
+The evaluators reproduce the per-patient semantics exactly – same
+``(rule_id, patient_id, field_name, issue_description)`` tuples in the same
+per-patient order – including the quirks that come from building a small
+DataFrame per patient (date-format inference from the patient's first date
+string, ints widened to floats when a patient's column contains nulls, row
+order taken from the index the per-patient lookup uses).
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import warnings
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:  # pandas < 2.2
+    from pandas._libs.tslibs.parsing import guess_datetime_format
+
+from app.utils.date_helpers import get_now
+from app.utils.validation_engine import (
+    ValidationResult,
+    ValidationRule,
+    evaluate_condition,
+)
+
+__all__ = ["PatientFrames", "load_patient_frames", "evaluate_rule"]
+
+# SQLite's default SQLITE_MAX_VARIABLE_NUMBER on older builds is 999
+_IN_CHUNK = 900
+# Strings pandas treats as missing when inferring a datetime format
+_NAT_STRINGS = {"", "NaT", "nat", "NAT", "nan", "NaN", "NAN"}
+_POS = "_patient_pos"
+
+
+@dataclass
+class PatientFrames:
+    """Population snapshot shared by all rule evaluators.
+
+    ``patients`` and ``vitals`` hold raw SQLite values (object dtype) so each
+    evaluator can apply the per-patient dtype rules itself.  ``vitals`` carries
+    an extra ``_patient_pos`` column with the patient's position in
+    ``patient_ids`` and is sorted by it; ``dates`` is the parsed ``date``
+    column aligned with ``vitals``.
+    """
+
+    patient_ids: List[str]
+    patients: pd.DataFrame
+    vitals: pd.DataFrame
+    dates: Optional[pd.Series]
+
+
+# ---------------------------------------------------------------------------
+# Loading
+# ---------------------------------------------------------------------------
+
+
+def _frame(cursor: sqlite3.Cursor, rows: list) -> pd.DataFrame:
+    columns = [d[0] for d in cursor.description]
+    return pd.DataFrame(rows, columns=columns, dtype=object)
+
+
+def _select_in(
+    conn: sqlite3.Connection,
+    sql: str,
+    column: str,
+    ids: Optional[Sequence[str]],
+    order_by: str = "",
+) -> pd.DataFrame:
+    """Run *sql* for all rows, or for ``column IN ids`` in parameter-safe chunks."""
+    if ids is None:
+        cursor = conn.execute(f"{sql}{order_by}")
+        return _frame(cursor, cursor.fetchall())
+
+    frames = []
+    for start in range(0, max(len(ids), 1), _IN_CHUNK):
+        chunk = list(ids[start : start + _IN_CHUNK])
+        marks = ",".join("?" * len(chunk)) or "NULL"
+        cursor = conn.execute(f"{sql} WHERE {column} IN ({marks}){order_by}", chunk)
+        frames.append(_frame(cursor, cursor.fetchall()))
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+def _vitals_row_order(conn: sqlite3.Connection) -> str:
+    """Return the ORDER BY that matches ``SELECT * FROM vitals WHERE patient_id = ?``.
+
+    The per-patient lookup returns rows in the order of whichever index the
+    planner picks (``uq_vitals_patient_date`` → by date), or rowid order for a
+    table scan.  Row order decides the order of range-check issues and which
+    value counts as "first", so the batch load sorts the same way.
+    """
+    order = ["patient_id"]
+    try:
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM vitals WHERE patient_id = ?", ("",)
+        ).fetchall()
+        detail = " ".join(str(row[-1]) for row in plan)
+        if "USING INDEX " in detail:
+            index = detail.split("USING INDEX ", 1)[1].split()[0]
+            cols = [r[2] for r in conn.execute(f'PRAGMA index_info("{index}")')]
+            order.extend(c for c in cols[1:] if c)
+    except sqlite3.Error:
+        pass
+    order.append("rowid")
+    return " ORDER BY " + ", ".join(f'"{c}"' if c != "rowid" else c for c in order)
+
+
+def _parse_dates(raw: pd.Series, owner: pd.Series) -> pd.Series:
+    """Parse *raw* dates exactly as ``convert_df_dates`` would per patient.
+
+    ``pd.to_datetime`` infers one format from the first non-null string of the
+    array it is given, so the same string can parse differently depending on
+    the patient.  Rows are grouped by their patient's inferred format and each
+    group is parsed with that explicit format; patients without an inferable
+    format fall back to a per-patient call.
+    """
+    if raw.empty:
+        return pd.Series(pd.NaT, index=raw.index, dtype="datetime64[ns]")
+
+    candidate = raw.where(
+        raw.map(lambda v: v is not None and not (isinstance(v, str) and v in _NAT_STRINGS))
+        & raw.notna()
+    )
+    first = candidate.groupby(owner, sort=False).first()
+
+    def _fmt(value: Any) -> Optional[str]:
+        if type(value) is not str:
+            return None
+        fmt = guess_datetime_format(value)
+        # tz offsets give tz-aware per-patient results; keep those per patient
+        if fmt is None or "%z" in fmt or "%Z" in fmt:
+            return None
+        return fmt
+
+    formats = first.map(_fmt)
+    row_format = owner.map(formats)
+
+    parsed = pd.Series(pd.NaT, index=raw.index, dtype="datetime64[ns]")
+    for fmt, idx in row_format.groupby(row_format, sort=False).groups.items():
+        try:
+            parsed.loc[idx] = pd.to_datetime(raw.loc[idx], format=fmt, errors="coerce")
+        except Exception:
+            row_format.loc[idx] = None
+
+    fallback = row_format.isna()
+    for _, idx in owner[fallback].groupby(owner[fallback], sort=False).groups.items():
+        # Rebuild the Series the way read_sql_query would type it per patient
+        values = pd.Series(raw.loc[idx].tolist(), index=idx)
+        try:
+            with warnings.catch_warnings():
+                # Same "could not infer format" warning the per-patient path logs
+                warnings.simplefilter("ignore", UserWarning)
+                converted = pd.to_datetime(values, errors="coerce")
+        except Exception:
+            continue
+        if _is_naive_datetime(converted):
+            parsed.loc[idx] = converted
+    return parsed
+
+
+def _is_naive_datetime(series: pd.Series) -> bool:
+    return pd.api.types.is_datetime64_dtype(series.dtype)
+
+
+def load_patient_frames(
+    conn: sqlite3.Connection, patient_ids: Optional[Sequence[str]] = None
+) -> PatientFrames:
+    """Load ``patients`` and ``vitals`` for *patient_ids* (default: everyone).
+
+    With ``patient_ids=None`` the order matches
+    :meth:`ValidationEngine.validate_all_patients`; otherwise the given order is
+    kept and unknown ids are dropped.
+    """
+    if patient_ids is None:
+        ids = [r[0] for r in conn.execute("SELECT id FROM patients WHERE id IS NOT NULL")]
+    else:
+        ids = [pid for pid in dict.fromkeys(patient_ids) if pid is not None]
+
+    patients = _select_in(conn, "SELECT * FROM patients", "id", None if patient_ids is None else ids)
+    patients = patients.drop_duplicates("id").set_index("id", drop=False)
+    ids = [pid for pid in ids if pid in patients.index]
+    patients = patients.loc[ids].reset_index(drop=True)
+
+    positions = {pid: i for i, pid in enumerate(ids)}
+    vitals = _select_in(
+        conn,
+        "SELECT * FROM vitals",
+        "patient_id",
+        None if patient_ids is None else ids,
+        _vitals_row_order(conn),
+    )
+    if "patient_id" in vitals.columns:
+        vitals[_POS] = vitals["patient_id"].map(positions)
+        vitals = vitals[vitals[_POS].notna()].copy()
+        vitals[_POS] = vitals[_POS].astype(int)
+        vitals = vitals.sort_values(_POS, kind="stable").reset_index(drop=True)
+    else:
+        vitals = vitals.iloc[0:0].assign(**{_POS: pd.Series(dtype=int)})
+
+    dates = None
+    if "date" in vitals.columns:
+        dates = _parse_dates(vitals["date"], vitals[_POS])
+    return PatientFrames(ids, patients, vitals, dates)
+
+
+# ---------------------------------------------------------------------------
+# Per-patient dtype emulation
+# ---------------------------------------------------------------------------
+
+
+def _safe_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def _widened(values: pd.Series, owner: pd.Series) -> pd.Series:
+    """Return *values* as the per-patient DataFrame would hold them.
+
+    ``read_sql_query`` turns a column of ints into float64 when the patient has
+    any NULL or float in it, and keeps raw values once a string is present.
+    """
+    if values.empty:
+        return values
+    is_null = values.isna()
+    is_float = values.map(lambda v: isinstance(v, float))
+    is_text = values.map(lambda v: not isinstance(v, (int, float)) and v is not None)
+    per = pd.DataFrame({"n": is_null, "f": is_float, "t": is_text}).groupby(owner).any()
+    widen_patient = (per["n"] | per["f"]) & ~per["t"]
+    widen_row = owner.map(widen_patient).fillna(False).astype(bool) & ~is_null
+    out = values.copy()
+    out[widen_row] = values[widen_row].map(float)
+    return out
+
+
+def _first_present(frames: PatientFrames, column: Optional[str]) -> pd.Series:
+    """Per-patient first non-null value of *column* (demographics before vitals)."""
+    out = pd.Series([None] * len(frames.patient_ids), dtype=object)
+    if column is None:
+        return out
+    vitals = frames.vitals
+    if column in vitals.columns:
+        values = frames.dates if column == "date" else _widened(vitals[column], vitals[_POS])
+        present = values[values.notna()]
+        first = present.groupby(vitals.loc[present.index, _POS]).first()
+        out.loc[first.index] = first.astype(object).values
+    if column in frames.patients.columns:
+        demo = frames.patients[column]
+        out = demo.where(demo.notna(), out).astype(object)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Rule evaluators
+# ---------------------------------------------------------------------------
+
+
+def _result(rule: ValidationRule, patient_id: str, field: str, text: str) -> ValidationResult:
+    return ValidationResult(
+        rule_id=rule.rule_id,
+        patient_id=patient_id,
+        field_name=field,
+        issue_description=text,
+    )
+
+
+def _missing(frames: PatientFrames, field: str) -> np.ndarray:
+    """Boolean array (per patient) mirroring ``_check_not_null``."""
+    if field in frames.patients.columns:
+        return frames.patients[field].isna().to_numpy()
+    vitals = frames.vitals
+    if field in vitals.columns:
+        has = np.zeros(len(frames.patient_ids), dtype=bool)
+        has[vitals.loc[vitals[field].notna(), _POS].unique()] = True
+        return ~has
+    return np.ones(len(frames.patient_ids), dtype=bool)
+
+
+def check_not_null(rule: ValidationRule, frames: PatientFrames, field: str) -> List[ValidationResult]:
+    ids = frames.patient_ids
+    return [
+        _result(rule, ids[pos], field, f"{field} is missing for patient")
+        for pos in np.flatnonzero(_missing(frames, field))
+    ]
+
+
+def check_value_range(
+    rule: ValidationRule,
+    frames: PatientFrames,
+    field: str,
+    min_value: Optional[float],
+    max_value: Optional[float],
+) -> List[ValidationResult]:
+    vitals = frames.vitals
+    if field not in vitals.columns or vitals.empty:
+        return []
+    if frames.dates is None:
+        # row["date"] raises per patient, so the rule yields nothing
+        return []
+
+    values = vitals[field].map(_safe_float).astype(float)
+    reached = vitals[field].notna() & frames.dates.notna()
+    keep = reached & values.notna()
+    if field == "weight" and "bmi" in vitals.columns:
+        raw_bmi = vitals["bmi"]
+        bmi = raw_bmi.map(_safe_float).astype(float)
+        keep &= ~(raw_bmi.notna() & ((bmi < 12) | (bmi > 70)))
+        # ``bmi_val < 12`` raises on a text BMI, and the per-patient engine
+        # then drops the whole rule for that patient
+        text = raw_bmi.notna() & raw_bmi.map(lambda v: not isinstance(v, (int, float, np.number)))
+        failed = vitals.loc[reached & text, _POS].unique()
+        keep &= ~vitals[_POS].isin(failed)
+
+    below = keep & (values < min_value) if min_value is not None else keep & False
+    above = keep & (values > max_value) if max_value is not None else keep & False
+    flagged = np.flatnonzero((below | above).to_numpy())
+
+    ids = frames.patient_ids
+    pos = vitals[_POS].to_numpy()
+    date_str = frames.dates.iloc[flagged].dt.strftime("%Y-%m-%d").tolist()
+    out: List[ValidationResult] = []
+    for i, row in enumerate(flagged):
+        value = float(values.iat[row])
+        pid = ids[pos[row]]
+        if below.iat[row]:
+            out.append(_result(rule, pid, field, f"{field} value {value} on {date_str[i]} is below minimum {min_value}"))
+        if above.iat[row]:
+            out.append(_result(rule, pid, field, f"{field} value {value} on {date_str[i]} is above maximum {max_value}"))
+    return out
+
+
+def check_measurement_frequency(
+    rule: ValidationRule,
+    frames: PatientFrames,
+    field: str,
+    max_days: int,
+    now: datetime,
+) -> List[ValidationResult]:
+    vitals = frames.vitals
+    if field not in vitals.columns or vitals.empty:
+        return []
+    ids = frames.patient_ids
+
+    with_vitals = set(vitals[_POS].unique())
+    measured_rows = vitals[field].notna()
+    measured = set(vitals.loc[measured_rows, _POS].unique())
+    issues: Dict[int, List[ValidationResult]] = {
+        pos: [_result(rule, ids[pos], field, f"No {field} measurements found for patient")]
+        for pos in sorted(with_vitals - measured)
+    }
+    if frames.dates is None:
+        return [r for pos in sorted(issues) for r in issues[pos]]
+
+    dated = pd.DataFrame({_POS: vitals[_POS], "date": frames.dates})
+    dated = dated[measured_rows & dated["date"].notna()]
+    dated = dated.sort_values([_POS, "date"], kind="stable")
+
+    gaps = dated.groupby(_POS)["date"].diff().dt.days
+    over = gaps[(gaps > 0) & (gaps > max_days)]
+    for row, days in zip(over.index, over.astype(int)):
+        pos = int(dated.at[row, _POS])
+        issues.setdefault(pos, []).append(
+            _result(rule, ids[pos], field, f"Gap of {days} days between {field} measurements (max allowed: {max_days})")
+        )
+
+    last = dated.groupby(_POS)["date"].max()
+    since = (pd.Timestamp(now) - last).dt.days.abs()
+    stale = since[(since > 0) & (since > max_days)]
+    for pos, days in zip(stale.index, stale.astype(int)):
+        last_str = last[pos].strftime("%Y-%m-%d")
+        issues.setdefault(int(pos), []).append(
+            _result(rule, ids[pos], field, f"No {field} measurement in {days} days (last: {last_str})")
+        )
+    return [r for pos in sorted(issues) for r in issues[pos]]
+
+
+def check_allowed_values(
+    rule: ValidationRule,
+    frames: PatientFrames,
+    field: str,
+    allowed_values: Optional[List[Any]],
+) -> List[ValidationResult]:
+    if allowed_values is None:
+        return []
+    allowed = {str(a) for a in allowed_values}
+    ids = frames.patient_ids
+    n = len(ids)
+
+    per_patient: List[List[Any]] = [[] for _ in range(n)]
+    if field in frames.patients.columns:
+        col = frames.patients[field]
+        for pos in np.flatnonzero(col.notna().to_numpy()):
+            per_patient[pos].append(col.iat[pos])
+    vitals = frames.vitals
+    if field in vitals.columns:
+        values = _widened(vitals[field], vitals[_POS])
+        mask = values.notna().to_numpy()
+        bad = values[mask].map(lambda v: str(v) not in allowed).to_numpy()
+        if bad.any():
+            pos_arr = vitals[_POS].to_numpy()[mask][bad]
+            vals = values[mask][bad].tolist()
+            seen: Dict[int, Dict[Any, None]] = {}
+            for pos, val in zip(pos_arr, vals):
+                seen.setdefault(int(pos), {}).setdefault(val, None)
+            for pos, uniq in seen.items():
+                per_patient[pos].extend(uniq)
+
+    out: List[ValidationResult] = []
+    for pos, values in enumerate(per_patient):
+        for val in values:
+            if str(val) not in allowed:
+                out.append(
+                    _result(rule, ids[pos], field, f"{field} value '{val}' not in allowed set {allowed_values}")
+                )
+    return out
+
+
+def check_conditional_not_null(
+    rule: ValidationRule,
+    frames: PatientFrames,
+    field: str,
+    conditions: list,
+) -> List[ValidationResult]:
+    if not conditions:
+        return check_not_null(rule, frames, field)
+
+    required = np.zeros(len(frames.patient_ids), dtype=bool)
+    for cond in conditions:
+        operator = cond.get("operator", "==")
+        value = cond.get("value")
+        lhs = _first_present(frames, cond.get("field"))
+        hit = lhs.map(lambda v: v is not None and bool(evaluate_condition(operator, v, value)))
+        required |= hit.to_numpy(dtype=bool)
+
+    ids = frames.patient_ids
+    missing = _missing(frames, field)
+    return [
+        _result(rule, ids[pos], field, f"{field} is missing for patient")
+        for pos in np.flatnonzero(required & missing)
+    ]
+
+
+def _patient_major(frames: PatientFrames, *groups: List[ValidationResult]) -> List[ValidationResult]:
+    """Merge result lists so each patient's results appear in *groups* order."""
+    order = {pid: i for i, pid in enumerate(frames.patient_ids)}
+    merged = [r for group in groups for r in group]
+    return sorted(merged, key=lambda r: order[r.patient_id])
+
+
+def evaluate_rule(
+    rule: ValidationRule, frames: PatientFrames, now: Optional[datetime] = None
+) -> List[ValidationResult]:
+    """Evaluate *rule* for every patient in *frames*.
+
+    Mirrors the dispatch in :meth:`ValidationEngine.validate_patient`; results
+    are ordered by patient, then as the per-patient check would emit them.
+    Exceptions propagate so the caller can log and skip the rule.
+    """
+    params = rule.parameters
+    logic = rule.validation_logic
+    field = params.get("field", "")
+
+    if logic == "date_diff_check":
+        if field == "weight":
+            return []
+        return check_measurement_frequency(
+            rule, frames, field, params.get("max_days_between", 60), now or get_now()
+        )
+    if logic == "range_check":
+        return check_value_range(rule, frames, field, params.get("min_value"), params.get("max_value"))
+    if logic == "not_null_check":
+        return check_not_null(rule, frames, field)
+    if logic == "allowed_values_check":
+        results = check_allowed_values(rule, frames, field, params.get("allowed_values", []))
+        if params.get("not_null"):
+            results = _patient_major(frames, results, check_not_null(rule, frames, field))
+        return results
+    if logic == "conditional_not_null_check":
+        return check_conditional_not_null(rule, frames, field, params.get("required_if", []))
+    return []
@@ -6,7 +6,12 @@ against a set of rules and identifying potential data quality issues.
 """
 
 import json
+import multiprocessing
+import os
 import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
 from typing import Dict, List, Any, Optional, Tuple
 import pandas as pd
 import logging
@@ -18,11 +23,40 @@ from app.utils.date_helpers import (
     convert_df_dates,
     get_now,
 )
+from app.utils.db_pool import get_connection, write_connection
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
 
+#: Default worker processes for :meth:`ValidationEngine.validate_patients_parallel`.
+DEFAULT_VALIDATION_WORKERS = int(
+    os.getenv("MH_VALIDATION_WORKERS", str(os.cpu_count() or 1))
+)
+#: Default number of patients per shard.
+DEFAULT_VALIDATION_CHUNK_SIZE = int(os.getenv("MH_VALIDATION_CHUNK_SIZE", "5000"))
+
+
+def evaluate_condition(operator: str, lhs: Any, rhs: Any) -> bool:
+    """Apply a ``required_if`` comparison; unsupported operators or errors are False."""
+    try:
+        if operator == "==":
+            return lhs == rhs
+        if operator == "!=":
+            return lhs != rhs
+        if operator == ">":
+            return lhs > rhs
+        if operator == "<":
+            return lhs < rhs
+        if operator == ">=":
+            return lhs >= rhs
+        if operator == "<=":
+            return lhs <= rhs
+    except Exception:
+        return False
+    return False
+
+
 class ValidationRule:
     """Simple class to represent a validation rule."""
 
@@ -115,6 +149,9 @@ class ValidationEngine:
         "health_coach_id",
     }
 
+    # Row in validation_watermark tracking consumed change-log entries
+    WATERMARK_NAME = "validation"
+
     def __init__(self, db_path: str):
         """
         Initialize the validation engine with a database connection.
@@ -124,6 +161,8 @@ class ValidationEngine:
         """
         self.db_path = db_path
         self.rules = []
+        # Per-shard timings from the last validate_patients_parallel() run
+        self.last_shard_timings: List[Dict[str, Any]] = []
         # logger.info(f"Found {result_count} existing validation results. Skipping initial validation.")
         # logger.info("Validation engine initialized successfully")
 
@@ -135,8 +174,7 @@ class ValidationEngine:
             List of ValidationRule objects
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            cursor = get_connection(self.db_path).cursor()
 
             cursor.execute(
                 "SELECT rule_id, description, rule_type, validation_logic, parameters, severity FROM validation_rules WHERE is_active = 1"
@@ -156,7 +194,6 @@ class ValidationEngine:
                 rules.append(ValidationRule(rule_dict))
 
             self.rules = rules
-            conn.close()
             return rules
 
         except Exception as e:
@@ -174,50 +211,50 @@ class ValidationEngine:
             True if successful, False otherwise
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            # Check if rule already exists
-            cursor.execute(
-                "SELECT 1 FROM validation_rules WHERE rule_id = ?", (rule.rule_id,)
-            )
-            exists = cursor.fetchone() is not None
-
-            if exists:
-                # Update existing rule
-                cursor.execute(
-                    "UPDATE validation_rules SET description = ?, rule_type = ?, validation_logic = ?, parameters = ?, severity = ?, updated_at = CURRENT_TIMESTAMP WHERE rule_id = ?",
-                    (
-                        rule.description,
-                        rule.rule_type,
-                        rule.validation_logic,
-                        json.dumps(rule.parameters),
-                        rule.severity,
-                        rule.rule_id,
-                    ),
-                )
-            else:
-                # Insert new rule
-                cursor.execute(
-                    "INSERT INTO validation_rules (rule_id, description, rule_type, validation_logic, parameters, severity) VALUES (?, ?, ?, ?, ?, ?)",
-                    (
-                        rule.rule_id,
-                        rule.description,
-                        rule.rule_type,
-                        rule.validation_logic,
-                        json.dumps(rule.parameters),
-                        rule.severity,
-                    ),
-                )
-
-            conn.commit()
-            conn.close()
+            with write_connection(self.db_path) as conn:
+                self._upsert_rule(conn.cursor(), rule)
             return True
 
         except Exception as e:
             logger.error(f"Error saving rule to database: {e}")
             return False
 
+    @staticmethod
+    def _upsert_rule(cursor, rule: ValidationRule) -> None:
+        """Insert or update *rule* using *cursor* (caller owns the transaction)."""
+        # Check if rule already exists
+        cursor.execute(
+            "SELECT 1 FROM validation_rules WHERE rule_id = ?", (rule.rule_id,)
+        )
+        exists = cursor.fetchone() is not None
+
+        if exists:
+            # Update existing rule
+            cursor.execute(
+                "UPDATE validation_rules SET description = ?, rule_type = ?, validation_logic = ?, parameters = ?, severity = ?, updated_at = CURRENT_TIMESTAMP WHERE rule_id = ?",
+                (
+                    rule.description,
+                    rule.rule_type,
+                    rule.validation_logic,
+                    json.dumps(rule.parameters),
+                    rule.severity,
+                    rule.rule_id,
+                ),
+            )
+        else:
+            # Insert new rule
+            cursor.execute(
+                "INSERT INTO validation_rules (rule_id, description, rule_type, validation_logic, parameters, severity) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    rule.rule_id,
+                    rule.description,
+                    rule.rule_type,
+                    rule.validation_logic,
+                    json.dumps(rule.parameters),
+                    rule.severity,
+                ),
+            )
+
     def save_validation_result(self, result: ValidationResult) -> bool:
         """
         Save a validation result to the database.
@@ -229,27 +266,59 @@ class ValidationEngine:
             True if successful, False otherwise
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with write_connection(self.db_path) as conn:
+                conn.execute(
+                    "INSERT INTO validation_results (rule_id, patient_id, field_name, issue_description, status, detected_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        result.rule_id,
+                        result.patient_id,
+                        result.field_name,
+                        result.issue_description,
+                        result.status,
+                        result.detected_at.isoformat(),
+                    ),
+                )
+            return True
 
-            cursor.execute(
-                "INSERT INTO validation_results (rule_id, patient_id, field_name, issue_description, status, detected_at) VALUES (?, ?, ?, ?, ?, ?)",
+        except Exception as e:
+            logger.error(f"Error saving validation result: {e}")
+            return False
+
+    @staticmethod
+    def _insert_results(conn, results: List[ValidationResult]) -> None:
+        """Bulk-insert *results* on *conn* (caller owns the transaction)."""
+        conn.executemany(
+            "INSERT INTO validation_results (rule_id, patient_id, field_name, issue_description, status, detected_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [
                 (
-                    result.rule_id,
-                    result.patient_id,
-                    result.field_name,
-                    result.issue_description,
-                    result.status,
-                    result.detected_at.isoformat(),
-                ),
-            )
+                    r.rule_id,
+                    r.patient_id,
+                    r.field_name,
+                    r.issue_description,
+                    r.status,
+                    r.detected_at.isoformat(),
+                )
+                for r in results
+            ],
+        )
 
-            conn.commit()
-            conn.close()
+    def save_validation_results(self, results: List[ValidationResult]) -> bool:
+        """
+        Save many validation results in one transaction.
+
+        Args:
+            results: ValidationResult objects to save
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            with write_connection(self.db_path) as conn:
+                self._insert_results(conn, results)
             return True
 
         except Exception as e:
-            logger.error(f"Error saving validation result: {e}")
+            logger.error(f"Error saving validation results: {e}")
             return False
 
     def get_patient_data(self, patient_id: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
@@ -263,7 +332,7 @@ class ValidationEngine:
             Tuple of (demographics DataFrame, vitals DataFrame)
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = get_connection(self.db_path)
 
             # Get patient demographics - fix column name from patient_id to id
             demographics = pd.read_sql_query(
@@ -288,7 +357,6 @@ class ValidationEngine:
                 if "date" in vitals.columns:
                     vitals = convert_df_dates(vitals, ["date"], utc=False)
 
-            conn.close()
             return demographics, vitals
 
         except Exception as e:
@@ -696,24 +764,6 @@ class ValidationEngine:
                 return vitals[col].dropna().iloc[0]
             return None
 
-        def _eval(operator: str, lhs, rhs):
-            try:
-                if operator == "==":
-                    return lhs == rhs
-                if operator == "!=":
-                    return lhs != rhs
-                if operator == ">":
-                    return lhs > rhs
-                if operator == "<":
-                    return lhs < rhs
-                if operator == ">=":
-                    return lhs >= rhs
-                if operator == "<=":
-                    return lhs <= rhs
-            except Exception:
-                return False
-            return False
-
         # If any condition matches, field becomes required
         required = False
         for cond in conditions:
@@ -723,7 +773,7 @@ class ValidationEngine:
             lhs_val = _get_value(c_field)
             if lhs_val is None:
                 continue
-            if _eval(operator, lhs_val, value):
+            if evaluate_condition(operator, lhs_val, value):
                 required = True
                 break
 
@@ -733,23 +783,352 @@ class ValidationEngine:
         # Now defer to not_null logic
         return self._check_not_null(patient_id, demographics, vitals, field, rule)
 
-    def validate_all_patients(self) -> Dict[str, List[ValidationResult]]:
+    def _evaluate_batch(
+        self,
+        patient_ids: Optional[List[str]],
+        now: Optional[datetime] = None,
+        timings: Optional[Dict[str, float]] = None,
+    ) -> Tuple[List[str], List[List[ValidationResult]]]:
+        """Run every active rule over *patient_ids*; returns (ids, per-rule results).
+
+        When *timings* is given it receives ``load_s`` and ``evaluate_s``.
+        """
+        from app.utils.validation_batch import evaluate_rule, load_patient_frames
+
+        if not self.rules:
+            self.load_rules_from_db()
+
+        started = time.perf_counter()
+        frames = load_patient_frames(get_connection(self.db_path), patient_ids)
+        loaded = time.perf_counter()
+        now = now or get_now()
+
+        per_rule: List[List[ValidationResult]] = []
+        for rule in self.rules:
+            field_name = (
+                rule.parameters.get("field")
+                if isinstance(rule.parameters, dict)
+                else None
+            )
+            if field_name and field_name in self.SKIPPED_FIELDS:
+                continue
+            try:
+                rule_results = evaluate_rule(rule, frames, now)
+            except Exception as exc:
+                logger.error("Rule %s failed in batch validation: %s", rule.rule_id, exc)
+                continue
+            if rule_results:
+                per_rule.append(rule_results)
+
+        if timings is not None:
+            timings["load_s"] = loaded - started
+            timings["evaluate_s"] = time.perf_counter() - loaded
+        return frames.patient_ids, per_rule
+
+    @staticmethod
+    def _group_by_patient(
+        patient_ids: List[str], per_rule: List[List[ValidationResult]]
+    ) -> Dict[str, List[ValidationResult]]:
+        grouped: Dict[str, List[ValidationResult]] = {pid: [] for pid in patient_ids}
+        for rule_results in per_rule:
+            for result in rule_results:
+                grouped[result.patient_id].append(result)
+        return {pid: found for pid, found in grouped.items() if found}
+
+    def validate_patients_batch(
+        self, patient_ids: Optional[List[str]] = None, save: bool = True
+    ) -> Dict[str, List[ValidationResult]]:
+        """
+        Validate many patients with one vectorised pass per rule.
+
+        Loads ``patients`` and ``vitals`` once and evaluates each rule over the
+        whole population (see :mod:`app.utils.validation_batch`).  Produces the
+        same results as calling :meth:`validate_patient` for each id, and writes
+        them with one ``executemany`` per rule inside a single transaction.
+
+        A full run (``patient_ids=None``) also advances the incremental
+        validation watermark, since every pending change has been covered.
+
+        Args:
+            patient_ids: Patients to validate (default: all patients)
+            save: Persist results to ``validation_results``
+
+        Returns:
+            Dictionary mapping patient IDs to lists of validation results
+        """
+        latest = None
+        if patient_ids is None and save:
+            latest = self._latest_change_id(get_connection(self.db_path))
+
+        ids, per_rule = self._evaluate_batch(patient_ids)
+
+        if save:
+            try:
+                with write_connection(self.db_path) as conn:
+                    for rule_results in per_rule:
+                        self._insert_results(conn, rule_results)
+                    if latest is not None:
+                        self._advance_watermark(conn, latest)
+            except Exception as e:
+                logger.error(f"Error saving validation results: {e}")
+
+        return self._group_by_patient(ids, per_rule)
+
+    def validate_patients_parallel(
+        self,
+        patient_ids: Optional[List[str]] = None,
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        save: bool = True,
+    ) -> Dict[str, List[ValidationResult]]:
+        """
+        Validate patients on several processes, one contiguous id shard each.
+
+        The patient list is split into shards of *chunk_size* ids and handed to
+        a ``ProcessPoolExecutor``.  Every worker opens its own read-only
+        connection and runs the batch evaluators on its shard; this process
+        is the only writer and inserts each shard's results as it arrives.
+        Per-shard timings are kept in :attr:`last_shard_timings`.
+
+        Args:
+            patient_ids: Patients to validate (default: all patients)
+            workers: Worker processes (default ``MH_VALIDATION_WORKERS`` or CPU count)
+            chunk_size: Patients per shard (default ``MH_VALIDATION_CHUNK_SIZE``)
+            save: Persist results to ``validation_results``
+
+        Returns:
+            Dictionary mapping patient IDs to lists of validation results
+        """
+        workers = workers or DEFAULT_VALIDATION_WORKERS
+        chunk_size = max(1, chunk_size or DEFAULT_VALIDATION_CHUNK_SIZE)
+
+        if not self.rules:
+            self.load_rules_from_db()
+
+        conn = get_connection(self.db_path)
+        latest = self._latest_change_id(conn) if patient_ids is None and save else None
+        if patient_ids is None:
+            patient_ids = [
+                row[0]
+                for row in conn.execute("SELECT id FROM patients WHERE id IS NOT NULL")
+            ]
+        shards = [
+            list(patient_ids[i : i + chunk_size])
+            for i in range(0, len(patient_ids), chunk_size)
+        ]
+        rule_dicts = [rule.to_dict() for rule in self.rules]
+        now = get_now()
+
+        self.last_shard_timings = []
+        shard_results: Dict[int, Tuple[List[str], List[List[ValidationResult]]]] = {}
+
+        def _merge(index: int, ids, per_rule, timing: Dict[str, Any]) -> None:
+            timing["shard"] = index
+            if save and per_rule:
+                started = time.perf_counter()
+                try:
+                    with write_connection(self.db_path) as wconn:
+                        for rule_results in per_rule:
+                            self._insert_results(wconn, rule_results)
+                except Exception as e:
+                    # Not complete: retried in-process and keeps the watermark back
+                    logger.error(f"Error saving results for shard {index}: {e}")
+                    return
+                timing["write_s"] = time.perf_counter() - started
+            shard_results[index] = (ids, per_rule)
+            self.last_shard_timings.append(timing)
+            logger.info(
+                "Validation shard %d: %d patients, load %.2fs, evaluate %.2fs (pid %s)",
+                index,
+                timing["patients"],
+                timing["load_s"],
+                timing["evaluate_s"],
+                timing["pid"],
+            )
+
+        pending = list(range(len(shards)))
+        if workers > 1 and len(shards) > 1:
+            try:
+                ctx = multiprocessing.get_context("spawn")
+                with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as executor:
+                    futures = {
+                        executor.submit(
+                            _validate_shard, self.db_path, rule_dicts, shards[index], now
+                        ): index
+                        for index in pending
+                    }
+                    for future in as_completed(futures):
+                        index = futures[future]
+                        try:
+                            _merge(index, *future.result())
+                        except Exception as e:
+                            logger.error(f"Validation shard {index} failed: {e}")
+            except Exception as e:
+                logger.warning(f"Process pool unavailable, validating in-process: {e}")
+            pending = [index for index in pending if index not in shard_results]
+
+        # Single-worker runs, plus any shard a worker could not finish
+        for index in pending:
+            try:
+                _merge(index, *_validate_shard(self.db_path, rule_dicts, shards[index], now))
+            except Exception as e:
+                logger.error(f"Validation shard {index} failed: {e}")
+
+        if latest is not None and len(shard_results) == len(shards):
+            with write_connection(self.db_path) as wconn:
+                self._advance_watermark(wconn, latest)
+
+        self.last_shard_timings.sort(key=lambda t: t["shard"])
+        merged: Dict[str, List[ValidationResult]] = {}
+        for index in sorted(shard_results):
+            merged.update(self._group_by_patient(*shard_results[index]))
+        return merged
+
+    # ------------------------------------------------------------------
+    # Incremental validation (change log + watermark, see migration 011)
+    # ------------------------------------------------------------------
+
+    def _latest_change_id(self, conn) -> Optional[int]:
+        """Highest change id seen so far (None if the change log is missing).
+
+        Consumed rows are pruned, so the watermark is the floor when the log
+        is empty.
+        """
+        try:
+            row = conn.execute(
+                """
+                SELECT MAX(
+                    COALESCE((SELECT MAX(change_id) FROM validation_change_log), 0),
+                    COALESCE((SELECT last_change_id FROM validation_watermark
+                              WHERE name = ?), 0)
+                )
+                """,
+                (self.WATERMARK_NAME,),
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0]
+
+    def get_validation_watermark(self) -> int:
+        """Return the last change-log id already covered by validation."""
+        try:
+            row = (
+                get_connection(self.db_path)
+                .execute(
+                    "SELECT last_change_id FROM validation_watermark WHERE name = ?",
+                    (self.WATERMARK_NAME,),
+                )
+                .fetchone()
+            )
+        except sqlite3.OperationalError:
+            return 0
+        return row[0] if row else 0
+
+    def _advance_watermark(self, conn, change_id: int) -> None:
+        """Move the watermark to *change_id* and prune consumed change-log rows."""
+        conn.execute(
+            """
+            INSERT INTO validation_watermark (name, last_change_id, updated_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(name) DO UPDATE SET
+                last_change_id = MAX(last_change_id, excluded.last_change_id),
+                updated_at = excluded.updated_at
+            """,
+            (self.WATERMARK_NAME, change_id),
+        )
+        conn.execute(
+            "DELETE FROM validation_change_log WHERE change_id <= ?", (change_id,)
+        )
+
+    def get_changed_patients(self) -> Tuple[int, List[str]]:
+        """
+        List patients touched since the validation watermark.
+
+        Returns:
+            Tuple of (latest change id, changed patient IDs in first-change order)
+        """
+        conn = get_connection(self.db_path)
+        latest = self._latest_change_id(conn)
+        if latest is None:
+            raise RuntimeError(
+                "validation_change_log missing – apply migration 011 first"
+            )
+        watermark = self.get_validation_watermark()
+        rows = conn.execute(
+            """
+            SELECT patient_id FROM validation_change_log
+            WHERE change_id > ? AND change_id <= ? AND patient_id IS NOT NULL
+            GROUP BY patient_id
+            ORDER BY MIN(change_id)
+            """,
+            (watermark, latest),
+        ).fetchall()
+        return latest, [row[0] for row in rows]
+
+    def validate_incremental(self) -> Dict[str, List[ValidationResult]]:
+        """
+        Re-validate only patients whose data changed since the last run.
+
+        Changed patients come from ``validation_change_log`` (filled by
+        triggers on ``patients``, ``vitals`` and ``data_corrections``).  Their
+        previous ``validation_results`` are replaced by the fresh ones and the
+        watermark is advanced in a single transaction, so readers never see a
+        half-updated patient and a failed run is simply retried next time.
+
+        Returns:
+            Dictionary mapping patient IDs to lists of validation results
+        """
+        try:
+            latest, changed = self.get_changed_patients()
+        except Exception as e:
+            logger.error(f"Error reading validation change log: {e}")
+            return {}
+
+        ids, per_rule = self._evaluate_batch(changed) if changed else ([], [])
+
+        try:
+            with write_connection(self.db_path) as conn:
+                conn.executemany(
+                    "DELETE FROM validation_results WHERE patient_id = ?",
+                    [(pid,) for pid in changed],
+                )
+                for rule_results in per_rule:
+                    self._insert_results(conn, rule_results)
+                self._advance_watermark(conn, latest)
+        except Exception as e:
+            logger.error(f"Error saving incremental validation results: {e}")
+            return {}
+
+        logger.info("Incremental validation re-checked %d patient(s)", len(changed))
+        return self._group_by_patient(ids, per_rule)
+
+    def validate_all_patients(
+        self, batch: bool = False
+    ) -> Dict[str, List[ValidationResult]]:
         """
         Validate all patients in the database.
 
+        Args:
+            batch: Use the vectorised :meth:`validate_patients_batch` path
+                instead of validating one patient at a time
+
         Returns:
             Dictionary mapping patient IDs to lists of validation results
         """
+        if batch:
+            try:
+                return self.validate_patients_batch()
+            except Exception as e:
+                logger.error(f"Error validating all patients: {e}")
+                return {}
+
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            cursor = get_connection(self.db_path).cursor()
 
             # Get all patient IDs - fix column name from patient_id to id
             cursor.execute("SELECT id FROM patients WHERE id IS NOT NULL")
             patient_ids = [row[0] for row in cursor.fetchall()]
 
-            conn.close()
-
             # Validate each patient
             results = {}
             for patient_id in patient_ids:
@@ -772,15 +1151,13 @@ class ValidationEngine:
             Dictionary with counts of issues by status
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            cursor = get_connection(self.db_path).cursor()
 
             cursor.execute(
                 "SELECT status, COUNT(*) FROM validation_results GROUP BY status"
             )
             results = {row[0]: row[1] for row in cursor.fetchall()}
 
-            conn.close()
             return results
 
         except Exception as e:
@@ -798,8 +1175,7 @@ class ValidationEngine:
             List of dictionaries with issue details
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            cursor = get_connection(self.db_path).cursor()
 
             cursor.execute(
                 """
@@ -837,9 +1213,22 @@ class ValidationEngine:
                     }
                 )
 
-            conn.close()
             return results
 
         except Exception as e:
             logger.error(f"Error getting patient issues: {e}")
             return []
+
+
+def _validate_shard(
+    db_path: str, rule_dicts: List[Dict[str, Any]], patient_ids: List[str], now: datetime
+) -> Tuple[List[str], List[List[ValidationResult]], Dict[str, Any]]:
+    """Process-pool worker: evaluate *rule_dicts* for one shard of patients."""
+    started = time.perf_counter()
+    engine = ValidationEngine(db_path)
+    engine.rules = [ValidationRule(d) for d in rule_dicts]
+    timing: Dict[str, Any] = {"patients": len(patient_ids), "pid": os.getpid()}
+    ids, per_rule = engine._evaluate_batch(patient_ids, now=now, timings=timing)
+    timing["results"] = sum(len(r) for r in per_rule)
+    timing["total_s"] = time.perf_counter() - started
+    return ids, per_rule, timing
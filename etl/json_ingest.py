@@ -1,63 +1,195 @@
 """Command-line ETL that ingests de-identified JSON export into SQLite.
 
 Usage:
-    python -m etl.json_ingest path/to/deidentified_patients.json [--db patient_data.db]
+    python -m etl.json_ingest path/to/deidentified_patients.json [--db patient_data.db] [--revalidate]
+        [--batch-size N] [--bulk [--rebuild-indexes]] [--force]
+        [--workers N [--queue-depth N]]
 
 The script is **idempotent** – running twice will not create duplicates.
+Patients whose export record is byte-for-byte unchanged since the previous
+ingest (by content hash, see :func:`content_hashes`) are skipped; ``--force``
+re-upserts everyone.
+
+With ``--batch-size`` the export is parsed incrementally and normalised and
+upserted *N* patients at a time, so memory stays flat for multi-GB files.
+``--bulk`` is meant for full reloads: each entity is staged in an unindexed
+temp table and merged with one set-based statement under relaxed durability
+PRAGMAs; ``--rebuild-indexes`` additionally drops secondary indexes of empty
+tables during the load and recreates them at the end.
+
+``--workers N`` pipelines the ingest: batches are change-filtered and
+normalised by *N* worker processes while the main process keeps parsing and
+is the only one writing to SQLite.
 """
 
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import logging
+import multiprocessing
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from functools import partial
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 
 import pandas as pd
 import sqlite3
 
 from app.utils.db_migrations import apply_pending_migrations
 from app.utils.saved_questions_db import DB_FILE  # reuse path helper
+from app.utils.feature_store import refresh_features
+from app.utils.snapshot_cache import refresh_snapshots
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
+# ---------------------------------------------------------------------------
+# Streaming reader
+# ---------------------------------------------------------------------------
+
+_WS = " \t\r\n"
+
+
+def iter_json_array(path: Path, chunk_size: int = 1 << 20) -> Iterator[Any]:
+    """Yield the elements of the top-level JSON array in *path* one by one.
+
+    Reads *chunk_size* characters at a time and decodes each element with
+    :meth:`json.JSONDecoder.raw_decode`, so only the current element (plus
+    one chunk) is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as fh:
+        buf, pos, state = "", 0, "start"
+        while True:
+            while pos < len(buf) and buf[pos] in _WS:
+                pos += 1
+            if pos == len(buf):
+                chunk = fh.read(chunk_size)
+                if not chunk:
+                    raise ValueError(f"{path}: unexpected end of JSON array")
+                buf, pos = chunk, 0
+                continue
+
+            ch = buf[pos]
+            if state == "start":
+                if ch != "[":
+                    raise ValueError(f"{path}: expected a top-level JSON array")
+                pos, state = pos + 1, "first"
+            elif state == "after":
+                if ch == "]":
+                    return
+                if ch != ",":
+                    raise ValueError(f"{path}: expected ',' or ']' at {ch!r}")
+                pos, state = pos + 1, "next"
+            elif state == "first" and ch == "]":
+                return
+            else:
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    item, end = None, None
+                # A complete element is followed by ',' or ']'.  Anything else
+                # means it is incomplete (or a number cut at the chunk edge):
+                # read more and decode again from the same position
+                nxt = len(buf) if end is None else end
+                while nxt < len(buf) and buf[nxt] in _WS:
+                    nxt += 1
+                if nxt == len(buf) or buf[nxt] not in ",]":
+                    chunk = fh.read(chunk_size)
+                    if chunk:
+                        buf, pos = buf[pos:] + chunk, 0
+                        continue
+                    if end is None:
+                        raise ValueError(f"{path}: truncated JSON element")
+                yield item
+                pos, state = end, "after"
+                if pos > chunk_size:
+                    buf, pos = buf[pos:], 0
+
+
+def _batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    it = iter(items)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
 # ---------------------------------------------------------------------------
 # Normalisers
 # ---------------------------------------------------------------------------
 
 
+_PATIENT_COLUMNS = {
+    "id",
+    "first_name",
+    "last_name",
+    "birth_date",
+    "gender",
+    "ethnicity",
+    "engagement_score",
+    "program_start_date",
+    "program_end_date",
+    "active",
+    "etoh",
+    "tobacco",
+    "glp1_full",
+}
+
+
 def _norm_patients(raw: List[Dict[str, Any]]) -> pd.DataFrame:
     df = pd.DataFrame(raw)
-    allowed = {
-        "id",
-        "first_name",
-        "last_name",
-        "birth_date",
-        "gender",
-        "ethnicity",
-        "engagement_score",
-        "program_start_date",
-        "program_end_date",
-        "active",
-        "etoh",
-        "tobacco",
-        "glp1_full",
-    }
-    present = [c for c in df.columns if c in allowed]
+    present = [c for c in df.columns if c in _PATIENT_COLUMNS]
     return df[present]
 
 
 def _extract_nested(raw: List[Dict[str, Any]], key: str) -> pd.DataFrame:
-    rows: List[Dict[str, Any]] = []
-    for p in raw:
-        nested = p.get(key) or []
-        for item in nested:
-            if "patient_id" not in item:
-                item["patient_id"] = p["id"]
-            rows.append(item)
-    return pd.DataFrame(rows)
+    """Flatten the *key* lists of all patients in *raw* into one frame.
+
+    Items without a ``patient_id`` inherit their parent's ``id``; *raw* itself
+    is left untouched.  Columns keep the order the items' keys first appear
+    in, with an inherited ``patient_id`` placed after the first item's keys.
+    """
+    nested = pd.Series(
+        [p.get(key) or [] for p in raw],
+        index=[p.get("id") for p in raw],
+        dtype=object,
+    ).explode()
+    nested = nested[nested.notna()]  # patients without items explode to NaN
+    if nested.empty:
+        return pd.DataFrame()
+
+    items = nested.tolist()
+    df = pd.DataFrame(items)
+    owners = nested.index.to_numpy()
+    if "patient_id" in df.columns:
+        missing = df["patient_id"].isna().to_numpy()
+        df.loc[missing, "patient_id"] = owners[missing]
+    else:
+        df["patient_id"] = owners
+    if "patient_id" not in items[0]:
+        columns = [c for c in df.columns if c != "patient_id"]
+        columns.insert(len(items[0]), "patient_id")
+        df = df[columns]
+    return df
 
 
 def _explode_scores(scores_df: pd.DataFrame) -> pd.DataFrame:
@@ -84,15 +216,22 @@ def _explode_mental(mh_df: pd.DataFrame) -> pd.DataFrame:
 
 
 def _explode_labs(lab_df: pd.DataFrame) -> pd.DataFrame:
-    keep_cols = {"patient_id", "date"}
-    long_rows = []
-    for _, row in lab_df.iterrows():
-        base = {"patient_id": row["patient_id"], "date": row["date"]}
-        for col, val in row.items():
-            if col in keep_cols or pd.isna(val):
-                continue
-            long_rows.append({**base, "test_name": col, "value": val})
-    return pd.DataFrame(long_rows)
+    if lab_df.empty:
+        return pd.DataFrame()
+    keep_cols = ["patient_id", "date"]
+    long = lab_df.melt(
+        id_vars=keep_cols,
+        value_vars=[c for c in lab_df.columns if c not in keep_cols],
+        var_name="test_name",
+        value_name="value",
+        ignore_index=False,
+    )
+    long = long[long["value"].notna()]
+    # Re-infer after dropping NaNs, as building the frame from scalars did
+    long = long.assign(value=long["value"].infer_objects())
+    # melt is column-major; a stable sort on the source row restores the
+    # row-by-row order, which decides the lab_id each value is inserted with
+    return long.sort_index(kind="stable").reset_index(drop=True)
 
 
 # ---------------------------------------------------------------------------
@@ -100,6 +239,16 @@ def _explode_labs(lab_df: pd.DataFrame) -> pd.DataFrame:
 # ---------------------------------------------------------------------------
 
 
+def _conflict_clause(columns: List[str], unique_cols: List[str]) -> str:
+    non_pk = [c for c in columns if c not in unique_cols]
+    if non_pk:
+        update_expr = ", ".join([f"{c}=excluded.{c}" for c in non_pk])
+        action = f"DO UPDATE SET {update_expr}"
+    else:
+        action = "DO NOTHING"
+    return f"ON CONFLICT({', '.join(unique_cols)}) {action}"
+
+
 def _bulk_upsert(
     df: pd.DataFrame, table: str, unique_cols: List[str], conn: sqlite3.Connection
 ):
@@ -107,95 +256,628 @@ def _bulk_upsert(
         return 0
     placeholders = ", ".join(["?"] * len(df.columns))
     columns = ", ".join(df.columns)
-    non_pk = [c for c in df.columns if c not in unique_cols]
-    if non_pk:
-        update_expr = ", ".join([f"{c}=excluded.{c}" for c in non_pk])
-        conflict_clause = f"DO UPDATE SET {update_expr}"
-    else:
-        conflict_clause = "DO NOTHING"
     sql = (
         f"INSERT INTO {table} ({columns}) VALUES ({placeholders}) "
-        f"ON CONFLICT({', '.join(unique_cols)}) {conflict_clause};"
+        f"{_conflict_clause(list(df.columns), unique_cols)};"
     )
     conn.executemany(sql, df.itertuples(index=False, name=None))
     return len(df)
 
 
+def _staged_upsert(
+    df: pd.DataFrame,
+    table: str,
+    unique_cols: List[str],
+    conn: sqlite3.Connection,
+    timings: Optional[Dict[str, float]] = None,
+):
+    """Bulk-mode counterpart of :func:`_bulk_upsert`.
+
+    Rows are appended to an unindexed temp table shaped like *table* and then
+    merged with a single ``INSERT ... SELECT ... ON CONFLICT`` statement, so
+    the live table's indexes are probed once per row inside one statement
+    instead of once per ``executemany`` step.  Elapsed time is added to
+    ``timings[table]``.
+    """
+    if df.empty:
+        return 0
+    start = time.perf_counter()
+    columns = ", ".join(df.columns)
+    placeholders = ", ".join(["?"] * len(df.columns))
+    stage = f"temp._stage_{table}"
+    conn.execute(f"DROP TABLE IF EXISTS {stage}")
+    # Copies column affinities only – no constraints, indexes or triggers
+    conn.execute(f"CREATE TABLE {stage} AS SELECT {columns} FROM main.{table} WHERE 0")
+    conn.executemany(
+        f"INSERT INTO {stage} ({columns}) VALUES ({placeholders})",
+        df.itertuples(index=False, name=None),
+    )
+    # ``WHERE true`` keeps SQLite from parsing ON CONFLICT as a join constraint
+    conn.execute(
+        f"INSERT INTO main.{table} ({columns}) SELECT {columns} FROM {stage} "
+        f"WHERE true {_conflict_clause(list(df.columns), unique_cols)}"
+    )
+    conn.execute(f"DROP TABLE {stage}")
+    if timings is not None:
+        timings[table] = timings.get(table, 0.0) + time.perf_counter() - start
+    return len(df)
+
+
+# Durability is traded for speed while a bulk load runs; the previous values
+# are restored afterwards.  WAL databases keep their journal mode because
+# leaving WAL needs exclusive access and would disturb pooled readers.
+_BULK_PRAGMAS = {
+    "synchronous": "OFF",
+    "journal_mode": "MEMORY",
+    "cache_size": "-262144",  # 256 MiB
+    "temp_store": "MEMORY",
+}
+
+
+@contextmanager
+def _bulk_pragmas(conn: sqlite3.Connection) -> Iterator[None]:
+    previous: Dict[str, Any] = {}
+    for name, value in _BULK_PRAGMAS.items():
+        current = conn.execute(f"PRAGMA {name}").fetchone()[0]
+        if name == "journal_mode" and str(current).lower() == "wal":
+            continue
+        try:
+            conn.execute(f"PRAGMA {name} = {value}")
+            previous[name] = current
+        except sqlite3.Error as exc:
+            logger.debug("Could not apply PRAGMA %s for bulk load: %s", name, exc)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            try:
+                conn.execute(f"PRAGMA {name} = {value}")
+            except sqlite3.Error as exc:
+                logger.warning("Could not restore PRAGMA %s: %s", name, exc)
+
+
+def _drop_secondary_indexes(
+    conn: sqlite3.Connection, tables: List[str]
+) -> List[str]:
+    """Drop non-unique indexes of the *empty* tables in *tables*.
+
+    Returns their ``CREATE INDEX`` statements for :func:`_rebuild_indexes`.
+    Unique indexes stay because the upserts' ``ON CONFLICT`` targets need
+    them; tables that already hold rows keep everything.
+    """
+    statements: List[str] = []
+    for table in tables:
+        if conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+            continue
+        rows = conn.execute(
+            "SELECT name, sql FROM sqlite_master "
+            "WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (table,),
+        ).fetchall()
+        for name, sql in rows:
+            if sql.lstrip().upper().startswith("CREATE UNIQUE"):
+                continue
+            conn.execute(f'DROP INDEX "{name}"')
+            statements.append(sql)
+    if statements:
+        logger.info("Dropped %d secondary indexes for bulk load", len(statements))
+    return statements
+
+
+def _rebuild_indexes(conn: sqlite3.Connection, statements: List[str]) -> None:
+    start = time.perf_counter()
+    for sql in statements:
+        conn.execute(sql)
+    if statements:
+        logger.info(
+            "Rebuilt %d indexes in %.2f s", len(statements), time.perf_counter() - start
+        )
+
+
+def _restore_indexes(conn: sqlite3.Connection, statements: List[str]) -> None:
+    """Re-create dropped indexes after a failed load.
+
+    ``DROP INDEX`` runs outside any transaction (sqlite3 only opens one for
+    DML), so rolling the load back does not bring the indexes back.
+    """
+    existing = {
+        row[0]
+        for row in conn.execute("SELECT sql FROM sqlite_master WHERE type = 'index'")
+    }
+    for sql in statements:
+        if sql in existing:
+            continue
+        try:
+            conn.execute(sql)
+        except sqlite3.Error as exc:
+            logger.error("Could not restore index after failed ingest: %s", exc)
+    conn.commit()
+
+
 # ---------------------------------------------------------------------------
 # Main ingest
 # ---------------------------------------------------------------------------
 
 
-def ingest(json_path: Path, db_path: Path = Path(DB_FILE)) -> dict:
-    apply_pending_migrations(str(db_path))
-    raw = json.loads(Path(json_path).read_text())
+# Conflict target of each table's upsert; pmh_id is autoincremented, so PMH
+# rows are always appended (duplicates allowed)
+_UNIQUE_COLS = {
+    "patients": ["id"],
+    "vitals": ["patient_id", "date"],
+    "scores": ["patient_id", "date", "score_type"],
+    "mental_health": ["patient_id", "date", "assessment_type"],
+    "lab_results": ["patient_id", "date", "test_name"],
+    "pmh": ["pmh_id"],
+}
+_TABLES = list(_UNIQUE_COLS)
+
+
+def normalise_batch(raw: List[Dict[str, Any]]) -> Dict[str, pd.DataFrame]:
+    """Reshape *raw* export patients into one frame per target table."""
+    return {
+        "patients": _norm_patients(raw),
+        "vitals": _extract_nested(raw, "vitals").rename(
+            columns={"systolic_pressure": "sbp", "diastolic_pressure": "dbp"}
+        ),
+        "scores": _explode_scores(_extract_nested(raw, "scores")),
+        "mental_health": _explode_mental(_extract_nested(raw, "mental_health")),
+        "lab_results": _explode_labs(_extract_nested(raw, "lab_results")),
+        "pmh": _extract_nested(raw, "pmh_data").rename(columns={"name": "condition"}),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Change detection
+# ---------------------------------------------------------------------------
 
-    patients_df = _norm_patients(raw)
-    vitals_df = _extract_nested(raw, "vitals").rename(
-        columns={"systolic_pressure": "sbp", "diastolic_pressure": "dbp"}
+# Export key holding each nested entity; the "patients" entity is the
+# demographic fields of the record itself
+_ENTITY_KEYS = {
+    "vitals": "vitals",
+    "scores": "scores",
+    "mental_health": "mental_health",
+    "lab_results": "lab_results",
+    "pmh": "pmh_data",
+}
+_HASH_KEYS = ["record", *_TABLES]
+_PATIENT_COUNTS = ["new_patients", "changed_patients", "skipped_patients"]
+_IN_CHUNK = 500  # ids per IN (...) list, well below SQLite's variable limit
+
+
+def _digest(obj: Any) -> str:
+    canonical = json.dumps(obj, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+def content_hashes(patient: Dict[str, Any]) -> Dict[str, str]:
+    """Return the content hashes of one export *patient* record.
+
+    One hash per target table over the canonical JSON of the part of the
+    record that feeds it, plus ``"record"`` over all of them.
+    """
+    hashes = {
+        "patients": _digest({k: v for k, v in patient.items() if k in _PATIENT_COLUMNS})
+    }
+    for table, key in _ENTITY_KEYS.items():
+        hashes[table] = _digest(patient.get(key) or [])
+    hashes["record"] = _digest([hashes[t] for t in _TABLES])
+    return hashes
+
+
+def _select_in(
+    conn: sqlite3.Connection, sql: str, ids: List[Any]
+) -> Iterator[tuple]:
+    """Run *sql* (with a ``{marks}`` slot for the IN list) over *ids* in chunks."""
+    for start in range(0, len(ids), _IN_CHUNK):
+        chunk = ids[start : start + _IN_CHUNK]
+        marks = ", ".join(["?"] * len(chunk))
+        yield from conn.execute(sql.format(marks=marks), chunk)
+
+
+def _lookup_hashes(
+    conn: sqlite3.Connection, ids: List[Any]
+) -> Tuple[Dict[Any, Dict[str, str]], Set[Any]]:
+    """Return the stored hashes of *ids* and the subset already in ``patients``."""
+    hash_cols = ", ".join(f"{k}_hash" for k in _HASH_KEYS)
+    stored = {
+        row[0]: dict(zip(_HASH_KEYS, row[1:]))
+        for row in _select_in(
+            conn,
+            f"SELECT patient_id, {hash_cols} FROM patient_ingest_hashes "
+            "WHERE patient_id IN ({marks})",
+            ids,
+        )
+    }
+    unhashed = [pid for pid in ids if pid not in stored]
+    known = set(stored) | {
+        row[0]
+        for row in _select_in(
+            conn, "SELECT id FROM patients WHERE id IN ({marks})", unhashed
+        )
+    }
+    return stored, known
+
+
+@dataclass
+class _PreparedBatch:
+    """Normalised, change-filtered frames of one batch, ready for the writer."""
+
+    patients: int
+    frames: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    replace_pmh: List[Any] = field(default_factory=list)
+    hashes: List[tuple] = field(default_factory=list)
+    counts: Dict[str, int] = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+def _prepare_batch(
+    raw: List[Dict[str, Any]],
+    stored: Dict[Any, Dict[str, str]],
+    known: Set[Any],
+    skip_unchanged: bool = True,
+) -> _PreparedBatch:
+    """Hash, change-filter and normalise *raw* without touching the database.
+
+    *stored* and *known* come from :func:`_lookup_hashes`.  Unchanged patients
+    are dropped; for changed ones, nested entities whose hash is unchanged
+    are removed before normalising and the ``patients`` row is kept only if
+    the demographics changed.  Existing patients whose PMH changed are listed
+    in ``replace_pmh``.  Pure CPU work, so pipelined ingests run it in worker
+    processes.
+    """
+    start = time.perf_counter()
+    counts = dict.fromkeys(_PATIENT_COUNTS, 0)
+    records, keep_rows, replace_pmh, hashes = [], set(), [], []
+    for patient in raw:
+        pid = patient.get("id")
+        new = content_hashes(patient)
+        old = stored.get(pid) if skip_unchanged else None
+        if old is not None and old["record"] == new["record"]:
+            counts["skipped_patients"] += 1
+            continue
+        counts["changed_patients" if pid in known else "new_patients"] += 1
+        hashes.append((pid, new))
+
+        write = {t for t in _TABLES if old is None or old[t] != new[t]}
+        if "patients" in write:
+            keep_rows.add(pid)
+        if skip_unchanged and "pmh" in write and pid in known:
+            replace_pmh.append(pid)
+        drop = {key for t, key in _ENTITY_KEYS.items() if t not in write}
+        records.append({k: v for k, v in patient.items() if k not in drop})
+
+    frames = normalise_batch(records) if records else {}
+    patients_df = frames.get("patients")
+    if patients_df is not None and "id" in patients_df.columns:
+        frames["patients"] = patients_df[patients_df["id"].isin(keep_rows)]
+    return _PreparedBatch(
+        patients=len(raw),
+        frames=frames,
+        replace_pmh=replace_pmh,
+        hashes=hashes,
+        counts=counts,
+        seconds=time.perf_counter() - start,
     )
-    scores_raw = _extract_nested(raw, "scores")
-    scores_df = _explode_scores(scores_raw)
-    mh_raw = _extract_nested(raw, "mental_health")
-    mh_df = _explode_mental(mh_raw)
-    labs_raw = _extract_nested(raw, "lab_results")
-    labs_df = _explode_labs(labs_raw)
-    pmh_df = _extract_nested(raw, "pmh_data").rename(columns={"name": "condition"})
+
+
+def _write_batch(
+    prepared: _PreparedBatch,
+    conn: sqlite3.Connection,
+    total: Dict[str, int],
+    upsert: Callable[..., int] = _bulk_upsert,
+) -> None:
+    """Apply a :class:`_PreparedBatch`, adding row and patient counts to *total*.
+
+    PMH rows have no natural key, so a changed PMH list replaces the
+    patient's rows instead of being appended again.
+    """
+    for key, count in prepared.counts.items():
+        total[key] += count
+    if not prepared.hashes:
+        return
+    replace_pmh = prepared.replace_pmh
+    for start in range(0, len(replace_pmh), _IN_CHUNK):
+        chunk = replace_pmh[start : start + _IN_CHUNK]
+        conn.execute(
+            f"DELETE FROM pmh WHERE patient_id IN ({', '.join(['?'] * len(chunk))})",
+            chunk,
+        )
+    for table, df in prepared.frames.items():
+        total[table] += upsert(df, table, _UNIQUE_COLS[table], conn)
+
+    # After the writes: their triggers drop the previous hash rows
+    conn.executemany(
+        f"INSERT OR REPLACE INTO patient_ingest_hashes "
+        f"(patient_id, {', '.join(f'{k}_hash' for k in _HASH_KEYS)}) "
+        f"VALUES ({', '.join(['?'] * (len(_HASH_KEYS) + 1))})",
+        [(pid, *(h[k] for k in _HASH_KEYS)) for pid, h in prepared.hashes],
+    )
+
+
+def _upsert_batch(
+    raw: List[Dict[str, Any]],
+    conn: sqlite3.Connection,
+    total: Dict[str, int],
+    upsert: Callable[..., int] = _bulk_upsert,
+    skip_unchanged: bool = True,
+) -> None:
+    """Write the changed parts of *raw* patients, adding row counts to *total*.
+
+    Unchanged patients are skipped and, for changed ones, only entities whose
+    hash differs are upserted (see :func:`_prepare_batch`).
+    """
+    stored, known = _lookup_hashes(conn, [p.get("id") for p in raw])
+    _write_batch(_prepare_batch(raw, stored, known, skip_unchanged), conn, total, upsert)
+
+
+# ---------------------------------------------------------------------------
+# Pipelined ingest
+# ---------------------------------------------------------------------------
+
+DEFAULT_INGEST_WORKERS = int(os.getenv("MH_INGEST_WORKERS", "1"))
+DEFAULT_INGEST_CHUNK_SIZE = int(os.getenv("MH_INGEST_CHUNK_SIZE", "5000"))
+
+
+def _run_pipeline(
+    batches: Iterable[List[Dict[str, Any]]],
+    conn: sqlite3.Connection,
+    total: Dict[str, int],
+    upsert: Callable[..., int],
+    skip_unchanged: bool,
+    workers: int,
+    queue_depth: int,
+    on_batch: Callable[[int], None],
+) -> Dict[str, Dict[str, float]]:
+    """Normalise *batches* in a process pool while this process writes.
+
+    The calling process is the reader and the single SQLite writer: it parses
+    the next batch, looks up its stored hashes and submits
+    :func:`_prepare_batch` to the pool, then writes finished batches in
+    submission order.  At most *queue_depth* batches are in flight; once the
+    queue is full the reader blocks on the oldest one, so parsing cannot run
+    ahead of the writer.  A batch sharing patient ids with an in-flight batch
+    waits for it to be written first, so repeated ids see each other's hashes
+    exactly as in a serial ingest.
+
+    Returns per-stage counters: patients read, patients normalised (summed
+    worker seconds) and rows written.
+    """
+    stats = {
+        "read": {"patients": 0, "seconds": 0.0},
+        "normalise": {"patients": 0, "seconds": 0.0},
+        "write": {"rows": 0, "seconds": 0.0},
+    }
+    in_flight: Deque[Tuple[Future, Set[Any]]] = deque()
+    pending: Counter = Counter()
+
+    def drain_one() -> None:
+        future, ids = in_flight.popleft()
+        prepared = future.result()
+        start = time.perf_counter()
+        rows = sum(total[t] for t in _TABLES)
+        _write_batch(prepared, conn, total, upsert)
+        stats["write"]["rows"] += sum(total[t] for t in _TABLES) - rows
+        stats["write"]["seconds"] += time.perf_counter() - start
+        stats["normalise"]["patients"] += prepared.patients
+        stats["normalise"]["seconds"] += prepared.seconds
+        pending.subtract(ids)
+        on_batch(prepared.patients)
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        batches = iter(batches)
+        while True:
+            start = time.perf_counter()
+            batch = next(batches, None)
+            if batch is None:
+                break
+            ids = [p.get("id") for p in batch]
+            stats["read"]["patients"] += len(batch)
+            stats["read"]["seconds"] += time.perf_counter() - start
+            while in_flight and any(pending[pid] > 0 for pid in ids):
+                drain_one()
+            stored, known = _lookup_hashes(conn, ids)
+            future = pool.submit(_prepare_batch, batch, stored, known, skip_unchanged)
+            in_flight.append((future, set(ids)))
+            pending.update(set(ids))
+            if len(in_flight) >= queue_depth:
+                drain_one()
+        while in_flight:
+            drain_one()
+
+    for stage, counters in stats.items():
+        unit, count = next((k, v) for k, v in counters.items() if k != "seconds")
+        secs = counters["seconds"]
+        counters["per_second"] = round(count / secs) if secs > 0 else count
+        logger.info(
+            "Pipeline %s: %d %s in %.2f s (%d %s/s)",
+            stage,
+            count,
+            unit,
+            secs,
+            counters["per_second"],
+            unit,
+        )
+    return stats
+
+
+def ingest(
+    json_path: Path,
+    db_path: Path = Path(DB_FILE),
+    revalidate: bool = False,
+    *,
+    batch_size: Optional[int] = None,
+    progress: Optional[Callable[[int, Dict[str, int]], None]] = None,
+    bulk: bool = False,
+    rebuild_indexes: bool = False,
+    skip_unchanged: bool = True,
+    workers: Optional[int] = None,
+    queue_depth: Optional[int] = None,
+) -> dict:
+    """Upsert *json_path* into *db_path* and return per-table row counts.
+
+    With ``revalidate=True`` the validation engine re-checks only the patients
+    this ingest actually changed (see ``ValidationEngine.validate_incremental``)
+    and the number of issues found is returned under ``"validation_issues"``.
+
+    ``batch_size`` switches to streaming mode: patients are parsed
+    incrementally and normalised/upserted *batch_size* at a time, keeping
+    memory flat regardless of file size.  Upsert semantics, final row counts
+    and the ``ingest_audit`` row are the same as a whole-file ingest, which
+    also still runs in a single transaction.  ``progress(patients_done,
+    totals)`` is called after each batch.
+
+    ``bulk=True`` selects the full-reload path: staged set-based merges (see
+    :func:`_staged_upsert`) under :data:`_BULK_PRAGMAS`, with per-table
+    throughput logged and returned under ``"rows_per_second"``.
+    ``rebuild_indexes=True`` (bulk only) drops the secondary indexes of tables
+    that start out empty and rebuilds them once the data is in.  Results are
+    identical to the default path.
+
+    Each patient's content hashes are kept in ``patient_ingest_hashes``.
+    Patients whose record is unchanged since the last ingest are skipped, and
+    for changed patients only the entities that differ are written.  The
+    returned dict and the ``ingest_audit`` row count ``new_patients``,
+    ``changed_patients`` and ``skipped_patients``.  ``skip_unchanged=False``
+    upserts every patient as before (hashes are still refreshed).
+
+    ``workers > 1`` (default ``MH_INGEST_WORKERS``, i.e. 1) runs the
+    pipelined ingest of :func:`_run_pipeline`: the export is streamed in
+    ``batch_size`` chunks (default ``MH_INGEST_CHUNK_SIZE``), hashing and
+    normalisation run in *workers* processes and this process remains the
+    single writer, still in one transaction.  At most ``queue_depth``
+    (default ``2 * workers``) batches are in flight.  Per-stage throughput is
+    logged and returned under ``"pipeline"``.  Results are identical to the
+    serial path, which is used as a fallback if no process pool can be
+    started.
+    """
+    apply_pending_migrations(str(db_path))
+    workers = DEFAULT_INGEST_WORKERS if workers is None else workers
+    if workers < 1:
+        raise ValueError("workers must be a positive integer")
+    queue_depth = 2 * workers if queue_depth is None else queue_depth
+    if queue_depth < 1:
+        raise ValueError("queue_depth must be a positive integer")
+    if workers > 1 and batch_size is None:
+        batch_size = DEFAULT_INGEST_CHUNK_SIZE
+    if batch_size is not None and batch_size < 1:
+        raise ValueError("batch_size must be a positive integer")
+
+    def read_batches() -> Iterable[List[Dict[str, Any]]]:
+        if batch_size is None:
+            return [json.loads(Path(json_path).read_text())]
+        return _batched(iter_json_array(Path(json_path)), batch_size)
 
     conn = sqlite3.connect(str(db_path))
-    total = {}
+    total = dict.fromkeys([*_TABLES, *_PATIENT_COUNTS], 0)
+    timings: Dict[str, float] = {}
+    upsert = partial(_staged_upsert, timings=timings) if bulk else _bulk_upsert
+    stages: Optional[Dict[str, Dict[str, float]]] = None
     try:
-        with conn:
-            total["patients"] = _bulk_upsert(patients_df, "patients", ["id"], conn)
-            total["vitals"] = _bulk_upsert(
-                vitals_df, "vitals", ["patient_id", "date"], conn
-            )
-            total["scores"] = _bulk_upsert(
-                scores_df, "scores", ["patient_id", "date", "score_type"], conn
-            )
-            total["mental_health"] = _bulk_upsert(
-                mh_df, "mental_health", ["patient_id", "date", "assessment_type"], conn
-            )
-            total["lab_results"] = _bulk_upsert(
-                labs_df, "lab_results", ["patient_id", "date", "test_name"], conn
-            )
-            # pmh_id auto; duplicates allowed
-            total["pmh"] = _bulk_upsert(pmh_df, "pmh", ["pmh_id"], conn)
+        dropped: List[str] = []
+        with _bulk_pragmas(conn) if bulk else nullcontext():
+            try:
+                with conn:
+                    dropped = (
+                        _drop_secondary_indexes(conn, _TABLES)
+                        if bulk and rebuild_indexes
+                        else []
+                    )
+                    done = 0
+
+                    def on_batch(patients: int) -> None:
+                        nonlocal done
+                        done += patients
+                        if progress is not None:
+                            progress(done, dict(total))
+
+                    if workers > 1:
+                        try:
+                            stages = _run_pipeline(
+                                read_batches(),
+                                conn,
+                                total,
+                                upsert,
+                                skip_unchanged,
+                                workers,
+                                queue_depth,
+                                on_batch,
+                            )
+                        except (OSError, BrokenProcessPool) as exc:
+                            logger.warning(
+                                "Process pool unavailable (%s); ingesting in-process", exc
+                            )
+                            conn.rollback()
+                            total.update(dict.fromkeys(total, 0))
+                            timings.clear()
+                            done = 0
+                    if stages is None:
+                        for batch in read_batches():
+                            _upsert_batch(batch, conn, total, upsert, skip_unchanged)
+                            on_batch(len(batch))
+                    _rebuild_indexes(conn, dropped)
+            except BaseException:
+                _restore_indexes(conn, dropped)
+                raise
         logger.info("Ingest complete: %s", total)
+        if bulk:
+            rates = {
+                table: round(total[table] / secs) if secs > 0 else total[table]
+                for table, secs in timings.items()
+            }
+            for table, rate in rates.items():
+                logger.info(
+                    "Bulk load %s: %d rows in %.2f s (%d rows/s)",
+                    table,
+                    total[table],
+                    timings[table],
+                    rate,
+                )
 
         # --------------------------------------------------------------
         # Persist audit row so we can trace each import operation
         # --------------------------------------------------------------
         try:
-            audit_cols = [
-                "filename",
-                "patients",
-                "vitals",
-                "scores",
-                "mental_health",
-                "lab_results",
-                "pmh",
-            ]
-            placeholders = ", ".join(["?"] * len(audit_cols))
-            sql = f"INSERT INTO ingest_audit ({', '.join(audit_cols)}) VALUES ({placeholders})"
-            conn.execute(
-                sql,
-                (
-                    Path(json_path).name,
-                    total.get("patients", 0),
-                    total.get("vitals", 0),
-                    total.get("scores", 0),
-                    total.get("mental_health", 0),
-                    total.get("lab_results", 0),
-                    total.get("pmh", 0),
-                ),
+            audit_cols = [*_TABLES, *_PATIENT_COUNTS]
+            placeholders = ", ".join(["?"] * (len(audit_cols) + 1))
+            sql = (
+                f"INSERT INTO ingest_audit (filename, {', '.join(audit_cols)}) "
+                f"VALUES ({placeholders})"
             )
+            # Own transaction – outside ``with conn`` the insert was never committed
+            with conn:
+                conn.execute(
+                    sql, (Path(json_path).name, *(total[c] for c in audit_cols))
+                )
             logger.info("Ingest audit row inserted.")
         except Exception as audit_exc:  # noqa: BLE001
             logger.error("Failed to insert ingest_audit row: %s", audit_exc)
     finally:
         conn.close()
 
+    # Recompute patient features for the patients this ingest changed
+    try:
+        refresh_features(str(db_path))
+    except Exception as feat_exc:  # noqa: BLE001
+        logger.warning("Failed to refresh patient features: %s", feat_exc)
+
+    # Re-materialise the columnar snapshots the get_all_* helpers read
+    try:
+        refresh_snapshots(str(db_path))
+    except Exception as snap_exc:  # noqa: BLE001
+        logger.warning("Failed to refresh table snapshots: %s", snap_exc)
+
+    if revalidate:
+        from app.utils.validation_engine import ValidationEngine
+
+        issues = ValidationEngine(str(db_path)).validate_incremental()
+        total["validation_issues"] = sum(len(found) for found in issues.values())
+
+    if bulk:
+        total["rows_per_second"] = rates
+    if stages is not None:
+        total["pipeline"] = stages
+
     # Return dict so callers (e.g., Panel UI) can show success metrics
     return total
 
@@ -214,5 +896,58 @@ if __name__ == "__main__":
         default=Path(DB_FILE),
         help="SQLite DB file (default patient_data.db)",
     )
+    parser.add_argument(
+        "--revalidate",
+        action="store_true",
+        help="Re-run validation for patients changed by this ingest",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Stream the export, upserting N patients per batch (constant memory)",
+    )
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="Full-reload mode: staged set-based merges with bulk-load PRAGMAs",
+    )
+    parser.add_argument(
+        "--rebuild-indexes",
+        action="store_true",
+        help="With --bulk, drop secondary indexes of empty tables and rebuild them after the load",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-upsert every patient, even those whose content hash is unchanged",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Normalise in N worker processes with a single writer (default MH_INGEST_WORKERS=1)",
+    )
+    parser.add_argument(
+        "--queue-depth",
+        type=int,
+        default=None,
+        help="With --workers, max batches in flight before the reader blocks (default 2*N)",
+    )
     args = parser.parse_args()
-    ingest(args.json_path, args.db_path)
+
+    def _log_progress(done: int, totals: Dict[str, int]) -> None:
+        logger.info("%d patients ingested (%s)", done, totals)
+
+    ingest(
+        args.json_path,
+        args.db_path,
+        revalidate=args.revalidate,
+        batch_size=args.batch_size,
+        progress=_log_progress if args.batch_size or args.workers else None,
+        bulk=args.bulk,
+        rebuild_indexes=args.rebuild_indexes,
+        skip_unchanged=not args.force,
+        workers=args.workers,
+        queue_depth=args.queue_depth,
+    )
@@ -0,0 +1,110 @@
+"""Change log feeding incremental validation.
+
+Creates ``validation_change_log`` (one row per patient touched by a write to
+``patients``, ``vitals`` or ``data_corrections``) plus the
+``validation_watermark`` table recording the last change id validation has
+consumed, and installs the triggers that fill the log.
+
+UPDATE triggers only fire when a column value actually changes, so re-running
+an idempotent JSON ingest (which upserts every row) does not mark the whole
+population as dirty.
+"""
+
+import sqlite3
+import sys
+
+TRACKED = {"patients": "id", "vitals": "patient_id"}
+
+
+def table_exists(conn, table):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()
+    return row is not None
+
+
+def columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def install_triggers(conn, table, key):
+    cols = columns(conn, table)
+    changed = " OR ".join(f'OLD."{c}" IS NOT NEW."{c}"' for c in cols)
+    log = "INSERT INTO validation_change_log (patient_id, table_name) VALUES"
+    conn.executescript(
+        f"""
+        DROP TRIGGER IF EXISTS trg_{table}_change_log_insert;
+        DROP TRIGGER IF EXISTS trg_{table}_change_log_update;
+        DROP TRIGGER IF EXISTS trg_{table}_change_log_delete;
+
+        CREATE TRIGGER trg_{table}_change_log_insert AFTER INSERT ON {table}
+        BEGIN
+            {log} (NEW."{key}", '{table}');
+        END;
+
+        CREATE TRIGGER trg_{table}_change_log_update AFTER UPDATE ON {table}
+        WHEN {changed}
+        BEGIN
+            {log} (NEW."{key}", '{table}');
+            INSERT INTO validation_change_log (patient_id, table_name)
+            SELECT OLD."{key}", '{table}' WHERE OLD."{key}" IS NOT NEW."{key}";
+        END;
+
+        CREATE TRIGGER trg_{table}_change_log_delete AFTER DELETE ON {table}
+        BEGIN
+            {log} (OLD."{key}", '{table}');
+        END;
+        """
+    )
+    print(f"Installed change-log triggers on {table}")
+
+
+def migrate(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS validation_change_log (
+                change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                patient_id TEXT,
+                table_name TEXT NOT NULL,
+                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+
+            CREATE TABLE IF NOT EXISTS validation_watermark (
+                name TEXT PRIMARY KEY,
+                last_change_id INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            """
+        )
+        for table, key in TRACKED.items():
+            if table_exists(conn, table):
+                install_triggers(conn, table, key)
+            else:
+                print(f"Table {table} missing – no change-log triggers installed")
+
+        if table_exists(conn, "data_corrections"):
+            conn.executescript(
+                """
+                DROP TRIGGER IF EXISTS trg_data_corrections_change_log;
+                CREATE TRIGGER trg_data_corrections_change_log
+                AFTER INSERT ON data_corrections
+                BEGIN
+                    INSERT INTO validation_change_log (patient_id, table_name)
+                    VALUES (NEW.patient_id, 'data_corrections');
+                END;
+                """
+            )
+            print("Installed change-log trigger on data_corrections")
+        conn.commit()
+        print("Migration 011_validation_change_log.py applied successfully.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python 011_validation_change_log.py <db_path>")
+        sys.exit(1)
+    migrate(sys.argv[1])
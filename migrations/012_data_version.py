@@ -0,0 +1,94 @@
+"""Per-table data-version counters for result caching.
+
+Creates ``data_version`` (one row per clinical table) and triggers that bump
+a table's counter on every INSERT, DELETE and value-changing UPDATE.  Caches
+that must not serve stale answers across restarts (the assistant answer
+cache) key their entries on these counters.  Unlike file timestamps, the
+counters do not move when only logs or caches are written to the same file.
+"""
+
+import sqlite3
+import sys
+
+TRACKED = [
+    "patients",
+    "vitals",
+    "scores",
+    "mental_health",
+    "lab_results",
+    "pmh",
+    "patient_visit_metrics",
+]
+
+
+def table_exists(conn, table):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()
+    return row is not None
+
+
+def columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def install_triggers(conn, table):
+    changed = " OR ".join(f'OLD."{c}" IS NOT NEW."{c}"' for c in columns(conn, table))
+    bump = f"UPDATE data_version SET version = version + 1 WHERE table_name = '{table}'"
+    conn.execute(
+        "INSERT OR IGNORE INTO data_version (table_name, version) VALUES (?, 0)",
+        (table,),
+    )
+    conn.executescript(
+        f"""
+        DROP TRIGGER IF EXISTS trg_{table}_data_version_insert;
+        DROP TRIGGER IF EXISTS trg_{table}_data_version_update;
+        DROP TRIGGER IF EXISTS trg_{table}_data_version_delete;
+
+        CREATE TRIGGER trg_{table}_data_version_insert AFTER INSERT ON {table}
+        BEGIN
+            {bump};
+        END;
+
+        CREATE TRIGGER trg_{table}_data_version_update AFTER UPDATE ON {table}
+        WHEN {changed}
+        BEGIN
+            {bump};
+        END;
+
+        CREATE TRIGGER trg_{table}_data_version_delete AFTER DELETE ON {table}
+        BEGIN
+            {bump};
+        END;
+        """
+    )
+    print(f"Installed data-version triggers on {table}")
+
+
+def migrate(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS data_version (
+                table_name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        for table in TRACKED:
+            if table_exists(conn, table):
+                install_triggers(conn, table)
+            else:
+                print(f"Table {table} missing – no data-version triggers installed")
+        conn.commit()
+        print("Migration 012_data_version.py applied successfully.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python 012_data_version.py <db_path>")
+        sys.exit(1)
+    migrate(sys.argv[1])
@@ -0,0 +1,49 @@
+"""Record streamed-narrative latency in ``assistant_logs``.
+
+Adds ``narrative_ttft_ms`` (time until the first narrative token reached the
+UI) and ``narrative_ms`` (total narrative generation time).
+"""
+
+import sqlite3
+import sys
+
+COLUMNS = {"narrative_ttft_ms": "INTEGER", "narrative_ms": "INTEGER"}
+
+
+def table_exists(conn, table):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()
+    return row is not None
+
+
+def column_exists(conn, table, column):
+    cur = conn.execute(f"PRAGMA table_info({table})")
+    return any(row[1] == column for row in cur.fetchall())
+
+
+def migrate(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        if not table_exists(conn, "assistant_logs"):
+            print("Table assistant_logs does not exist; nothing to do")
+            return
+        for column, sql_type in COLUMNS.items():
+            if not column_exists(conn, "assistant_logs", column):
+                conn.execute(
+                    f"ALTER TABLE assistant_logs ADD COLUMN {column} {sql_type}"
+                )
+                print(f"Added column {column} to assistant_logs")
+            else:
+                print(f"Column {column} already exists in assistant_logs")
+        conn.commit()
+        print("Migration 013_assistant_logs_narrative_latency.py applied successfully.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python 013_assistant_logs_narrative_latency.py <db_path>")
+        sys.exit(1)
+    migrate(sys.argv[1])
@@ -0,0 +1,79 @@
+"""Covering indexes for the report and gap-analysis queries.
+
+Run ``python -m scripts.index_advisor`` to check the query plans they give.
+Indexes whose table or columns are missing (legacy databases) are skipped.
+"""
+
+import sqlite3
+import sys
+
+# name -> (table, columns, partial-index WHERE clause or None)
+INDEXES = {
+    # Latest lab value per patient for one test (gap report latest_labs CTE,
+    # find_patients_with_abnormal_values test_name filters)
+    "idx_lab_results_test_patient_date": (
+        "lab_results",
+        ["test_name", "patient_id", "date", "value"],
+        None,
+    ),
+    # Latest vital per patient and metric (gap report latest_vitals CTE).
+    # (patient_id, date) itself is already covered by uq_vitals_patient_date.
+    "idx_vitals_bmi_latest": (
+        "vitals",
+        ["patient_id", "date", "bmi"],
+        "bmi IS NOT NULL",
+    ),
+    "idx_vitals_weight_latest": (
+        "vitals",
+        ["patient_id", "date", "weight"],
+        "weight IS NOT NULL",
+    ),
+    "idx_vitals_sbp_latest": (
+        "vitals",
+        ["patient_id", "date", "sbp"],
+        "sbp IS NOT NULL",
+    ),
+    "idx_vitals_dbp_latest": (
+        "vitals",
+        ["patient_id", "date", "dbp"],
+        "dbp IS NOT NULL",
+    ),
+    # Active-patient filters (clinical inactivity report, active_only joins)
+    "idx_patients_active": ("patients", ["active"], None),
+    # Validation dashboard: status counts and status-filtered joins to rules
+    "idx_validation_results_status_rule_patient": (
+        "validation_results",
+        ["status", "rule_id", "patient_id"],
+        None,
+    ),
+}
+
+
+def columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def migrate(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        for name, (table, cols, where) in INDEXES.items():
+            missing = set(cols) - columns(conn, table)
+            if missing:
+                print(f"Skipped {name}: {table} lacks {', '.join(sorted(missing))}")
+                continue
+            sql = f"CREATE INDEX IF NOT EXISTS {name} ON {table}({', '.join(cols)})"
+            if where:
+                sql += f" WHERE {where}"
+            conn.execute(sql)
+            print(f"Ensured index {name} on {table}({', '.join(cols)})")
+        conn.commit()
+        print("Migration 014_report_indexes.py applied successfully.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python 014_report_indexes.py <db_path>")
+        sys.exit(1)
+    migrate(sys.argv[1])
@@ -0,0 +1,293 @@
+"""Materialized "latest value per patient" tables.
+
+Creates three tables holding the most recent non-null value per patient and
+metric, so "latest BMI / A1C / PHQ-9" lookups are a primary-key probe instead
+of a ``MAX(date)`` group-by over the full history:
+
+* ``latest_vitals``  – (patient_id, metric) for weight, height, bmi, sbp, dbp
+* ``latest_labs``    – (patient_id, test_name) from ``lab_results``
+* ``latest_scores``  – (patient_id, score_type) from ``scores`` and
+  ``mental_health`` (``assessment_type`` / ``score``)
+
+Triggers on the source tables keep them current for every write path (ETL,
+corrections, UI edits).  An INSERT only replaces the stored row when it is at
+least as recent; UPDATE and DELETE recompute the affected key from history.
+Ties on ``date`` go to the most recently inserted row.
+
+UPDATE triggers only fire when a watched value actually changes, so an
+unchanged re-ingest does not recompute anything.  The three tables are created
+even when a source table is missing (it simply contributes no rows).
+
+Re-running this script rebuilds all three tables from history and reinstalls
+the triggers, e.g. after a bulk load with triggers disabled.
+"""
+
+import sqlite3
+import sys
+
+VITAL_METRICS = ["weight", "height", "bmi", "sbp", "dbp"]
+
+TABLES = """
+CREATE TABLE IF NOT EXISTS latest_vitals (
+    patient_id TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL,
+    date TEXT,
+    PRIMARY KEY (patient_id, metric)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_latest_vitals_metric_value
+    ON latest_vitals(metric, value, date);
+
+CREATE TABLE IF NOT EXISTS latest_labs (
+    patient_id TEXT NOT NULL,
+    test_name TEXT NOT NULL,
+    value REAL,
+    unit TEXT,
+    date TEXT,
+    lab_id INTEGER,
+    PRIMARY KEY (patient_id, test_name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_latest_labs_test_value
+    ON latest_labs(test_name, value, date);
+
+CREATE TABLE IF NOT EXISTS latest_scores (
+    patient_id TEXT NOT NULL,
+    score_type TEXT NOT NULL,
+    value REAL,
+    date TEXT,
+    source TEXT NOT NULL,
+    PRIMARY KEY (patient_id, score_type)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_latest_scores_type_value
+    ON latest_scores(score_type, value, date);
+"""
+
+# Per-key recompute statements; {pid} / {key} are NEW./OLD. references.
+_VITAL_REFRESH = """
+        DELETE FROM latest_vitals WHERE patient_id = {pid};
+""" + "".join(
+    f"""
+        INSERT INTO latest_vitals (patient_id, metric, value, date)
+        SELECT patient_id, '{m}', {m}, date FROM vitals
+        WHERE patient_id = {{pid}} AND {m} IS NOT NULL
+        ORDER BY date DESC, vital_id DESC LIMIT 1;"""
+    for m in VITAL_METRICS
+)
+
+_LAB_REFRESH = """
+        DELETE FROM latest_labs WHERE patient_id = {pid} AND test_name = {key};
+        INSERT INTO latest_labs (patient_id, test_name, value, unit, date, lab_id)
+        SELECT patient_id, test_name, value, unit, date, lab_id FROM lab_results
+        WHERE patient_id = {pid} AND test_name = {key} AND value IS NOT NULL
+        ORDER BY date DESC, lab_id DESC LIMIT 1;"""
+
+_SCORE_REFRESH = """
+        DELETE FROM latest_scores WHERE patient_id = {pid} AND score_type = {key};
+        INSERT INTO latest_scores (patient_id, score_type, value, date, source)
+        SELECT patient_id, score_type, value, date, source FROM (
+            SELECT patient_id, score_type, score_value AS value, date,
+                   'scores' AS source, score_id AS row_id
+            FROM scores
+            WHERE patient_id = {pid} AND score_type = {key}
+              AND score_value IS NOT NULL
+            UNION ALL
+            SELECT patient_id, assessment_type, score, date,
+                   'mental_health', mh_id
+            FROM mental_health
+            WHERE patient_id = {pid} AND assessment_type = {key}
+              AND score IS NOT NULL
+        )
+        ORDER BY date DESC, source = 'scores', row_id DESC LIMIT 1;"""
+
+# Insert-time upserts: keep the stored row unless the new one is as recent.
+_NEWER = "WHERE excluded.date >= {t}.date OR {t}.date IS NULL"
+
+_VITAL_INSERT = "".join(
+    f"""
+        INSERT INTO latest_vitals (patient_id, metric, value, date)
+        SELECT NEW.patient_id, '{m}', NEW.{m}, NEW.date WHERE NEW.{m} IS NOT NULL
+        ON CONFLICT (patient_id, metric) DO UPDATE
+        SET value = excluded.value, date = excluded.date
+        {_NEWER.format(t="latest_vitals")};"""
+    for m in VITAL_METRICS
+)
+
+_LAB_INSERT = f"""
+        INSERT INTO latest_labs (patient_id, test_name, value, unit, date, lab_id)
+        SELECT NEW.patient_id, NEW.test_name, NEW.value, NEW.unit, NEW.date, NEW.lab_id
+        WHERE NEW.test_name IS NOT NULL AND NEW.value IS NOT NULL
+        ON CONFLICT (patient_id, test_name) DO UPDATE
+        SET value = excluded.value, unit = excluded.unit, date = excluded.date,
+            lab_id = excluded.lab_id
+        {_NEWER.format(t="latest_labs")};"""
+
+
+def _score_insert(type_col, value_col, source):
+    return f"""
+        INSERT INTO latest_scores (patient_id, score_type, value, date, source)
+        SELECT NEW.patient_id, NEW.{type_col}, NEW.{value_col}, NEW.date, '{source}'
+        WHERE NEW.{type_col} IS NOT NULL AND NEW.{value_col} IS NOT NULL
+        ON CONFLICT (patient_id, score_type) DO UPDATE
+        SET value = excluded.value, date = excluded.date, source = excluded.source
+        {_NEWER.format(t="latest_scores")};"""
+
+
+# table -> (columns watched by UPDATE, key column or None, refresh SQL, insert SQL)
+SOURCES = {
+    "vitals": (
+        ["patient_id", "date"] + VITAL_METRICS,
+        None,
+        _VITAL_REFRESH,
+        _VITAL_INSERT,
+    ),
+    "lab_results": (
+        ["patient_id", "date", "test_name", "value", "unit"],
+        "test_name",
+        _LAB_REFRESH,
+        _LAB_INSERT,
+    ),
+    "scores": (
+        ["patient_id", "date", "score_type", "score_value"],
+        "score_type",
+        _SCORE_REFRESH,
+        _score_insert("score_type", "score_value", "scores"),
+    ),
+    "mental_health": (
+        ["patient_id", "date", "assessment_type", "score"],
+        "assessment_type",
+        _SCORE_REFRESH,
+        _score_insert("assessment_type", "score", "mental_health"),
+    ),
+}
+
+_VITALS_BACKFILL = f"""{"".join(
+    f'''
+INSERT INTO latest_vitals (patient_id, metric, value, date)
+SELECT patient_id, '{m}', {m}, date FROM (
+    SELECT patient_id, {m}, date, ROW_NUMBER() OVER (
+        PARTITION BY patient_id ORDER BY date DESC, vital_id DESC) AS rn
+    FROM vitals WHERE {m} IS NOT NULL
+) WHERE rn = 1;'''
+    for m in VITAL_METRICS
+)}
+"""
+
+_LABS_BACKFILL = """
+INSERT INTO latest_labs (patient_id, test_name, value, unit, date, lab_id)
+SELECT patient_id, test_name, value, unit, date, lab_id FROM (
+    SELECT *, ROW_NUMBER() OVER (
+        PARTITION BY patient_id, test_name ORDER BY date DESC, lab_id DESC) AS rn
+    FROM lab_results WHERE test_name IS NOT NULL AND value IS NOT NULL
+) WHERE rn = 1;
+"""
+
+# Score sources for the latest_scores backfill, unioned over those present
+_SCORE_ROWS = {
+    "scores": """
+        SELECT patient_id, score_type, score_value AS value, date,
+               'scores' AS source, score_id AS row_id
+        FROM scores WHERE score_type IS NOT NULL AND score_value IS NOT NULL""",
+    "mental_health": """
+        SELECT patient_id, assessment_type AS score_type, score AS value, date,
+               'mental_health' AS source, mh_id AS row_id
+        FROM mental_health WHERE assessment_type IS NOT NULL AND score IS NOT NULL""",
+}
+
+
+def backfill(existing):
+    """Return the rebuild script for the source tables in *existing*."""
+    script = "DELETE FROM latest_vitals;\nDELETE FROM latest_labs;\nDELETE FROM latest_scores;\n"
+    if "vitals" in existing:
+        script += _VITALS_BACKFILL
+    if "lab_results" in existing:
+        script += _LABS_BACKFILL
+    score_rows = "\n        UNION ALL".join(
+        sql for table, sql in _SCORE_ROWS.items() if table in existing
+    )
+    if score_rows:
+        script += f"""
+INSERT INTO latest_scores (patient_id, score_type, value, date, source)
+SELECT patient_id, score_type, value, date, source FROM (
+    SELECT *, ROW_NUMBER() OVER (
+        PARTITION BY patient_id, score_type
+        ORDER BY date DESC, source = 'scores', row_id DESC) AS rn
+    FROM ({score_rows}
+    )
+) WHERE rn = 1;
+"""
+    return script
+
+
+def table_exists(conn, table):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()
+    return row is not None
+
+
+def install_triggers(conn, table):
+    watched, key, refresh, insert = SOURCES[table]
+    key_sql = f'."{key}"' if key else ""
+
+    def refresh_for(row):
+        return refresh.format(pid=f"{row}.patient_id", key=f"{row}{key_sql}")
+
+    # On UPDATE recompute the old key, then the new one if the key moved;
+    # upserts that leave every watched value unchanged do nothing.
+    changed = " OR ".join(f'OLD."{c}" IS NOT NEW."{c}"' for c in watched)
+    moved = "NEW.patient_id IS NOT OLD.patient_id"
+    if key:
+        moved += f' OR NEW."{key}" IS NOT OLD."{key}"'
+    conn.executescript(
+        f"""
+        DROP TRIGGER IF EXISTS trg_{table}_latest_insert;
+        DROP TRIGGER IF EXISTS trg_{table}_latest_update;
+        DROP TRIGGER IF EXISTS trg_{table}_latest_update_moved;
+        DROP TRIGGER IF EXISTS trg_{table}_latest_delete;
+
+        CREATE TRIGGER trg_{table}_latest_insert AFTER INSERT ON {table}
+        BEGIN{insert}
+        END;
+
+        CREATE TRIGGER trg_{table}_latest_update
+        AFTER UPDATE OF {", ".join(watched)} ON {table}
+        WHEN {changed}
+        BEGIN{refresh_for("OLD")}
+        END;
+
+        CREATE TRIGGER trg_{table}_latest_update_moved
+        AFTER UPDATE OF {", ".join(watched)} ON {table}
+        WHEN {moved}
+        BEGIN{refresh_for("NEW")}
+        END;
+
+        CREATE TRIGGER trg_{table}_latest_delete AFTER DELETE ON {table}
+        BEGIN{refresh_for("OLD")}
+        END;
+        """
+    )
+    print(f"Installed latest-value triggers on {table}")
+
+
+def migrate(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript(TABLES)
+        existing = [t for t in SOURCES if table_exists(conn, t)]
+        missing = [t for t in SOURCES if t not in existing]
+        if missing:
+            print(f"No latest-value triggers for missing {', '.join(missing)}")
+        for table in existing:
+            install_triggers(conn, table)
+        conn.executescript(backfill(existing))
+        conn.commit()
+        print("Migration 015_latest_values.py applied successfully.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python 015_latest_values.py <db_path>")
+        sys.exit(1)
+    migrate(sys.argv[1])
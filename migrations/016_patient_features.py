@@ -0,0 +1,107 @@
+"""Patient feature store tables.
+
+Creates ``patient_features`` (one row per patient; feature columns are added
+by :mod:`app.utils.feature_store` from its registry) and
+``feature_change_log``, filled by triggers on the tables features are derived
+from.  The log is seeded with every existing patient so the first refresh
+builds the whole table.
+
+As in migration 011, UPDATE triggers only fire when a column value actually
+changes, so idempotent re-ingests do not mark every patient dirty.
+"""
+
+import sqlite3
+import sys
+
+TRACKED = {
+    "patients": "id",
+    "vitals": "patient_id",
+    "mental_health": "patient_id",
+    "patient_visit_metrics": "patient_id",
+}
+
+
+def table_exists(conn, table):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()
+    return row is not None
+
+
+def columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def install_triggers(conn, table, key):
+    changed = " OR ".join(f'OLD."{c}" IS NOT NEW."{c}"' for c in columns(conn, table))
+    log = "INSERT INTO feature_change_log (patient_id, table_name) VALUES"
+    conn.executescript(
+        f"""
+        DROP TRIGGER IF EXISTS trg_{table}_feature_log_insert;
+        DROP TRIGGER IF EXISTS trg_{table}_feature_log_update;
+        DROP TRIGGER IF EXISTS trg_{table}_feature_log_delete;
+
+        CREATE TRIGGER trg_{table}_feature_log_insert AFTER INSERT ON {table}
+        BEGIN
+            {log} (NEW."{key}", '{table}');
+        END;
+
+        CREATE TRIGGER trg_{table}_feature_log_update AFTER UPDATE ON {table}
+        WHEN {changed}
+        BEGIN
+            {log} (NEW."{key}", '{table}');
+            INSERT INTO feature_change_log (patient_id, table_name)
+            SELECT OLD."{key}", '{table}' WHERE OLD."{key}" IS NOT NEW."{key}";
+        END;
+
+        CREATE TRIGGER trg_{table}_feature_log_delete AFTER DELETE ON {table}
+        BEGIN
+            {log} (OLD."{key}", '{table}');
+        END;
+        """
+    )
+    print(f"Installed feature change-log triggers on {table}")
+
+
+def migrate(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS patient_features (
+                patient_id TEXT PRIMARY KEY,
+                computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+
+            CREATE TABLE IF NOT EXISTS feature_change_log (
+                change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                patient_id TEXT,
+                table_name TEXT NOT NULL,
+                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            """
+        )
+        for table, key in TRACKED.items():
+            if table_exists(conn, table):
+                install_triggers(conn, table, key)
+            else:
+                print(f"Table {table} missing – no feature change-log triggers")
+
+        if table_exists(conn, "patients"):
+            conn.execute(
+                """
+                INSERT INTO feature_change_log (patient_id, table_name)
+                SELECT id, 'patients' FROM patients
+                """
+            )
+        conn.commit()
+        print("Migration 016_patient_features.py applied successfully.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python 016_patient_features.py <db_path>")
+        sys.exit(1)
+    migrate(sys.argv[1])
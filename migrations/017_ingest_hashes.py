@@ -0,0 +1,108 @@
+"""Per-patient content hashes for change-detecting JSON ingest.
+
+Creates ``patient_ingest_hashes`` (one row per patient: a hash of the whole
+export record plus one hash per ingested entity) and adds
+``new_patients`` / ``changed_patients`` / ``skipped_patients`` counters to
+``ingest_audit``.
+
+A stored hash only proves the database still holds what that export wrote,
+so any UPDATE that changes a value, or any DELETE, on the patient's rows
+outside the ingest drops the patient's hash row; the next ingest then
+rewrites that patient instead of skipping it.
+"""
+
+import sqlite3
+import sys
+
+TRACKED = {
+    "patients": "id",
+    "vitals": "patient_id",
+    "scores": "patient_id",
+    "mental_health": "patient_id",
+    "lab_results": "patient_id",
+    "pmh": "patient_id",
+}
+
+AUDIT_COLUMNS = {
+    "new_patients": "INTEGER DEFAULT 0",
+    "changed_patients": "INTEGER DEFAULT 0",
+    "skipped_patients": "INTEGER DEFAULT 0",
+}
+
+
+def table_exists(conn, table):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()
+    return row is not None
+
+
+def columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def install_triggers(conn, table, key):
+    changed = " OR ".join(f'OLD."{c}" IS NOT NEW."{c}"' for c in columns(conn, table))
+    forget = "DELETE FROM patient_ingest_hashes WHERE patient_id IN"
+    conn.executescript(
+        f"""
+        DROP TRIGGER IF EXISTS trg_{table}_ingest_hash_update;
+        DROP TRIGGER IF EXISTS trg_{table}_ingest_hash_delete;
+
+        CREATE TRIGGER trg_{table}_ingest_hash_update AFTER UPDATE ON {table}
+        WHEN {changed}
+        BEGIN
+            {forget} (OLD."{key}", NEW."{key}");
+        END;
+
+        CREATE TRIGGER trg_{table}_ingest_hash_delete AFTER DELETE ON {table}
+        BEGIN
+            {forget} (OLD."{key}");
+        END;
+        """
+    )
+    print(f"Installed ingest-hash triggers on {table}")
+
+
+def migrate(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS patient_ingest_hashes (
+                patient_id TEXT PRIMARY KEY,
+                record_hash TEXT NOT NULL,
+                patients_hash TEXT,
+                vitals_hash TEXT,
+                scores_hash TEXT,
+                mental_health_hash TEXT,
+                lab_results_hash TEXT,
+                pmh_hash TEXT,
+                ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            """
+        )
+        for table, key in TRACKED.items():
+            if table_exists(conn, table):
+                install_triggers(conn, table, key)
+            else:
+                print(f"Table {table} missing – no ingest-hash triggers")
+
+        if table_exists(conn, "ingest_audit"):
+            for column, sql_type in AUDIT_COLUMNS.items():
+                if column not in columns(conn, "ingest_audit"):
+                    conn.execute(
+                        f"ALTER TABLE ingest_audit ADD COLUMN {column} {sql_type}"
+                    )
+                    print(f"Added column {column} to ingest_audit")
+        conn.commit()
+        print("Migration 017_ingest_hashes.py applied successfully.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python 017_ingest_hashes.py <db_path>")
+        sys.exit(1)
+    migrate(sys.argv[1])
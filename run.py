@@ -68,6 +68,14 @@ def cleanup_resources():
         except Exception as e:
             logger.error(f"Error stopping server: {e}")
 
+    # Stop warm sandbox workers
+    try:
+        from app.utils.sandbox_pool import shutdown_sandbox_pool
+
+        shutdown_sandbox_pool()
+    except Exception as e:
+        logger.error(f"Error stopping sandbox pool: {e}")
+
 
 def signal_handler(sig, frame):
     """Handle termination signals by cleaning up and exiting."""
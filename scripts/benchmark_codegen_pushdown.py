@@ -0,0 +1,124 @@
+"""Benchmark SQL push-down for the trend, top-N, histogram and comparison templates.
+
+For each template the "before" path pulls the raw rows the old generators
+fetched and aggregates them in pandas; the "after" path executes the code the
+generators now emit, where SQLite aggregates.  Prints rows transferred into
+pandas and the best-of-N latency for both, and checks the results agree.
+
+Usage
+-----
+python -m scripts.benchmark_codegen_pushdown [--db patient_data.db] [--repeat 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.db_query import query_dataframe
+from app.utils.ai.code_generator import generate_code
+from app.utils.ai.sql_compiler import column_ref, resolve_source
+from app.utils.query_intent import QueryIntent
+
+CASES = [
+    QueryIntent(analysis_type="trend", target_field="weight"),
+    QueryIntent(analysis_type="top_n", target_field="ethnicity", parameters={"n": 5}),
+    QueryIntent(analysis_type="distribution", target_field="bmi"),
+    QueryIntent(analysis_type="comparison", target_field="bmi", group_by=["gender"]),
+]
+
+
+def _before(intent: QueryIntent, db_path: str | None):
+    col = column_ref(intent.target_field)
+    fields = [intent.target_field, *intent.group_by]
+    columns = [f"{col} AS x"]
+    if intent.analysis_type == "trend":
+        fields.append("date")
+        columns.append("v.date")
+    if intent.group_by:
+        columns.append(f"{column_ref(intent.group_by[0])} AS g")
+    from_clause, terms, params = resolve_source(intent, fields)
+    where = f" WHERE {' AND '.join(terms)}" if terms else ""
+    df = query_dataframe(
+        f"SELECT {', '.join(columns)} FROM {from_clause}{where}",
+        params,
+        db_path=db_path,
+        use_cache=False,
+    )
+
+    if intent.analysis_type == "trend":
+        period = pd.to_datetime(df["date"]).dt.strftime("%Y-%m")
+        result = df.groupby(period)["x"].mean().to_dict()
+    elif intent.analysis_type == "top_n":
+        result = df["x"].value_counts().nlargest(intent.parameters["n"]).to_dict()
+    elif intent.analysis_type == "comparison":
+        result = df.groupby("g")["x"].mean().to_dict()
+    else:
+        values = df["x"].dropna()
+        values = values[(values >= 12) & (values <= 70)]
+        result = np.histogram(values, bins=10)[0].tolist()
+    return result, len(df)
+
+
+def _after(intent: QueryIntent, db_path: str | None):
+    transferred = []
+
+    def _query(sql, params=None):
+        df = query_dataframe(sql, params, db_path=db_path, use_cache=False)
+        transferred.append(len(df))
+        return df
+
+    namespace = {"pd": pd, "np": np, "query_dataframe": _query}
+    exec(generate_code(intent, intent.parameters), namespace)  # noqa: S102
+    result = namespace["results"]
+    if intent.analysis_type == "comparison":
+        result = result.get("comparison", result)
+    elif intent.analysis_type == "distribution":
+        result = result["counts"]
+    return result, sum(transferred)
+
+
+def _best_of(fn, intent, db_path, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result, rows = fn(intent, db_path)
+        timings.append(time.perf_counter() - start)
+    return result, rows, min(timings)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare pandas-side and SQL push-down template aggregation"
+    )
+    parser.add_argument(
+        "--db", default=None, help="Database to benchmark (default: active DB)"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per path")
+    args = parser.parse_args(argv)
+
+    print(f"{'template':<14}{'rows before':>12}{'rows after':>12}"
+          f"{'before (ms)':>13}{'after (ms)':>12}  match")
+    for intent in CASES:
+        old, old_rows, old_secs = _best_of(_before, intent, args.db, args.repeat)
+        new, new_rows, new_secs = _best_of(_after, intent, args.db, args.repeat)
+        if intent.analysis_type == "top_n":
+            # Ties at the cut-off may pick different keys; compare the counts
+            match = sorted(old.values()) == sorted(new.values())
+        elif isinstance(old, dict):
+            match = old.keys() == new.keys() and np.allclose(
+                [old[k] for k in old], [new[k] for k in old], equal_nan=True
+            )
+        else:
+            match = old == new
+        print(
+            f"{intent.analysis_type:<14}{old_rows:>12}{new_rows:>12}"
+            f"{old_secs * 1000:>13.1f}{new_secs * 1000:>12.1f}  {'yes' if match else 'NO'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Benchmark the JSON-ingest normalisation stage on synthetic exports.
+
+Generates deterministic synthetic patients (vitals, scores, mental health,
+labs and PMH nested the way the de-identified export nests them) and times
+``etl.json_ingest.normalise_batch`` against the former row-wise normalisers
+(per-item dict loops and ``iterrows``), kept below as the "before" path.
+Exports are generated and normalised ``--batch-size`` patients at a time, as
+``ingest(batch_size=...)`` does, so 1M patients fit in memory.  Every batch is
+checked to produce identical frames.
+
+Usage
+-----
+python -m scripts.benchmark_etl_normalize [--sizes 10000,100000,1000000]
+    [--batch-size 10000] [--skip-before]
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import random
+import time
+from typing import Any, Dict, List
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from etl.json_ingest import _explode_mental, _explode_scores, _norm_patients
+from etl.json_ingest import normalise_batch
+
+_LAB_TESTS = ["A1C", "LDL", "HDL", "glucose", "triglycerides"]
+
+
+def _synthetic_patients(start: int, count: int) -> List[Dict[str, Any]]:
+    rng = random.Random(start)
+    patients = []
+    for i in range(start, start + count):
+        pid = f"p{i}"
+        dates = [f"2025-{m:02d}-{rng.randint(1, 28):02d}" for m in (1, 4, 7)]
+        patients.append(
+            {
+                "id": pid,
+                "first_name": "Synth",
+                "last_name": f"Patient{i}",
+                "gender": rng.choice(["F", "M"]),
+                "active": rng.randint(0, 1),
+                "vitals": [
+                    {
+                        "date": d,
+                        "weight": round(rng.uniform(50, 150), 1),
+                        "bmi": round(rng.uniform(18, 45), 1),
+                        "systolic_pressure": rng.randint(100, 170),
+                        "diastolic_pressure": rng.randint(60, 100),
+                    }
+                    for d in dates
+                ],
+                "scores": [
+                    {"score_date": d, "vitality_score": rng.randint(0, 100)}
+                    for d in dates[:2]
+                ],
+                "mental_health": [
+                    {
+                        "patient_id": pid,
+                        "date": d,
+                        "phq9": rng.randint(0, 27),
+                        "gad7": rng.choice([None, rng.randint(0, 21)]),
+                    }
+                    for d in dates[:2]
+                ],
+                "lab_results": [
+                    {
+                        "date": d,
+                        **{
+                            t: rng.choice([None, round(rng.uniform(1, 200), 1)])
+                            for t in _LAB_TESTS
+                        },
+                    }
+                    for d in dates[::2]
+                ],
+                "pmh_data": [{"name": "hypertension", "onset_date": "2019-01-01"}],
+            }
+        )
+    return patients
+
+
+# ---------------------------------------------------------------------------
+# Former row-wise normalisers ("before" path)
+# ---------------------------------------------------------------------------
+
+
+def _extract_nested_rowwise(raw: List[Dict[str, Any]], key: str) -> pd.DataFrame:
+    rows: List[Dict[str, Any]] = []
+    for p in raw:
+        nested = p.get(key) or []
+        for item in nested:
+            if "patient_id" not in item:
+                item["patient_id"] = p["id"]
+            rows.append(item)
+    return pd.DataFrame(rows)
+
+
+def _explode_labs_rowwise(lab_df: pd.DataFrame) -> pd.DataFrame:
+    keep_cols = {"patient_id", "date"}
+    long_rows = []
+    for _, row in lab_df.iterrows():
+        base = {"patient_id": row["patient_id"], "date": row["date"]}
+        for col, val in row.items():
+            if col in keep_cols or pd.isna(val):
+                continue
+            long_rows.append({**base, "test_name": col, "value": val})
+    return pd.DataFrame(long_rows)
+
+
+def _normalise_rowwise(raw: List[Dict[str, Any]]) -> Dict[str, pd.DataFrame]:
+    return {
+        "patients": _norm_patients(raw),
+        "vitals": _extract_nested_rowwise(raw, "vitals").rename(
+            columns={"systolic_pressure": "sbp", "diastolic_pressure": "dbp"}
+        ),
+        "scores": _explode_scores(_extract_nested_rowwise(raw, "scores")),
+        "mental_health": _explode_mental(_extract_nested_rowwise(raw, "mental_health")),
+        "lab_results": _explode_labs_rowwise(_extract_nested_rowwise(raw, "lab_results")),
+        "pmh": _extract_nested_rowwise(raw, "pmh_data").rename(
+            columns={"name": "condition"}
+        ),
+    }
+
+
+def _timed(fn, raw):
+    start = time.perf_counter()
+    frames = fn(raw)
+    return frames, time.perf_counter() - start
+
+
+def _run(size: int, batch_size: int, skip_before: bool) -> None:
+    before_secs = after_secs = 0.0
+    rows = 0
+    for start in range(0, size, batch_size):
+        raw = _synthetic_patients(start, min(batch_size, size - start))
+        new, secs = _timed(normalise_batch, raw)
+        after_secs += secs
+        rows += sum(len(df) for df in new.values())
+        if skip_before:
+            continue
+        # The row-wise path mutates its input, so it gets its own copy
+        old, secs = _timed(_normalise_rowwise, copy.deepcopy(raw))
+        before_secs += secs
+        for table, df in old.items():
+            assert_frame_equal(new[table].reset_index(drop=True), df.reset_index(drop=True))
+
+    before = "-" if skip_before else f"{before_secs:.2f}"
+    speedup = "-" if skip_before else f"{before_secs / after_secs:.1f}x"
+    print(f"{size:>10}{rows:>12}{before:>12}{after_secs:>12.2f}{speedup:>9}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare row-wise and columnar ETL normalisation"
+    )
+    parser.add_argument(
+        "--sizes",
+        default="10000,100000,1000000",
+        help="Comma-separated patient counts",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=10000, help="Patients per batch"
+    )
+    parser.add_argument(
+        "--skip-before",
+        action="store_true",
+        help="Only time the columnar path (no row-wise run or equality check)",
+    )
+    args = parser.parse_args(argv)
+
+    print(f"{'patients':>10}{'rows':>12}{'before (s)':>12}{'after (s)':>12}{'speedup':>9}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        _run(size, args.batch_size, args.skip_before)
+
+
+if __name__ == "__main__":
+    main()
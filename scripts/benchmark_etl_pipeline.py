@@ -0,0 +1,74 @@
+"""Benchmark pipelined JSON ingest across worker counts.
+
+Writes a synthetic export (see :mod:`scripts.benchmark_etl_normalize`) to a
+temporary directory and ingests it into a fresh database once per
+``--workers`` value, printing wall-clock time and the per-stage throughput
+returned by ``ingest(workers=...)``.  Stage figures for ``1`` are absent
+because a single worker takes the serial in-process path.
+
+Usage
+-----
+python -m scripts.benchmark_etl_pipeline [--patients 50000]
+    [--workers 1,2,4] [--batch-size 5000] [--queue-depth N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from etl.json_ingest import ingest
+from scripts.benchmark_etl_normalize import _synthetic_patients
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Time pipelined ETL ingest")
+    parser.add_argument("--patients", type=int, default=50000)
+    parser.add_argument(
+        "--workers", default="1,2,4", help="Comma-separated worker counts"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=5000, help="Patients per batch"
+    )
+    parser.add_argument(
+        "--queue-depth", type=int, default=None, help="Batches in flight (default 2*N)"
+    )
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        export = Path(tmp) / "export.json"
+        with open(export, "w", encoding="utf-8") as fh:
+            fh.write("[")
+            for start in range(0, args.patients, args.batch_size):
+                batch = _synthetic_patients(
+                    start, min(args.batch_size, args.patients - start)
+                )
+                prefix = "," if start else ""
+                fh.write(prefix + ",".join(json.dumps(p) for p in batch))
+            fh.write("]")
+
+        print(f"{'workers':>8}{'wall (s)':>10}{'read/s':>10}{'norm/s':>10}{'rows/s':>10}")
+        for workers in (int(w) for w in args.workers.split(",")):
+            start = time.perf_counter()
+            counts = ingest(
+                export,
+                Path(tmp) / f"w{workers}.db",
+                batch_size=args.batch_size,
+                workers=workers,
+                queue_depth=args.queue_depth,
+            )
+            wall = time.perf_counter() - start
+            stages = counts.get("pipeline")
+            rates = (
+                [stages[s]["per_second"] for s in ("read", "normalise", "write")]
+                if stages
+                else ["-"] * 3
+            )
+            print(f"{workers:>8}{wall:>10.2f}" + "".join(f"{r:>10}" for r in rates))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Benchmark per-patient vs batch (vectorised) validation.
+
+Copies the database twice into a temporary directory, runs
+``ValidationEngine.validate_all_patients()`` on one copy and
+``validate_all_patients(batch=True)`` on the other, checks that both produce
+identical results and prints the timings.  ``--workers`` additionally times
+the multi-process mode at each worker count and prints per-shard timings.
+
+Usage
+-----
+python -m scripts.benchmark_validation [--db patient_data.db] [--skip-slow]
+    [--workers 1,2,4] [--chunk-size 5000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+from app.config import get_mh_db_path
+from app.utils.validation_engine import ValidationEngine
+
+
+def _copy_db(src: str, dst: Path) -> str:
+    source, target = sqlite3.connect(src), sqlite3.connect(dst)
+    source.backup(target)
+    source.close()
+    target.close()
+    return str(dst)
+
+
+def _flatten(results) -> Counter:
+    return Counter(
+        (r.rule_id, r.patient_id, r.field_name, r.issue_description)
+        for found in results.values()
+        for r in found
+    )
+
+
+def _timed(engine: ValidationEngine, batch: bool):
+    engine.load_rules_from_db()
+    start = time.perf_counter()
+    results = engine.validate_all_patients(batch=batch)
+    return results, time.perf_counter() - start
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare per-patient and batch validation runtimes"
+    )
+    parser.add_argument(
+        "--db", default=None, help="Database to benchmark (default: active DB)"
+    )
+    parser.add_argument(
+        "--skip-slow",
+        action="store_true",
+        help="Only time the batch path (no equivalence check)",
+    )
+    parser.add_argument(
+        "--workers",
+        default="",
+        help="Comma-separated worker counts for the parallel mode, e.g. 1,2,4",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=None, help="Patients per parallel shard"
+    )
+    args = parser.parse_args(argv)
+
+    src = args.db or get_mh_db_path()
+    with tempfile.TemporaryDirectory() as tmp:
+        fast_db = _copy_db(src, Path(tmp) / "batch.db")
+        batch_results, batch_secs = _timed(ValidationEngine(fast_db), batch=True)
+        n_issues = sum(len(v) for v in batch_results.values())
+        print(f"batch:       {batch_secs:8.2f}s  {n_issues} issues")
+
+        for n in [int(w) for w in args.workers.split(",") if w.strip()]:
+            par_db = _copy_db(src, Path(tmp) / f"parallel_{n}.db")
+            engine = ValidationEngine(par_db)
+            start = time.perf_counter()
+            par_results = engine.validate_patients_parallel(
+                workers=n, chunk_size=args.chunk_size
+            )
+            secs = time.perf_counter() - start
+            print(f"parallel x{n}: {secs:7.2f}s  {len(engine.last_shard_timings)} shards")
+            for t in engine.last_shard_timings:
+                print(
+                    f"    shard {t['shard']:>3}: {t['patients']:>6} patients  "
+                    f"load {t['load_s']:.2f}s  eval {t['evaluate_s']:.2f}s  pid {t['pid']}"
+                )
+            if _flatten(par_results) != _flatten(batch_results):
+                raise SystemExit(f"Mismatch between batch and parallel x{n} results")
+
+        if args.skip_slow:
+            return
+
+        slow_db = _copy_db(src, Path(tmp) / "per_patient.db")
+        slow_results, slow_secs = _timed(ValidationEngine(slow_db), batch=False)
+        print(f"per-patient: {slow_secs:8.2f}s")
+        print(f"speed-up:    {slow_secs / max(batch_secs, 1e-9):8.1f}x")
+
+        if _flatten(slow_results) != _flatten(batch_results):
+            raise SystemExit("Mismatch between per-patient and batch results")
+        print("Results identical.")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,13 +5,21 @@ from __future__ import annotations
 Usage
 -----
 python -m scripts.generate_gap_report --condition obesity [--active-only] [--out /tmp/obesity_gap.csv]
+python -m scripts.generate_gap_report --condition obesity --condition prediabetes
+python -m scripts.generate_gap_report --condition all
+
+Several conditions (or ``all``) are evaluated together in a single query and
+written as one long-format table with a ``condition`` column.
 """
 
 import argparse
 from pathlib import Path
 
 
-from app.utils.gap_report import get_condition_gap_report
+from app.utils.gap_report import (
+    get_all_condition_gap_reports,
+    get_condition_gap_report,
+)
 
 
 def main(argv: list[str] | None = None) -> None:
@@ -22,7 +30,9 @@ def main(argv: list[str] | None = None) -> None:
         "--condition",
         "-c",
         required=True,
-        help="Condition term, e.g. 'obesity', 'prediabetes'",
+        action="append",
+        help="Condition term, e.g. 'obesity', 'prediabetes'. Repeat for several "
+        "conditions, or pass 'all' for every supported condition",
     )
     parser.add_argument(
         "--active-only", "-a", action="store_true", help="Include only active patients"
@@ -33,7 +43,16 @@ def main(argv: list[str] | None = None) -> None:
 
     args = parser.parse_args(argv)
 
-    df = get_condition_gap_report(args.condition, active_only=args.active_only)
+    if "all" in args.condition:
+        df = get_all_condition_gap_reports(active_only=args.active_only)
+    elif len(args.condition) > 1:
+        df = get_all_condition_gap_reports(
+            args.condition, active_only=args.active_only
+        )
+    else:
+        df = get_condition_gap_report(
+            args.condition[0], active_only=args.active_only
+        )
 
     if df.empty:
         print("No gaps detected – every patient already has the diagnosis coded.")
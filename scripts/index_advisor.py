@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+"""CLI wrapper for the index advisor.
+
+Runs ``EXPLAIN QUERY PLAN`` over the known report queries and lists the ones
+that still scan a whole table.  Exits with status 1 when any query does, so it
+can gate CI or a post-migration check.
+
+Usage
+-----
+python -m scripts.index_advisor [--db patient_data.db] [--verbose]
+"""
+
+import argparse
+import sys
+
+from app.utils.index_advisor import advise, format_advice
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Flag full table scans in the app's report queries"
+    )
+    parser.add_argument(
+        "--db", help="Path to SQLite DB (default: the app's active database)"
+    )
+    parser.add_argument(
+        "--verbose",
+        "-v",
+        action="store_true",
+        help="Also print covering-index scans and the full query plans",
+    )
+    args = parser.parse_args(argv)
+
+    results = advise(args.db)
+    print(format_advice(results, verbose=args.verbose))
+
+    flagged = [r.name for r in results if not r.ok]
+    if flagged:
+        print(f"\n{len(flagged)} of {len(results)} queries need attention.")
+        return 1
+    print(f"\nAll {len(results)} report queries use indexes.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+"""Recompute the patient feature store.
+
+Ingest refreshes ``patient_features`` itself; run this after other writes to
+the source tables (manual edits, migrations, new registered features).
+Sandbox snippets and execution plans only ever read the store.
+
+Usage
+-----
+python -m scripts.refresh_features [--db patient_data.db] [--full]
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from app import db_query
+from app.utils.feature_store import refresh_features
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Refresh the patient feature store")
+    parser.add_argument("--db", default=None, help="Database path (default MH_DB_PATH)")
+    parser.add_argument(
+        "--full", action="store_true", help="Recompute every patient, not just changed ones"
+    )
+    args = parser.parse_args(argv)
+    db_path = args.db or db_query.get_db_path()
+
+    count = refresh_features(db_path, full=args.full)
+    print(f"Refreshed features for {count} patient(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Report per-table memory saved by schema-driven dtypes.
+
+Loads each ``get_all_*`` table raw (``typed=False``), applies
+:func:`app.utils.dtype_registry.apply_dtypes` and prints deep memory use
+before and after, plus the time the conversion took.
+
+Usage
+-----
+python -m scripts.report_dtype_savings [--db patient_data.db]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from app import db_query
+from app.utils.dtype_registry import apply_dtypes, memory_savings
+
+_LOADERS = {
+    "patients": db_query.get_all_patients,
+    "vitals": db_query.get_all_vitals,
+    "scores": db_query.get_all_scores,
+    "mental_health": db_query.get_all_mental_health,
+}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Report typed-frame memory savings")
+    parser.add_argument("--db", default=None, help="Database path (default MH_DB_PATH)")
+    args = parser.parse_args(argv)
+    db_path = args.db or db_query.get_db_path()
+
+    mib = 1024 * 1024
+    print(
+        f"{'table':<15}{'rows':>10}{'before MiB':>12}{'after MiB':>12}"
+        f"{'saved':>8}{'convert (s)':>13}"
+    )
+    for table, loader in _LOADERS.items():
+        raw = loader(db_path=db_path, typed=False)
+        start = time.perf_counter()
+        typed = apply_dtypes(raw)
+        seconds = time.perf_counter() - start
+        stats = memory_savings(raw, typed)
+        share = stats["saved_bytes"] / stats["before_bytes"] if stats["before_bytes"] else 0
+        print(
+            f"{table:<15}{len(raw):>10}{stats['before_bytes'] / mib:>12.1f}"
+            f"{stats['after_bytes'] / mib:>12.1f}{share:>8.0%}{seconds:>13.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
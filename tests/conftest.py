@@ -18,6 +18,13 @@ import types
 import os
 
 os.environ.setdefault("OPENAI_API_KEY", "dummy-test-key")
+# Tests stub the LLM per test; a persistent answer cache would leak answers
+# between them.  tests/utils/test_answer_cache.py enables it explicitly.
+os.environ.setdefault("MH_ANSWER_CACHE", "0")
+# get_all_* helpers would otherwise read snapshots past the query_dataframe
+# stub below (and write them next to the real DB).
+# tests/utils/test_snapshot_cache.py enables them explicitly.
+os.environ.setdefault("MH_SNAPSHOT_CACHE", "0")
 
 # ------------------------------------------------------------------
 # Speed-hack: avoid importing the full plotting stack (holoviews/bokeh)
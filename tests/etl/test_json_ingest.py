@@ -57,6 +57,9 @@ def test_ingest_idempotent(tmp_json_file: Path, tmp_db_file: Path):
     try:
         assert _count(conn, "patients") == 2
         assert _count(conn, "vitals") == 3
+        # ingest refreshes the feature store itself
+        assert _count(conn, "patient_features") == 2
+        assert _count(conn, "feature_change_log") == 0
     finally:
         conn.close()
 
@@ -123,3 +126,242 @@ def test_ingest_additional_data(tmp_path: Path, tmp_db_file: Path):  # noqa: D10
         assert _count(conn, "vitals") == 5
     finally:
         conn.close()
+
+
+def test_ingest_revalidate_consumes_change_log(tmp_json_file: Path, tmp_db_file: Path):
+    from app.utils.validation_engine import ValidationEngine
+
+    counts = ingest(tmp_json_file, tmp_db_file, revalidate=True)
+    assert "validation_issues" in counts
+
+    engine = ValidationEngine(str(tmp_db_file))
+    assert engine.get_changed_patients()[1] == []
+
+    # Re-ingesting identical data must not mark anyone as changed
+    ingest(tmp_json_file, tmp_db_file)
+    assert engine.get_changed_patients()[1] == []
+
+
+def _snapshot(db_file: Path):
+    conn = sqlite3.connect(db_file)
+    try:
+        counts = {t: _count(conn, t) for t in ("patients", "vitals", "ingest_audit")}
+        audit = conn.execute(
+            "SELECT filename, patients, vitals, scores, mental_health, lab_results, pmh "
+            "FROM ingest_audit"
+        ).fetchall()
+        vitals = conn.execute(
+            "SELECT patient_id, date, weight FROM vitals ORDER BY patient_id, date"
+        ).fetchall()
+    finally:
+        conn.close()
+    return counts, audit, vitals
+
+
+def test_streaming_ingest_matches_whole_file(tmp_json_file: Path, tmp_path: Path):
+    whole_db = tmp_path / "whole.db"
+    streamed_db = tmp_path / "streamed.db"
+    progress = []
+
+    whole = ingest(tmp_json_file, whole_db)
+    streamed = ingest(
+        tmp_json_file,
+        streamed_db,
+        batch_size=1,
+        progress=lambda done, totals: progress.append((done, totals["vitals"])),
+    )
+
+    assert streamed == whole
+    assert _snapshot(streamed_db) == _snapshot(whole_db)
+    assert _snapshot(streamed_db)[0]["ingest_audit"] == 1
+    assert [done for done, _ in progress] == [1, 2]
+    assert progress[-1][1] == whole["vitals"]
+
+
+def test_iter_json_array_handles_chunk_boundaries(tmp_path: Path):
+    from etl.json_ingest import iter_json_array
+
+    items = SAMPLE + [12.5, "a,]b", None, [1, [2]]]
+    f = tmp_path / "items.json"
+    f.write_text(json.dumps(items, indent=2))
+
+    assert list(iter_json_array(f, chunk_size=3)) == items
+
+    f.write_text('[{"id": "p1"}')
+    with pytest.raises(ValueError):
+        list(iter_json_array(f, chunk_size=4))
+
+
+def _indexes(db_file: Path):
+    conn = sqlite3.connect(db_file)
+    try:
+        return conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' ORDER BY name"
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def test_bulk_ingest_matches_default(tmp_json_file: Path, tmp_path: Path):
+    default_db = tmp_path / "default.db"
+    bulk_db = tmp_path / "bulk.db"
+
+    expected = ingest(tmp_json_file, default_db)
+    counts = ingest(tmp_json_file, bulk_db, bulk=True, rebuild_indexes=True)
+    rates = counts.pop("rows_per_second")
+
+    assert counts == expected
+    assert set(rates) == {"patients", "vitals"}
+    assert _snapshot(bulk_db) == _snapshot(default_db)
+    assert _indexes(bulk_db) == _indexes(default_db)
+
+    # Second (non-empty) load takes the merge/update path
+    ingest(tmp_json_file, default_db)
+    ingest(tmp_json_file, bulk_db, bulk=True, rebuild_indexes=True)
+    assert _snapshot(bulk_db) == _snapshot(default_db)
+
+    # Bulk pragmas are restored; the post-ingest feature refresh then opens
+    # both databases through the (WAL) connection pool alike
+    modes = []
+    for path in (default_db, bulk_db):
+        conn = sqlite3.connect(path)
+        try:
+            modes.append(conn.execute("PRAGMA journal_mode").fetchone()[0])
+        finally:
+            conn.close()
+    assert modes[1] == modes[0] != "memory"
+
+
+def test_failed_bulk_ingest_keeps_indexes(tmp_json_file: Path, tmp_path: Path):
+    db_file = tmp_path / "failed.db"
+    ingest(tmp_json_file, tmp_path / "reference.db")
+    truncated = tmp_path / "truncated.json"
+    truncated.write_text(tmp_json_file.read_text()[:-40])
+
+    with pytest.raises(ValueError):
+        ingest(truncated, db_file, bulk=True, rebuild_indexes=True, batch_size=1)
+
+    assert _indexes(db_file) == _indexes(tmp_path / "reference.db")
+    conn = sqlite3.connect(db_file)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM patients").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+
+def test_normalise_batch_reshapes_without_mutating_input():
+    import copy
+
+    from etl.json_ingest import normalise_batch
+
+    raw = [
+        {
+            "id": "p1",
+            "lab_results": [
+                {"date": "2025-01-01", "A1C": 6.1, "LDL": None, "HDL": 50},
+                {"date": "2025-02-01", "A1C": None, "LDL": 120.0, "HDL": None},
+            ],
+            "pmh_data": [{"name": "htn"}, {"patient_id": "p9", "name": "t2dm"}],
+        },
+        {"id": "p2", "lab_results": []},
+    ]
+    before = copy.deepcopy(raw)
+
+    frames = normalise_batch(raw)
+
+    assert raw == before
+    # Row-major order: all tests of the first lab row before the second
+    assert frames["lab_results"].values.tolist() == [
+        ["p1", "2025-01-01", "A1C", 6.1],
+        ["p1", "2025-01-01", "HDL", 50.0],
+        ["p1", "2025-02-01", "LDL", 120.0],
+    ]
+    assert frames["pmh"].values.tolist() == [["htn", "p1"], ["t2dm", "p9"]]
+    assert frames["vitals"].empty
+
+
+def test_reingest_skips_unchanged_and_rewrites_changed_entities(tmp_path: Path):
+    db_file = tmp_path / "hash.db"
+    night1 = [
+        {**SAMPLE[0], "pmh_data": [{"name": "htn"}]},
+        {**SAMPLE[1], "pmh_data": [{"name": "t2dm"}]},
+    ]
+    f = tmp_path / "night.json"
+    f.write_text(json.dumps(night1))
+    first = ingest(f, db_file)
+    assert (first["new_patients"], first["changed_patients"]) == (2, 0)
+
+    # p1 gains a PMH entry, p2 is unchanged, p3 is new
+    night2 = json.loads(json.dumps(night1))
+    night2[0]["pmh_data"].append({"name": "obesity"})
+    night2.append({"id": "p3", "first_name": "E", "last_name": "F"})
+    f.write_text(json.dumps(night2))
+    counts = ingest(f, db_file)
+
+    assert counts["new_patients"] == 1
+    assert counts["changed_patients"] == 1
+    assert counts["skipped_patients"] == 1
+    # Only p1's PMH and p3's patient row were written
+    assert (counts["patients"], counts["vitals"], counts["pmh"]) == (1, 0, 2)
+
+    conn = sqlite3.connect(db_file)
+    try:
+        pmh = conn.execute(
+            "SELECT patient_id, condition FROM pmh ORDER BY patient_id, condition"
+        ).fetchall()
+        assert pmh == [("p1", "htn"), ("p1", "obesity"), ("p2", "t2dm")]
+        audit = conn.execute(
+            "SELECT new_patients, changed_patients, skipped_patients "
+            "FROM ingest_audit ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        assert audit == (1, 1, 1)
+
+        # An edit outside the ingest invalidates the stored hash
+        conn.execute("UPDATE vitals SET weight = 1 WHERE patient_id = 'p2'")
+        conn.commit()
+    finally:
+        conn.close()
+
+    counts = ingest(f, db_file)
+    assert (counts["changed_patients"], counts["skipped_patients"]) == (1, 2)
+    conn = sqlite3.connect(db_file)
+    try:
+        assert conn.execute(
+            "SELECT weight FROM vitals WHERE patient_id = 'p2'"
+        ).fetchall() == [(90.0,)]
+    finally:
+        conn.close()
+
+
+def test_pipelined_ingest_matches_serial(tmp_json_file: Path, tmp_path: Path, monkeypatch):
+    import etl.json_ingest as json_ingest
+
+    serial_db = tmp_path / "serial.db"
+    piped_db = tmp_path / "piped.db"
+    progress = []
+
+    expected = ingest(tmp_json_file, serial_db, batch_size=1)
+    counts = ingest(
+        tmp_json_file,
+        piped_db,
+        batch_size=1,
+        workers=2,
+        queue_depth=1,
+        progress=lambda done, totals: progress.append(done),
+    )
+    stages = counts.pop("pipeline")
+
+    assert counts == expected
+    assert _snapshot(piped_db) == _snapshot(serial_db)
+    assert progress == [1, 2]
+    assert stages["read"]["patients"] == stages["normalise"]["patients"] == 2
+    assert stages["write"]["rows"] == expected["patients"] + expected["vitals"]
+
+    # Without a usable process pool the same ingest runs in-process
+    def no_pool(*args, **kwargs):
+        raise OSError("no process pool")
+
+    monkeypatch.setattr(json_ingest, "ProcessPoolExecutor", no_pool)
+    fallback_db = tmp_path / "fallback.db"
+    assert ingest(tmp_json_file, fallback_db, workers=2) == expected
+    assert _snapshot(fallback_db) == _snapshot(serial_db)
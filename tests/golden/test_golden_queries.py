@@ -131,12 +131,11 @@ def _make_fake_df(case):  # noqa: D401
 
         # --- FALLBACK CHECK: TOP_N --- (dict represents value counts)
         elif intent["analysis_type"] == "top_n":
-            # Expected structure: {category_value: count}
-            metric_col = intent["target_field"]
-            rows = []
-            for key, cnt in expected.items():
-                rows.extend([key] * cnt)
-            return pd.DataFrame({metric_col: rows})
+            # Expected structure: {category_value: count}; the SQL already
+            # groups and ranks, returning one (value, count) row per category
+            return pd.DataFrame(
+                {"value": list(expected.keys()), "count": list(expected.values())}
+            )
 
         # --- CORRELATION ANALYSIS --- (dict with correlation_coefficient)
         elif (
@@ -267,7 +266,7 @@ def test_golden_query(monkeypatch: pytest.MonkeyPatch, case):  # noqa: D103 –
         # Fix query_dataframe issue by manually adding db_query prefix
         if "query_dataframe" in code and "db_query.query_dataframe" not in code:
             code = code.replace(
-                "df = query_dataframe(sql)", "df = db_query.query_dataframe(sql)"
+                "df = query_dataframe(sql", "df = db_query.query_dataframe(sql"
             )
             print("Fixed query_dataframe reference in generated code")
 
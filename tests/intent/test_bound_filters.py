@@ -0,0 +1,41 @@
+"""Filters compile to ``?`` placeholders plus a parameter tuple."""
+
+from app.utils.ai.code_generator import generate_code
+from app.utils.ai.sql_builder import build_filters, build_filters_clause, inline_params
+from app.utils.query_intent import QueryIntent
+
+
+def _intent(**kwargs):
+    return QueryIntent(
+        **{"analysis_type": "average", "target_field": "weight", **kwargs}
+    )
+
+
+def test_build_filters_binds_values_in_order():
+    intent = _intent(
+        filters=[{"field": "gender", "value": "female"}],
+        conditions=[
+            {"field": "bmi", "operator": "between", "value": [25, 30]},
+            {"field": "ethnicity", "operator": "in", "value": ["Asian", "White"]},
+        ],
+        time_range={"start_date": "2025-01-01", "end_date": "2025-03-31"},
+    )
+
+    where, params = build_filters(intent)
+
+    assert "'" not in where
+    assert params == ("2025-01-01", "2025-03-31", "F", 25, 30, "Asian", "White")
+    assert inline_params(where, params) == build_filters_clause(intent)
+
+
+def test_values_do_not_change_generated_sql():
+    first = generate_code(_intent(filters=[{"field": "gender", "value": "F"}]))
+    second = generate_code(_intent(filters=[{"field": "gender", "value": "M"}]))
+
+    sql_lines = [
+        [line for line in code.splitlines() if line.startswith("sql = ")]
+        for code in (first, second)
+    ]
+    assert sql_lines[0] == sql_lines[1]
+    assert "params = ('F',)" in first
+    assert "df = query_dataframe(sql, params)" in first
@@ -0,0 +1,157 @@
+"""Template intents run in-process as an ExecutionPlan; other code uses the sandbox."""
+
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+import app.db_query as db_query
+import app.engine as engine_mod
+from app.engine import AnalysisEngine
+from app.utils.ai.code_generator import generate_code
+from app.utils.ai.execution_plan import compile_plan
+from app.utils.db_migrations import apply_pending_migrations
+from app.utils.query_intent import QueryIntent
+
+_query_dataframe = db_query.query_dataframe
+
+
+@pytest.fixture()
+def db(tmp_path, monkeypatch):
+    path = str(tmp_path / "plan.db")
+    apply_pending_migrations(path)
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO patients (id, first_name, last_name, gender, active) "
+        "VALUES (?, 'A', 'B', ?, ?)",
+        [("1", "F", 1), ("2", "M", 1), ("3", "F", 0)],
+    )
+    conn.executemany(
+        "INSERT INTO vitals (patient_id, date, bmi) VALUES (?, ?, ?)",
+        [("1", "2025-01-05", 30.0), ("2", "2025-01-20", 34.0), ("3", "2025-02-02", 26.0)],
+    )
+    conn.commit()
+    conn.close()
+    monkeypatch.setenv("MH_DB_PATH", path)
+    # conftest stubs query_dataframe; plans must read the seeded database
+    monkeypatch.setattr(db_query, "query_dataframe", _query_dataframe)
+    return path
+
+
+def test_compile_plan_only_for_template_types():
+    assert compile_plan(QueryIntent(analysis_type="unknown", target_field=None)) is None
+
+    intent = QueryIntent(analysis_type="average", target_field="bmi")
+    plan = compile_plan(intent)
+    assert plan.analysis_type == "average"
+    assert plan.code == generate_code(intent)
+
+
+def test_plan_runs_template_in_process(db):
+    intent = QueryIntent(
+        analysis_type="comparison", target_field="bmi", group_by=["gender"]
+    )
+    results = compile_plan(intent).run()
+
+    assert results["comparison"] == pytest.approx({"F": 28.0, "M": 34.0})
+    assert results["counts"] == {"F": 2, "M": 1}
+    assert "execution_time" in results
+
+
+@pytest.mark.parametrize("analysis_type", ["top_n", "average", "comparison"])
+def test_unknown_fields_never_run_in_process(db, tmp_path, analysis_type):
+    marker = tmp_path / "pwned"
+    payload = f"bmi'] if False else None\nimport os; os.system('touch {marker}')\n#"
+    for fields in (
+        {"target_field": payload, "group_by": ["gender"]},
+        {"target_field": "bmi", "group_by": [payload]},
+        {"target_field": "bmi", "group_by": ["gender"], "filters": [{"field": payload, "value": 1}]},
+    ):
+        intent = QueryIntent(analysis_type=analysis_type, **fields)
+        assert compile_plan(intent) is None
+    assert not marker.exists()
+
+    # Filter values only reach the code as bound params or flattened comments
+    intent = QueryIntent(
+        analysis_type="average",
+        target_field="bmi",
+        group_by=["gender"],
+        filters=[{"field": "gender", "value": "F\nresults = 'pwned' #"}],
+    )
+    code = compile_plan(intent).code
+    assert not any(line.startswith("results = 'pwned'") for line in code.splitlines())
+
+
+@pytest.mark.parametrize(
+    "parameters",
+    [
+        {"method": "pearson' if open({marker!r}, 'w') else '"},
+        {"correlation_type": "time_series", "period": "month' if open({marker!r}, 'w') else '"},
+        {"correlation_type": "time_series", "rolling_window": "3 if open({marker!r}, 'w') else 3"},
+    ],
+)
+def test_parameter_injection_never_runs_in_process(db, tmp_path, parameters):
+    marker = str(tmp_path / "pwned")
+    parameters = {k: v.format(marker=marker) for k, v in parameters.items()}
+    intent = QueryIntent(
+        analysis_type="correlation",
+        target_field="weight",
+        additional_fields=["bmi"],
+        parameters=parameters,
+    )
+    assert compile_plan(intent) is None
+
+    # The generator refuses the value too, so the sandbox never sees it either
+    exec(generate_code(intent), {})  # noqa: S102
+    assert not (tmp_path / "pwned").exists()
+
+    safe = QueryIntent(
+        analysis_type="correlation",
+        target_field="weight",
+        additional_fields=["bmi"],
+        parameters={"method": "spearman", "period": "quarter", "rolling_window": 2},
+    )
+    assert compile_plan(safe) is not None
+
+
+def test_plan_errors_are_returned_not_raised():
+    plan = compile_plan(QueryIntent(analysis_type="average", target_field="bmi"))
+    broken = type(plan)(plan.analysis_type, "results = 1 / 0")
+    assert "division by zero" in broken.run()["error"]
+
+
+@pytest.mark.parametrize("trusted", [True, False])
+def test_engine_bypasses_sandbox_only_for_template_code(db, monkeypatch, trusted):
+    intent = QueryIntent(
+        analysis_type="average",
+        target_field="bmi",
+        filters=[{"field": "gender", "value": "F"}],
+    )
+    sandbox_calls = []
+
+    def fake_code(intent, schema, custom_prompt=None):
+        return generate_code(intent) if trusted else "results = 99.0"
+
+    def fake_run(code):
+        sandbox_calls.append(code)
+        return 99.0
+
+    monkeypatch.setattr(engine_mod.ai, "get_query_intent", lambda q: intent)
+    monkeypatch.setattr(engine_mod.ai, "generate_analysis_code", fake_code)
+    monkeypatch.setattr(engine_mod, "run_snippet", fake_run)
+
+    eng = AnalysisEngine()
+    eng.process_query("average BMI of women")
+    eng.generate_analysis_code()
+    result = eng.execute_analysis()
+
+    if trusted:
+        assert eng.plan is not None
+        # The engine adds its own gender/active filters; any real BMI will do
+        assert 26.0 <= result <= 34.0
+        assert sandbox_calls == []
+    else:
+        assert eng.plan is None
+        assert result == 99.0
+        assert len(sandbox_calls) == 1
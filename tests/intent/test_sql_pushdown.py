@@ -0,0 +1,221 @@
+"""Equivalence tests for the SQL push-down templates (trend, top-N, histogram,
+comparison).
+
+Each generated snippet runs against a seeded SQLite database and is compared
+with the former pandas computation over the raw rows of the same source.
+Intents come from the golden queries plus a few filtered variants.
+"""
+
+from __future__ import annotations
+
+import random
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+
+from app.db_query import query_dataframe
+from app.utils.ai.code_generator import generate_code
+from app.utils.ai.sql_compiler import column_ref, compile_trend, resolve_source
+from app.utils.db_migrations import apply_pending_migrations
+from app.utils.query_intent import QueryIntent
+
+_GOLDEN = Path(__file__).parents[1] / "golden" / "qa.yaml"
+_PUSHED_DOWN = {"trend", "top_n", "distribution", "comparison"}
+
+
+def _golden_intents():
+    cases = yaml.safe_load(_GOLDEN.read_text())
+    return [
+        pytest.param(case["intent"], id=case["name"])
+        for case in cases
+        if case["intent"]["analysis_type"] in _PUSHED_DOWN
+    ]
+
+
+_EXTRA_INTENTS = [
+    pytest.param(
+        {"analysis_type": "distribution", "target_field": "bmi"}, id="bmi_histogram"
+    ),
+    pytest.param(
+        {
+            "analysis_type": "distribution",
+            "target_field": "weight",
+            "filters": [{"field": "gender", "value": "female"}],
+            "parameters": {"bins": 7},
+        },
+        id="female_weight_histogram",
+    ),
+    pytest.param(
+        {
+            "analysis_type": "trend",
+            "target_field": "sbp",
+            "filters": [{"field": "active", "value": 1}],
+            "parameters": {"period": "week"},
+        },
+        id="active_sbp_weekly_trend",
+    ),
+    pytest.param(
+        {
+            "analysis_type": "comparison",
+            "target_field": "weight",
+            "group_by": ["ethnicity"],
+            "conditions": [{"field": "bmi", "operator": ">", "value": 30}],
+        },
+        id="weight_by_ethnicity_obese",
+    ),
+]
+
+
+_DAYS = [(y, m, d) for y in (2024, 2025) for m in range(1, 13) for d in range(1, 29)]
+
+
+@pytest.fixture(scope="module")
+def seeded_db(tmp_path_factory):
+    db_path = str(tmp_path_factory.mktemp("pushdown") / "pushdown.db")
+    apply_pending_migrations(db_path)
+    rng = random.Random(7)
+    conn = sqlite3.connect(db_path)
+    for pid in range(60):
+        conn.execute(
+            "INSERT INTO patients (id, first_name, last_name, gender, ethnicity, "
+            "active, birth_date) VALUES (?, 'A', 'B', ?, ?, ?, ?)",
+            (
+                str(pid),
+                rng.choice(["F", "M"]),
+                rng.choice(["Asian", "Hispanic", "White", None]),
+                rng.randint(0, 1),
+                f"{rng.randint(1940, 2000)}-{rng.randint(1, 12):02d}-15",
+            ),
+        )
+        # Distinct dates: vitals are unique per (patient_id, date)
+        for year, month, day in rng.sample(_DAYS, 12):
+            conn.execute(
+                "INSERT INTO vitals (patient_id, date, weight, bmi, sbp) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    str(pid),
+                    f"{year}-{month:02d}-{day:02d}",
+                    rng.choice([None, round(rng.uniform(120, 260), 1)]),
+                    round(rng.uniform(10, 75), 1),
+                    rng.randint(100, 170),
+                ),
+            )
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def _run(code, db_path):
+    namespace = {
+        "pd": pd,
+        "np": np,
+        "query_dataframe": lambda sql, params=None: query_dataframe(
+            sql, params, db_path=db_path
+        ),
+    }
+    exec(code, namespace)  # noqa: S102 – generated template code
+    return namespace["results"]
+
+
+def _raw(intent, columns, db_path):
+    fields = [intent.target_field, *(intent.group_by or [])]
+    if intent.analysis_type == "trend":
+        fields.append("date")
+    from_clause, terms, params = resolve_source(intent, fields)
+    where = f" WHERE {' AND '.join(terms)}" if terms else ""
+    return query_dataframe(
+        f"SELECT {', '.join(columns)} FROM {from_clause}{where}",
+        params,
+        db_path=db_path,
+    )
+
+
+def _expected(intent, db_path):
+    target = intent.target_field
+    col = column_ref(target)
+    kind = intent.analysis_type
+    if kind == "trend":
+        df = _raw(intent, [f"{col} AS x", "v.date"], db_path)
+        df["date"] = pd.to_datetime(df["date"])
+        period = intent.parameters.get("period", "month")
+        fmt = "%Y-%m" if period == "month" else "%Y-%U"
+        return df.groupby(df["date"].dt.strftime(fmt))["x"].mean().to_dict()
+    if kind == "top_n":
+        id_col = "p.id" if col.startswith(("p.", "CAST")) else "v.vital_id"
+        df = _raw(intent, [f"{id_col} AS row_id", f"{col} AS x"], db_path)
+        return df.drop_duplicates("row_id")["x"].value_counts()
+    if kind == "comparison":
+        group = column_ref(intent.group_by[0])
+        df = _raw(intent, [f"{group} AS g", f"{col} AS x"], db_path)
+        grouped = df.groupby("g")["x"]
+        return {
+            "comparison": grouped.mean().to_dict(),
+            "counts": grouped.size().to_dict(),
+        }
+    df = _raw(intent, [f"{col} AS x"], db_path).dropna()
+    if target == "bmi":
+        df = df[(df["x"] >= 12) & (df["x"] <= 70)]
+    counts, edges = np.histogram(df["x"], bins=intent.parameters.get("bins", 10))
+    return {"counts": counts.tolist(), "bin_edges": edges.tolist()}
+
+
+@pytest.mark.parametrize("intent_dict", _golden_intents() + _EXTRA_INTENTS)
+def test_pushdown_matches_pandas(seeded_db, intent_dict):
+    intent = QueryIntent(**{"filters": [], "conditions": [], **intent_dict})
+    code = generate_code(intent, intent.parameters)
+    results = _run(code, seeded_db)
+    expected = _expected(intent, seeded_db)
+
+    if intent.analysis_type == "top_n":
+        n = intent.parameters.get("n", 10)
+        assert results == {k: expected[k] for k in results}
+        assert sorted(results.values()) == sorted(expected.nlargest(n).tolist())
+    elif intent.analysis_type == "distribution":
+        assert results["counts"] == expected["counts"]
+        assert np.allclose(results["bin_edges"], expected["bin_edges"])
+    elif intent.analysis_type == "comparison":
+        assert results["counts"] == expected["counts"]
+        assert results["comparison"] == pytest.approx(expected["comparison"])
+    else:
+        assert results == pytest.approx(expected, nan_ok=True)
+        assert results
+
+
+def test_pushdown_returns_result_sized_frames(seeded_db):
+    intent = QueryIntent(
+        analysis_type="trend", target_field="weight", filters=[], conditions=[]
+    )
+    code = generate_code(intent)
+    assert "GROUP BY period" in code
+    assert "df.groupby" not in code
+
+    rows = sqlite3.connect(seeded_db).execute(*compile_trend(intent)).fetchall()
+    assert len(rows) <= 24  # two years of months, not 720 vitals rows
+
+
+@pytest.mark.parametrize(
+    "field", ["bmi'] if False else None", "bmi\nimport os", "weight) --", "score_type"]
+)
+def test_unknown_fields_are_rejected(field):
+    with pytest.raises(ValueError, match="Unknown field"):
+        column_ref(field)
+
+    target = QueryIntent(analysis_type="top_n", target_field=field)
+    with pytest.raises(ValueError):
+        resolve_source(target, [target.target_field])
+    filtered = QueryIntent(
+        analysis_type="trend",
+        target_field="weight",
+        filters=[{"field": field, "value": 1}],
+    )
+    with pytest.raises(ValueError):
+        compile_trend(filtered)
+
+    # Generators turn the rejection into an error result without any SQL
+    code = generate_code(target)
+    assert "query_dataframe" not in code
+    assert "Unknown field" in _run(code, ":memory:")["error"]
@@ -0,0 +1,107 @@
+"""Tests for the warm sandbox worker pool (app.utils.sandbox_pool)."""
+
+import os
+import threading
+import time
+
+import pytest
+
+from app.utils.sandbox_pool import SandboxWorkerPool
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="POSIX process semantics")
+
+
+@pytest.fixture()
+def pool():
+    p = SandboxWorkerPool(size=1, max_tasks=3)
+    yield p
+    p.shutdown()
+
+
+def test_worker_is_reused_and_recycled(pool):
+    pids = [pool.run("import os\nresults = os.getpid()").value for _ in range(4)]
+
+    # first three runs share a warm worker, the fourth gets its replacement
+    assert len(set(pids[:3])) == 1
+    assert pids[3] != pids[0]
+    assert pool.stats()["recycled"] == 1
+
+
+def test_timeout_kills_worker_and_pool_recovers(pool):
+    res = pool.run("while True:\n    pass", timeout=1)
+    assert res.type == "error"
+    assert "timed out" in res.value
+
+    ok = pool.run("results = 2 + 2")
+    assert (ok.type, ok.value) == ("scalar", 4)
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_import_whitelist_still_enforced(pool):
+    res = pool.run("import socket\nresults = 1")
+    assert res.type == "error"
+    assert "blocked in sandbox" in res.value
+
+
+def test_snippet_globals_do_not_leak(pool):
+    pool.run("global leaked\nleaked = 5\nresults = 1")
+    res = pool.run("results = leaked")
+    assert res.type == "error"
+    assert "leaked" in res.value
+
+
+@pytest.mark.parametrize(
+    "patch",
+    [
+        "pd._leak = 42",
+        "db_query.query_dataframe = lambda *a, **k: pd.DataFrame({'n': [-1]})",
+        "pd.DataFrame.mean = lambda self, *a, **k: -1",
+        "os.environ['MH_DB_PATH'] = '/tmp/elsewhere.db'",
+    ],
+)
+def test_module_patches_do_not_leak(pool, patch):
+    first = pool.run(f"import os\n{patch}\nresults = os.getpid()")
+    second = pool.run(
+        "import os\n"
+        "results = [os.getpid(), getattr(pd, '_leak', None),"
+        " db_query.query_dataframe.__name__, pd.DataFrame({'a': [1, 3]}).mean()['a'],"
+        " os.environ.get('MH_DB_PATH') == '/tmp/elsewhere.db']"
+    )
+    assert second.value[0] != first.value  # fresh worker
+    assert second.value[1:] == [None, "query_dataframe", 2.0, False]
+    assert pool.stats()["recycled"] == 1
+
+
+def test_unpatched_snippets_keep_their_worker(pool):
+    code = "import os\nresults = (os.getpid(), float(pd.Series([1, 2]).mean()))"
+    pids = {pool.run(code).value[0] for _ in range(3)}
+    assert len(pids) == 1
+
+
+def test_queue_wait_counts_against_timeout():
+    pool = SandboxWorkerPool(size=1)
+    try:
+        busy = threading.Thread(target=pool.run, args=("import time\ntime.sleep(3)\nresults = 1",))
+        busy.start()
+        time.sleep(0.5)
+        start = time.monotonic()
+        res = pool.run("results = 1", timeout=1)
+        assert time.monotonic() - start < 2
+        assert res.type == "error"
+        assert "timed out" in res.value
+        busy.join()
+    finally:
+        pool.shutdown()
+
+
+def test_dataframe_round_trip(pool):
+    res = pool.run("results = pd.DataFrame({'a': [1, 2, 3]})")
+    assert res.type == "dataframe"
+    assert res.value["a"].tolist() == [1, 2, 3]
+
+
+def test_large_dataframe_uses_shared_memory(pool):
+    res = pool.run("results = pd.DataFrame({'x': np.arange(300_000, dtype=float)})")
+    assert res.type == "dataframe"
+    assert res.meta["transport"] == "shared_memory"
+    assert res.value["x"].sum() == sum(range(300_000))
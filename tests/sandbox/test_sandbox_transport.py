@@ -0,0 +1,128 @@
+"""Tests for the shared-memory result transport (app.utils.sandbox_transport)."""
+
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.sandbox import SandboxResult
+from app.utils.sandbox_pool import SandboxWorkerPool, _Worker
+from app.utils.sandbox_transport import (
+    SharedFrameRef,
+    install_worker_cleanup,
+    pack_result,
+    unpack_result,
+)
+
+
+def _round_trip(value, type_, **kwargs):
+    packed = pack_result(SandboxResult(type=type_, value=value), min_bytes=0, **kwargs)
+    return packed, unpack_result(packed)
+
+
+def test_dataframe_round_trip_through_shared_memory():
+    df = pd.DataFrame(
+        {
+            "weight": np.linspace(50, 120, 1000),
+            "name": [f"p{i}" for i in range(1000)],
+            "date": pd.date_range("2025-01-01", periods=1000, freq="h"),
+        },
+        index=pd.RangeIndex(100, 1100, name="row"),
+    )
+    packed, res = _round_trip(df, "dataframe")
+
+    assert isinstance(packed.value, SharedFrameRef)
+    assert res.meta["transport"] == "shared_memory"
+    pd.testing.assert_frame_equal(res.value, df)
+
+
+def test_series_keeps_name_and_index():
+    s = pd.Series([1.5, 2.5, None], index=["a", "b", "c"], name="bmi")
+    _, res = _round_trip(s, "series")
+    pd.testing.assert_series_equal(res.value, s)
+
+
+def test_small_and_non_arrow_results_stay_pickled():
+    small = SandboxResult(type="dataframe", value=pd.DataFrame({"a": [1]}))
+    assert pack_result(small) is small
+
+    mixed = SandboxResult(type="dataframe", value=pd.DataFrame({"m": [1, "a"]}))
+    assert pack_result(mixed, min_bytes=0) is mixed
+
+
+def test_byte_budget_enforced_on_shared_buffer():
+    df = pd.DataFrame({"x": np.zeros(10_000)})
+    packed = pack_result(SandboxResult(type="dataframe", value=df), min_bytes=0, max_bytes=1000)
+    assert packed.type == "error"
+    assert "dataframe too large" in packed.value.lower()
+
+
+def test_default_budget_admits_text_heavy_frames():
+    df = pd.DataFrame({f"c{i}": [f"patient note {j}" for j in range(100_000)] for i in range(5)})
+    packed, res = _round_trip(df, "dataframe")
+    assert isinstance(packed.value, SharedFrameRef)
+    pd.testing.assert_frame_equal(res.value, df)
+
+
+def test_byte_budget_enforced_on_pickled_fallback():
+    mixed = pd.DataFrame({"m": [1, "a"] * 1000})
+    packed = pack_result(SandboxResult(type="dataframe", value=mixed), min_bytes=0, max_bytes=1000)
+    assert packed.type == "error"
+    assert "dataframe too large" in packed.value.lower()
+
+
+@pytest.mark.parametrize("value", [42, {"a": 1}, "text"])
+def test_other_results_pass_through(value):
+    result = SandboxResult(type="object", value=value)
+    assert unpack_result(pack_result(result, min_bytes=0)) is result
+
+
+def _segment_exists(name):
+    try:
+        shared_memory.SharedMemory(name=name).close()
+    except FileNotFoundError:
+        return False
+    return True
+
+
+class _DeadProcess:
+    def is_alive(self):
+        return False
+
+    def join(self, timeout=None):
+        pass
+
+
+def test_killed_worker_result_is_unlinked():
+    df = pd.DataFrame({"x": np.arange(1000, dtype=float)})
+    packed = pack_result(SandboxResult(type="dataframe", value=df), min_bytes=0)
+    parent, child = multiprocessing.Pipe()
+    child.send((packed, False))  # arrived after the parent gave up
+
+    SandboxWorkerPool._kill(_Worker(_DeadProcess(), parent))
+    assert not _segment_exists(packed.value.name)
+
+
+def _pack_then_hang(conn):
+    install_worker_cleanup()
+    df = pd.DataFrame({"x": np.arange(1000, dtype=float)})
+    packed = pack_result(SandboxResult(type="dataframe", value=df), min_bytes=0)
+    conn.send(packed.value.name)  # a name only, the result is never handed over
+    conn.recv()
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX signal semantics")
+def test_terminated_worker_unlinks_pending_segment():
+    ctx = multiprocessing.get_context("fork")
+    parent, child = ctx.Pipe()
+    process = ctx.Process(target=_pack_then_hang, args=(child,))
+    process.start()
+    name = parent.recv()
+    assert _segment_exists(name)
+
+    process.terminate()
+    process.join(timeout=5)
+    assert not _segment_exists(name)
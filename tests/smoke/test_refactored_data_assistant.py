@@ -209,3 +209,98 @@ def test_refactored_components_with_clarification():
 
 if __name__ == "__main__":
     pytest.main(["-xvs", __file__])
+
+
+@pytest.mark.smoke
+def test_stale_narrative_stream_keeps_its_own_query_state(monkeypatch):
+    """A narrative finishing after a new query started must not touch the UI."""
+    import panel as pn
+
+    assistant = DataAnalysisAssistant(test_mode=True)
+    assistant.test_mode = False  # log like the threaded path, but run inline
+    assistant.ui.update_status = MagicMock()
+    assistant.query_text = "old query"
+    assistant.engine.execution_results = {"average": 30.0}
+    assistant.engine.intent = "old intent"
+    assistant.engine.generated_code = "old code"
+
+    validated, logged = [], []
+    monkeypatch.setattr(
+        "app.utils.preprocess.validate_narrative",
+        lambda text, query, results: validated.append((query, results)) or text,
+    )
+    monkeypatch.setattr(
+        "app.utils.query_logging.log_interaction",
+        lambda query, **kw: logged.append((query, kw["intent"], kw["generated_code"])),
+    )
+
+    shown = []
+
+    def _interpret(on_token=None):
+        on_token("The average ")
+        shown.append(pane.object)
+        # The user starts a new query while the model is still streaming
+        assistant._process_query = MagicMock()
+        assistant._narrative_token = None
+        assistant.query_text = "new query"
+        assistant.engine.execution_results = {"count": 7}
+        assistant.engine.intent = "new intent"
+        assistant.engine.generated_code = "new code"
+        on_token("BMI is 30.")
+        return "The average BMI is 30."
+
+    assistant.engine.interpret_results = _interpret
+    pane = pn.pane.Markdown("placeholder")
+    token = assistant._narrative_token = object()
+    snapshot = {
+        "query_text": "old query",
+        "results": {"average": 30.0},
+        "intent": "old intent",
+        "generated_code": "old code",
+    }
+    assistant._stream_narrative(pane, token, snapshot)
+
+    assert pane.object == shown[0]  # nothing painted once the stream went stale
+    assert validated == [("old query", {"average": 30.0})]
+    assert logged == [("old query", "old intent", "old code")]
+    assistant.ui.update_status.assert_not_called()
+
+
+@pytest.mark.smoke
+def test_fully_cached_answer_skips_to_results():
+    """Intent, code and result cache hits go straight to the results stage."""
+    assistant = DataAnalysisAssistant(test_mode=True)
+    assistant.query_text = "What is the average BMI?"
+    engine = assistant.engine
+
+    def _process_query(query):
+        engine.cache_hits = {"intent": True, "code": False, "result": False}
+        engine.intent = MagicMock()
+        return engine.intent
+
+    def _generate():
+        engine.cache_hits["code"] = True
+        engine.generated_code = "results = 30.0"
+
+    def _execute():
+        engine.cache_hits["result"] = True
+        engine.execution_results = 30.0
+
+    engine.process_query = _process_query
+    engine.generate_analysis_code = MagicMock(side_effect=_generate)
+    engine.execute_analysis = MagicMock(side_effect=_execute)
+    assistant._generate_analysis_code = MagicMock()
+    assistant._execute_analysis = MagicMock()
+    assistant._display_final_results = MagicMock()
+    assistant.ui.display_generated_code = MagicMock()
+    assistant.ui.display_execution_results = MagicMock()
+
+    with patch("app.data_assistant.is_truly_ambiguous_query", return_value=False):
+        assistant._process_query()
+
+    assistant._generate_analysis_code.assert_not_called()
+    assistant._execute_analysis.assert_not_called()
+    engine.execute_analysis.assert_called_once()
+    assert assistant.workflow.current_stage == WorkflowStages.RESULTS
+    assistant._display_final_results.assert_called_once()
+    assistant.ui.display_generated_code.assert_called_once_with("results = 30.0")
@@ -52,7 +52,7 @@ def test_tricky_pipeline(monkeypatch: pytest.MonkeyPatch, case):  # noqa: D103
     # Fix query_dataframe issue by manually adding db_query prefix
     if "query_dataframe" in code and "db_query.query_dataframe" not in code:
         code = code.replace(
-            "df = query_dataframe(sql)", "df = db_query.query_dataframe(sql)"
+            "df = query_dataframe(sql", "df = db_query.query_dataframe(sql"
         )
         print("Fixed query_dataframe reference in generated code")
 
@@ -0,0 +1,114 @@
+"""Tests for the layered assistant answer cache (app.utils.answer_cache)."""
+
+from __future__ import annotations
+
+import pytest
+
+import app.engine as engine_mod
+from app.engine import AnalysisEngine
+from app.utils.answer_cache import AnswerCache, data_version_stamp
+from app.utils.db_migrations import apply_pending_migrations
+from app.utils.db_pool import write_connection
+from app.utils.query_intent import QueryIntent
+
+
+@pytest.fixture()
+def cache(tmp_path):
+    return AnswerCache(str(tmp_path / "cache.db"))
+
+
+def test_round_trip_and_ttl(cache):
+    assert cache.get("code", "k") == (False, None)
+    assert cache.put("code", "k", {"code": "results = 1"})
+    assert cache.get("code", "k") == (True, {"code": "results = 1"})
+
+    cache.ttl_seconds = -1
+    assert cache.get("code", "k") == (False, None)
+    assert cache.stats()["code"]["hits"] == 1
+
+
+def test_size_based_lru_eviction(cache):
+    cache.put("result", "a", "x" * 1000)
+    cache.put("result", "b", "x" * 1000)
+    cache.get("result", "a")  # "b" is now least recently used
+    cache.max_bytes = 2500
+    cache.put("result", "c", "x" * 1000)
+
+    assert cache.get("result", "b")[0] is False
+    assert cache.get("result", "a")[0] and cache.get("result", "c")[0]
+
+
+def test_data_version_ignores_log_writes(tmp_path):
+    db = str(tmp_path / "patients.db")
+    apply_pending_migrations(db)
+    before = data_version_stamp(db)
+
+    with write_connection(db) as conn:
+        conn.execute("INSERT INTO assistant_logs (query) VALUES ('q')")
+    assert data_version_stamp(db) == before
+
+    with write_connection(db) as conn:
+        conn.execute(
+            "INSERT INTO patients (id, first_name, last_name) VALUES ('1', 'A', 'B')"
+        )
+    assert data_version_stamp(db) != before
+
+
+def test_engine_skips_cached_stages(tmp_path, monkeypatch, cache):
+    db = str(tmp_path / "patients.db")
+    apply_pending_migrations(db)
+    monkeypatch.setenv("MH_DB_PATH", db)
+    monkeypatch.setenv("MH_ANSWER_CACHE", "1")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(engine_mod, "get_answer_cache", lambda: cache)
+
+    calls = {"intent": 0, "code": 0, "run": 0, "narrative": 0}
+
+    def fake_intent(query):
+        calls["intent"] += 1
+        return QueryIntent(analysis_type="average", target_field="bmi")
+
+    def fake_code(intent, schema, custom_prompt=None):
+        calls["code"] += 1
+        return "results = 31.5"
+
+    def fake_run(code):
+        calls["run"] += 1
+        return 31.5
+
+    def fake_narrative(query, results, visualizations=None):
+        calls["narrative"] += 1
+        return "Average BMI is 31.5."
+
+    monkeypatch.setattr(engine_mod.ai, "get_query_intent", fake_intent)
+    monkeypatch.setattr(engine_mod.ai, "generate_analysis_code", fake_code)
+    monkeypatch.setattr(engine_mod.ai, "interpret_results", fake_narrative)
+    monkeypatch.setattr(engine_mod, "run_snippet", fake_run)
+
+    def ask(question):
+        eng = AnalysisEngine()
+        eng.process_query(question)
+        eng.generate_analysis_code()
+        eng.execute_analysis()
+        return eng, eng.interpret_results()
+
+    first, text = ask("Average BMI of active patients?")
+    assert not any(first.cache_hits.values())
+
+    second, again = ask("average  BMI of active patients")
+    assert all(second.cache_hits.values())
+    assert (again, second.execution_results) == (text, 31.5)
+    assert calls == {"intent": 1, "code": 1, "run": 1, "narrative": 1}
+
+    with write_connection(db) as conn:
+        conn.execute(
+            "INSERT INTO vitals (patient_id, date, bmi) VALUES ('1', '2025-01-01', 30)"
+        )
+    third, _ = ask("average BMI of active patients")
+    assert third.cache_hits == {
+        "intent": True,
+        "code": True,
+        "result": False,
+        "narrative": False,
+    }
+    assert calls["run"] == 2
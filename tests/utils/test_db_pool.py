@@ -0,0 +1,166 @@
+"""Tests for the pooled SQLite connection manager (app.utils.db_pool)."""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from app.utils.db_pool import ConnectionPool
+
+
+@pytest.fixture()
+def pool():
+    p = ConnectionPool()
+    yield p
+    p.close_all()
+
+
+@pytest.fixture()
+def db_file(tmp_path):
+    path = tmp_path / "pool.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, val TEXT)")
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+def test_reader_is_reused_within_thread(pool, db_file):
+    first = pool.reader(db_file)
+    second = pool.reader(db_file)
+    assert first is second
+
+    stats = pool.stats()
+    assert stats["reader_misses"] == 1
+    assert stats["reader_hits"] == 1
+    assert stats["hit_rate"] == pytest.approx(0.5)
+
+
+def test_readers_are_thread_local(pool, db_file):
+    main_conn = pool.reader(db_file)
+    seen = {}
+
+    def _worker():
+        seen["conn"] = pool.reader(db_file)
+
+    t = threading.Thread(target=_worker)
+    t.start()
+    t.join()
+
+    assert seen["conn"] is not main_conn
+
+
+def test_reader_rejects_writes(pool, db_file):
+    conn = pool.reader(db_file)
+    with pytest.raises(sqlite3.OperationalError):
+        conn.execute("INSERT INTO t (val) VALUES ('x')")
+
+
+def test_writer_commits_and_enables_wal(pool, db_file):
+    with pool.writer(db_file) as conn:
+        conn.execute("INSERT INTO t (val) VALUES ('a')")
+
+    assert pool.reader(db_file).execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+    mode = pool.reader(db_file).execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode.lower() == "wal"
+
+
+def test_writer_rolls_back_on_error(pool, db_file):
+    with pytest.raises(RuntimeError):
+        with pool.writer(db_file) as conn:
+            conn.execute("INSERT INTO t (val) VALUES ('a')")
+            raise RuntimeError("boom")
+
+    assert pool.reader(db_file).execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+
+def test_nested_writer_commits_only_at_outermost_block(pool, db_file):
+    def count():
+        return pool.reader(db_file).execute("SELECT COUNT(*) FROM t").fetchone()[0]
+
+    with pytest.raises(RuntimeError):
+        with pool.writer(db_file) as outer:
+            outer.execute("INSERT INTO t (val) VALUES ('outer')")
+            with pool.writer(db_file) as inner:
+                inner.execute("INSERT INTO t (val) VALUES ('inner')")
+            assert count() == 0  # nothing committed by the inner block
+            raise RuntimeError("boom")
+    assert count() == 0
+
+    with pool.writer(db_file) as outer:
+        with pool.writer(db_file) as inner:  # no outer write yet
+            inner.execute("INSERT INTO t (val) VALUES ('kept')")
+        with pytest.raises(RuntimeError):
+            with pool.writer(db_file) as inner:
+                inner.execute("INSERT INTO t (val) VALUES ('dropped')")
+                raise RuntimeError("inner only")
+        outer.execute("INSERT INTO t (val) VALUES ('outer')")
+    vals = [r[0] for r in pool.reader(db_file).execute("SELECT val FROM t ORDER BY id")]
+    assert vals == ["kept", "outer"]
+
+
+def test_pragmas_applied(db_file):
+    pool = ConnectionPool(mmap_size=1024 * 1024, cache_size_kib=2048)
+    try:
+        conn = pool.reader(db_file)
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] == -2048
+        assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+    finally:
+        pool.close_all()
+
+
+def test_replaced_file_triggers_reconnect(pool, tmp_path):
+    path = str(tmp_path / "swap.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE a (x)")
+    conn.close()
+    pool.reader(path)
+
+    os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE b (x)")
+    conn.close()
+
+    tables = {
+        r[0]
+        for r in pool.reader(path).execute(
+            "SELECT name FROM sqlite_master WHERE type='table'"
+        )
+    }
+    assert tables == {"b"}
+    assert pool.stats()["reconnects"] == 1
+
+
+def test_default_path_follows_env_override(pool, db_file, tmp_path, monkeypatch):
+    other = tmp_path / "other.db"
+    sqlite3.connect(other).close()
+
+    monkeypatch.setenv("MH_DB_PATH", db_file)
+    first = pool.reader()
+    monkeypatch.setenv("MH_DB_PATH", str(other))
+    second = pool.reader()
+
+    assert first is not second
+
+
+def test_statement_cache_hits_for_rebound_values(db_file):
+    pool = ConnectionPool(cached_statements=2)
+    try:
+        pool.reader(db_file)
+        sql = "SELECT val FROM t WHERE id = ?"
+        assert pool.note_statement(sql, db_file) is False
+        assert pool.note_statement(sql, db_file) is True
+        # Evicted once more distinct statements than the cache holds are seen
+        pool.note_statement("SELECT 1", db_file)
+        pool.note_statement("SELECT 2", db_file)
+        assert pool.note_statement(sql, db_file) is False
+
+        stats = pool.stats()
+        assert stats["statement_hits"] == 1
+        assert stats["statement_misses"] == 4
+        assert stats["statement_hit_rate"] == pytest.approx(0.2)
+    finally:
+        pool.close_all()
@@ -0,0 +1,96 @@
+"""Tests for schema-driven DataFrame dtypes (app.utils.dtype_registry)."""
+
+from __future__ import annotations
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+import app.db_query as db_query
+from app.utils.db_migrations import apply_pending_migrations
+from app.utils.dtype_registry import DTYPE_REGISTRY, apply_dtypes, memory_savings
+
+_query_dataframe = db_query.query_dataframe
+
+
+def test_registry_is_derived_from_schema_and_enums():
+    assert DTYPE_REGISTRY["date"] == "datetime"
+    assert DTYPE_REGISTRY["birth_date"] == "datetime"
+    assert DTYPE_REGISTRY["gender"] == "category"
+    assert DTYPE_REGISTRY["ethnicity"] == "category"
+    assert DTYPE_REGISTRY["assessment_type"] == "category"
+    assert DTYPE_REGISTRY["active"] == "int8"
+    assert DTYPE_REGISTRY["engagement_score"] == "int32"
+    # Free text, identifiers and floats keep their SQLite dtypes
+    for column in ("id", "patient_id", "first_name", "bmi", "weight", "value"):
+        assert column not in DTYPE_REGISTRY
+
+
+def test_apply_dtypes_converts_only_losslessly():
+    raw = pd.DataFrame(
+        {
+            "patient_id": ["1", "2", "3"],
+            "date": ["2024-01-01", "2024-02-01", None],
+            "birth_date": ["1980-01-01", "not a date", "1990-05-05"],
+            "gender": ["F", "M", "F"],
+            "active": np.array([1, 0, 1], dtype="int64"),
+            "sbp": [120.0, np.nan, 130.0],  # NULLs arrive as float64
+            "engagement_score": np.array([5, 2**40, 7], dtype="int64"),
+        }
+    )
+    typed = apply_dtypes(raw)
+
+    assert pd.api.types.is_datetime64_dtype(typed["date"])
+    assert typed["date"].isna().tolist() == [False, False, True]
+    assert isinstance(typed["gender"].dtype, pd.CategoricalDtype)
+    assert typed["active"].dtype == "int8"
+    for column in ("patient_id", "birth_date", "sbp", "engagement_score"):
+        assert_frame_equal(typed[[column]], raw[[column]])
+    assert raw["gender"].dtype == object  # input left untouched
+
+
+def test_get_all_helpers_typed_by_default(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_query, "query_dataframe", _query_dataframe)
+    db_file = str(tmp_path / "typed.db")
+    apply_pending_migrations(db_file)
+    conn = sqlite3.connect(db_file)
+    conn.executescript(
+        """
+        INSERT INTO patients (id, first_name, last_name, gender, active,
+                              engagement_score, program_start_date)
+            VALUES ('1', 'A', 'A', 'F', 1, 70, '2024-01-01'),
+                   ('2', 'B', 'B', 'M', 0, 80, '2024-03-15');
+        INSERT INTO vitals (patient_id, date, bmi, sbp) VALUES
+            ('1', '2024-01-01', 25, 120), ('2', '2024-06-01', 42, 135);
+        """
+    )
+    conn.commit()
+    conn.close()
+
+    raw = db_query.get_all_patients(db_path=db_file, typed=False)
+    typed = db_query.get_all_patients(db_path=db_file)
+    assert raw["gender"].dtype == object
+    assert isinstance(typed["gender"].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_dtype(typed["program_start_date"])
+    assert typed["active"].dtype == "int8"
+    assert typed.loc[typed["active"] == 1, "id"].tolist() == ["1"]
+    assert_frame_equal(typed, apply_dtypes(raw))
+
+    vitals = db_query.get_all_vitals(db_path=db_file)
+    assert vitals["sbp"].dtype == "int32"
+    assert vitals["date"].max() == pd.Timestamp("2024-06-01")
+
+    stats = memory_savings(raw, typed)
+    assert stats["saved_bytes"] == stats["before_bytes"] - stats["after_bytes"]
+
+    monkeypatch.setenv("MH_TYPED_FRAMES", "0")
+    assert_frame_equal(db_query.get_all_patients(db_path=db_file), raw)
+    # query_dataframe stays untyped unless asked
+    sql = "SELECT gender FROM patients"
+    assert db_query.query_dataframe(sql, db_path=db_file)["gender"].dtype == object
+    assert isinstance(
+        db_query.query_dataframe(sql, db_path=db_file, typed=True)["gender"].dtype,
+        pd.CategoricalDtype,
+    )
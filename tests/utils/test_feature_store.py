@@ -0,0 +1,111 @@
+"""Tests for the patient feature store (migration 016)."""
+
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from app.utils.db_migrations import apply_pending_migrations
+from app.utils.feature_store import (
+    FEATURE_REGISTRY,
+    get_patient_features,
+    read_patient_features,
+    refresh_features,
+    register_feature,
+)
+
+
+@pytest.fixture()
+def feature_db(tmp_path):
+    db_path = str(tmp_path / "features.db")
+    apply_pending_migrations(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(
+        """
+        INSERT INTO patients (id, first_name, last_name, active, birth_date) VALUES
+            ('1', 'A', 'A', 1, '1980-01-01'), ('2', 'B', 'B', 0, NULL);
+        INSERT INTO vitals (patient_id, date, weight, bmi) VALUES
+            ('1', '2024-01-01', 200, 32), ('1', '2024-06-01', 180, 28.5),
+            ('2', '2024-02-01', 150, 22);
+        INSERT INTO mental_health (patient_id, date, assessment_type, score) VALUES
+            ('1', '2024-01-01', 'PHQ-9', 15), ('1', '2024-06-15', 'PHQ-9', 6);
+        INSERT INTO patient_visit_metrics
+            (patient_id, provider_visits, health_coach_visits) VALUES ('1', 3, 5);
+        """
+    )
+    conn.commit()
+    yield db_path, conn
+    conn.close()
+
+
+def _row(df, patient_id):
+    return df.set_index("patient_id").loc[patient_id]
+
+
+def test_first_read_builds_all_patients(feature_db):
+    db_path, conn = feature_db
+
+    df = get_patient_features(db_path=db_path, refresh=True)
+
+    assert df["patient_id"].tolist() == ["1", "2"]
+    one = _row(df, "1")
+    assert one["baseline_weight"] == 200
+    assert one["latest_weight"] == 180
+    assert one["weight_change"] == -20
+    assert one["weight_change_pct"] == pytest.approx(-10.0)
+    assert one["bmi_category"] == "overweight"
+    assert one["phq9_change"] == -9
+    assert one["total_visits"] == 8
+    assert one["age"] >= 44
+    assert _row(df, "2")["bmi_category"] == "normal"
+    assert conn.execute("SELECT COUNT(*) FROM feature_change_log").fetchone()[0] == 0
+
+
+def test_refresh_recomputes_only_changed_patients(feature_db):
+    db_path, conn = feature_db
+    assert refresh_features(db_path) == 2
+
+    conn.execute("INSERT INTO vitals (patient_id, date, weight, bmi) VALUES ('2', '2024-05-01', 165, 31)")
+    conn.commit()
+    assert refresh_features(db_path) == 1
+    assert refresh_features(db_path) == 0
+
+    two = _row(get_patient_features(["weight_change_pct", "bmi_category"], db_path=db_path), "2")
+    assert two["weight_change_pct"] == pytest.approx(10.0)
+    assert two["bmi_category"] == "obesity"
+
+    conn.execute("DELETE FROM patients WHERE id = '2'")
+    conn.commit()
+    df = get_patient_features(["age"], db_path=db_path, refresh=True)
+    assert df["patient_id"].tolist() == ["1"]
+
+
+def test_read_accessor_never_refreshes(feature_db):
+    db_path, conn = feature_db
+    pending = "SELECT COUNT(*) FROM feature_change_log"
+    assert conn.execute(pending).fetchone()[0] > 0
+
+    assert read_patient_features(db_path=db_path).empty
+    assert get_patient_features(db_path=db_path).empty
+    assert conn.execute(pending).fetchone()[0] > 0
+    assert conn.execute("SELECT COUNT(*) FROM patient_features").fetchone()[0] == 0
+
+
+def test_registered_feature_adds_column(feature_db, monkeypatch):
+    db_path, _ = feature_db
+    monkeypatch.setitem(FEATURE_REGISTRY, "_test_max_weight", None)
+    register_feature(
+        "_test_max_weight",
+        lambda inputs: inputs["vitals"].groupby("patient_id")["weight"].max(),
+        sources={"vitals"},
+    )
+
+    refresh_features(db_path, full=True)
+    df = get_patient_features(["_test_max_weight"], ["1"], db_path=db_path)
+    assert df["_test_max_weight"].tolist() == [200]
+
+    with pytest.raises(KeyError):
+        get_patient_features(["no_such_feature"], db_path=db_path)
+    with pytest.raises(ValueError):
+        register_feature("bad", lambda inputs: None, sources={"nowhere"})
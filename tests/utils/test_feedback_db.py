@@ -78,3 +78,15 @@ def test_load_feedback_with_data(temp_db):
     assert feedback[1]["question"] == "First question"
     assert feedback[1]["rating"] == "up"
     assert feedback[1]["comment"] is None
+
+
+def test_reads_skip_writer_once_table_exists(temp_db, monkeypatch):
+    import app.utils.feedback_db as feedback_db
+
+    insert_feedback(question="Q", rating="up", db_file=temp_db)
+
+    def _no_writer(*_a, **_kw):
+        raise AssertionError("read took the writer lock")
+
+    monkeypatch.setattr(feedback_db, "write_connection", _no_writer)
+    assert len(load_feedback(db_file=temp_db)) == 1
@@ -1,3 +1,5 @@
+import re
+
 import pytest
 import pandas as pd
 from pandas.testing import assert_frame_equal
@@ -292,3 +294,62 @@ def test_db_path_forwarded_to_query_dataframe(mocker):
     _, called_kwargs_default = mock_query_dataframe.call_args
     assert "db_path" in called_kwargs_default
     assert called_kwargs_default["db_path"] is None
+
+
+# ---------------------------------------------------------------------------
+# Batch (multi-condition) gap report
+# ---------------------------------------------------------------------------
+
+
+def test_build_all_conditions_gap_sql_single_pass():
+    """Batch SQL scans each source once and resolves condition synonyms."""
+    from app.utils.gap_report import build_all_conditions_gap_sql
+
+    sql = build_all_conditions_gap_sql(["t2dm", "diabetes", "obesity"])
+
+    assert sql.count("FROM latest_vitals") == 1
+    assert sql.count("FROM latest_labs") == 1
+    assert len(re.findall(r"FROM pmh\b", sql)) == 1  # not pmh_match
+    assert "('type_2_diabetes', 'A1C', 6.5, NULL, 'a1c')" in sql
+    assert "'morbid_obesity'" not in sql
+    assert "patients.active = 1" not in sql
+
+    with pytest.raises(ValueError, match="Gap-report not supported"):
+        build_all_conditions_gap_sql(["not_a_condition_xyz"])
+
+
+def test_get_all_condition_gap_reports_matches_single_reports(tmp_path):
+    """Batch report equals the per-condition reports stacked in long format."""
+    import sqlite3
+
+    from app.utils.db_migrations import apply_pending_migrations
+    from app.utils.gap_report import _RULES, get_all_condition_gap_reports
+
+    db_path = str(tmp_path / "gaps.db")
+    apply_pending_migrations(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(
+        """
+        INSERT INTO patients (id, first_name, last_name, active) VALUES
+            ('1', 'A', 'A', 1), ('2', 'B', 'B', 1), ('3', 'C', 'C', 0);
+        INSERT INTO vitals (patient_id, date, bmi) VALUES
+            ('1', '2024-01-01', 25), ('1', '2024-06-01', 42),
+            ('2', '2024-06-01', 31), ('3', '2024-06-01', 33);
+        INSERT INTO lab_results (patient_id, date, test_name, value) VALUES
+            ('1', '2024-01-01', 'A1C', 7.0), ('1', '2024-05-01', 'A1C', 6.0),
+            ('2', '2024-01-01', 'A1C', 8.0);
+        INSERT INTO pmh (patient_id, condition) VALUES ('2', 'Type 2 Diabetes');
+        """
+    )
+    conn.commit()
+    conn.close()
+
+    batch = get_all_condition_gap_reports(active_only=True, db_path=db_path)
+
+    assert list(batch.columns) == ["condition", "patient_id", "metric", "value", "date"]
+    for condition in _RULES:
+        single = get_condition_gap_report(condition, active_only=True, db_path=db_path)
+        part = batch[batch["condition"] == condition]
+        assert sorted(part["patient_id"]) == sorted(single["patient_id"])
+        assert sorted(part["value"]) == sorted(single.iloc[:, 1])
+    assert set(batch["condition"]) == {"obesity", "morbid_obesity", "prediabetes"}
@@ -0,0 +1,37 @@
+"""Tests for the report-query index advisor."""
+
+from __future__ import annotations
+
+import pytest
+
+from app.utils.db_migrations import apply_pending_migrations
+from app.utils.index_advisor import ReportQuery, advise, format_advice
+
+
+@pytest.fixture()
+def migrated_db(tmp_path):
+    db_path = str(tmp_path / "advisor.db")
+    apply_pending_migrations(db_path)
+    return db_path
+
+
+def test_report_queries_use_indexes_after_migrations(migrated_db):
+    results = advise(migrated_db)
+
+    assert results, "registry should not be empty"
+    assert [r.name for r in results if not r.ok] == []
+    by_name = {r.name: r for r in results}
+    gap = by_name["gap_report.type_2_diabetes"]
+    assert any("idx_latest_labs_test_value" in p for p in gap.plan)
+    assert gap.allowed_scans == ["pmh"]
+
+
+def test_full_table_scan_is_flagged(migrated_db):
+    query = ReportQuery(
+        "adhoc.height_filter",
+        lambda: ("SELECT v.patient_id FROM vitals v WHERE v.height > ?", (70,)),
+    )
+    [result] = advise(migrated_db, [query])
+
+    assert result.full_scans == ["vitals"]
+    assert "[FULL SCAN] adhoc.height_filter" in format_advice([result])
@@ -0,0 +1,194 @@
+"""Tests for the materialized latest-value tables (migration 015)."""
+
+from __future__ import annotations
+
+import importlib.util
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+import app.db_query as db_query
+from app.db_query import (
+    get_latest_labs,
+    get_latest_scores,
+    get_latest_vitals,
+    get_most_recent_labs,
+    get_patient_overview,
+)
+from app.utils.ai.code_generator import generate_code
+from app.utils.assumptions import resolve_metric_source
+from app.utils.db_migrations import apply_pending_migrations
+from app.utils.query_intent import QueryIntent
+
+_query_dataframe = db_query.query_dataframe
+
+
+@pytest.fixture(autouse=True)
+def real_query_dataframe(monkeypatch):
+    """Undo conftest's fake ``query_dataframe``; these tests read a real DB."""
+    monkeypatch.setattr(db_query, "query_dataframe", _query_dataframe)
+
+
+@pytest.fixture()
+def latest_db(tmp_path):
+    db_path = str(tmp_path / "latest.db")
+    apply_pending_migrations(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(
+        """
+        INSERT INTO patients (id, first_name, last_name, active) VALUES
+            ('1', 'A', 'A', 1), ('2', 'B', 'B', 1);
+        INSERT INTO vitals (patient_id, date, weight, bmi) VALUES
+            ('1', '2024-01-01', 180, 25), ('1', '2024-06-01', NULL, 42),
+            ('1', '2023-01-01', 150, 20);
+        INSERT INTO lab_results (patient_id, date, test_name, value, unit) VALUES
+            ('1', '2024-01-01', 'A1C', 7.0, '%'), ('1', '2023-05-01', 'A1C', 6.0, '%');
+        INSERT INTO mental_health (patient_id, date, assessment_type, score) VALUES
+            ('1', '2024-01-01', 'PHQ-9', 12), ('1', '2024-03-01', 'PHQ-9', 5);
+        INSERT INTO scores (patient_id, date, score_type, score_value) VALUES
+            ('1', '2024-01-01', 'vitality_score', 70);
+        """
+    )
+    conn.commit()
+    yield db_path, conn
+    conn.close()
+
+
+def _latest(conn, table, key):
+    return {
+        (pid, k): (value, date)
+        for pid, k, value, date in conn.execute(
+            f"SELECT patient_id, {key}, value, date FROM {table}"
+        )
+    }
+
+
+def test_inserts_keep_latest_non_null_value(latest_db):
+    db_path, conn = latest_db
+
+    vitals = _latest(conn, "latest_vitals", "metric")
+    assert vitals[("1", "bmi")] == (42.0, "2024-06-01")
+    assert vitals[("1", "weight")] == (180.0, "2024-01-01")
+    assert _latest(conn, "latest_labs", "test_name") == {
+        ("1", "A1C"): (7.0, "2024-01-01")
+    }
+    scores = _latest(conn, "latest_scores", "score_type")
+    assert scores[("1", "PHQ-9")] == (5.0, "2024-03-01")
+    assert scores[("1", "vitality_score")] == (70.0, "2024-01-01")
+
+
+def test_update_and_delete_recompute_from_history(latest_db):
+    db_path, conn = latest_db
+
+    conn.execute("DELETE FROM vitals WHERE date = '2024-06-01'")
+    conn.execute("UPDATE lab_results SET value = 8.1 WHERE date = '2023-05-01'")
+    conn.execute("DELETE FROM lab_results WHERE date = '2024-01-01'")
+    conn.execute("UPDATE mental_health SET patient_id = '2' WHERE date = '2024-03-01'")
+    conn.commit()
+
+    assert _latest(conn, "latest_vitals", "metric")[("1", "bmi")] == (
+        25.0,
+        "2024-01-01",
+    )
+    assert _latest(conn, "latest_labs", "test_name") == {
+        ("1", "A1C"): (8.1, "2023-05-01")
+    }
+    scores = _latest(conn, "latest_scores", "score_type")
+    assert scores[("1", "PHQ-9")] == (12.0, "2024-01-01")
+    assert scores[("2", "PHQ-9")] == (5.0, "2024-03-01")
+
+
+def test_unchanged_update_does_not_recompute(latest_db):
+    db_path, conn = latest_db
+    # Tamper with the materialized row; only a real change may overwrite it
+    conn.execute("UPDATE latest_vitals SET value = -1 WHERE metric = 'weight'")
+    conn.execute("UPDATE vitals SET weight = weight, bmi = bmi")
+    assert _latest(conn, "latest_vitals", "metric")[("1", "weight")][0] == -1
+
+    conn.execute("UPDATE vitals SET weight = 181 WHERE date = '2024-01-01'")
+    assert _latest(conn, "latest_vitals", "metric")[("1", "weight")][0] == 181
+
+
+def test_migration_creates_tables_without_all_sources(tmp_path):
+    spec = importlib.util.spec_from_file_location(
+        "latest_values", Path(__file__).parents[2] / "migrations" / "015_latest_values.py"
+    )
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+
+    db_path = str(tmp_path / "partial.db")
+    conn = sqlite3.connect(db_path)
+    conn.executescript(
+        """
+        CREATE TABLE vitals (vital_id INTEGER PRIMARY KEY, patient_id TEXT,
+            date TEXT, weight REAL, height REAL, bmi REAL, sbp INT, dbp INT);
+        INSERT INTO vitals (patient_id, date, bmi) VALUES ('1', '2024-01-01', 30);
+        """
+    )
+    conn.commit()
+    migration.migrate(db_path)
+
+    for table in ("latest_vitals", "latest_labs", "latest_scores"):
+        assert migration.table_exists(conn, table)
+    assert _latest(conn, "latest_vitals", "metric") == {("1", "bmi"): (30.0, "2024-01-01")}
+    conn.execute("INSERT INTO vitals (patient_id, date, bmi) VALUES ('1', '2024-02-01', 31)")
+    assert _latest(conn, "latest_vitals", "metric")[("1", "bmi")][0] == 31.0
+    conn.close()
+
+
+def test_accessors_and_overview_read_latest_tables(latest_db):
+    db_path, _ = latest_db
+
+    bmi = get_latest_vitals(metrics="bmi", db_path=db_path)
+    assert bmi[["patient_id", "value"]].values.tolist() == [["1", 42.0]]
+    assert get_latest_labs("1", ["A1C"], db_path=db_path)["value"].tolist() == [7.0]
+    phq = get_latest_scores(score_types="PHQ-9", db_path=db_path)
+    assert phq["source"].tolist() == ["mental_health"]
+
+    labs = get_most_recent_labs("1", db_path=db_path)
+    assert labs[["test_name", "value", "unit"]].values.tolist() == [["A1C", 7.0, "%"]]
+
+    overview = get_patient_overview("1", db_path=db_path)
+    assert overview["latest_vitals"]["bmi"] == 42.0
+    assert overview["latest_vitals"]["weight"] == 180.0
+    assert overview["latest_vitals"]["date"] == "2024-06-01"
+    assert overview["latest_labs"]["A1C"]["value"] == 7.0
+    assert set(overview["latest_scores"]) == {"vitality_score"}
+
+
+@pytest.mark.parametrize(
+    "query, per_patient",
+    [
+        ("average of each patient's latest BMI", True),
+        ("mean most recent weight per patient", True),
+        ("what is the latest average BMI", False),
+        ("average BMI of the most recent readings", False),
+    ],
+)
+def test_latest_source_only_for_per_patient_questions(query, per_patient):
+    params = {"metric_instance": resolve_metric_source(query)}
+    intent = QueryIntent(analysis_type="average", target_field="bmi", parameters=params)
+    assert ("FROM latest_vitals" in generate_code(intent, params)) is per_patient
+
+
+def test_latest_source_keeps_history_for_reading_filters():
+    params = {"metric_instance": resolve_metric_source("each patient's latest bmi")}
+    for extra in (
+        {"conditions": [{"field": "sbp", "operator": ">", "value": 140}]},
+        {"time_range": {"start_date": "2024-01-01", "end_date": "2024-06-30"}},
+        {"group_by": ["gender"]},
+    ):
+        intent = QueryIntent(
+            analysis_type="average", target_field="bmi", parameters=params, **extra
+        )
+        assert "latest_vitals" not in generate_code(intent, params)
+
+    kept = QueryIntent(
+        analysis_type="average",
+        target_field="bmi",
+        parameters=params,
+        filters=[{"field": "gender", "value": "F"}],
+        conditions=[{"field": "bmi", "operator": ">", "value": 30}],
+    )
+    assert "FROM latest_vitals" in generate_code(kept, params)
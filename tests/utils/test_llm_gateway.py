@@ -0,0 +1,113 @@
+"""Tests for the asyncio LLM gateway against the local stub server."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.errors import LLMError
+from app.utils.ai import llm_interface
+from app.utils.ai.llm_gateway import LLMGateway, llm_stage
+from app.utils.ai.llm_stub_server import StubLLMServer
+
+
+@pytest.fixture()
+def stub():
+    with StubLLMServer(responses={"hi": "hello there"}) as server:
+        yield server
+
+
+@pytest.fixture()
+def gateway(stub):
+    gw = LLMGateway(api_key="stub", base_url=stub.base_url, backoff_base=0.01)
+    yield gw
+    gw.close()
+
+
+def test_sync_ask_accounts_tokens_per_stage(stub, gateway):
+    with llm_stage("narrative"):
+        assert gateway.ask("system prompt", "hi") == "hello there"
+    gateway.ask("system prompt", "other", stage="intent")
+
+    usage = gateway.usage_stats()
+    assert usage["narrative"]["requests"] == 1
+    assert usage["narrative"]["prompt_tokens"] == 3
+    assert usage["narrative"]["completion_tokens"] == 2
+    assert usage["intent"]["total_tokens"] > 0
+
+
+def test_identical_inflight_requests_are_coalesced(stub, gateway):
+    stub.delay = 0.3
+
+    async def burst():
+        return await asyncio.gather(*(gateway.ask_async("p", "hi") for _ in range(5)))
+
+    assert asyncio.run(burst()) == ["hello there"] * 5
+    assert stub.requests == 1
+    assert gateway.usage_stats()["default"]["coalesced"] == 4
+
+
+def test_concurrency_is_bounded(stub):
+    stub.delay = 0.2
+    gw = LLMGateway(api_key="stub", base_url=stub.base_url, max_concurrency=2)
+
+    async def burst():
+        return await asyncio.gather(*(gw.ask_async("p", f"q{i}") for i in range(6)))
+
+    try:
+        asyncio.run(burst())
+    finally:
+        gw.close()
+    assert stub.requests == 6
+    assert stub.peak_active == 2
+
+
+def test_rate_limits_are_retried_then_surface_as_llm_error(stub, gateway):
+    stub.fail_first = 2
+    assert gateway.ask("p", "hi") == "hello there"
+    assert gateway.usage_stats()["default"]["retries"] == 2
+
+    stub.fail_first = stub.requests + 10
+    gateway.max_retries = 1
+    with pytest.raises(LLMError):
+        gateway.ask("p", "hi")
+    assert gateway.usage_stats()["default"]["errors"] == 1
+
+
+def test_ask_llm_uses_shared_gateway(monkeypatch, gateway):
+    monkeypatch.setattr(llm_interface, "_OFFLINE_MODE", False)
+    monkeypatch.setattr("app.utils.ai.llm_gateway.get_llm_gateway", lambda: gateway)
+    assert llm_interface.ask_llm("p", "hi") == "hello there"
+    assert gateway.usage_stats()["default"]["requests"] == 1
+
+
+def test_stream_yields_deltas_and_records_ttft(stub, gateway):
+    stub.token_delay = 0.05
+    with llm_stage("narrative"):
+        chunks = list(gateway.ask_stream("p", "hi"))
+
+    assert chunks == ["hello ", "there"]
+    usage = gateway.usage_stats()["narrative"]
+    assert usage["streams"] == 1
+    assert usage["completion_tokens"] == 2
+    assert 0 < usage["ttft_s"] < usage["latency_s"]
+
+
+def test_stream_retries_before_first_token(stub, gateway):
+    stub.fail_first = 1
+    assert "".join(gateway.ask_stream("p", "hi")) == "hello there"
+    assert gateway.usage_stats()["default"]["retries"] == 1
+
+
+def test_narrative_streams_through_on_token(monkeypatch, gateway):
+    from app.utils.ai import narrative_builder
+
+    monkeypatch.setattr(llm_interface, "_OFFLINE_MODE", False)
+    monkeypatch.setattr(narrative_builder, "is_offline_mode", lambda: False)
+    monkeypatch.setattr("app.utils.ai.llm_gateway.get_llm_gateway", lambda: gateway)
+
+    seen = []
+    text = narrative_builder.interpret_results("q", {"n": 1}, on_token=seen.append)
+    assert len(seen) > 1
+    assert text == "".join(seen).strip()
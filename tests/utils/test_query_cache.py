@@ -0,0 +1,92 @@
+"""Tests for the query_dataframe result cache (app.utils.query_cache)."""
+
+from __future__ import annotations
+
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from app.db_query import query_dataframe
+from app.utils.db_pool import write_connection
+from app.utils.query_cache import QueryCache, clear_query_cache, normalize_sql, query_cache_stats
+
+
+@pytest.fixture()
+def db_file(tmp_path):
+    path = tmp_path / "cache.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE vitals (patient_id TEXT, weight REAL)")
+    conn.executemany("INSERT INTO vitals VALUES (?, ?)", [("1", 180.0), ("2", 200.0)])
+    conn.commit()
+    conn.close()
+    clear_query_cache()
+    yield str(path)
+    clear_query_cache()
+
+
+SQL = "SELECT patient_id, weight FROM vitals WHERE weight > ? ORDER BY patient_id"
+
+
+def test_normalize_sql_keeps_literals():
+    assert normalize_sql("SELECT  *\n FROM t WHERE a = 'x  y' ;") == "SELECT * FROM t WHERE a = 'x  y'"
+
+
+def test_repeated_query_is_served_from_cache(db_file):
+    first = query_dataframe(SQL, params=(100,), db_path=db_file)
+    first.loc[0, "weight"] = -1  # caller mutation must not leak into the cache
+    second = query_dataframe("SELECT patient_id, weight\nFROM vitals WHERE weight > ? ORDER BY patient_id;", params=(100,), db_path=db_file)
+
+    assert second["weight"].tolist() == [180.0, 200.0]
+    stats = query_cache_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+    query_dataframe(SQL, params=(190,), db_path=db_file)
+    assert query_cache_stats()["misses"] == 2
+
+
+@pytest.mark.parametrize("external", [False, True])
+def test_writes_invalidate_cached_results(db_file, external):
+    assert len(query_dataframe(SQL, params=(0,), db_path=db_file)) == 2
+
+    if external:  # e.g. an ETL script with its own connection
+        conn = sqlite3.connect(db_file)
+        conn.execute("INSERT INTO vitals VALUES ('3', 150.0)")
+        conn.commit()
+        conn.close()
+    else:
+        with write_connection(db_file) as conn:
+            conn.execute("INSERT INTO vitals VALUES ('3', 150.0)")
+
+    assert len(query_dataframe(SQL, params=(0,), db_path=db_file)) == 3
+    assert query_cache_stats()["hits"] == 0
+
+
+def test_lru_eviction_by_bytes(db_file):
+    cache = QueryCache(max_bytes=1)
+    conn = sqlite3.connect(db_file)
+    key = cache.make_key(conn, db_file, SQL, (0,))
+    cache.put(key, pd.read_sql_query(SQL, conn, params=(0,)))
+    assert cache.stats()["entries"] == 0 and cache.stats()["skipped"] == 1
+
+    df = pd.DataFrame({"a": range(10)})
+    cache.max_bytes = int(df.memory_usage(index=True, deep=True).sum()) * 2
+    keys = [cache.make_key(conn, db_file, f"SELECT {i}") for i in range(3)]
+    cache.put(keys[0], df)
+    cache.put(keys[1], df)
+    cache.get(keys[0])  # touch -> keys[1] is now least recently used
+    cache.put(keys[2], df)
+
+    assert [e["sql"] for e in cache.entries()] == ["SELECT 0", "SELECT 2"]
+    assert cache.entries()[0]["hits"] == 1
+    assert cache.stats()["evictions"] == 1
+    conn.close()
+
+
+def test_uncacheable_queries(db_file):
+    conn = sqlite3.connect(db_file)
+    cache = QueryCache()
+    assert cache.make_key(conn, db_file, "DELETE FROM vitals") is None
+    assert cache.make_key(conn, db_file, SQL, ([1],)) is None
+    assert cache.make_key(conn, ":memory:", SQL) is None
+    conn.close()
@@ -35,3 +35,24 @@ def test_log_interaction_creates_row():
         assert "count" in row["intent_json"]
     finally:
         os.unlink(db_path)
+
+
+def test_log_interaction_records_narrative_latency(tmp_path):
+    """Narrative timings land in columns added to pre-existing tables."""
+    import sqlite3
+
+    db_path = str(tmp_path / "logs.db")
+    with sqlite3.connect(db_path) as conn:  # table as created by migration 006
+        conn.execute(
+            "CREATE TABLE assistant_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "query TEXT NOT NULL, intent_json TEXT, generated_code TEXT, "
+            "result_summary TEXT, duration_ms INTEGER, "
+            "created_at TEXT DEFAULT CURRENT_TIMESTAMP)"
+        )
+
+    ql.log_interaction(
+        query="q", result="done", narrative_ttft_ms=40, narrative_ms=900, db_file=db_path
+    )
+
+    row = ql.fetch_recent(limit=1, db_file=db_path)[0]
+    assert (row["narrative_ttft_ms"], row["narrative_ms"]) == (40, 900)
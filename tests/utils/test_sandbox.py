@@ -3,6 +3,7 @@
 import pytest
 import pandas as pd
 import numpy as np
+import app.utils.sandbox as sandbox_mod
 from app.utils.sandbox import run_snippet, run_user_code, SandboxResult
 
 
@@ -227,28 +228,30 @@ results = x[10]  # Index out of range
     )
 
 
-def test_run_user_code_large_dataframe():
+def test_run_user_code_large_dataframe(monkeypatch):
     """Test handling of excessively large DataFrames."""
+    monkeypatch.setattr(sandbox_mod, "MAX_DATAFRAME_SIZE", 8_000_000)
     large_df_code = """
 import pandas as pd
 import numpy as np
 
 # Create a DataFrame that exceeds the limit
-results = pd.DataFrame(np.random.rand(1000, 1001))  # Just above 1,000,000 cell limit
+results = pd.DataFrame(np.random.rand(1000, 1001))  # Just above 8,000,000 bytes
 """
     result = run_user_code(large_df_code)
     assert result.type == "error"
     assert "dataframe too large" in result.value.lower()
 
 
-def test_run_user_code_large_series():
+def test_run_user_code_large_series(monkeypatch):
     """Test handling of excessively large Series."""
+    monkeypatch.setattr(sandbox_mod, "MAX_DATAFRAME_SIZE", 8_000_000)
     large_series_code = """
 import pandas as pd
 import numpy as np
 
 # Create a Series that exceeds the limit
-results = pd.Series(range(1100000))  # Above the 1,000,000 limit
+results = pd.Series(range(1100000))  # Above 8,000,000 bytes
 """
     result = run_user_code(large_series_code)
     assert result.type == "error"
@@ -77,3 +77,13 @@ def test_load_saved_questions_bad_path_returns_empty_list(tmp_path):
     bad_path = tmp_path / "nonexistent" / "subdir" / "file.db"
     loaded = sqdb.load_saved_questions(db_file=str(bad_path))
     assert loaded == []
+
+
+def test_reads_skip_writer_once_table_exists(db_path, monkeypatch):
+    sqdb.upsert_question("Q1", "How many patients?", db_file=db_path)
+
+    def _no_writer(*_a, **_kw):
+        raise AssertionError("read took the writer lock")
+
+    monkeypatch.setattr(sqdb, "write_connection", _no_writer)
+    assert [q["name"] for q in sqdb.load_saved_questions(db_file=db_path)] == ["Q1"]
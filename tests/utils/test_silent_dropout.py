@@ -30,6 +30,13 @@ def mock_query_dataframe():
         yield mock
 
 
+@pytest.fixture
+def has_last_visit_date():
+    """Pretend migrations added ``patient_visit_metrics.last_visit_date``."""
+    with patch("app.utils.silent_dropout._check_column_exists", return_value=True):
+        yield
+
+
 @pytest.fixture
 def mock_sqlite3_connect():
     """Mock for sqlite3.connect."""
@@ -50,7 +57,7 @@ def mock_sqlite3_connect():
         yield mock, mock_conn, mock_cursor
 
 
-def test_get_silent_dropout_report(mock_query_dataframe):
+def test_get_silent_dropout_report(mock_query_dataframe, has_last_visit_date):
     """Test the silent dropout report generation."""
     # Call function with default parameters
     result = get_silent_dropout_report()
@@ -78,7 +85,9 @@ def test_get_silent_dropout_report(mock_query_dataframe):
     assert result["days_since_visit"].tolist() == [120, 75]
 
 
-def test_get_silent_dropout_report_custom_threshold(mock_query_dataframe):
+def test_get_silent_dropout_report_custom_threshold(
+    mock_query_dataframe, has_last_visit_date
+):
     """Test report generation with custom threshold."""
     # Call with custom threshold
     result = get_silent_dropout_report(threshold_days=60, active_only=False)
@@ -96,6 +105,16 @@ def test_get_silent_dropout_report_custom_threshold(mock_query_dataframe):
     assert mock_query_dataframe.call_args[1]["params"] == (expected_date,)
 
 
+def test_get_silent_dropout_report_without_last_visit_date(mock_query_dataframe):
+    """The simplified query has no placeholder, so nothing is bound."""
+    with patch("app.utils.silent_dropout._check_column_exists", return_value=False):
+        get_silent_dropout_report()
+
+    sql = mock_query_dataframe.call_args[0][0]
+    assert "?" not in sql
+    assert mock_query_dataframe.call_args[1]["params"] == ()
+
+
 def test_update_last_visit_date_for_patients(mock_sqlite3_connect):
     """Test updating last visit dates."""
     _, _, mock_cursor = mock_sqlite3_connect
@@ -0,0 +1,106 @@
+"""Tests for the columnar table snapshots (app.utils.snapshot_cache)."""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+import app.db_query as db_query
+from app.utils.db_migrations import apply_pending_migrations
+from app.utils.dtype_registry import apply_dtypes
+from app.utils.snapshot_cache import (
+    SNAPSHOT_QUERIES,
+    refresh_snapshots,
+    snapshot_dir,
+    snapshot_stats,
+)
+
+_query_dataframe = db_query.query_dataframe
+
+
+@pytest.fixture(autouse=True)
+def snapshots_on(monkeypatch):
+    """Undo conftest's fake ``query_dataframe`` and snapshot opt-out."""
+    monkeypatch.setattr(db_query, "query_dataframe", _query_dataframe)
+    monkeypatch.setenv("MH_SNAPSHOT_CACHE", "1")
+
+
+@pytest.fixture()
+def db_file(tmp_path):
+    db_path = str(tmp_path / "snap.db")
+    apply_pending_migrations(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(
+        """
+        INSERT INTO patients (id, first_name, last_name, active, engagement_score)
+            VALUES ('1', 'A', 'A', 1, NULL), ('2', 'B', 'B', 0, 80);
+        INSERT INTO vitals (patient_id, date, weight, bmi) VALUES
+            ('1', '2024-01-01', 180, 25), ('2', '2024-06-01', NULL, 42);
+        INSERT INTO mental_health (patient_id, date, assessment_type, score)
+            VALUES ('1', '2024-01-01', 'phq9', 7);
+        """
+    )
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def _sqlite(db_file, table):
+    # get_all_* return typed frames by default
+    conn = sqlite3.connect(db_file)
+    try:
+        return apply_dtypes(pd.read_sql_query(SNAPSHOT_QUERIES[table], conn))
+    finally:
+        conn.close()
+
+
+def test_get_all_helpers_serve_fresh_snapshots(db_file):
+    before = snapshot_stats()
+    first = db_query.get_all_vitals(db_path=db_file)
+    assert os.path.exists(os.path.join(snapshot_dir(db_file), "vitals.arrow"))
+
+    second = db_query.get_all_vitals(db_path=db_file)
+    stats = snapshot_stats()
+    assert stats["misses"] - before["misses"] == 1
+    assert stats["hits"] - before["hits"] == 1
+    assert_frame_equal(second, first)
+    assert_frame_equal(second, _sqlite(db_file, "vitals"))
+
+    # A commit from another connection makes only that table stale
+    db_query.get_all_patients(db_path=db_file)
+    conn = sqlite3.connect(db_file)
+    conn.execute("INSERT INTO vitals (patient_id, date, weight) VALUES ('2', '2025-01-01', 90)")
+    conn.commit()
+    conn.close()
+
+    hits = snapshot_stats()["hits"]
+    assert len(db_query.get_all_vitals(db_path=db_file)) == 3
+    assert snapshot_stats()["hits"] == hits
+    assert_frame_equal(
+        db_query.get_all_patients(db_path=db_file), _sqlite(db_file, "patients")
+    )
+    assert snapshot_stats()["hits"] == hits + 1
+
+
+def test_refresh_snapshots_writes_only_stale_tables(db_file):
+    assert refresh_snapshots(db_file) == len(SNAPSHOT_QUERIES)
+    assert refresh_snapshots(db_file) == 0
+
+    conn = sqlite3.connect(db_file)
+    conn.execute("UPDATE patients SET engagement_score = 90 WHERE id = '1'")
+    conn.commit()
+    conn.close()
+    assert refresh_snapshots(db_file) == 1
+
+    hits = snapshot_stats()["hits"]
+    for table, helper in [
+        ("patients", db_query.get_all_patients),
+        ("scores", db_query.get_all_scores),
+        ("mental_health", db_query.get_all_mental_health),
+    ]:
+        assert_frame_equal(helper(db_path=db_file), _sqlite(db_file, table))
+    assert snapshot_stats()["hits"] == hits + 3
@@ -0,0 +1,130 @@
+"""Tests for chunked queries and streaming aggregation (app.utils.streaming_stats)."""
+
+from __future__ import annotations
+
+import sqlite3
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+import app.db_query as db_query
+from app.utils.metrics import get_metric
+from app.utils.streaming_stats import QuantileSketch, RunningStats, stream_aggregate
+
+_query_dataframe = db_query.query_dataframe
+
+
+def _chunks(df: pd.DataFrame, size: int):
+    for start in range(0, len(df), size):
+        yield df.iloc[start : start + size]
+
+
+@pytest.fixture()
+def frame():
+    rng = np.random.default_rng(7)
+    n = 20_000
+    df = pd.DataFrame(
+        {
+            "gender": rng.choice(["F", "M", "X"], n),
+            "site": rng.choice(["a", "b"], n),
+            "bmi": rng.normal(30, 6, n),
+        }
+    )
+    df.loc[rng.choice(n, 500, replace=False), "bmi"] = np.nan
+    return df
+
+
+def test_running_stats_match_pandas(frame):
+    stats = RunningStats()
+    for chunk in _chunks(frame, 3_000):
+        stats.update(chunk["bmi"])
+    bmi = frame["bmi"]
+
+    assert stats.count == bmi.count()
+    assert stats.mean == pytest.approx(bmi.mean())
+    assert stats.std() == pytest.approx(bmi.std())
+    assert (stats.min, stats.max) == (bmi.min(), bmi.max())
+
+    left, right = RunningStats().update(bmi[:7]), RunningStats().update(bmi[7:])
+    assert left.merge(right).variance() == pytest.approx(bmi.var())
+
+
+def test_quantile_sketch_stays_within_rank_error(frame):
+    values = frame["bmi"].dropna().to_numpy()
+    sketch = QuantileSketch(k=256)
+    for chunk in _chunks(frame, 1_000):
+        sketch.update(chunk["bmi"])
+
+    assert sketch.count == values.size
+    assert sum(level.size for level in sketch._levels) < values.size / 10
+    for q, estimate in zip([0.1, 0.5, 0.9], sketch.quantile([0.1, 0.5, 0.9])):
+        rank = (values <= estimate).mean()
+        assert abs(rank - q) < 0.02
+    assert np.isnan(QuantileSketch().quantile(0.5))
+
+
+def test_stream_aggregate_matches_groupby(frame):
+    result = stream_aggregate(
+        _chunks(frame, 2_500), "bmi", by=["gender", "site"], quantiles=(0.5,)
+    )
+    expected = frame.groupby(["gender", "site"])["bmi"].agg(
+        ["count", "mean", "std", "min", "max"]
+    )
+
+    assert_frame_equal(result.drop(columns="q50"), expected, check_exact=False)
+    medians = frame.groupby(["gender", "site"])["bmi"].median()
+    assert (result["q50"] - medians).abs().max() < 0.5
+
+    overall = stream_aggregate(_chunks(frame, 2_500), "bmi")
+    assert overall.loc["all", "count"] == frame["bmi"].count()
+    assert overall.loc["all", "mean"] == pytest.approx(frame["bmi"].mean())
+
+
+def test_stream_aggregate_typed_chunks_skip_empty_groups(frame):
+    typed = frame.assign(gender=frame["gender"].astype("category"))
+    typed.loc[typed["gender"] == "X", "bmi"] = np.nan
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", FutureWarning)
+        result = stream_aggregate(_chunks(typed, 2_500), "bmi", by="gender")
+
+    assert list(result.index) == ["F", "M"]
+    expected = frame[frame["gender"] != "X"].groupby("gender")["bmi"].agg(
+        ["count", "mean", "std", "min", "max"]
+    )
+    result.index = result.index.astype(object)
+    assert_frame_equal(result, expected, check_exact=False)
+
+
+def test_iter_query_dataframe_streams_real_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_query, "query_dataframe", _query_dataframe)
+    db_file = str(tmp_path / "stream.db")
+    conn = sqlite3.connect(db_file)
+    conn.execute("CREATE TABLE vitals (patient_id TEXT, bmi REAL)")
+    conn.executemany(
+        "INSERT INTO vitals VALUES (?, ?)",
+        [(str(i % 7), 20 + i % 13) for i in range(1_000)],
+    )
+    conn.commit()
+    conn.close()
+    sql = "SELECT patient_id, bmi FROM vitals WHERE bmi > ? ORDER BY rowid"
+
+    chunks = list(db_query.iter_query_dataframe(sql, (21,), chunksize=300, db_path=db_file))
+    assert [len(c) for c in chunks][:-1] == [300] * (len(chunks) - 1)
+    assert_frame_equal(
+        pd.concat(chunks, ignore_index=True),
+        db_query.query_dataframe(sql, params=(21,), db_path=db_file),
+    )
+
+    summary = get_metric("running_summary")(
+        db_query.iter_query_dataframe(sql, (21,), chunksize=128, db_path=db_file),
+        "bmi",
+        by="patient_id",
+    )
+    assert summary["count"].sum() == sum(len(c) for c in chunks)
+
+    with pytest.raises(ValueError):
+        db_query.iter_query_dataframe(sql, chunksize=0, db_path=db_file)
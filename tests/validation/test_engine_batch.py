@@ -0,0 +1,257 @@
+"""Batch (vectorised) validation must match the per-patient engine exactly."""
+
+import random
+import sqlite3
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.utils.db_migrations import apply_pending_migrations
+from app.utils.rule_loader import initialize_validation_rules
+from app.utils.validation_engine import ValidationEngine, ValidationRule
+
+EXTRA_RULES = [
+    {
+        "rule_id": "BMI_FREQUENCY_CHECK",
+        "description": "BMI measured at least every 30 days",
+        "rule_type": "missing_data",
+        "validation_logic": "date_diff_check",
+        "parameters": {"field": "bmi", "max_days_between": 30},
+        "severity": "warning",
+    },
+    {
+        "rule_id": "WEIGHT_FREQUENCY_CHECK",
+        "description": "Skipped by the engine (BMI covers it)",
+        "rule_type": "missing_data",
+        "validation_logic": "date_diff_check",
+        "parameters": {"field": "weight", "max_days_between": 30},
+        "severity": "warning",
+    },
+    {
+        "rule_id": "SBP_ALLOWED_CHECK",
+        "description": "SBP restricted to a toy set (exercises vitals values)",
+        "rule_type": "consistency_check",
+        "validation_logic": "allowed_values_check",
+        "parameters": {"field": "sbp", "allowed_values": [120, 130], "not_null": True},
+        "severity": "info",
+    },
+    {
+        "rule_id": "END_DATE_IF_INACTIVE",
+        "description": "Inactive patients need an end date",
+        "rule_type": "missing_data",
+        "validation_logic": "conditional_not_null_check",
+        "parameters": {
+            "field": "program_end_date",
+            "required_if": [{"field": "active", "operator": "==", "value": 0}],
+        },
+        "severity": "error",
+    },
+    {
+        "rule_id": "HEIGHT_IF_HEAVY",
+        "description": "Height required once weight exceeds 300",
+        "rule_type": "missing_data",
+        "validation_logic": "conditional_not_null_check",
+        "parameters": {
+            "field": "height",
+            "required_if": [{"field": "weight", "operator": ">", "value": 300}],
+        },
+        "severity": "warning",
+    },
+]
+
+DATE_FORMATS = ["%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%m/%d/%Y"]
+
+
+def _seed(conn: sqlite3.Connection, n_patients: int = 120, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    for pid in range(1, n_patients + 1):
+        conn.execute(
+            "INSERT INTO patients (id, first_name, last_name, program_start_date, "
+            "program_end_date, active, glp1_full) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                str(pid),
+                "P",
+                str(pid),
+                rng.choice(["2025-01-01", None]),
+                rng.choice(["2025-06-01", None, None]),
+                rng.choice([0, 1, 1, None, "yes"]),
+                rng.choice([0, 1, 2, None]),
+            ),
+        )
+        fmt = rng.choice(DATE_FORMATS)
+        day = rng.randint(0, 20)
+        for _ in range(rng.randint(0, 6)):
+            day += rng.choice([5, 20, 45, 120])
+            date = (datetime(2024, 1, 1) + timedelta(days=day)).strftime(fmt)
+            if rng.random() < 0.05:
+                date = f"unknown-{day}"
+            conn.execute(
+                "INSERT INTO vitals (patient_id, date, weight, height, bmi, sbp, dbp) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    str(pid),
+                    date,
+                    rng.choice([150.0, 480.0, 90.0, None, "n/a"]),
+                    rng.choice([65, None]),
+                    rng.choice([24.0, 8.0, 85.0, None]),
+                    rng.choice([120, 130, 250, None]),
+                    rng.choice([80, 30, None]),
+                ),
+            )
+    conn.commit()
+
+
+@pytest.fixture(scope="module")
+def seeded_db(tmp_path_factory):
+    db_path = tmp_path_factory.mktemp("batch_db") / "batch.db"
+    apply_pending_migrations(str(db_path))
+    conn = sqlite3.connect(db_path)
+    _seed(conn)
+    conn.close()
+    initialize_validation_rules(str(db_path))
+
+    engine = ValidationEngine(str(db_path))
+    for rule in EXTRA_RULES:
+        engine.save_rule_to_db(ValidationRule(rule))
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE validation_rules SET is_active = 1")
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def _copy(src, tmp_path, name):
+    # backup() includes pages still sitting in the WAL of the pooled writer
+    dst = tmp_path / name
+    source, target = sqlite3.connect(src), sqlite3.connect(dst)
+    source.backup(target)
+    source.close()
+    target.close()
+    return str(dst)
+
+
+def _flatten(results):
+    return {
+        pid: [(r.rule_id, r.field_name, r.issue_description) for r in found]
+        for pid, found in results.items()
+    }
+
+
+def _stored(db_path):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        "SELECT rule_id, patient_id, field_name, issue_description, status "
+        "FROM validation_results"
+    ).fetchall()
+    conn.close()
+    return Counter(rows)
+
+
+def test_batch_matches_per_patient(seeded_db, tmp_path):
+    slow_db = _copy(seeded_db, tmp_path, "slow.db")
+    fast_db = _copy(seeded_db, tmp_path, "fast.db")
+
+    expected = ValidationEngine(slow_db).validate_all_patients()
+    actual = ValidationEngine(fast_db).validate_all_patients(batch=True)
+
+    fired = {r.rule_id for found in expected.values() for r in found}
+    assert {rule["rule_id"] for rule in EXTRA_RULES} - fired == {
+        "WEIGHT_FREQUENCY_CHECK"
+    }
+    assert list(actual) == list(expected)
+    assert _flatten(actual) == _flatten(expected)
+    assert _stored(fast_db) == _stored(slow_db)
+
+
+def test_batch_subset_and_no_save(seeded_db, tmp_path):
+    db = _copy(seeded_db, tmp_path, "subset.db")
+    engine = ValidationEngine(db)
+
+    subset = ["5", "3", "does-not-exist", "17"]
+    batch = engine.validate_patients_batch(subset, save=False)
+    assert set(batch) <= {"3", "5", "17"}
+    assert _stored(db) == Counter()
+
+    for pid in ("3", "5", "17"):
+        per_patient = engine.validate_patient(pid)
+        assert _flatten({pid: per_patient}).get(pid) == _flatten(batch).get(pid, [])
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parallel_matches_batch(seeded_db, tmp_path, workers):
+    batch_db = _copy(seeded_db, tmp_path, "batch.db")
+    parallel_db = _copy(seeded_db, tmp_path, "parallel.db")
+
+    expected = ValidationEngine(batch_db).validate_patients_batch()
+    engine = ValidationEngine(parallel_db)
+    actual = engine.validate_patients_parallel(workers=workers, chunk_size=25)
+
+    assert list(actual) == list(expected)
+    assert _flatten(actual) == _flatten(expected)
+    assert _stored(parallel_db) == _stored(batch_db)
+
+    timings = engine.last_shard_timings
+    assert [t["shard"] for t in timings] == list(range(5))  # 120 patients / 25
+    assert sum(t["patients"] for t in timings) == 120
+
+
+def test_parallel_failed_write_keeps_watermark(seeded_db, tmp_path, monkeypatch):
+    db = _copy(seeded_db, tmp_path, "failed_write.db")
+    engine = ValidationEngine(db)
+    before = engine.get_validation_watermark()
+    insert = engine._insert_results
+    calls = []
+
+    def flaky_insert(conn, results):
+        calls.append(1)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("disk I/O error")
+        insert(conn, results)
+
+    monkeypatch.setattr(engine, "_insert_results", flaky_insert)
+    actual = engine.validate_patients_parallel(workers=1, chunk_size=25)
+
+    assert [t["shard"] for t in engine.last_shard_timings] == [1, 2, 3, 4]
+    assert len(actual) < len(engine.validate_patients_batch(save=False))
+    assert engine.get_validation_watermark() == before
+
+    monkeypatch.setattr(engine, "_insert_results", insert)
+    engine.validate_patients_parallel(workers=1, chunk_size=25)
+    assert engine.get_validation_watermark() > before
+
+
+
+def test_batch_matches_per_patient_with_text_bmi(seeded_db, tmp_path):
+    """A text BMI makes the per-patient weight range check fail for that patient."""
+    seeded = _copy(seeded_db, tmp_path, "seeded.db")
+    conn = sqlite3.connect(seeded)
+    conn.executemany(
+        "INSERT INTO patients (id, first_name, last_name) VALUES (?, 'P', ?)",
+        [(pid, pid) for pid in ("901", "902", "903")],
+    )
+    conn.executemany(
+        "INSERT INTO vitals (patient_id, date, weight, bmi) VALUES (?, ?, ?, ?)",
+        [
+            ("901", "2024-02-01", 520.0, 24.0),
+            ("901", "2024-03-01", 520.0, "n/a"),  # raises: weight rule dropped
+            ("902", "unknown-1", 520.0, "n/a"),  # skipped on its date first
+            ("902", "2024-02-01", 520.0, 24.0),
+            ("903", "2024-02-01", None, "n/a"),  # no weight, row never reached
+            ("903", "2024-03-01", 520.0, 24.0),
+        ],
+    )
+    conn.commit()
+    conn.close()
+    slow_db = _copy(seeded, tmp_path, "slow.db")
+    fast_db = _copy(seeded, tmp_path, "fast.db")
+
+    expected = ValidationEngine(slow_db).validate_all_patients()
+    actual = ValidationEngine(fast_db).validate_all_patients(batch=True)
+
+    def weight_issues(pid):
+        return [r for r in expected.get(pid, []) if r.field_name == "weight"]
+
+    assert not weight_issues("901")
+    assert weight_issues("902") and weight_issues("903")
+    assert _flatten(actual) == _flatten(expected)
@@ -0,0 +1,96 @@
+"""Incremental validation driven by validation_change_log (migration 011)."""
+
+import sqlite3
+
+import pytest
+
+from app.services import data_service
+from app.utils.db_migrations import apply_pending_migrations
+from app.utils.db_pool import write_connection
+from app.utils.rule_loader import initialize_validation_rules
+from app.utils.validation_engine import ValidationEngine
+
+
+@pytest.fixture()
+def db_path(tmp_path):
+    path = str(tmp_path / "incremental.db")
+    apply_pending_migrations(path)
+    conn = sqlite3.connect(path)
+    for pid in ("1", "2", "3"):
+        conn.execute(
+            "INSERT INTO patients (id, first_name, last_name, program_start_date, active) "
+            "VALUES (?, 'P', ?, '2025-01-01', 1)",
+            (pid, pid),
+        )
+        conn.execute(
+            "INSERT INTO vitals (patient_id, date, weight, bmi) VALUES (?, '2025-01-01', 180, 25)",
+            (pid,),
+        )
+    conn.commit()
+    conn.close()
+    initialize_validation_rules(path)
+    return path
+
+
+def _results(path):
+    conn = sqlite3.connect(path)
+    rows = conn.execute(
+        "SELECT result_id, patient_id, rule_id, issue_description FROM validation_results"
+    ).fetchall()
+    conn.close()
+    return rows
+
+
+def test_full_run_consumes_change_log(db_path):
+    engine = ValidationEngine(db_path)
+    _, pending = engine.get_changed_patients()
+    assert pending == ["1", "2", "3"]
+
+    engine.validate_all_patients(batch=True)
+
+    latest, pending = engine.get_changed_patients()
+    assert pending == []
+    assert engine.get_validation_watermark() == latest
+
+
+def test_incremental_only_touches_changed_patients(db_path):
+    engine = ValidationEngine(db_path)
+    engine.validate_all_patients(batch=True)
+    before = {row[0]: row for row in _results(db_path) if row[1] != "2"}
+
+    with write_connection(db_path) as conn:
+        conn.execute("UPDATE vitals SET bmi = 95 WHERE patient_id = '2'")
+
+    assert engine.get_changed_patients()[1] == ["2"]
+    found = engine.validate_incremental()
+
+    after = _results(db_path)
+    # untouched patients keep their original rows (same result ids)
+    assert {row[0]: row for row in after if row[1] != "2"} == before
+    stored_p2 = sorted(row[2:] for row in after if row[1] == "2")
+    fresh_p2 = engine.validate_patients_batch(["2"], save=False)["2"]
+    assert stored_p2 == sorted((r.rule_id, r.issue_description) for r in fresh_p2)
+    assert any("bmi value 95.0" in r.issue_description for r in found["2"])
+    assert engine.get_changed_patients()[1] == []
+
+
+def test_noop_upsert_is_not_logged(db_path):
+    engine = ValidationEngine(db_path)
+    engine.validate_all_patients(batch=True)
+
+    with write_connection(db_path) as conn:
+        conn.execute(
+            "INSERT INTO vitals (patient_id, date, weight) VALUES ('1', '2025-01-01', 180) "
+            "ON CONFLICT(patient_id, date) DO UPDATE SET weight = excluded.weight"
+        )
+
+    assert engine.get_changed_patients()[1] == []
+
+
+def test_correction_marks_patient_dirty(db_path):
+    engine = ValidationEngine(db_path)
+    engine.validate_all_patients(batch=True)
+    result_id = next(row[0] for row in _results(db_path) if row[1] == "3")
+
+    assert data_service.submit_correction_db(db_path, result_id, "fixed", "typo")
+    assert engine.get_changed_patients()[1] == ["3"]